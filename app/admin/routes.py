@@ -2,6 +2,7 @@ from fastapi import APIRouter, Request, Depends, Form, HTTPException, File, Uplo
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from typing import Dict, Any, List, Optional, Set
+import asyncio
 import redis.asyncio as aioredis
 import redis
 import base64
@@ -34,6 +35,7 @@ from app.utils.supabase_credentials import SupabaseCredentialManager
 from app.constants import DOCUMENT_MAX_UPLOAD_BYTES, DOCUMENT_MAX_UPLOAD_MB
 from app.services.client_supabase_auth import generate_client_session_tokens
 from app.services.client_connection_manager import get_connection_manager
+from app.services.embed_config_cache import invalidate_embed_config
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -44,6 +46,9 @@ _pending_telegram_codes: Dict[str, Dict[str, Any]] = {}
 # In-memory profile cache fallback when Supabase profile/auth records are unavailable (dev/superadmin)
 _profile_cache: Dict[str, Dict[str, Any]] = {}
 
+# Running re-embedding jobs (see admin_reembed_client)
+_reembed_tasks: Set[asyncio.Task] = set()
+
 def _pending_key(user_id: Optional[str], email: Optional[str]) -> str:
     return str(user_id or email or "unknown").lower()
 
@@ -5313,6 +5318,8 @@ async def admin_update_agent(
                         "sound_settings": sound_settings
                     }).eq("slug", agent_slug).execute()
                     logger.info(f"🔊 Updated sound_settings result: {result.data if result else 'no result'}")
+                    # update_agent invalidated before this write; drop anything cached in between
+                    await invalidate_embed_config(client_id)
                 else:
                     logger.warning(f"🔊 No Supabase client available for client {client_id}")
             except Exception as sound_err:
@@ -5550,6 +5557,48 @@ async def edit_client_modal(client_id: str, request: Request, admin_user: Dict[s
     """
     return HTMLResponse(html)
 
+@router.post("/clients/{client_id}/reembed")
+async def admin_reembed_client(
+    client_id: str,
+    request: Request,
+    admin_user: Dict[str, Any] = Depends(get_admin_user)
+):
+    """Start a resumable re-embedding of the client's vectors with a new embedding model.
+
+    The client's embedding settings switch to the new model once every column has been swapped.
+    """
+    ensure_client_access(client_id, admin_user)
+    if not os.getenv("SUPABASE_ACCESS_TOKEN"):
+        raise HTTPException(status_code=503, detail="SUPABASE_ACCESS_TOKEN is required to re-embed")
+
+    from app.services.reembedding_job import SUPPORTED_DIMENSION, reembed_client
+
+    form = await request.form()
+    provider = (form.get("embedding_provider") or "").strip()
+    model = (form.get("embedding_model") or "").strip()
+    document_model = (form.get("document_embedding_model") or "").strip() or None
+    try:
+        dimension = int(form.get("embedding_dimension") or SUPPORTED_DIMENSION)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="embedding_dimension must be an integer")
+    if not provider or not model:
+        raise HTTPException(status_code=400, detail="embedding_provider and embedding_model are required")
+    if dimension != SUPPORTED_DIMENSION:
+        raise HTTPException(status_code=400, detail=f"Only {SUPPORTED_DIMENSION}-dimension embeddings are supported")
+
+    async def _run() -> None:
+        try:
+            await reembed_client(client_id, provider, model, dimension, document_model=document_model)
+        except Exception as e:
+            logger.error(f"Re-embedding failed for client {client_id}: {e}")
+
+    # Hold a reference until the job finishes so it is not garbage-collected mid-run
+    task = asyncio.create_task(_run())
+    _reembed_tasks.add(task)
+    task.add_done_callback(_reembed_tasks.discard)
+    return {"success": True, "message": "Re-embedding started; progress is tracked in embedding_reembed_progress"}
+
+
 @router.post("/clients/{client_id}/update")
 async def admin_update_client(
     client_id: str,
@@ -8,8 +8,31 @@ import logging
 import json
 from typing import Dict, Optional, Any
 
+from app.services.credential_cache import get_credential_cache
+
 logger = logging.getLogger(__name__)
 
+_platform_clients: Dict[tuple, Any] = {}
+
+
+def _platform_client(supabase_url: str, supabase_key: str):
+    """Reuse one platform Supabase client per process instead of one per load."""
+    client = _platform_clients.get((supabase_url, supabase_key))
+    if client is None:
+        from supabase import create_client
+
+        client = create_client(supabase_url, supabase_key)
+        _platform_clients[(supabase_url, supabase_key)] = client
+    return client
+
+
+def _cached(scope: Optional[str], name: str, loader):
+    """Serve from the process-wide credential cache (TTL, single-flight)."""
+    if not scope:
+        return loader()
+    return get_credential_cache().get(scope, name, loader)
+
+
 class APIKeyLoader:
     """Handles loading API keys from various sources"""
     
@@ -79,11 +102,13 @@ class APIKeyLoader:
     
     @staticmethod
     def _load_from_supabase(client_id: str) -> Dict[str, str]:
+        """Client API keys via the credential cache (refreshes at most once per TTL)."""
+        return _cached(client_id, "byok_keys", lambda: APIKeyLoader._fetch_from_supabase(client_id))
+
+    @staticmethod
+    def _fetch_from_supabase(client_id: str) -> Dict[str, str]:
         """Load API keys from Supabase for a specific client"""
         try:
-            # Import here to avoid circular dependencies
-            from supabase import create_client, Client
-            
             supabase_url = os.getenv('SUPABASE_URL')
             supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
             
@@ -91,8 +116,8 @@ class APIKeyLoader:
                 logger.error("Supabase credentials not available - cannot load API keys")
                 return {}
                 
-            # Create Supabase client
-            supabase: Client = create_client(supabase_url, supabase_key)
+            # Shared platform Supabase client
+            supabase = _platform_client(supabase_url, supabase_key)
             
             # Get client API keys from the 'clients' table
             # Platform database stores API keys as individual columns
@@ -14,6 +14,10 @@ Auto-generation feature:
 - Automatically generates new images at configurable intervals
 - Uses recent conversation context to create relevant visuals
 - Keeps the visual experience fresh without relying solely on LLM tool calls
+- Pipelined: the next image starts generating ahead of its display time
+  (based on a rolling average of generation latency) and is held in a small
+  look-ahead buffer, so each image is shown on schedule instead of one full
+  generation time late
 """
 
 from __future__ import annotations
@@ -23,7 +27,9 @@ import json
 import logging
 import random
 import time
-from typing import Any, Dict, List, Optional, Callable, Awaitable
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Callable, Awaitable
 
 from livekit import rtc
 from livekit.agents.llm.tool_context import function_tool as lk_function_tool, ToolError
@@ -41,6 +47,15 @@ CONVERSATIONAL_FILLER = [
 ]
 
 
+@dataclass
+class _PrefetchedImage:
+    """An auto-generated image waiting in the look-ahead buffer"""
+    prompt: str
+    result: Any
+    context_version: int
+    created_at: float
+
+
 class KenBurnsToolBuilder:
     """
     Builds Ken Burns image generation tools for an agent session.
@@ -102,6 +117,14 @@ class KenBurnsToolBuilder:
         self._auto_generation_task: Optional[asyncio.Task] = None
         self._auto_generation_running = False
 
+        # Pipelined prefetch settings
+        self.prefetch_depth = max(1, int(kenburns_config.get("prefetch_depth", 1)))
+        self._avg_generation_s = float(kenburns_config.get("expected_generation_seconds", 4.0))
+        self._prefetch_buffer: Deque[_PrefetchedImage] = deque()
+        self._prefetch_task: Optional[asyncio.Task] = None
+        self._warmup_task: Optional[asyncio.Task] = None
+        self._context_version = 0
+
         # Track generation state
         self._current_image_url: Optional[str] = None
         self._generation_in_progress = False
@@ -185,6 +208,7 @@ class KenBurnsToolBuilder:
             self._recent_context.append(text.strip())
             if len(self._recent_context) > self._max_context_items:
                 self._recent_context.pop(0)
+            self._context_version += 1
 
     def update_user_context(self, text: str) -> None:
         """
@@ -198,6 +222,7 @@ class KenBurnsToolBuilder:
             self._recent_user_context.append(text.strip())
             if len(self._recent_user_context) > self._max_context_items:
                 self._recent_user_context.pop(0)
+            self._context_version += 1
 
     @staticmethod
     def _strip_filler(text: str) -> str:
@@ -281,62 +306,120 @@ class KenBurnsToolBuilder:
         ]
         return random.choice(fallback_prompts)
 
-    async def _auto_generate_image(self) -> None:
-        """
-        Automatically generate an image using recent context.
-        Called by the auto-generation background task.
-        """
-        if self._generation_in_progress:
-            logger.debug("Auto-generation skipped - generation already in progress")
-            return
+    def _record_generation_time(self, generation_time_ms: float) -> None:
+        """Track a rolling average of generation latency to size the prefetch lead"""
+        seconds = max(0.0, generation_time_ms / 1000.0)
+        self._avg_generation_s = 0.7 * self._avg_generation_s + 0.3 * seconds
 
-        self._generation_in_progress = True
-        try:
-            # Generate prompt from context
-            auto_prompt = self._generate_auto_prompt()
-            enhanced_prompt = self._enhance_prompt(auto_prompt)
-
-            logger.info(f"Auto-generating Ken Burns image: {auto_prompt[:50]}...")
-
-            # Generate the image
-            result = await self.runware.generate_image(
-                prompt=enhanced_prompt,
-                width=self.image_width,
-                height=self.image_height,
-                negative_prompt=self.DEFAULT_NEGATIVE_PROMPT,
-            )
+    def _next_display_at(self) -> float:
+        """Wall-clock time the next auto-generated image is due on screen"""
+        return self._last_generation_time + self.auto_interval
+
+    def _buffer_is_fresh(self) -> bool:
+        """True if the look-ahead buffer is full of images built from the current context"""
+        return (
+            len(self._prefetch_buffer) >= self.prefetch_depth
+            and self._prefetch_buffer[-1].context_version == self._context_version
+        )
 
-            # Update state
-            self._current_image_url = result.image_url
-            self._last_generation_time = time.time()
-            self._generation_count += 1
+    async def _prefetch_image(self) -> None:
+        """Generate one image from the rolling context into the look-ahead buffer."""
+        context_version = self._context_version
+        auto_prompt = self._generate_auto_prompt()
+        enhanced_prompt = self._enhance_prompt(auto_prompt)
 
-            # Send to frontend
-            await self._send_image_to_frontend(
-                image_url=result.image_url,
+        logger.info(f"Prefetching Ken Burns image: {auto_prompt[:50]}...")
+
+        result = await self.runware.generate_image(
+            prompt=enhanced_prompt,
+            width=self.image_width,
+            height=self.image_height,
+            negative_prompt=self.DEFAULT_NEGATIVE_PROMPT,
+        )
+        self._record_generation_time(result.generation_time_ms)
+
+        self._prefetch_buffer.append(
+            _PrefetchedImage(
                 prompt=auto_prompt,
-                generation_time_ms=result.generation_time_ms,
+                result=result,
+                context_version=context_version,
+                created_at=time.time(),
             )
+        )
+        while len(self._prefetch_buffer) > self.prefetch_depth:
+            self._prefetch_buffer.popleft()
+
+    def _ensure_prefetch(self) -> Optional[asyncio.Task]:
+        """Start a prefetch unless one is in flight or the buffer is already fresh."""
+        if self._prefetch_task and not self._prefetch_task.done():
+            return self._prefetch_task
+        if self._buffer_is_fresh():
+            return None
+        self._prefetch_task = asyncio.create_task(self._prefetch_image())
+        self._prefetch_task.add_done_callback(self._on_background_task_done)
+        return self._prefetch_task
 
-            logger.info(
-                f"Auto-generated Ken Burns image in {result.generation_time_ms:.0f}ms"
-            )
+    @staticmethod
+    def _on_background_task_done(task: asyncio.Task) -> None:
+        """Retrieve a prefetch/warm-up outcome so failures are logged even when nobody awaits it."""
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            logger.warning(f"Ken Burns background generation task failed: {error}")
 
-        except Exception as e:
-            logger.error(f"Auto-generation failed: {e}", exc_info=True)
-        finally:
-            self._generation_in_progress = False
+    def _take_prefetched(self) -> Optional[_PrefetchedImage]:
+        """
+        Pop the next image to display.
+
+        Images built from superseded context are dropped in favour of the
+        newest one, so the display follows the conversation.
+        """
+        if not self._prefetch_buffer:
+            return None
+        newest_version = self._prefetch_buffer[-1].context_version
+        while self._prefetch_buffer and self._prefetch_buffer[0].context_version < newest_version:
+            self._prefetch_buffer.popleft()
+        return self._prefetch_buffer.popleft()
+
+    async def _display_prefetched(self, item: _PrefetchedImage) -> None:
+        """Publish a prefetched image and reset the display schedule."""
+        self._current_image_url = item.result.image_url
+        self._last_generation_time = time.time()
+        self._generation_count += 1
+
+        await self._send_image_to_frontend(
+            image_url=item.result.image_url,
+            prompt=item.prompt,
+            generation_time_ms=item.result.generation_time_ms,
+        )
+
+        logger.info(
+            f"Auto-generated Ken Burns image displayed "
+            f"(generated in {item.result.generation_time_ms:.0f}ms, "
+            f"buffered {time.time() - item.created_at:.1f}s)"
+        )
 
     async def _auto_generation_loop(self) -> None:
         """
-        Background loop that auto-generates images at the configured interval.
+        Background loop that keeps auto-generated images on schedule.
+
+        Generation for the next image starts ``_avg_generation_s`` before it is
+        due, so it is ready (or nearly ready) when the current one expires.
+        Manual generations push the schedule back via ``_last_generation_time``.
         """
-        logger.info(f"Starting Ken Burns auto-generation loop (interval: {self.auto_interval}s)")
+        logger.info(
+            f"Starting Ken Burns auto-generation loop (interval: {self.auto_interval}s, "
+            f"prefetch_depth: {self.prefetch_depth})"
+        )
 
         while self._auto_generation_running:
             try:
-                # Wait for the interval
-                await asyncio.sleep(self.auto_interval)
+                # Sleep until it's time to start generating the next image
+                prefetch_at = self._next_display_at() - self._avg_generation_s
+                delay = prefetch_at - time.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
 
                 if not self._auto_generation_running:
                     break
@@ -345,11 +428,31 @@ class KenBurnsToolBuilder:
                 # which calls stop_auto_generation(). No need to check state here -
                 # if the room disconnects, the loop will be cancelled.
 
-                # Check if enough time has passed since last generation
-                # (manual generations should also reset the timer)
-                time_since_last = time.time() - self._last_generation_time
-                if time_since_last >= self.auto_interval:
-                    await self._auto_generate_image()
+                # A manual generation may have pushed the schedule back while we slept
+                if self._next_display_at() - self._avg_generation_s > time.time() + 0.05:
+                    continue
+
+                task = self._ensure_prefetch()
+
+                remaining = self._next_display_at() - time.time()
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+                if not self._auto_generation_running:
+                    break
+                if time.time() < self._next_display_at():
+                    continue
+
+                if not self._prefetch_buffer and task is not None:
+                    # Generation is running late; wait for it rather than dropping the tick
+                    await asyncio.shield(task)
+
+                item = self._take_prefetched()
+                if item is not None:
+                    await self._display_prefetched(item)
+
+                # Keep the look-ahead buffer topped up for deeper pipelines
+                if self.prefetch_depth > 1:
+                    self._ensure_prefetch()
 
             except asyncio.CancelledError:
                 logger.info("Auto-generation loop cancelled")
@@ -375,6 +478,13 @@ class KenBurnsToolBuilder:
 
         self._auto_generation_running = True
         self._last_generation_time = time.time()  # Start the timer
+
+        # Open the persistent RunWare connection before the first prefetch
+        warm_up = getattr(self.runware, "warm_up", None)
+        if callable(warm_up):
+            self._warmup_task = asyncio.create_task(warm_up())
+            self._warmup_task.add_done_callback(self._on_background_task_done)
+
         self._auto_generation_task = asyncio.create_task(self._auto_generation_loop())
         logger.info(f"Started Ken Burns auto-generation (interval: {self.auto_interval}s)")
 
@@ -384,9 +494,13 @@ class KenBurnsToolBuilder:
         Call this when the agent session ends.
         """
         self._auto_generation_running = False
-        if self._auto_generation_task:
-            self._auto_generation_task.cancel()
-            self._auto_generation_task = None
+        for task in (self._auto_generation_task, self._prefetch_task, self._warmup_task):
+            if task and not task.done():
+                task.cancel()
+        self._auto_generation_task = None
+        self._prefetch_task = None
+        self._warmup_task = None
+        self._prefetch_buffer.clear()
         logger.info("Stopped Ken Burns auto-generation")
 
     def build_tools(self) -> List[Any]:
@@ -459,6 +573,7 @@ class KenBurnsToolBuilder:
                 # Update state
                 builder._current_image_url = result.image_url
                 builder._last_generation_time = time.time()  # Reset auto-gen timer
+                builder._record_generation_time(result.generation_time_ms)
 
                 # Send to frontend immediately
                 await builder._send_image_to_frontend(
@@ -3,7 +3,7 @@ Context-aware LLM wrapper that injects dynamic RAG context before each LLM call.
 This ensures the agent always has access to conversation history and documents.
 """
 import logging
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Tuple, Union
 from livekit import agents
 from livekit.agents import llm
 import asyncio
@@ -30,6 +30,10 @@ class ContextAwareLLM:
         self.context_manager = context_manager
         self.user_id = user_id
         self._wrapped_attrs = set()
+
+        # Turn-scoped memo: tool-call follow-ups within a turn reuse the same context.
+        # Holds (turn_key, task resolving to the context result).
+        self._turn_context: Optional[Tuple[Tuple[Optional[str], str], asyncio.Task]] = None
         
         # Copy all attributes from base_llm to maintain compatibility
         for attr in dir(base_llm):
@@ -64,60 +68,18 @@ class ContextAwareLLM:
                 # Assume it's a list of messages
                 messages = chat_ctx
             
-            # Extract the latest user message
-            user_message = None
-            for msg in reversed(messages):
-                if hasattr(msg, 'role') and msg.role == "user":
-                    if hasattr(msg, 'content'):
-                        # Handle both string and list content
-                        if isinstance(msg.content, list):
-                            # Extract text from list of content items
-                            text_parts = []
-                            for item in msg.content:
-                                if hasattr(item, 'text'):
-                                    text_parts.append(item.text)
-                                elif isinstance(item, str):
-                                    text_parts.append(item)
-                            user_message = ' '.join(text_parts)
-                        else:
-                            user_message = msg.content
-                    else:
-                        user_message = str(msg)
-                    break
-            
+            # Extract the latest user message (and its item id, which identifies the turn)
+            user_message, turn_id = self._latest_user_message(messages)
+
             # Build dynamic context if we have a user message and context manager
             if user_message and self.context_manager:
-                logger.info(f"Building dynamic context for user message: '{user_message[:100]}...'")
-                
                 try:
-                    # Build complete context including conversation history and documents
-                    context_result = await self.context_manager.build_complete_context(
-                        user_message=user_message,
-                        user_id=self.user_id
-                    )
-                    
+                    context_result = await self._context_for_turn(turn_id, user_message)
+
                     enhanced_prompt = context_result.get("enhanced_system_prompt")
                     if enhanced_prompt:
-                        logger.info("✅ Dynamic context built successfully")
-                        
-                        # If we have a ChatContext, we need to create a new one with enhanced prompt
                         if hasattr(chat_ctx, 'items'):
-                            # Create a new ChatContext with enhanced system prompt
-                            new_ctx = llm.ChatContext()
-                            
-                            # Add the enhanced system prompt first
-                            new_ctx.add_message(role="system", content=enhanced_prompt)
-                            
-                            # Add remaining messages (skip original system messages)
-                            for msg in chat_ctx.items:
-                                if hasattr(msg, 'role') and msg.role != "system":
-                                    new_ctx.add_message(
-                                        role=msg.role,
-                                        content=msg.content if hasattr(msg, 'content') else str(msg)
-                                    )
-                            
-                            # Replace the original context
-                            chat_ctx = new_ctx
+                            chat_ctx = self._with_system_prompt(chat_ctx, enhanced_prompt)
                         else:
                             # Working with message list - use original logic
                             # Find the last system message index
@@ -145,10 +107,6 @@ class ContextAwareLLM:
                             
                             # Use enhanced messages for the LLM call
                             messages = enhanced_messages
-                        
-                        # Log context metadata
-                        context_metadata = context_result.get('context_metadata', {})
-                        logger.info(f"Context metadata: {context_metadata}")
                     else:
                         logger.warning("Context manager returned no enhanced prompt")
                         
@@ -173,6 +131,69 @@ class ContextAwareLLM:
             logger.error(f"Error in ContextAwareLLM.chat: {e}", exc_info=True)
             raise
     
+    @staticmethod
+    def _latest_user_message(messages) -> Tuple[Optional[str], Optional[str]]:
+        """Text and item id of the most recent user message."""
+        for msg in reversed(messages):
+            if getattr(msg, 'role', None) != "user":
+                continue
+            if hasattr(msg, 'content'):
+                # Handle both string and list content
+                if isinstance(msg.content, list):
+                    # Extract text from list of content items
+                    text_parts = []
+                    for item in msg.content:
+                        if hasattr(item, 'text'):
+                            text_parts.append(item.text)
+                        elif isinstance(item, str):
+                            text_parts.append(item)
+                    user_message = ' '.join(text_parts)
+                else:
+                    user_message = msg.content
+            else:
+                user_message = str(msg)
+            return user_message, getattr(msg, 'id', None)
+        return None, None
+
+    async def _context_for_turn(self, turn_id: Optional[str], user_message: str) -> Dict[str, Any]:
+        """
+        Build (or reuse) the context for the current turn.
+
+        Keyed by the user message's item id and text, so the follow-up LLM calls
+        after tool results share one build; concurrent callers await the same task.
+        A new user message replaces the memo.
+        """
+        key = (turn_id, user_message)
+        if self._turn_context is not None and self._turn_context[0] == key:
+            task = self._turn_context[1]
+            if not (task.done() and (task.cancelled() or task.exception() is not None)):
+                logger.info("♻️ Reusing turn context for tool follow-up call")
+                return await asyncio.shield(task)
+
+        logger.info(f"Building dynamic context for user message: '{user_message[:100]}...'")
+        task = asyncio.create_task(
+            self.context_manager.build_complete_context(user_message=user_message, user_id=self.user_id)
+        )
+        self._turn_context = (key, task)
+        context_result = await asyncio.shield(task)
+        logger.info("✅ Dynamic context built successfully")
+        logger.info(f"Context metadata: {context_result.get('context_metadata', {})}")
+        return context_result
+
+    @staticmethod
+    def _with_system_prompt(chat_ctx, enhanced_prompt: str):
+        """
+        ChatContext with ``enhanced_prompt`` as its only system message.
+
+        Reuses the existing item objects (including tool calls and their
+        outputs) instead of re-adding every message.
+        """
+        items = [
+            item for item in chat_ctx.items
+            if not (getattr(item, 'type', 'message') == 'message' and getattr(item, 'role', None) == 'system')
+        ]
+        return llm.ChatContext(items=[llm.ChatMessage(role="system", content=[enhanced_prompt]), *items])
+
     # Provide synchronous wrapper if needed
     def chat_sync(self, messages: List[llm.ChatMessage], **kwargs) -> Any:
         """Synchronous version of chat for compatibility."""
@@ -10,6 +10,7 @@ import uuid
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 from supabase import Client
+from app.services.conversation_state import get_conversation_state_store
 
 logger = logging.getLogger(__name__)
 
@@ -183,6 +184,12 @@ async def store_turn(
         )
         
         result["success"] = True
+
+        # Keep the rolling conversation window in step (no-op if not loaded)
+        try:
+            await get_conversation_state_store().append_turn(conversation_id, user_text, assistant_text)
+        except Exception as state_exc:
+            logger.debug(f"Conversation state append skipped: {state_exc}")
         result["processing_time_ms"] = processing_time_ms
         
         # Best-effort embedding generation (if embedder is provided)
@@ -193,7 +200,16 @@ async def store_turn(
                 user_text,
                 assistant_text,
                 result.get("user_row_id"),
-                result.get("assistant_row_id")
+                result.get("assistant_row_id"),
+                turn_row={
+                    "turn_id": turn_id,
+                    "conversation_id": conversation_id,
+                    "user_id": user_id,
+                    "agent_id": agent_id,
+                    "user_message": user_text,
+                    "agent_response": assistant_text,
+                    "created_at": timestamp,
+                },
             )
         
         return result
@@ -211,11 +227,16 @@ async def generate_embeddings_best_effort(
     user_text: str,
     assistant_text: str,
     user_row_id: Optional[str],
-    assistant_row_id: Optional[str]
+    assistant_row_id: Optional[str],
+    turn_row: Optional[Dict[str, Any]] = None
 ) -> None:
     """
     Generate and store embeddings for transcripts (best-effort, non-blocking).
-    
+
+    When ``turn_row`` is given, the user-message embedding is also upserted into
+    ``conversation_turn_embeddings`` (one row per turn_id), which is what
+    conversation RAG searches.
+
     Failures in embedding generation do not affect transcript storage.
     """
     # List of trivial messages to skip
@@ -234,6 +255,8 @@ async def generate_embeddings_best_effort(
                     .eq("id", user_row_id) \
                     .execute()
                 logger.debug(f"Generated embedding for user message (id={user_row_id})")
+                if turn_row:
+                    store_turn_embedding(supabase_client, turn_row, user_embedding)
             except Exception as e:
                 logger.warning(f"Failed to generate user embedding: {e}")
         
@@ -251,3 +274,18 @@ async def generate_embeddings_best_effort(
                 
     except Exception as e:
         logger.warning(f"Failed during embedding generation process: {e}")
+
+
+def store_turn_embedding(
+    supabase_client: Client,
+    turn_row: Dict[str, Any],
+    embedding: List[float]
+) -> None:
+    """Upsert the per-turn memory row (no-op on tenants without the table yet)."""
+    try:
+        supabase_client.table("conversation_turn_embeddings") \
+            .upsert({**turn_row, "embeddings": embedding}, on_conflict="turn_id") \
+            .execute()
+        logger.debug(f"Stored turn embedding (turn_id={turn_row.get('turn_id')})")
+    except Exception as e:
+        logger.warning(f"Failed to store turn embedding: {e}")
@@ -4,7 +4,6 @@ from typing import Optional, Dict, Any, List
 import asyncio
 import json
 import logging
-import time
 import uuid
 from io import BytesIO
 
@@ -12,11 +11,7 @@ from fastapi.templating import Jinja2Templates
 
 from app.core.dependencies import get_agent_service, get_client_service
 from app.config import settings
-from app.services.tools_service_supabase import ToolsService
 from app.api.v1 import trigger as trigger_api
-from app.services.agent_service_multitenant import AgentService as MultitentAgentService
-from app.services.client_service_multitenant import ClientService as MultitenantClientService
-from app.services.client_service_supabase_enhanced import ClientService as SupabaseClientService
 from app.utils.supabase_credentials import SupabaseCredentialManager
 from app.services.client_supabase_auth import ensure_client_user_credentials
 from app.integrations.supabase_client import supabase_manager
@@ -24,7 +19,11 @@ from app.middleware.auth import require_user_auth
 from app.models.user import AuthContext
 from app.agent_modules.transcript_store import store_turn
 from app.services.usage_tracking import usage_tracking_service
+from app.services.embed_config_cache import get_embed_config_cache
+from app.services.embed_services import get_embed_services
+from app.services.lingua_service import sign_lingua_history
 from app.services.tier_features import get_tier_features
+from app.utils.stage_timer import StageTimer
 from pydantic import BaseModel, EmailStr
 
 logger = logging.getLogger(__name__)
@@ -34,24 +33,6 @@ templates = Jinja2Templates(directory="app/templates")
 
 ACTIVE_SUBSCRIPTION_STATUSES = {"active", "trialing", "past_due"}
 
-# ── Embed config cache (TTL-based) ──────────────────────────────────────────
-_embed_config_cache: Dict[str, Any] = {}
-_EMBED_CACHE_TTL = 60  # seconds
-
-
-def _get_cached_embed_config(client_id: str, agent_slug: str) -> Optional[Dict[str, Any]]:
-    key = f"{client_id}:{agent_slug}"
-    entry = _embed_config_cache.get(key)
-    if entry and (time.monotonic() - entry["ts"]) < _EMBED_CACHE_TTL:
-        return entry["data"]
-    return None
-
-
-def _set_cached_embed_config(client_id: str, agent_slug: str, data: Dict[str, Any]) -> None:
-    key = f"{client_id}:{agent_slug}"
-    _embed_config_cache[key] = {"data": data, "ts": time.monotonic()}
-
-
 def _as_bool(value: Any, default: bool) -> bool:
     if value is None:
         return default
@@ -155,102 +136,48 @@ LAYOUT_PRESETS = {
 }
 
 
-@router.get("/embed/{client_id}/{agent_slug}", response_class=HTMLResponse)
-async def embed_sidekick(
-    request: Request,
-    client_id: str,
-    agent_slug: str,
-    theme: Optional[str] = "dark",
-    # Dimension parameters
-    width: Optional[str] = None,
-    height: Optional[str] = None,
-    min_height: Optional[str] = None,
-    max_height: Optional[str] = None,
-    layout: Optional[str] = None,  # "fullscreen", "compact", "standard"
-):
-    # ── Compute effective dimensions ─────────────────────────────────────
-    # Start with standard defaults
-    effective_dims = {
-        "embed_width": "100%",
-        "embed_height": "100%",
-        "embed_min_height": "min(700px, 95vh)",
-        "embed_max_height": "none",
-        "embed_padding": None,  # None = use responsive CSS defaults
-    }
-
-    # Apply layout preset if specified
-    if layout and layout in LAYOUT_PRESETS:
-        preset = LAYOUT_PRESETS[layout]
-        effective_dims["embed_width"] = preset["width"]
-        effective_dims["embed_height"] = preset["height"]
-        effective_dims["embed_min_height"] = preset["min_height"]
-        effective_dims["embed_max_height"] = preset["max_height"]
-        effective_dims["embed_padding"] = preset["padding"]
-
-    # Override with explicit parameters (they take precedence over presets)
-    if width:
-        effective_dims["embed_width"] = width
-    if height:
-        effective_dims["embed_height"] = height
-    if min_height:
-        effective_dims["embed_min_height"] = min_height
-    if max_height:
-        effective_dims["embed_max_height"] = max_height
-
-    # ── Compute API base URL from request (needed for both cached and non-cached paths) ──
-    # Handle reverse proxy: check X-Forwarded-Proto header for HTTPS
-    api_base_url = str(request.base_url).rstrip('/')
-    forwarded_proto = request.headers.get("x-forwarded-proto", "").lower()
-    if forwarded_proto == "https" and api_base_url.startswith("http://"):
-        api_base_url = "https://" + api_base_url[7:]
-
-    # ── Check cache first (include dimensions in cache key) ──────────────
-    dims_key = f"{width}:{height}:{min_height}:{max_height}:{layout}"
-    cached = _get_cached_embed_config(client_id, f"{agent_slug}:{dims_key}")
-    if cached:
-        # Merge dimensions and api_base_url into cached data
-        cached_with_dims = {**cached, **effective_dims, "api_base_url": api_base_url}
-        return templates.TemplateResponse("embed/sidekick.html", {**cached_with_dims, "request": request, "theme": theme})
-
+def _load_embed_config(client_id: str, agent_slug: str) -> Dict[str, Any]:
+    """
+    Build the request-independent embed template context from the platform and
+    tenant databases (blocking; run in a thread). Raises ValueError when the
+    client is missing or misconfigured.
+    """
     # ── Get client record (single direct query for all needed fields) ────
+    from supabase import create_client
+    client_service = get_client_service()
+    platform_sb = client_service.supabase
     try:
-        from supabase import create_client
-        client_service = get_client_service()
-        platform_sb = client_service.supabase
-        try:
-            client_result = platform_sb.table("clients").select(
-                "supabase_url, supabase_anon_key, supabase_service_role_key, "
-                "supertab_client_id, tier, stripe_subscription_id, subscription_status"
-            ).eq("id", client_id).limit(1).execute()
-            # Handle the result - limit(1) returns a list
-            if client_result.data:
-                client_result.data = client_result.data[0]
-            else:
-                client_result.data = None
-        except Exception as db_err:
-            logger.error(f"[embed] Database query failed: {db_err}")
-            raise ValueError(f"Failed to fetch client {client_id}: {db_err}")
-
-        if not client_result.data:
-            raise ValueError(f"Client {client_id} not found")
-
-        cr = client_result.data
-        client_supabase_url = cr.get("supabase_url", "")
-        client_supabase_anon_key = cr.get("supabase_anon_key", "")
-        client_service_key = cr.get("supabase_service_role_key", "")
-
-        if not client_supabase_url or not client_supabase_anon_key:
-            raise ValueError(f"Client {client_id} is missing Supabase configuration")
-
-        client_record = {
-            "supertab_client_id": cr.get("supertab_client_id"),
-            "tier": cr.get("tier"),
-            "stripe_subscription_id": cr.get("stripe_subscription_id"),
-            "subscription_status": cr.get("subscription_status"),
-        }
-        client_supertab_id = client_record.get("supertab_client_id")
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc))
+        client_result = platform_sb.table("clients").select(
+            "supabase_url, supabase_anon_key, supabase_service_role_key, "
+            "supertab_client_id, tier, stripe_subscription_id, subscription_status"
+        ).eq("id", client_id).limit(1).execute()
+        # Handle the result - limit(1) returns a list
+        if client_result.data:
+            client_result.data = client_result.data[0]
+        else:
+            client_result.data = None
+    except Exception as db_err:
+        logger.error(f"[embed] Database query failed: {db_err}")
+        raise ValueError(f"Failed to fetch client {client_id}: {db_err}")
+
+    if not client_result.data:
+        raise ValueError(f"Client {client_id} not found")
+
+    cr = client_result.data
+    client_supabase_url = cr.get("supabase_url", "")
+    client_supabase_anon_key = cr.get("supabase_anon_key", "")
+    client_service_key = cr.get("supabase_service_role_key", "")
+
+    if not client_supabase_url or not client_supabase_anon_key:
+        raise ValueError(f"Client {client_id} is missing Supabase configuration")
+
+    client_record = {
+        "supertab_client_id": cr.get("supertab_client_id"),
+        "tier": cr.get("tier"),
+        "stripe_subscription_id": cr.get("stripe_subscription_id"),
+        "subscription_status": cr.get("subscription_status"),
+    }
+    client_supertab_id = client_record.get("supertab_client_id")
 
     # ── Fetch agent config, tools, and Supertab settings ─────────────────
     supertab_config = None
@@ -367,10 +294,7 @@ async def embed_sidekick(
         # Fail open - if we can't get config, just continue with defaults
         logger.warning(f"[embed] Failed to fetch agent config: {e}")
 
-    # ── Build template context and cache it ──────────────────────────────
-    # Note: api_base_url was computed earlier (before cache check)
-
-    tpl_context = {
+    return {
         "client_id": client_id,
         "agent_id": agent_id,
         "agent_slug": agent_slug,
@@ -387,14 +311,70 @@ async def embed_sidekick(
         "text_chat_enabled": text_chat_enabled,
         "video_chat_enabled": video_chat_enabled,
         "sound_settings": sound_settings,
-        "api_base_url": api_base_url,
     }
-    _set_cached_embed_config(client_id, f"{agent_slug}:{dims_key}", tpl_context)
 
-    # Merge dimensions into template context
-    tpl_context_with_dims = {**tpl_context, **effective_dims}
 
-    return templates.TemplateResponse("embed/sidekick.html", {**tpl_context_with_dims, "request": request, "theme": theme})
+@router.get("/embed/{client_id}/{agent_slug}", response_class=HTMLResponse)
+async def embed_sidekick(
+    request: Request,
+    client_id: str,
+    agent_slug: str,
+    theme: Optional[str] = "dark",
+    # Dimension parameters
+    width: Optional[str] = None,
+    height: Optional[str] = None,
+    min_height: Optional[str] = None,
+    max_height: Optional[str] = None,
+    layout: Optional[str] = None,  # "fullscreen", "compact", "standard"
+):
+    # ── Compute effective dimensions ─────────────────────────────────────
+    # Start with standard defaults
+    effective_dims = {
+        "embed_width": "100%",
+        "embed_height": "100%",
+        "embed_min_height": "min(700px, 95vh)",
+        "embed_max_height": "none",
+        "embed_padding": None,  # None = use responsive CSS defaults
+    }
+
+    # Apply layout preset if specified
+    if layout and layout in LAYOUT_PRESETS:
+        preset = LAYOUT_PRESETS[layout]
+        effective_dims["embed_width"] = preset["width"]
+        effective_dims["embed_height"] = preset["height"]
+        effective_dims["embed_min_height"] = preset["min_height"]
+        effective_dims["embed_max_height"] = preset["max_height"]
+        effective_dims["embed_padding"] = preset["padding"]
+
+    # Override with explicit parameters (they take precedence over presets)
+    if width:
+        effective_dims["embed_width"] = width
+    if height:
+        effective_dims["embed_height"] = height
+    if min_height:
+        effective_dims["embed_min_height"] = min_height
+    if max_height:
+        effective_dims["embed_max_height"] = max_height
+
+    # ── Compute API base URL from request (not part of the cached context) ──
+    # Handle reverse proxy: check X-Forwarded-Proto header for HTTPS
+    api_base_url = str(request.base_url).rstrip('/')
+    forwarded_proto = request.headers.get("x-forwarded-proto", "").lower()
+    if forwarded_proto == "https" and api_base_url.startswith("http://"):
+        api_base_url = "https://" + api_base_url[7:]
+
+    # ── Template context (cached per client/agent; dimensions and base URL are per request) ──
+    try:
+        tpl_context = await get_embed_config_cache().get(
+            client_id, agent_slug, lambda: asyncio.to_thread(_load_embed_config, client_id, agent_slug)
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    return templates.TemplateResponse(
+        "embed/sidekick.html",
+        {**tpl_context, **effective_dims, "api_base_url": api_base_url, "request": request, "theme": theme},
+    )
 
 
 @router.post("/api/embed/client-users/sync")
@@ -555,6 +535,8 @@ async def embed_text_stream(
     user_id: Optional[str] = Form(None),
 ):
     async def generate():
+        timer = StageTimer("embed_text_stream")
+        completed = False
         try:
             try:
                 yield ":stream-open\n\n"
@@ -569,20 +551,18 @@ async def embed_text_stream(
             # Use a valid UUID so downstream queries against Supabase succeed.
             effective_user_id = user_id if user_id else str(uuid.uuid5(uuid.NAMESPACE_URL, "sidekick-forge/embed-user"))
 
-            # Use multitenant services for proper architecture
-            agent_service = MultitentAgentService()
-            client_service = MultitenantClientService()
+            # Shared multitenant services; lookups are memoized for this request
+            services = get_embed_services()
+            lookups = services.request(client_id)
 
             # Get agent from client database
-            from uuid import UUID
-            client_uuid = UUID(client_id)
-            agent = await agent_service.get_agent(client_uuid, agent_slug)
+            agent = await lookups.agent(agent_slug)
             if not agent or not agent.enabled:
                 yield f"data: {json.dumps({'error': 'Agent not available'})}\n\n"
                 return
 
-            # Get client info and API keys
-            platform_client = await client_service.get_client(client_id)
+            # Get client info
+            platform_client = await lookups.client()
             if not platform_client:
                 yield f"data: {json.dumps({'error': 'Client not found'})}\n\n"
                 return
@@ -603,7 +583,7 @@ async def embed_text_stream(
                 yield f"data: {json.dumps({'error': 'Text chat is disabled for this sidekick'})}\n\n"
                 return
 
-            api_keys = await agent_service.get_client_api_keys(client_uuid)
+            timer.lap("config_resolution")
 
             # Use provided conversation_id or generate a new one
             effective_conversation_id = conversation_id if conversation_id else str(uuid.uuid4())
@@ -620,16 +600,6 @@ async def embed_text_stream(
                 conversation_id=effective_conversation_id,
             )
 
-            # Initialize ToolsService with Supabase-based ClientService for platform access
-            import os
-            platform_supabase_url = os.getenv('SUPABASE_URL')
-            platform_supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
-            supabase_client_service = SupabaseClientService(
-                supabase_url=platform_supabase_url,
-                supabase_key=platform_supabase_key
-            )
-            tools_service = ToolsService(client_service=supabase_client_service)
-
             # Set up the LiveKit room and dispatch the agent job
             try:
                 from app.integrations.livekit_client import livekit_manager
@@ -650,54 +620,74 @@ async def embed_text_stream(
                     request_context=None,
                     client_conversation_id=effective_conversation_id,
                 )
-                
+                timer.lap("context_build")
+
                 # Add tools and user message to context
-                tools_payload = await trigger_api._get_agent_tools(tools_service, platform_client.id, agent.id)
+                tools_payload = await trigger_api._get_agent_tools(services.tools, platform_client.id, agent.id)
                 logger.info(f"[embed-stream] tools_payload count: {len(tools_payload) if tools_payload else 0}")
                 if tools_payload:
                     logger.info(f"[embed-stream] tool slugs: {[t.get('slug') for t in tools_payload]}")
                     agent_context["tools"] = tools_payload
                 trigger_api._apply_tool_prompt_sections(agent_context, tools_payload)
                 agent_context["user_message"] = message
-
-                # Create room and dispatch
-                # NOTE: enable_agent_dispatch=False because we explicitly call dispatch_agent_job below
-                # Setting it to True causes DOUBLE dispatch (one from room creation, one from explicit call)
-                text_room_name = f"text-{effective_conversation_id}-{uuid.uuid4().hex[:8]}"
-                # Use lightweight room metadata to stay under LiveKit's 64KB limit.
-                # Heavy config (dataset_ids, tools, system_prompt, api_keys, etc.)
-                # is delivered via dispatch job metadata instead.
-                _room_meta = {
-                    "agent_name": settings.livekit_agent_name,
-                    "agent_slug": agent.slug,
-                    "user_id": effective_user_id,
-                    "mode": "text",
-                    "client_id": agent_context.get("client_id"),
-                    "conversation_id": agent_context.get("conversation_id"),
-                }
-                await trigger_api.ensure_livekit_room_exists(
-                    backend_livekit,
-                    text_room_name,
-                    agent_name=settings.livekit_agent_name,
-                    agent_slug=agent.slug,
+                timer.lap("tool_manifest")
+
+                # Follow-ups go straight to the conversation's text session actor
+                # when one is live; otherwise create a room and dispatch a job.
+                session_turn = await trigger_api.open_text_session_turn(
+                    agent_context,
+                    conversation_id=None if is_new_conversation else effective_conversation_id,
+                    message=message,
                     user_id=effective_user_id,
-                    agent_config=_room_meta,
-                    enable_agent_dispatch=False,  # Don't dispatch here - we do it explicitly below
-                )
-
-                await trigger_api.dispatch_agent_job(
-                    livekit_manager=backend_livekit,
-                    room_name=text_room_name,
-                    agent=agent,
-                    client=platform_client,
-                    user_id=effective_user_id,
-                    conversation_id=effective_conversation_id,
                     session_id=session_id,
-                    tools=agent_context.get("tools"),
-                    tools_config=agent_context.get("tools_config"),
-                    api_keys=agent_context.get("api_keys"),
-                    agent_context=agent_context,
                 )
+                if session_turn is not None:
+                    updates = session_turn.updates()
+                else:
+                    # Create room and dispatch
+                    # NOTE: enable_agent_dispatch=False because we explicitly call dispatch_agent_job below
+                    # Setting it to True causes DOUBLE dispatch (one from room creation, one from explicit call)
+                    text_room_name = f"text-{effective_conversation_id}-{uuid.uuid4().hex[:8]}"
+                    # Use lightweight room metadata to stay under LiveKit's 64KB limit.
+                    # Heavy config (dataset_ids, tools, system_prompt, api_keys, etc.)
+                    # is delivered via dispatch job metadata instead.
+                    _room_meta = {
+                        "agent_name": settings.livekit_agent_name,
+                        "agent_slug": agent.slug,
+                        "user_id": effective_user_id,
+                        "mode": "text",
+                        "client_id": agent_context.get("client_id"),
+                        "conversation_id": agent_context.get("conversation_id"),
+                    }
+                    await trigger_api.ensure_livekit_room_exists(
+                        backend_livekit,
+                        text_room_name,
+                        agent_name=settings.livekit_agent_name,
+                        agent_slug=agent.slug,
+                        user_id=effective_user_id,
+                        agent_config=_room_meta,
+                        enable_agent_dispatch=False,  # Don't dispatch here - we do it explicitly below
+                    )
+
+                    await trigger_api.dispatch_agent_job(
+                        livekit_manager=backend_livekit,
+                        room_name=text_room_name,
+                        agent=agent,
+                        client=platform_client,
+                        user_id=effective_user_id,
+                        conversation_id=effective_conversation_id,
+                        session_id=session_id,
+                        tools=agent_context.get("tools"),
+                        tools_config=agent_context.get("tools_config"),
+                        api_keys=agent_context.get("api_keys"),
+                        agent_context=agent_context,
+                    )
+
+                    updates = trigger_api.poll_for_text_response_streaming(
+                        backend_livekit,
+                        text_room_name,
+                    )
+                timer.lap("dispatch")
 
                 # Track text usage for quota metering (per-agent)
                 try:
@@ -714,26 +704,25 @@ async def embed_text_stream(
                         )
                 except Exception as usage_err:
                     logger.warning("Failed to track text usage in embed stream: %s", usage_err)
+                timer.lap("quota")
 
                 # Stream responses from the worker
-                async for update in trigger_api.poll_for_text_response_streaming(
-                    backend_livekit,
-                    text_room_name,
-                ):
+                async for update in updates:
                     if "error" in update:
                         yield f"data: {json.dumps({'error': update['error']})}\n\n"
                         return
                     elif "delta" in update:
+                        timer.mark("first_token")
                         yield f"data: {json.dumps({'delta': update['delta']})}\n\n"
                     elif update.get("done"):
+                        timer.mark("first_token")
+                        timer.lap("response")
                         full_text = update.get("full_text", "")
                         citations = update.get("citations", [])
 
                         # Persist the conversation turn to the client's Supabase
                         try:
-                            client_supabase_url, _, client_service_key = await SupabaseCredentialManager.get_client_supabase_credentials(client_id)
-                            from supabase import create_client
-                            client_sb = create_client(client_supabase_url, client_service_key)
+                            client_sb = await asyncio.to_thread(lookups.tenant_supabase)
 
                             # Build metadata, including widget data if present
                             turn_metadata = {"channel": "text", "agent_slug": agent_slug}
@@ -754,6 +743,8 @@ async def embed_text_stream(
                             logger.info(f"[embed-stream] Persisted conversation turn for {effective_conversation_id}")
                         except Exception as store_err:
                             logger.warning(f"[embed-stream] Failed to persist conversation turn: {store_err}")
+                        timer.lap("persist")
+                        completed = True
 
                         final_payload = {
                             "done": True,
@@ -784,6 +775,8 @@ async def embed_text_stream(
             # NO FALLBACK POLICY: Any error in the streaming path should return an error
             logger.error("❌ NO FALLBACK POLICY - embed_text_stream error: %s", exc, exc_info=True)
             yield f"data: {json.dumps({'error': f'Processing failed: {str(exc)}', 'no_fallback': True})}\n\n"
+        finally:
+            timer.finish(client_id=client_id, agent_slug=agent_slug, ok=completed)
 
     return StreamingResponse(
         generate(),
@@ -827,7 +820,7 @@ async def generate_conversation_title(
         agent_id = conversation.get("agent_id")
 
         # Get agent's LLM settings
-        agent_service = MultitentAgentService()
+        agent_service = get_embed_services().agents
         from uuid import UUID
         client_uuid = UUID(client_id)
 
@@ -910,7 +903,7 @@ async def list_embed_conversations(
         effective_agent_id = agent_id
         if agent_slug and not agent_id:
             try:
-                agent_service = MultitentAgentService()
+                agent_service = get_embed_services().agents
                 from uuid import UUID
                 client_uuid = UUID(client_id)
                 agent = await agent_service.get_agent(client_uuid, agent_slug)
@@ -1024,6 +1017,7 @@ async def get_embed_conversation_messages(
         result = client_sb.table("conversation_transcripts").select("*").eq("conversation_id", conversation_id).order("created_at", desc=False).limit(limit).offset(offset).execute()
 
         messages = result.data or []
+        await sign_lingua_history(client_sb, messages)
 
         return {
             "success": True,
@@ -1308,7 +1302,7 @@ async def get_most_recent_conversation(
         effective_agent_id = agent_id
         if agent_slug and not agent_id:
             try:
-                agent_service = MultitentAgentService()
+                agent_service = get_embed_services().agents
                 from uuid import UUID
                 client_uuid = UUID(client_id)
                 agent = await agent_service.get_agent(client_uuid, agent_slug)
@@ -1346,11 +1340,13 @@ async def get_most_recent_conversation(
 
         # Get messages for this conversation (ascending order for chronological display)
         messages_result = client_sb.table("conversation_transcripts").select("*").eq("conversation_id", conversation["id"]).order("created_at", desc=False).limit(200).execute()
+        messages = messages_result.data or []
+        await sign_lingua_history(client_sb, messages)
 
         return {
             "success": True,
             "conversation": conversation,
-            "messages": messages_result.data or []
+            "messages": messages
         }
 
     except Exception as e:
@@ -1683,7 +1679,7 @@ async def get_react_embed_connection_details(
         agent_data = agent_result.data
 
         # Get client info
-        client_service = MultitenantClientService()
+        client_service = get_embed_services().clients
         client = await client_service.get_client(client_id)
         if not client:
             raise HTTPException(status_code=404, detail="Client not found")
@@ -1732,7 +1728,7 @@ async def get_react_embed_connection_details(
         ).to_jwt()
 
         # Build agent context for dispatch
-        agent_service = MultitentAgentService()
+        agent_service = get_embed_services().agents
         from uuid import UUID
         client_uuid = UUID(client_id)
         api_keys = await agent_service.get_client_api_keys(client_uuid)
@@ -9,6 +9,7 @@ from app.models.agent import Agent, AgentCreate, AgentUpdate, AgentInDB, AgentWi
 from app.services.agent_service_supabase import AgentService
 from app.services.client_service_supabase import ClientService
 from app.core.dependencies import get_client_service, get_agent_service
+from app.services.embed_config_cache import invalidate_embed_config
 
 router = APIRouter(prefix="/agents", tags=["agents"])
 
@@ -197,6 +198,7 @@ async def update_agent(
                 
                 # Update in main agents table
                 result = supabase_manager.admin_client.table("agents").update(update_dict).eq("slug", agent_slug).execute()
+                await invalidate_embed_config(client_id)
                 
                 if result.data and len(result.data) > 0:
                     agent_data = result.data[0]
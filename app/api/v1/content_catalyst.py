@@ -7,20 +7,47 @@ Provides REST API endpoints for the Content Catalyst multi-phase article generat
 from __future__ import annotations
 
 import logging
-import uuid
+from dataclasses import asdict
 from typing import Optional
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, Header, HTTPException, UploadFile, File, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from app.core.dependencies import get_client_service
 from app.services.client_service_supabase import ClientService
+from app.services.conversation_state import invalidate_conversation_state
+from app.services.media_run_worker import CONTENT_CATALYST_RUN
+from app.services.media_runs import (
+    get_media_run_store,
+    stream_media_run_events,
+    submit_media_run,
+    wait_for_media_run,
+)
+from app.services.media_upload import UploadPolicy, stream_upload
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/content-catalyst", tags=["content-catalyst"])
 
+# How long /start waits for the worker when the caller asks for the articles inline
+CONTENT_CATALYST_WAIT_SECONDS = 15 * 60
+
+# 200MB matches the Supabase project setting
+CONTENT_CATALYST_AUDIO_UPLOAD = UploadPolicy(
+    label="content-catalyst",
+    bucket="audio-uploads",
+    path_prefix="content-catalyst",
+    max_bytes=200 * 1024 * 1024,
+    allowed_types=("audio",),
+    media_kind="audio",
+    invalid_type_detail="Invalid file type. Only MP3/audio files are accepted.",
+    too_large_detail="File too large ({size_mb:.1f}MB). Maximum upload size is 200MB.",
+    default_content_type="audio/mpeg",
+    default_ext="mp3",
+)
+
 
 class ContentCatalystStartRequest(BaseModel):
     """Request to start a Content Catalyst run."""
@@ -72,14 +99,15 @@ async def start_content_catalyst(
     user_id: Optional[str] = Query(None),
     conversation_id: Optional[str] = Query(None),
     session_id: Optional[str] = Query(None),
-    background_tasks: BackgroundTasks = None,
+    wait: bool = Query(True, description="Wait for the articles instead of returning the run_id immediately"),
     client_service: ClientService = Depends(get_client_service),
 ):
     """
     Start a new Content Catalyst run.
 
-    This endpoint initiates the multi-phase article generation pipeline.
-    The run is executed asynchronously, and progress can be monitored via the status endpoint.
+    This endpoint initiates the multi-phase article generation pipeline on a
+    media run worker. With ``wait=false`` it returns the run_id immediately and
+    progress can be followed via /status/{run_id}/events (SSE) or /status/{run_id}.
     """
     try:
         # Validate client exists and has Content Catalyst enabled
@@ -200,15 +228,43 @@ async def start_content_catalyst(
         # Get the service (pass agent_id for per-agent configuration)
         service = await get_content_catalyst_service(client_id, agent_id=agent_id)
 
-        # Run the pipeline (synchronously for now - can be made async with background_tasks)
-        run_id, article_1, article_2 = await service.run_full_pipeline(
+        # Create the database run up front so the caller gets its id right away
+        run_id = await service.create_run(
             config=config,
             agent_id=agent_id,
             user_id=user_id,
             conversation_id=conversation_id,
             session_id=session_id,
         )
+        await submit_media_run(
+            CONTENT_CATALYST_RUN,
+            {
+                "client_id": client_id,
+                "agent_id": agent_id,
+                "user_id": user_id,
+                "conversation_id": conversation_id,
+                "session_id": session_id,
+                "config": {**asdict(config), "source_type": config.source_type.value},
+            },
+            run_id=run_id,
+            client_id=client_id,
+        )
+
+        if not wait:
+            return ContentCatalystStartResponse(
+                success=True,
+                run_id=run_id,
+                message="Content Catalyst started. Follow /status/{run_id}/events for progress.",
+            )
+
+        run = await wait_for_media_run(run_id, CONTENT_CATALYST_WAIT_SECONDS)
+        if not run or run.get("status") != "complete":
+            if run and run.get("status") == "failed":
+                raise HTTPException(status_code=500, detail=run.get("error") or "Content Catalyst failed")
+            raise HTTPException(status_code=504, detail=f"Content Catalyst run {run_id} is still running; check /status/{run_id}")
 
+        article_1 = run["result"]["article_1"]
+        article_2 = run["result"]["article_2"]
         return ContentCatalystStartResponse(
             success=True,
             run_id=run_id,
@@ -232,8 +288,24 @@ async def get_content_catalyst_status(
 ):
     """
     Get the status of a Content Catalyst run.
+
+    Live progress comes from the shared run registry; finished or older runs
+    fall back to the database record.
     """
     try:
+        run = await get_media_run_store().get(run_id)
+        if run and run.get("kind") == CONTENT_CATALYST_RUN and run.get("client_id") == client_id:
+            result = run.get("result") or {}
+            return ContentCatalystStatusResponse(
+                run_id=run_id,
+                status=run.get("status", "unknown"),
+                current_phase=run.get("current_phase") or "input",
+                phases_completed=run.get("phases_completed", []),
+                article_1=result.get("article_1"),
+                article_2=result.get("article_2"),
+                error=run.get("error"),
+            )
+
         from app.services.content_catalyst_service import get_content_catalyst_service
 
         service = await get_content_catalyst_service(client_id)
@@ -259,6 +331,26 @@ async def get_content_catalyst_status(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/status/{run_id}/events")
+async def stream_content_catalyst_status(
+    run_id: str,
+    client_id: str = Query(...),
+    last_event_id: Optional[str] = Header(None),
+):
+    """Server-Sent Events with phase progress for a Content Catalyst run."""
+    run = await get_media_run_store().get(run_id)
+    if not run or run.get("kind") != CONTENT_CATALYST_RUN or run.get("client_id") != client_id:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return StreamingResponse(
+        stream_media_run_events(run_id, last_event_id=last_event_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        },
+    )
+
+
 @router.post("/upload-mp3", response_model=MP3UploadResponse)
 async def upload_mp3(
     file: UploadFile = File(...),
@@ -272,172 +364,14 @@ async def upload_mp3(
     The URL can be used as the source_content when starting a Content Catalyst run with source_type='mp3'.
     """
     try:
-        # Validate file type
-        if not file.content_type or 'audio' not in file.content_type:
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid file type. Only MP3/audio files are accepted."
-            )
-
-        # Validate file size (max 200MB - matches Supabase project setting)
-        MAX_SIZE = 200 * 1024 * 1024  # 200MB
-        content = await file.read()
-        file_size_mb = len(content) / (1024 * 1024)
-        logger.info(f"[content-catalyst] Uploading file: {file.filename}, size: {file_size_mb:.1f}MB")
-        if len(content) > MAX_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large ({file_size_mb:.1f}MB). Maximum upload size is 200MB."
-            )
-
-        # Get client's Supabase for storage
         client_sb = await client_service.get_client_supabase_client(client_id, auto_sync=False)
-
-        # Generate unique filename
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        file_ext = file.filename.split('.')[-1] if file.filename and '.' in file.filename else 'mp3'
-        storage_path = f"content-catalyst/{client_id}/{timestamp}_{uuid.uuid4().hex[:8]}.{file_ext}"
-
-        # Upload to Supabase storage
-        bucket_name = "audio-uploads"
-
-        try:
-            # Try to create bucket if it doesn't exist
-            bucket_created = False
-            try:
-                # Use minimal options - file_size_limit may exceed plan limits
-                result = client_sb.storage.create_bucket(
-                    bucket_name,
-                    options={"public": False}
-                )
-                logger.info(f"Created bucket '{bucket_name}': {result}")
-                bucket_created = True
-            except Exception as e:
-                error_str = str(e).lower()
-                if "already exists" in error_str or "duplicate" in error_str:
-                    logger.debug(f"Bucket '{bucket_name}' already exists")
-                    bucket_created = True
-                else:
-                    logger.warning(f"Could not create bucket '{bucket_name}': {e}")
-                    # Try to list buckets to see if it exists
-                    try:
-                        buckets = client_sb.storage.list_buckets()
-                        bucket_names = [b.get('name') or b.get('id') for b in buckets]
-                        logger.info(f"Available buckets: {bucket_names}")
-                        if bucket_name in bucket_names:
-                            bucket_created = True
-                    except Exception as list_err:
-                        logger.warning(f"Could not list buckets: {list_err}")
-
-            if not bucket_created:
-                # Bucket doesn't exist and we couldn't create it - give clear error
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Storage bucket '{bucket_name}' does not exist in the client's Supabase project. Please create it in Supabase Dashboard → Storage → New Bucket."
-                )
-
-            # Upload file - use resumable upload for files > 6MB (Supabase TUS protocol)
-            logger.info(f"Uploading file to {bucket_name}/{storage_path}, size: {file_size_mb:.1f}MB")
-
-            # For files larger than 6MB, we need to use the TUS resumable upload protocol
-            # The standard upload has a 50MB limit at the API gateway level
-            if len(content) > 6 * 1024 * 1024:  # > 6MB
-                logger.info(f"Using resumable upload for large file ({file_size_mb:.1f}MB)")
-                # Use httpx to do a direct TUS upload
-                import httpx
-
-                # Get the Supabase URL and key from the client
-                supabase_url = client_sb.supabase_url
-                supabase_key = client_sb.supabase_key
-
-                # TUS upload endpoint
-                tus_endpoint = f"{supabase_url}/storage/v1/upload/resumable"
-
-                headers = {
-                    "Authorization": f"Bearer {supabase_key}",
-                    "apikey": supabase_key,
-                    "x-upsert": "true",
-                    "upload-length": str(len(content)),
-                    "upload-metadata": f"bucketName {bucket_name},objectName {storage_path},contentType {file.content_type or 'audio/mpeg'}".replace(" ", ""),
-                    "tus-resumable": "1.0.0",
-                }
-
-                # Base64 encode the metadata values
-                import base64
-                bucket_b64 = base64.b64encode(bucket_name.encode()).decode()
-                path_b64 = base64.b64encode(storage_path.encode()).decode()
-                ctype_b64 = base64.b64encode((file.content_type or "audio/mpeg").encode()).decode()
-                headers["upload-metadata"] = f"bucketName {bucket_b64},objectName {path_b64},contentType {ctype_b64}"
-
-                async with httpx.AsyncClient(timeout=300.0) as http_client:
-                    # Step 1: Create upload
-                    create_resp = await http_client.post(tus_endpoint, headers=headers)
-
-                    if create_resp.status_code not in (200, 201):
-                        logger.error(f"TUS create failed: {create_resp.status_code} - {create_resp.text}")
-                        raise Exception(f"Failed to initiate resumable upload: {create_resp.text}")
-
-                    upload_url = create_resp.headers.get("location")
-                    if not upload_url:
-                        raise Exception("No upload URL returned from TUS endpoint")
-
-                    logger.info(f"TUS upload URL: {upload_url}")
-
-                    # Step 2: Upload the content
-                    patch_headers = {
-                        "Authorization": f"Bearer {supabase_key}",
-                        "apikey": supabase_key,
-                        "tus-resumable": "1.0.0",
-                        "upload-offset": "0",
-                        "content-type": "application/offset+octet-stream",
-                    }
-
-                    patch_resp = await http_client.patch(
-                        upload_url,
-                        headers=patch_headers,
-                        content=content
-                    )
-
-                    if patch_resp.status_code not in (200, 204):
-                        logger.error(f"TUS upload failed: {patch_resp.status_code} - {patch_resp.text}")
-                        raise Exception(f"Failed to upload file: {patch_resp.text}")
-
-                    logger.info(f"TUS upload complete: {patch_resp.status_code}")
-                    result = {"path": storage_path}
-            else:
-                # Standard upload for small files
-                result = client_sb.storage.from_(bucket_name).upload(
-                    path=storage_path,
-                    file=content,
-                    file_options={"content-type": file.content_type or "audio/mpeg"}
-                )
-
-            logger.info(f"Upload result: {result}")
-
-            # Get signed URL (valid for 1 hour)
-            signed_url = client_sb.storage.from_(bucket_name).create_signed_url(
-                path=storage_path,
-                expires_in=3600  # 1 hour
-            )
-
-            if signed_url and signed_url.get("signedURL"):
-                return MP3UploadResponse(
-                    success=True,
-                    file_url=signed_url["signedURL"],
-                    file_path=storage_path,
-                    message="File uploaded successfully"
-                )
-            else:
-                raise HTTPException(status_code=500, detail="Failed to generate signed URL")
-
-        except HTTPException:
-            raise
-        except Exception as storage_error:
-            logger.error(f"Storage upload failed: {storage_error}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to upload file: {str(storage_error)}"
-            )
+        stored = await stream_upload(file, client_sb, client_id, CONTENT_CATALYST_AUDIO_UPLOAD)
+        return MP3UploadResponse(
+            success=True,
+            file_url=stored.signed_url,
+            file_path=stored.path,
+            message="File uploaded successfully"
+        )
 
     except HTTPException:
         raise
@@ -530,6 +464,7 @@ async def store_widget_result(
             },
             "created_at": datetime.utcnow().isoformat()
         }).execute()
+        await invalidate_conversation_state(conversation_id)
 
         logger.info(f"Stored widget result for conversation {conversation_id}, run {request.run_id}")
 
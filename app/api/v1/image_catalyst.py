@@ -6,19 +6,45 @@ Uses Runware API with Nano Banana 2 Pro (Gemini 3 Pro Image) and FLUX.2 Dev mode
 """
 
 import logging
-import uuid
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from app.core.dependencies import get_client_service
 from app.services.client_service_supabase import ClientService
+from app.services.conversation_state import invalidate_conversation_state
+from app.services.media_run_worker import IMAGE_CATALYST_RUN
+from app.services.media_runs import (
+    get_media_run_store,
+    stream_media_run_events,
+    submit_media_run,
+    wait_for_media_run,
+)
+from app.services.media_upload import UploadPolicy, stream_upload
 
 router = APIRouter(prefix="/image-catalyst", tags=["image-catalyst"])
 logger = logging.getLogger(__name__)
 
+# Generations normally finish in 5-15s; /start stops waiting after this
+IMAGE_CATALYST_WAIT_SECONDS = 180
+
+IMAGE_REFERENCE_UPLOAD = UploadPolicy(
+    label="ImageCatalyst Upload",
+    bucket="image-uploads",
+    path_prefix="image-catalyst",
+    max_bytes=10 * 1024 * 1024,
+    allowed_types=("image/",),
+    media_kind="image",
+    invalid_type_detail="Invalid file type. Supported formats: PNG, JPG, JPEG, WEBP",
+    too_large_detail="File too large. Maximum size is 10MB.",
+    default_content_type="image/png",
+    default_ext="png",
+    require_signature=True,
+)
+
 
 # ============================================================================
 # Request/Response Models
@@ -156,102 +182,19 @@ async def upload_reference_image(
     """
     logger.info(f"[ImageCatalyst Upload] Starting upload for client_id={client_id}, filename={file.filename}, content_type={file.content_type}")
     try:
-        # Validate file type
-        content_type = file.content_type or ''
-        if not content_type.startswith('image/'):
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid file type. Supported formats: PNG, JPG, JPEG, WEBP"
-            )
-
-        # Validate file size (max 10MB)
-        MAX_SIZE = 10 * 1024 * 1024
-        content = await file.read()
-        if len(content) > MAX_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail="File too large. Maximum size is 10MB."
-            )
-
-        # Get client's Supabase for storage
         logger.info(f"[ImageCatalyst Upload] Getting Supabase client for {client_id}")
         client_sb = await client_service.get_client_supabase_client(client_id, auto_sync=False)
         if not client_sb:
             logger.error(f"[ImageCatalyst Upload] No Supabase client found for {client_id}")
             raise HTTPException(status_code=500, detail="Could not connect to client storage")
 
-        # Generate unique filename
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        file_ext = file.filename.split('.')[-1] if file.filename and '.' in file.filename else 'png'
-        storage_path = f"image-catalyst/{client_id}/{timestamp}_{uuid.uuid4().hex[:8]}.{file_ext}"
-
-        # Upload to Supabase storage
-        bucket_name = "image-uploads"
-
-        try:
-            # Try to create bucket if it doesn't exist
-            bucket_created = False
-            try:
-                result = client_sb.storage.create_bucket(
-                    bucket_name,
-                    options={"public": False}
-                )
-                logger.info(f"Created bucket '{bucket_name}': {result}")
-                bucket_created = True
-            except Exception as e:
-                error_str = str(e).lower()
-                if "already exists" in error_str or "duplicate" in error_str:
-                    logger.debug(f"Bucket '{bucket_name}' already exists")
-                    bucket_created = True
-                else:
-                    logger.warning(f"Could not create bucket '{bucket_name}': {e}")
-                    try:
-                        buckets = client_sb.storage.list_buckets()
-                        bucket_names = [b.get('name') or b.get('id') for b in buckets]
-                        if bucket_name in bucket_names:
-                            bucket_created = True
-                    except Exception as list_err:
-                        logger.warning(f"Could not list buckets: {list_err}")
-
-            if not bucket_created:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Storage bucket '{bucket_name}' does not exist. Please create it in Supabase Dashboard."
-                )
-
-            # Upload file
-            logger.info(f"Uploading reference image to {bucket_name}/{storage_path}")
-            result = client_sb.storage.from_(bucket_name).upload(
-                path=storage_path,
-                file=content,
-                file_options={"content-type": content_type or "image/png"}
-            )
-            logger.info(f"Upload result: {result}")
-
-            # Get signed URL (valid for 1 hour)
-            signed_url = client_sb.storage.from_(bucket_name).create_signed_url(
-                path=storage_path,
-                expires_in=3600
-            )
-
-            if signed_url and signed_url.get("signedURL"):
-                return ImageUploadResponse(
-                    success=True,
-                    file_url=signed_url["signedURL"],
-                    file_path=storage_path,
-                    message="Reference image uploaded successfully"
-                )
-            else:
-                raise HTTPException(status_code=500, detail="Failed to generate signed URL")
-
-        except HTTPException:
-            raise
-        except Exception as storage_error:
-            logger.error(f"[ImageCatalyst Upload] Storage upload failed: {storage_error}", exc_info=True)
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to upload file: {str(storage_error)}"
-            )
+        stored = await stream_upload(file, client_sb, client_id, IMAGE_REFERENCE_UPLOAD)
+        return ImageUploadResponse(
+            success=True,
+            file_url=stored.signed_url,
+            file_path=stored.path,
+            message="Reference image uploaded successfully"
+        )
 
     except HTTPException:
         raise
@@ -268,12 +211,15 @@ async def start_image_generation(
     user_id: Optional[str] = Query(None),
     conversation_id: Optional[str] = Query(None),
     session_id: Optional[str] = Query(None),
+    wait: bool = Query(True, description="Wait for the image instead of returning the run_id immediately"),
     client_service: ClientService = Depends(get_client_service),
 ):
     """
     Generate an image using Image Catalyst.
 
-    Synchronous -- returns result directly since image generation is fast (~5-15s).
+    Generation runs on a media run worker. By default this waits and returns
+    the result directly since image generation is fast (~5-15s); with
+    ``wait=false`` it returns a run_id to follow via /status/{run_id}/events.
     """
     try:
         # Validate client exists
@@ -290,7 +236,7 @@ async def start_image_generation(
             )
 
         # Validate mode
-        from app.services.image_catalyst_service import ImageMode, ImageCatalystService
+        from app.services.image_catalyst_service import ImageCatalystResult, ImageMode
         try:
             mode = ImageMode(request.mode)
         except ValueError:
@@ -305,27 +251,47 @@ async def start_image_generation(
         if enriched_prompt != request.prompt:
             logger.info(f"Brand style applied to prompt for agent {agent_id}")
 
-        # Create service and generate
-        service = ImageCatalystService()
-        result = await service.generate(
-            mode=mode,
-            prompt=request.prompt,
-            enriched_prompt=enriched_prompt if enriched_prompt != request.prompt else None,
+        # Queue the generation for a media run worker
+        run = await submit_media_run(
+            IMAGE_CATALYST_RUN,
+            {
+                "mode": mode.value,
+                "prompt": request.prompt,
+                "enriched_prompt": enriched_prompt if enriched_prompt != request.prompt else None,
+                "client_id": client_id,
+                "agent_id": agent_id,
+                "user_id": user_id,
+                "conversation_id": conversation_id,
+                "session_id": session_id,
+                "reference_image_url": request.reference_image_url,
+                "width": request.width,
+                "height": request.height,
+                "quality": request.quality,
+                "steps": request.steps,
+                "cfg_scale": request.cfg_scale,
+                "strength": request.strength,
+                "seed": request.seed,
+            },
             client_id=client_id,
-            agent_id=agent_id,
-            user_id=user_id,
-            conversation_id=conversation_id,
-            session_id=session_id,
-            reference_image_url=request.reference_image_url,
-            width=request.width,
-            height=request.height,
-            quality=request.quality,
-            steps=request.steps,
-            cfg_scale=request.cfg_scale,
-            strength=request.strength,
-            seed=request.seed,
+            mode=mode.value,
         )
 
+        if not wait:
+            return ImageCatalystStartResponse(
+                success=True,
+                run_id=run["run_id"],
+                status="pending",
+                message="Image generation started",
+            )
+
+        run = await wait_for_media_run(run["run_id"], IMAGE_CATALYST_WAIT_SECONDS)
+        if not run or run.get("status") not in ("complete", "failed"):
+            raise HTTPException(status_code=504, detail="Image generation is taking longer than expected; check /status/{run_id}")
+        if not run.get("result"):
+            # The worker failed before the service produced a result
+            raise ValueError(run.get("error") or "Image generation failed")
+        result = ImageCatalystResult(**run["result"])
+
         if result.status == "failed":
             return ImageCatalystStartResponse(
                 success=False,
@@ -362,6 +328,21 @@ async def get_status(
 ):
     """Get status of an Image Catalyst generation run."""
     try:
+        queued = await get_media_run_store().get(run_id)
+        if queued and queued.get("kind") == IMAGE_CATALYST_RUN and queued.get("client_id") == client_id:
+            result = queued.get("result") or {}
+            return ImageCatalystStatusResponse(
+                run_id=run_id,
+                status=result.get("status") or queued.get("status", "unknown"),
+                mode=queued.get("mode"),
+                prompt=queued["params"].get("prompt"),
+                image_url=result.get("image_url"),
+                seed=result.get("seed"),
+                generation_time_ms=result.get("generation_time_ms"),
+                cost=float(result.get("cost", 0) or 0),
+                error=result.get("error") or queued.get("error"),
+            )
+
         from app.services.image_catalyst_service import ImageCatalystService
 
         service = ImageCatalystService()
@@ -389,6 +370,26 @@ async def get_status(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/status/{run_id}/events")
+async def stream_status(
+    run_id: str,
+    client_id: str = Query(...),
+    last_event_id: Optional[str] = Header(None),
+):
+    """Server-Sent Events for a queued Image Catalyst generation."""
+    run = await get_media_run_store().get(run_id)
+    if not run or run.get("kind") != IMAGE_CATALYST_RUN or run.get("client_id") != client_id:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return StreamingResponse(
+        stream_media_run_events(run_id, last_event_id=last_event_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        },
+    )
+
+
 @router.get("/costs", response_model=CostSummaryResponse)
 async def get_cost_summary(
     client_id: str = Query(...),
@@ -447,6 +448,7 @@ async def store_result(
             },
             "created_at": datetime.utcnow().isoformat(),
         }).execute()
+        await invalidate_conversation_state(request.conversation_id)
 
         logger.info(
             f"Stored Image Catalyst result for conversation {request.conversation_id}, "
@@ -4,34 +4,48 @@ LINGUA API Endpoints
 Audio transcription and subtitle translation using AssemblyAI.
 """
 
-import asyncio
 import logging
-import os
-import uuid
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, UploadFile
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from app.core.dependencies import get_client_service
-
-# Platform-level AssemblyAI API key (fallback for clients without their own key)
-PLATFORM_ASSEMBLYAI_KEY = os.getenv("ASSEMBLYAI_API_KEY")
 from app.services.client_service_supabase import ClientService
+from app.services.conversation_state import invalidate_conversation_state
 from app.services.lingua_service import (
-    LinguaService,
+    LINGUA_OUTPUT_BUCKET,
+    LINGUA_STATUS_PROGRESS,
+    SUBTITLE_FORMATS,
     LinguaResult,
-    generate_srt,
-    generate_vtt,
-    generate_txt,
+    lingua_service_for_client,
+    output_path_map,
+    sign_output_paths,
     get_available_transcription_languages,
     get_available_translation_languages,
 )
+from app.services.media_run_worker import LINGUA_RUN
+from app.services.media_runs import get_media_run_store, stream_media_run_events, submit_media_run
+from app.services.media_upload import UploadPolicy, stream_upload
 
 router = APIRouter(prefix="/lingua", tags=["lingua"])
 logger = logging.getLogger(__name__)
 
+LINGUA_AUDIO_UPLOAD = UploadPolicy(
+    label="lingua",
+    bucket="audio-uploads",
+    path_prefix="lingua",
+    max_bytes=100 * 1024 * 1024,
+    allowed_types=("audio/", "video/webm"),  # webm can contain audio
+    media_kind="audio",
+    invalid_type_detail="Invalid file type. Supported formats: MP3, WAV, M4A, FLAC, OGG, WEBM",
+    too_large_detail="File too large. Maximum size is 100MB.",
+    default_content_type="audio/mpeg",
+    default_ext="mp3",
+)
+
 
 # ============================================================================
 # Request/Response Models
@@ -74,6 +88,8 @@ class LinguaStatusResponse(BaseModel):
     transcript: Optional[Dict[str, Any]] = None
     translations: Optional[Dict[str, Any]] = None
     download_urls: Optional[Dict[str, Any]] = None
+    # Storage paths behind download_urls; saved results keep these and are re-signed on read
+    output_paths: Optional[Dict[str, Dict[str, str]]] = None
     error: Optional[str] = None
 
 
@@ -90,48 +106,6 @@ class StoreResultRequest(BaseModel):
     result_data: Dict[str, Any]
 
 
-# ============================================================================
-# In-Memory Run Storage (for demo - production should use database)
-# ============================================================================
-
-_lingua_runs: Dict[str, Any] = {}  # Can store LinguaResult or pending status dict
-
-
-async def process_lingua_async(
-    run_id: str,
-    service: LinguaService,
-    audio_url: str,
-    source_language: Optional[str],
-    target_languages: Optional[List[str]],
-):
-    """Background task to process LINGUA transcription and translation."""
-    try:
-        logger.info(f"[LINGUA] Background task started for run {run_id}")
-
-        # Update status to transcribing
-        if run_id in _lingua_runs:
-            _lingua_runs[run_id]["status"] = "transcribing"
-
-        result = await service.process_full(
-            audio_url=audio_url,
-            source_language=source_language,
-            target_languages=target_languages,
-        )
-
-        # Store the completed result
-        _lingua_runs[run_id] = result
-        logger.info(f"[LINGUA] Background task completed for run {run_id}")
-
-    except Exception as e:
-        logger.error(f"[LINGUA] Background task failed for run {run_id}: {e}", exc_info=True)
-        # Store error status
-        _lingua_runs[run_id] = {
-            "run_id": run_id,
-            "status": "failed",
-            "error": str(e),
-        }
-
-
 # ============================================================================
 # API Endpoints
 # ============================================================================
@@ -158,99 +132,14 @@ async def upload_audio(
     Supported formats: MP3, WAV, M4A, FLAC, OGG, WEBM
     """
     try:
-        # Validate file type
-        allowed_types = ['audio/', 'video/webm']  # webm can contain audio
-        content_type = file.content_type or ''
-        if not any(allowed in content_type for allowed in allowed_types):
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid file type. Supported formats: MP3, WAV, M4A, FLAC, OGG, WEBM"
-            )
-
-        # Validate file size (max 100MB)
-        MAX_SIZE = 100 * 1024 * 1024  # 100MB
-        content = await file.read()
-        if len(content) > MAX_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail="File too large. Maximum size is 100MB."
-            )
-
-        # Get client's Supabase for storage
         client_sb = await client_service.get_client_supabase_client(client_id, auto_sync=False)
-
-        # Generate unique filename
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        file_ext = file.filename.split('.')[-1] if file.filename and '.' in file.filename else 'mp3'
-        storage_path = f"lingua/{client_id}/{timestamp}_{uuid.uuid4().hex[:8]}.{file_ext}"
-
-        # Upload to Supabase storage
-        bucket_name = "audio-uploads"
-
-        try:
-            # Try to create bucket if it doesn't exist
-            bucket_created = False
-            try:
-                result = client_sb.storage.create_bucket(
-                    bucket_name,
-                    options={"public": False}
-                )
-                logger.info(f"Created bucket '{bucket_name}': {result}")
-                bucket_created = True
-            except Exception as e:
-                error_str = str(e).lower()
-                if "already exists" in error_str or "duplicate" in error_str:
-                    logger.debug(f"Bucket '{bucket_name}' already exists")
-                    bucket_created = True
-                else:
-                    logger.warning(f"Could not create bucket '{bucket_name}': {e}")
-                    try:
-                        buckets = client_sb.storage.list_buckets()
-                        bucket_names = [b.get('name') or b.get('id') for b in buckets]
-                        if bucket_name in bucket_names:
-                            bucket_created = True
-                    except Exception as list_err:
-                        logger.warning(f"Could not list buckets: {list_err}")
-
-            if not bucket_created:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Storage bucket '{bucket_name}' does not exist. Please create it in Supabase Dashboard."
-                )
-
-            # Upload file
-            logger.info(f"Uploading file to {bucket_name}/{storage_path}")
-            result = client_sb.storage.from_(bucket_name).upload(
-                path=storage_path,
-                file=content,
-                file_options={"content-type": content_type or "audio/mpeg"}
-            )
-            logger.info(f"Upload result: {result}")
-
-            # Get signed URL (valid for 1 hour)
-            signed_url = client_sb.storage.from_(bucket_name).create_signed_url(
-                path=storage_path,
-                expires_in=3600  # 1 hour
-            )
-
-            if signed_url and signed_url.get("signedURL"):
-                return AudioUploadResponse(
-                    success=True,
-                    file_url=signed_url["signedURL"],
-                    file_path=storage_path,
-                    message="File uploaded successfully"
-                )
-            else:
-                raise HTTPException(status_code=500, detail="Failed to generate signed URL")
-
-        except HTTPException:
-            raise
-        except Exception as storage_error:
-            logger.error(f"Storage upload failed: {storage_error}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to upload file: {str(storage_error)}"
-            )
+        stored = await stream_upload(file, client_sb, client_id, LINGUA_AUDIO_UPLOAD)
+        return AudioUploadResponse(
+            success=True,
+            file_url=stored.signed_url,
+            file_path=stored.path,
+            message="File uploaded successfully"
+        )
 
     except HTTPException:
         raise
@@ -262,7 +151,6 @@ async def upload_audio(
 @router.post("/start", response_model=LinguaStartResponse)
 async def start_lingua(
     request: LinguaStartRequest,
-    background_tasks: BackgroundTasks,
     client_id: str = Query(...),
     agent_id: Optional[str] = Query(None),
     client_service: ClientService = Depends(get_client_service),
@@ -270,8 +158,8 @@ async def start_lingua(
     """
     Start LINGUA transcription and translation.
 
-    This endpoint starts processing in the background and returns immediately.
-    Use /status/{run_id} to poll for completion.
+    The run is queued for a media run worker and this endpoint returns immediately.
+    Follow /status/{run_id}/events (SSE) or poll /status/{run_id} for completion.
     """
     try:
         # Get client info and API keys
@@ -279,78 +167,30 @@ async def start_lingua(
         if not client:
             raise HTTPException(status_code=404, detail="Client not found")
 
-        # Get AssemblyAI API key (client-specific or platform fallback)
-        assemblyai_key = getattr(client.settings.api_keys, 'assemblyai_api_key', None)
-        if not assemblyai_key:
-            # Try from additional_settings
-            assemblyai_key = client.additional_settings.get('api_keys', {}).get('assemblyai_api_key')
-
-        # Fall back to platform-level key if client doesn't have one
-        if not assemblyai_key:
-            assemblyai_key = PLATFORM_ASSEMBLYAI_KEY
-            if assemblyai_key:
-                logger.info(f"Using platform AssemblyAI key for client {client_id}")
-
-        if not assemblyai_key:
-            raise HTTPException(
-                status_code=400,
-                detail="AssemblyAI API key not configured. Contact your administrator."
-            )
-
-        # Get LLM API key for translation (prefer Groq, fallback to others)
-        llm_key = None
-        llm_provider = "groq"
-
-        if client.settings.api_keys.groq_api_key:
-            llm_key = client.settings.api_keys.groq_api_key
-            llm_provider = "groq"
-        elif client.settings.api_keys.openai_api_key:
-            llm_key = client.settings.api_keys.openai_api_key
-            llm_provider = "openai"
-        elif client.settings.api_keys.deepinfra_api_key:
-            llm_key = client.settings.api_keys.deepinfra_api_key
-            llm_provider = "deepinfra"
-
-        if not llm_key and request.target_languages:
-            raise HTTPException(
-                status_code=400,
-                detail="Translation requires an LLM API key (Groq, OpenAI, or DeepInfra). Add one in Settings → API Keys."
-            )
-
-        # Initialize service
-        service = LinguaService(
-            assemblyai_api_key=assemblyai_key,
-            llm_api_key=llm_key or "",
-            llm_provider=llm_provider,
-        )
-
-        # Generate run ID
-        run_id = str(uuid.uuid4())
-
-        # Store pending status
-        _lingua_runs[run_id] = {
-            "run_id": run_id,
-            "status": "pending",
-            "created_at": datetime.utcnow().isoformat(),
-            "source_audio_url": request.source_audio_url,
-            "target_languages": request.target_languages,
-        }
-
-        # Start background processing
-        logger.info(f"Starting LINGUA background processing for client {client_id}, run {run_id}")
-        background_tasks.add_task(
-            process_lingua_async,
-            run_id=run_id,
-            service=service,
-            audio_url=request.source_audio_url,
-            source_language=request.source_language,
-            target_languages=request.target_languages if request.target_languages else None,
+        # Fail fast on missing keys; the worker resolves them again when it runs
+        try:
+            lingua_service_for_client(client, needs_translation=bool(request.target_languages))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        logger.info(f"Queueing LINGUA run for client {client_id}")
+        run = await submit_media_run(
+            LINGUA_RUN,
+            {
+                "client_id": client_id,
+                "agent_id": agent_id,
+                "audio_url": request.source_audio_url,
+                "source_language": request.source_language,
+                "target_languages": request.target_languages,
+                "output_formats": request.output_formats,
+            },
+            client_id=client_id,
         )
 
         # Return immediately with pending status
         return LinguaStartResponse(
             success=True,
-            run_id=run_id,
+            run_id=run["run_id"],
             status="pending",
             message="Processing started. Poll /status/{run_id} for updates.",
             transcript=None,
@@ -365,35 +205,34 @@ async def start_lingua(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _get_lingua_run(run_id: str, client_id: str) -> Dict[str, Any]:
+    run = await get_media_run_store().get(run_id)
+    if not run or run.get("kind") != LINGUA_RUN or run.get("client_id") != client_id:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
+
+
 @router.get("/status/{run_id}", response_model=LinguaStatusResponse)
 async def get_status(
     run_id: str,
     client_id: str = Query(...),
+    offset: int = Query(0, ge=0, description="First segment of the returned segment window"),
+    limit: int = Query(100, ge=0, le=1000, description="Segments per language in the window"),
+    client_service: ClientService = Depends(get_client_service),
 ):
-    """Get status of a LINGUA processing run."""
-    result = _lingua_runs.get(run_id)
-    if not result:
-        raise HTTPException(status_code=404, detail="Run not found")
+    """
+    Get status of a LINGUA processing run.
 
-    # Handle dict (pending/in-progress) vs LinguaResult (completed)
-    if isinstance(result, dict):
-        # Still processing or failed
-        status = result.get("status", "pending")
-        progress = 0
-        phase = "Starting..."
-        if status == "pending":
-            progress = 10
-            phase = "Starting transcription..."
-        elif status == "transcribing":
-            progress = 40
-            phase = "Transcribing audio..."
-        elif status == "translating":
-            progress = 70
-            phase = "Translating subtitles..."
-        elif status == "failed":
-            progress = 0
-            phase = "Failed"
+    Finished runs return summaries with one window of segments per language
+    (page with ``offset``/``limit``) and download URLs for the subtitle files,
+    so the response size does not grow with the media length.
+    """
+    run = await _get_lingua_run(run_id, client_id)
 
+    if not run.get("result"):
+        # Still processing or failed
+        status = run.get("status", "pending")
+        progress, phase = LINGUA_STATUS_PROGRESS.get(status, (0, "Starting..."))
         return LinguaStatusResponse(
             run_id=run_id,
             status=status,
@@ -402,51 +241,117 @@ async def get_status(
             transcript=None,
             translations={},
             download_urls={},
-            error=result.get("error"),
+            error=run.get("error"),
         )
 
-    # LinguaResult object - processing complete
+    # Processing finished
+    result = LinguaResult.from_dict(run["result"])
     progress = 100 if result.status == "complete" else 0
     phase = "Complete" if result.status == "complete" else "Failed"
 
-    # Generate download content
-    download_urls = {}
-    if result.original_transcript:
-        orig_lang = result.original_transcript.language_code
-        download_urls[orig_lang] = {
-            "srt": generate_srt(result.original_transcript.segments),
-            "vtt": generate_vtt(result.original_transcript.segments),
-            "txt": generate_txt(result.original_transcript.segments),
-        }
-        for lang_code, translation in result.translations.items():
-            download_urls[lang_code] = {
-                "srt": generate_srt(translation.segments),
-                "vtt": generate_vtt(translation.segments),
-                "txt": translation.text,
-            }
-
     return LinguaStatusResponse(
         run_id=run_id,
         status=result.status,
         progress_percent=progress,
         current_phase=phase,
-        transcript=result.original_transcript.to_dict() if result.original_transcript else None,
-        translations={k: v.to_dict() for k, v in result.translations.items()},
-        download_urls=download_urls,
+        transcript=result.original_transcript.summary(offset, limit) if result.original_transcript else None,
+        translations={k: v.summary(offset, limit) for k, v in result.translations.items()},
+        download_urls=await _download_urls(result, client_id, client_service),
+        output_paths=output_path_map(result),
         error=result.error,
     )
 
 
+async def _download_urls(result: LinguaResult, client_id: str, client_service: ClientService) -> Dict[str, Dict[str, str]]:
+    """Signed URLs for stored subtitle files; API streaming URLs for anything not stored."""
+    stored = [
+        (lang_code, output_format, path)
+        for output_format in SUBTITLE_FORMATS
+        for lang_code, path in result.output_paths(output_format).items()
+    ]
+    signed: Dict[str, str] = {}
+    if stored:
+        try:
+            client_sb = await client_service.get_client_supabase_client(client_id, auto_sync=False)
+            signed = await sign_output_paths(client_sb, [path for _, _, path in stored])
+        except Exception as e:
+            logger.warning(f"Could not sign LINGUA outputs for run {result.run_id}: {e}")
+
+    download_urls: Dict[str, Dict[str, str]] = {}
+    for lang_code in result.languages():
+        for output_format in SUBTITLE_FORMATS:
+            path = result.output_paths(output_format).get(lang_code)
+            if path and path in signed:
+                url = signed[path]
+            elif stored and not path:
+                continue  # Format was not requested for this run
+            else:
+                url = f"/api/v1/lingua/status/{result.run_id}/download/{lang_code}/{output_format}?client_id={client_id}"
+            download_urls.setdefault(lang_code, {})[output_format] = url
+    return download_urls
+
+
+@router.get("/status/{run_id}/download/{language}/{output_format}")
+async def download_output(
+    run_id: str,
+    language: str,
+    output_format: str,
+    client_id: str = Query(...),
+):
+    """Stream one language's subtitles, generated cue by cue from the run result."""
+    run = await _get_lingua_run(run_id, client_id)
+    if output_format not in SUBTITLE_FORMATS:
+        raise HTTPException(status_code=404, detail="Unknown format")
+    segments = LinguaResult.from_dict(run["result"]).languages().get(language) if run.get("result") else None
+    if segments is None:
+        raise HTTPException(status_code=404, detail="No output for this language")
+
+    generate, content_type = SUBTITLE_FORMATS[output_format]
+    return StreamingResponse(
+        generate(segments),
+        media_type=f"{content_type}; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="transcript_{language}.{output_format}"'},
+    )
+
+
+@router.get("/status/{run_id}/events")
+async def stream_status(
+    run_id: str,
+    client_id: str = Query(...),
+    last_event_id: Optional[str] = Header(None),
+):
+    """Server-Sent Events with progress for a LINGUA run; closes once the run finishes."""
+    await _get_lingua_run(run_id, client_id)
+    return StreamingResponse(
+        stream_media_run_events(run_id, last_event_id=last_event_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        },
+    )
+
+
 @router.post("/store-result")
 async def store_result(
     request: StoreResultRequest,
     client_id: str = Query(...),
     client_service: ClientService = Depends(get_client_service),
 ):
-    """Store LINGUA results in conversation history."""
+    """
+    Store LINGUA results in conversation history.
+
+    Signed download URLs expire, so they are dropped here; the run's storage
+    paths are saved instead and signed again whenever the history is read.
+    """
     try:
         client_sb = await client_service.get_client_supabase_client(client_id, auto_sync=False)
 
+        data = {k: v for k, v in request.result_data.items() if k != "download_urls"}
+        run = await get_media_run_store().get(request.run_id)
+        if run and run.get("kind") == LINGUA_RUN and run.get("client_id") == client_id and run.get("result"):
+            data["output_paths"] = output_path_map(LinguaResult.from_dict(run["result"]))
+
         # Store as widget message in conversation
         client_sb.table("conversation_transcripts").insert({
             "conversation_id": request.conversation_id,
@@ -457,12 +362,13 @@ async def store_result(
                     "type": "lingua",
                     "state": "complete",
                     "run_id": request.run_id,
-                    "data": request.result_data,
+                    "data": data,
                 },
                 "channel": "text",
             },
             "created_at": datetime.utcnow().isoformat(),
         }).execute()
+        await invalidate_conversation_state(request.conversation_id)
 
         return {"success": True, "message": "Result stored"}
 
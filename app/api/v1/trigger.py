@@ -14,6 +14,7 @@ import time
 from datetime import datetime
 import traceback  # For detailed errors
 import re
+import weakref
 
 from app.services.agent_service_supabase import AgentService
 from app.services.client_service_supabase import ClientService
@@ -27,6 +28,8 @@ from app.config import settings
 # Tools service for abilities
 from app.services.tools_service_supabase import ToolsService
 from app.services.document_processor import document_processor
+from app.services.dispatch_config import SECRET_CONFIG_FIELDS, get_dispatch_config_store
+from app.services.text_sessions import TextSessionTurn, get_text_session_client, session_fingerprint
 from app.utils.tool_prompts import apply_tool_prompt_instructions
 from livekit.agents.llm.tool_context import ToolContext
 from app.agent_modules.tool_registry import ToolRegistry
@@ -442,6 +445,9 @@ async def _build_agent_context_for_dispatch(
         "tools_config": tools_config,
         "embedding": embedding_cfg,
         "rerank": rerank_cfg,
+        "rag_retrieval_mode": (
+            additional_settings.get("rag_retrieval_mode") if isinstance(additional_settings, dict) else None
+        ),
         "mode": mode,
         "api_keys": api_keys_map,
     }
@@ -675,6 +681,64 @@ def _should_dispatch(room_name: str) -> bool:
 
 # Cross-process dedupe removed; relying on in-process dedupe only
 
+# Job metadata fields that vary per dispatch; everything else is agent config
+# that travels by reference when a dispatch config store is configured.
+INLINE_JOB_METADATA_FIELDS = (
+    "client_id",
+    "agent_slug",
+    "agent_id",
+    "conversation_id",
+    "user_id",
+    "mode",
+    "user_message",
+    "text_session_fingerprint",
+)
+
+# One LiveKit API client (and aiohttp session) per event loop and credential set.
+# Keyed weakly on the loop object, so a closed loop's clients go with it and a
+# new loop that reuses its id() never picks up a session bound to the old one.
+_dispatch_api_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[Any, ...], Any]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_dispatch_api(livekit_manager: LiveKitManager) -> Any:
+    """Reuse a LiveKit API client for dispatches instead of opening one per call."""
+    clients = _dispatch_api_clients.setdefault(asyncio.get_running_loop(), {})
+    key = (
+        api.LiveKitAPI,
+        livekit_manager.url,
+        livekit_manager.api_key,
+        livekit_manager.api_secret,
+    )
+    client = clients.get(key)
+    if client is None:
+        client = api.LiveKitAPI(
+            url=livekit_manager.url,
+            api_key=livekit_manager.api_key,
+            api_secret=livekit_manager.api_secret,
+        )
+        clients[key] = client
+    return client
+
+
+async def _externalize_dispatch_config(job_metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace agent config in job metadata with a signed ``config_ref`` when possible.
+
+    Secrets stay inline: the store never writes them to Redis.
+    """
+    store = get_dispatch_config_store()
+    if store is None:
+        return job_metadata
+    inline = {k: job_metadata[k] for k in INLINE_JOB_METADATA_FIELDS + SECRET_CONFIG_FIELDS if k in job_metadata}
+    config = {k: v for k, v in job_metadata.items() if k not in inline}
+    try:
+        inline["config_ref"] = await store.put(config)
+    except Exception as e:
+        logger.warning(f"Dispatch config store write failed; sending config inline: {e}")
+        return job_metadata
+    return inline
+
 class CreateRoomRequest(BaseModel):
     """Request model for creating a LiveKit room"""
     room_name: str = Field(..., description="Name of the room to create")
@@ -1243,45 +1307,63 @@ async def handle_text_trigger_via_livekit(
         "conversation_id": agent_context.get("conversation_id"),
     }
 
-    reused_room = False
-    if request.conversation_id:
-        text_room_name, room_info, reused_room = await _get_or_create_text_room(
-            backend_livekit,
-            conversation_id=client_conversation_id,
-            agent_slug=agent.slug,
+    # Follow-ups go straight to a live text session actor when there is one
+    session_turn = await open_text_session_turn(
+        agent_context,
+        conversation_id=conversation_id if request.conversation_id else None,
+        message=request.message,
+        user_id=request.user_id,
+        session_id=request.session_id,
+    )
+
+    if session_turn is not None:
+        text_room_name = None
+        room_info = None
+        dispatch_info = {"mode": "text_session", "turn_id": session_turn.turn_id}
+        try:
+            response_text, citations, tool_results, widget = await session_turn.result()
+        except RuntimeError as session_err:
+            raise HTTPException(status_code=504, detail=str(session_err))
+    else:
+        reused_room = False
+        if request.conversation_id:
+            text_room_name, room_info, reused_room = await _get_or_create_text_room(
+                backend_livekit,
+                conversation_id=client_conversation_id,
+                agent_slug=agent.slug,
+                user_id=request.user_id,
+                agent_context=_room_meta,
+            )
+        else:
+            text_room_name = f"text-{client_conversation_id}-{uuid.uuid4().hex[:8]}"
+            room_info = await ensure_livekit_room_exists(
+                backend_livekit,
+                text_room_name,
+                agent_name=settings.livekit_agent_name,
+                agent_slug=agent.slug,
+                user_id=request.user_id,
+                agent_config=_room_meta,
+                enable_agent_dispatch=True,
+            )
+
+        dispatch_info = await dispatch_agent_job(
+            livekit_manager=backend_livekit,
+            room_name=text_room_name,
+            agent=agent,
+            client=client,
             user_id=request.user_id,
-            agent_context=_room_meta,
+            conversation_id=conversation_id,
+            session_id=request.session_id,
+            tools=agent_context.get("tools"),
+            tools_config=agent_context.get("tools_config"),
+            api_keys=agent_context.get("api_keys"),
+            agent_context=agent_context,
         )
-    else:
-        text_room_name = f"text-{client_conversation_id}-{uuid.uuid4().hex[:8]}"
-        room_info = await ensure_livekit_room_exists(
+
+        response_text, citations, tool_results, widget = await _poll_for_text_response(
             backend_livekit,
             text_room_name,
-            agent_name=settings.livekit_agent_name,
-            agent_slug=agent.slug,
-            user_id=request.user_id,
-            agent_config=_room_meta,
-            enable_agent_dispatch=True,
         )
-
-    dispatch_info = await dispatch_agent_job(
-        livekit_manager=backend_livekit,
-        room_name=text_room_name,
-        agent=agent,
-        client=client,
-        user_id=request.user_id,
-        conversation_id=conversation_id,
-        session_id=request.session_id,
-        tools=agent_context.get("tools"),
-        tools_config=agent_context.get("tools_config"),
-        api_keys=agent_context.get("api_keys"),
-        agent_context=agent_context,
-    )
-
-    response_text, citations, tool_results, widget = await _poll_for_text_response(
-        backend_livekit,
-        text_room_name,
-    )
     citations = citations or []
     tool_results = tool_results or []
 
@@ -1478,6 +1560,9 @@ async def handle_text_trigger(
         "voice_settings": agent.voice_settings.dict() if agent.voice_settings else {},
         "embedding": embedding_cfg,
         "rerank": rerank_cfg,
+        "rag_retrieval_mode": (
+            _add_settings_rerank.get("rag_retrieval_mode") if isinstance(_add_settings_rerank, dict) else None
+        ),
         "rag_results_limit": getattr(agent, "rag_results_limit", None),
         "show_citations": getattr(agent, "show_citations", True),
     }
@@ -1951,6 +2036,8 @@ async def dispatch_agent_job(
             ),
             "rerank": context_snapshot.get("rerank"),
             "user_message": context_snapshot.get("user_message"),
+            # Lets a text session actor notice config changes on follow-up turns
+            "text_session_fingerprint": context_snapshot.get("text_session_fingerprint"),
         }
 
         tools_payload = tools if tools is not None else context_snapshot.get("tools") or []
@@ -1975,15 +2062,10 @@ async def dispatch_agent_job(
         except Exception:
             pass
         
-        # Create LiveKit API client for explicit dispatch
-        api_start = time.time()
-        livekit_api = api.LiveKitAPI(
-            url=livekit_manager.url,
-            api_key=livekit_manager.api_key,
-            api_secret=livekit_manager.api_secret
-        )
-        api_duration = time.time() - api_start
-        logger.info(f"⏱️ LiveKit API client creation took {api_duration:.2f}s")
+        full_metadata_size = len(json.dumps(job_metadata))
+        job_metadata = await _externalize_dispatch_config(job_metadata)
+
+        livekit_api = _get_dispatch_api(livekit_manager)
         
         preferred_worker = await livekit_manager.get_warm_worker()
         if preferred_worker:
@@ -1993,7 +2075,7 @@ async def dispatch_agent_job(
         # Dispatch the agent with job metadata using the correct API method
         dispatch_request = api.CreateAgentDispatchRequest(
             room=room_name,
-            metadata=json.dumps(job_metadata),  # Pass full config as job metadata
+            metadata=json.dumps(job_metadata),  # Per-dispatch fields plus agent config (inline or by reference)
             agent_name=settings.livekit_agent_name  # Match the agent name the worker accepts
         )
         
@@ -2001,7 +2083,10 @@ async def dispatch_agent_job(
         logger.info(f"   - Room: {room_name}")
         logger.info(f"   - Agent name: {settings.livekit_agent_name}")
         logger.info(f"   - Metadata fields: {len(job_metadata)}")
-        logger.info(f"   - Metadata size: {len(json.dumps(job_metadata))} bytes")
+        logger.info(
+            f"   - Metadata size: {len(json.dumps(job_metadata))} bytes"
+            + (f" (config by reference, {full_metadata_size} bytes inline)" if "config_ref" in job_metadata else "")
+        )
         
         dispatch_api_start = time.time()
         dispatch_response = await livekit_api.agent_dispatch.create_dispatch(dispatch_request)
@@ -2175,6 +2260,41 @@ async def poll_for_text_response_streaming(
     yield {"error": f"Text response timeout after {timeout}s"}
 
 
+async def open_text_session_turn(
+    agent_context: Dict[str, Any],
+    *,
+    conversation_id: Optional[str],
+    message: str,
+    user_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+) -> Optional[TextSessionTurn]:
+    """
+    Hand a follow-up message to the conversation's live text session actor.
+
+    Stamps ``agent_context`` with the config fingerprint (so a dispatched job can
+    become the actor) and returns None when no actor accepted the turn, in which
+    case the caller creates/reuses the room and dispatches as usual.
+    """
+    agent_context["text_session_fingerprint"] = session_fingerprint(agent_context)
+    session_client = get_text_session_client()
+    if session_client is None or not conversation_id:
+        return None
+    try:
+        turn = await session_client.submit(
+            conversation_id,
+            message,
+            fingerprint=agent_context["text_session_fingerprint"],
+            user_id=user_id,
+            session_id=session_id,
+        )
+    except Exception as exc:
+        logger.warning(f"Text session submit failed for {conversation_id}; dispatching instead: {exc}")
+        return None
+    if turn is not None:
+        logger.info(f"💬 Routed follow-up for conversation {conversation_id} to its text session actor")
+    return turn
+
+
 async def _get_or_create_text_room(
     livekit_manager: LiveKitManager,
     *,
@@ -1,4 +1,5 @@
+from .assemblyai import router as assemblyai_router
 from .livekit import router as livekit_router
 from .supabase import router as supabase_router
 
-__all__ = ["livekit_router", "supabase_router"]
+__all__ = ["assemblyai_router", "livekit_router", "supabase_router"]
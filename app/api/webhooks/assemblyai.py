@@ -0,0 +1,44 @@
+"""AssemblyAI transcript completion webhooks for Lingua runs."""
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, status
+from pydantic import BaseModel
+
+from app.services.assemblyai_webhooks import verify_webhook_token
+from app.services.media_run_worker import LINGUA_RUN
+from app.services.media_runs import get_media_run_store, resume_media_run
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+class TranscriptWebhook(BaseModel):
+    """Body AssemblyAI posts when a transcript finishes."""
+    transcript_id: str
+    status: str
+
+
+@router.post("/assemblyai/transcripts/{run_id}")
+async def handle_transcript_webhook(
+    run_id: str,
+    payload: TranscriptWebhook,
+    x_sidekick_webhook_token: Optional[str] = Header(None),
+):
+    """Resume the parked Lingua run waiting on this transcript."""
+    if not verify_webhook_token(run_id, x_sidekick_webhook_token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid webhook token")
+
+    run = await get_media_run_store().get(run_id)
+    if not run or run.get("kind") != LINGUA_RUN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Run not found")
+    # The worker records transcript_id before parking; the token already ties the callback to this run
+    if run.get("transcript_id") and run["transcript_id"] != payload.transcript_id:
+        logger.warning(f"AssemblyAI webhook for run {run_id} names transcript {payload.transcript_id}, expected {run.get('transcript_id')}")
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Transcript does not belong to this run")
+
+    # The worker fetches the transcript itself, so a duplicate callback is harmless; one that
+    # beats the park is remembered and requeues the run as soon as it parks
+    resumed = await resume_media_run(LINGUA_RUN, run_id, transcript_status=payload.status)
+    logger.info(f"AssemblyAI transcript {payload.transcript_id} {payload.status}; run {run_id} resumed={resumed}")
+    return {"success": True, "resumed": resumed}
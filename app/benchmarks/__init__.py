@@ -0,0 +1 @@
+"""Latency benchmarks for platform hot paths (run with ``python -m app.benchmarks.<name>``)."""
@@ -0,0 +1,425 @@
+"""
+Local stand-ins for the services behind the text chat path.
+
+Each stand-in replaces one network dependency with an in-process fake that
+answers after a configurable latency, so benchmarks exercise the real FastAPI
+route and trigger code without Supabase, LiveKit or model providers:
+
+- ``InMemorySupabase``: the PostgREST query-builder surface used by
+  ``store_turn`` and dataset resolution (blocking calls sleep, like the real
+  sync client does on the event loop)
+- ``FakeLiveKitManager`` / ``FakeLiveKitAPI``: rooms with metadata and agent
+  dispatch; each dispatch starts a ``SimulatedTextWorker``
+- ``SimulatedTextWorker``: plays the agent's text turn (embed -> vector search
+  -> rerank -> streamed LLM tokens) into room metadata the way the worker does
+- agent/client/tools services returning real ``Agent``/``Client``/``ToolOut`` models
+
+``StandInEnvironment`` patches them in and restores the originals.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.agent import Agent, VoiceSettings
+from app.models.client import APIKeys, Client, ClientSettings, EmbeddingSettings, SupabaseConfig
+from app.models.tools import ToolOut
+
+BENCH_CLIENT_ID = "7b1d2c7e-0000-4000-8000-00000000beef"
+BENCH_AGENT_ID = "a9e8f7d6-0000-4000-8000-00000000cafe"
+BENCH_AGENT_SLUG = "bench-agent"
+BENCH_SUPABASE_URL = "https://bench.supabase.co"
+
+
+@dataclass
+class Latencies:
+    """Simulated service latencies in milliseconds (jittered by ``jitter``)."""
+
+    platform_db_ms: float = 15.0
+    tenant_db_ms: float = 10.0
+    livekit_api_ms: float = 20.0
+    embedder_ms: float = 60.0
+    reranker_ms: float = 80.0
+    llm_first_token_ms: float = 350.0
+    llm_token_interval_ms: float = 15.0
+    llm_tokens: int = 40
+    jitter: float = 0.2
+
+    def sample(self, base_ms: float) -> float:
+        """Seconds to wait for a call with the given base latency."""
+        spread = base_ms * self.jitter
+        return max(0.0, base_ms + random.uniform(-spread, spread)) / 1000
+
+
+# ---------------------------------------------------------------------------
+# Supabase
+# ---------------------------------------------------------------------------
+
+
+class _Result:
+    def __init__(self, data: List[Dict[str, Any]]):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, db: "InMemorySupabase", table: str, action: str = "select", payload: Any = None):
+        self.db = db
+        self.table = table
+        self.action = action
+        self.payload = payload
+        self.filters: List[Tuple[str, Any]] = []
+        self._limit: Optional[int] = None
+
+    # Builder methods used by the text path; unknown modifiers are accepted as no-ops
+    def select(self, *_args: Any, **_kwargs: Any) -> "_Query":
+        return self
+
+    def eq(self, column: str, value: Any) -> "_Query":
+        self.filters.append((column, value))
+        return self
+
+    def order(self, *_args: Any, **_kwargs: Any) -> "_Query":
+        return self
+
+    def limit(self, count: int) -> "_Query":
+        self._limit = count
+        return self
+
+    def _matches(self, row: Dict[str, Any]) -> bool:
+        return all(str(row.get(column)) == str(value) for column, value in self.filters)
+
+    def execute(self) -> _Result:
+        # Blocking, like supabase-py's sync client
+        time.sleep(self.db.latencies.sample(self.db.latency_ms))
+        rows = self.db.tables.setdefault(self.table, [])
+        if self.action == "insert":
+            payload = self.payload if isinstance(self.payload, list) else [self.payload]
+            inserted = [{"id": str(uuid.uuid4()), **row} for row in payload]
+            rows.extend(inserted)
+            return _Result(inserted)
+        if self.action == "upsert":
+            rows.extend(self.payload if isinstance(self.payload, list) else [self.payload])
+            return _Result([])
+        matched = [row for row in rows if self._matches(row)]
+        if self.action == "update":
+            for row in matched:
+                row.update(self.payload)
+        return _Result(matched[: self._limit] if self._limit else matched)
+
+
+class _Table:
+    def __init__(self, db: "InMemorySupabase", name: str):
+        self.db = db
+        self.name = name
+
+    def select(self, *args: Any, **kwargs: Any) -> _Query:
+        return _Query(self.db, self.name)
+
+    def insert(self, payload: Any) -> _Query:
+        return _Query(self.db, self.name, "insert", payload)
+
+    def upsert(self, payload: Any, **_kwargs: Any) -> _Query:
+        return _Query(self.db, self.name, "upsert", payload)
+
+    def update(self, payload: Dict[str, Any]) -> _Query:
+        return _Query(self.db, self.name, "update", payload)
+
+
+class InMemorySupabase:
+    """Tenant database stand-in (tables are plain lists of dicts)."""
+
+    def __init__(self, latencies: Latencies, latency_ms: Optional[float] = None):
+        self.latencies = latencies
+        self.latency_ms = latencies.tenant_db_ms if latency_ms is None else latency_ms
+        self.tables: Dict[str, List[Dict[str, Any]]] = {
+            "agent_documents": [
+                {"agent_id": BENCH_AGENT_ID, "document_id": doc_id, "enabled": True} for doc_id in range(1, 6)
+            ],
+        }
+
+    def table(self, name: str) -> _Table:
+        return _Table(self, name)
+
+
+# ---------------------------------------------------------------------------
+# LiveKit
+# ---------------------------------------------------------------------------
+
+
+class SimulatedTextWorker:
+    """Plays one text turn into room metadata: embed, search, rerank, stream tokens."""
+
+    def __init__(self, manager: "FakeLiveKitManager", latencies: Latencies, tenant_db: InMemorySupabase):
+        self.manager = manager
+        self.latencies = latencies
+        self.tenant_db = tenant_db
+
+    async def run(self, room_name: str, job_metadata: Dict[str, Any]) -> None:
+        lat = self.latencies
+        await asyncio.sleep(lat.sample(lat.embedder_ms))
+        await asyncio.sleep(lat.sample(self.tenant_db.latency_ms))  # match_documents RPC
+        await asyncio.sleep(lat.sample(lat.reranker_ms))
+        await asyncio.sleep(lat.sample(lat.llm_first_token_ms))
+
+        words = []
+        for index in range(lat.llm_tokens):
+            words.append(f"token{index}")
+            await self.manager.update_room_metadata(
+                room_name, {"text_response_partial": " ".join(words), "streaming": True}
+            )
+            await asyncio.sleep(lat.sample(lat.llm_token_interval_ms))
+
+        await self.manager.update_room_metadata(
+            room_name,
+            {
+                "text_response": " ".join(words),
+                "text_response_partial": " ".join(words),
+                "streaming": False,
+                "citations": [{"document_id": 1, "title": "Bench doc"}],
+            },
+        )
+
+
+class FakeLiveKitManager:
+    """``LiveKitManager`` surface used by the text path, backed by a dict of rooms."""
+
+    def __init__(self, latencies: Latencies):
+        self.latencies = latencies
+        self.url = "wss://bench.livekit.local"
+        self.api_key = "bench"
+        self.api_secret = "bench-secret"
+        self._initialized = True
+        self.rooms: Dict[str, Dict[str, Any]] = {}
+        self.worker_tasks: List[asyncio.Task] = []
+
+    async def _call(self) -> None:
+        await asyncio.sleep(self.latencies.sample(self.latencies.livekit_api_ms))
+
+    async def initialize(self) -> None:
+        self._initialized = True
+
+    async def get_room(self, room_name: str) -> Optional[Dict[str, Any]]:
+        await self._call()
+        room = self.rooms.get(room_name)
+        if room is None:
+            return None
+        return {**room, "metadata": json.dumps(room["metadata"])}
+
+    async def create_room(self, name: str, metadata: Optional[str] = None, **kwargs: Any) -> Dict[str, Any]:
+        await self._call()
+        created_at = datetime.utcnow()
+        self.rooms[name] = {
+            "name": name,
+            "num_participants": 0,
+            "creation_time": created_at.isoformat(),
+            "metadata": json.loads(metadata) if metadata else {},
+        }
+        return {"name": name, "created_at": created_at, "max_participants": kwargs.get("max_participants", 10)}
+
+    async def update_room_metadata(self, room_name: str, metadata: Dict[str, Any]) -> bool:
+        await self._call()
+        room = self.rooms.get(room_name)
+        if room is None:
+            return False
+        room["metadata"].update(metadata)
+        return True
+
+    async def get_warm_worker(self) -> Optional[str]:
+        return None
+
+    async def return_worker_to_pool(self, worker_id: Optional[str]) -> None:
+        return None
+
+
+class _FakeDispatchService:
+    def __init__(self, manager: FakeLiveKitManager, worker: SimulatedTextWorker):
+        self.manager = manager
+        self.worker = worker
+
+    async def create_dispatch(self, request: Any) -> Any:
+        await self.manager._call()
+        job_metadata = json.loads(request.metadata or "{}")
+        task = asyncio.create_task(self.worker.run(request.room, job_metadata))
+        self.manager.worker_tasks.append(task)
+        return SimpleNamespace(id=f"AD_{uuid.uuid4().hex[:10]}")
+
+
+class FakeLiveKitAPI:
+    """Stands in for ``livekit.api.LiveKitAPI`` (only agent dispatch is used on this path)."""
+
+    manager: FakeLiveKitManager
+    worker: SimulatedTextWorker
+
+    def __init__(self, url: str = "", api_key: str = "", api_secret: str = "", **_kwargs: Any):
+        self.agent_dispatch = _FakeDispatchService(self.manager, self.worker)
+
+    async def aclose(self) -> None:
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Platform services
+# ---------------------------------------------------------------------------
+
+
+def bench_agent() -> Agent:
+    return Agent(
+        id=BENCH_AGENT_ID,
+        slug=BENCH_AGENT_SLUG,
+        name="Bench Agent",
+        client_id=BENCH_CLIENT_ID,
+        system_prompt="You are a helpful assistant used for latency benchmarks.",
+        voice_settings=VoiceSettings(
+            provider="livekit",
+            llm_provider="openai",
+            llm_model="gpt-4o-mini",
+            stt_provider="deepgram",
+            tts_provider="openai",
+        ),
+    )
+
+
+def bench_client() -> Client:
+    return Client(
+        id=BENCH_CLIENT_ID,
+        name="Bench Client",
+        settings=ClientSettings(
+            supabase=SupabaseConfig(url=BENCH_SUPABASE_URL, anon_key="anon", service_role_key="service"),
+            api_keys=APIKeys(openai_api_key="sk-bench"),
+            embedding=EmbeddingSettings(provider="siliconflow", document_model="bench-embed", conversation_model="bench-embed", dimension=1024),
+        ),
+        additional_settings={"embedding": {"provider": "siliconflow", "document_model": "bench-embed", "dimension": 1024}},
+    )
+
+
+class FakeAgentService:
+    def __init__(self, latencies: Latencies):
+        self.latencies = latencies
+
+    async def get_agent(self, client_id: Any, agent_slug: str) -> Optional[Agent]:
+        await asyncio.sleep(self.latencies.sample(self.latencies.tenant_db_ms))
+        return bench_agent() if agent_slug == BENCH_AGENT_SLUG else None
+
+    async def get_client_api_keys(self, client_id: Any) -> Dict[str, Any]:
+        await asyncio.sleep(self.latencies.sample(self.latencies.platform_db_ms))
+        return {"openai_api_key": "sk-bench"}
+
+
+class FakeClientService:
+    def __init__(self, latencies: Latencies):
+        self.latencies = latencies
+
+    async def get_client(self, client_id: str, *args: Any, **kwargs: Any) -> Optional[Client]:
+        await asyncio.sleep(self.latencies.sample(self.latencies.platform_db_ms))
+        return bench_client() if str(client_id) == BENCH_CLIENT_ID else None
+
+
+class FakeToolsService:
+    def __init__(self, latencies: Latencies, tool_count: int = 3):
+        self.latencies = latencies
+        self.tools = [
+            ToolOut(
+                id=str(uuid.uuid5(uuid.NAMESPACE_URL, f"bench-tool-{i}")),
+                name=f"Bench Tool {i}",
+                slug=f"bench_tool_{i}",
+                description="Benchmark tool",
+                type="n8n",
+                config={"webhook_url": f"https://bench.local/hook/{i}"},
+            )
+            for i in range(tool_count)
+        ]
+
+    async def list_agent_tools(self, client_id: str, agent_id: str) -> List[ToolOut]:
+        # Assignment lookup on the platform DB, then tool rows on platform + tenant DBs
+        await asyncio.sleep(self.latencies.sample(self.latencies.platform_db_ms))
+        await asyncio.sleep(self.latencies.sample(self.latencies.platform_db_ms))
+        await asyncio.sleep(self.latencies.sample(self.latencies.tenant_db_ms))
+        return list(self.tools)
+
+
+class FakeUsageTracking:
+    def __init__(self, latencies: Latencies):
+        self.latencies = latencies
+
+    async def initialize(self) -> None:
+        return None
+
+    async def increment_agent_text_usage(self, client_id: str, agent_id: str, count: int = 1) -> Tuple[bool, Any]:
+        await asyncio.sleep(self.latencies.sample(self.latencies.platform_db_ms))
+        return True, SimpleNamespace(used=1, limit=1000)
+
+
+# ---------------------------------------------------------------------------
+# Installation
+# ---------------------------------------------------------------------------
+
+
+class StandInEnvironment:
+    """Patches the stand-ins into the embed/trigger modules; use as a context manager."""
+
+    def __init__(self, latencies: Optional[Latencies] = None, tool_count: int = 3):
+        self.latencies = latencies or Latencies()
+        self.tenant_db = InMemorySupabase(self.latencies)
+        self.livekit = FakeLiveKitManager(self.latencies)
+        self.worker = SimulatedTextWorker(self.livekit, self.latencies, self.tenant_db)
+        self.tool_count = tool_count
+        self._patches: List[Tuple[Any, str, Any]] = []
+
+    def _patch(self, target: Any, name: str, value: Any) -> None:
+        self._patches.append((target, name, getattr(target, name)))
+        setattr(target, name, value)
+
+    def install(self) -> "StandInEnvironment":
+        import supabase as supabase_module
+        from livekit import api as livekit_api
+
+        from app.api import embed
+        from app.api.v1 import trigger
+        from app.integrations import livekit_client
+        from app.services.embed_services import EmbedServices
+
+        latencies = self.latencies
+        tenant_db = self.tenant_db
+
+        api_stub = type("BenchLiveKitAPI", (FakeLiveKitAPI,), {"manager": self.livekit, "worker": self.worker})
+
+        async def _get_client_supabase(client_id: str) -> InMemorySupabase:
+            return tenant_db
+
+        services = EmbedServices(
+            connection_manager=SimpleNamespace(get_client_db_client=lambda client_id: tenant_db),
+            agent_service=FakeAgentService(latencies),
+            client_service=FakeClientService(latencies),
+            tools_service=FakeToolsService(latencies, self.tool_count),
+        )
+        self._patch(embed, "get_embed_services", lambda: services)
+        self._patch(embed, "usage_tracking_service", FakeUsageTracking(latencies))
+        self._patch(livekit_client, "livekit_manager", self.livekit)
+        self._patch(
+            trigger,
+            "api",
+            SimpleNamespace(LiveKitAPI=api_stub, CreateAgentDispatchRequest=livekit_api.CreateAgentDispatchRequest),
+        )
+        self._patch(trigger.document_processor, "_get_client_supabase", _get_client_supabase)
+        self._patch(supabase_module, "create_client", lambda url, key, *args, **kwargs: tenant_db)
+        return self
+
+    def restore(self) -> None:
+        for target, name, original in reversed(self._patches):
+            setattr(target, name, original)
+        self._patches.clear()
+        for task in self.livekit.worker_tasks:
+            task.cancel()
+
+    def __enter__(self) -> "StandInEnvironment":
+        return self.install()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.restore()
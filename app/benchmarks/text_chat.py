@@ -0,0 +1,267 @@
+"""
+End-to-end latency benchmark for the embed text chat path.
+
+Drives ``POST /api/embed/text/stream`` through the real FastAPI route, trigger
+helpers and SSE generator with every network dependency replaced by the
+latency-modelled stand-ins in ``app.benchmarks.standins``. Per-stage timings
+come from the route's ``StageTimer`` (via a stage sink), so the report shows
+where a turn spends its time:
+
+    config_resolution  agent/client/API-key lookups
+    context_build      agent context for dispatch (dataset ids, settings)
+    tool_manifest      tool listing and prompt sections
+    dispatch           room creation + agent dispatch
+    quota              text usage metering
+    first_token        request start -> first streamed delta
+    response           dispatch -> final response from the worker
+    persist            storing the conversation turn
+    total              whole request
+
+Usage::
+
+    python -m app.benchmarks.text_chat --conversations 20 --messages 3 --concurrency 5
+    python -m app.benchmarks.text_chat --json --fail-above first_token=900 --fail-above total=2500
+
+``--fail-above`` exits non-zero when a stage's p95 exceeds its budget, so the
+benchmark can gate CI against latency regressions.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import sys
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from app.benchmarks.standins import BENCH_AGENT_SLUG, BENCH_CLIENT_ID, Latencies, StandInEnvironment
+from app.utils.stage_timer import add_stage_sink, remove_stage_sink
+
+logger = logging.getLogger(__name__)
+
+EVENT = "embed_text_stream"
+STAGE_ORDER = [
+    "config_resolution",
+    "context_build",
+    "tool_manifest",
+    "dispatch",
+    "quota",
+    "first_token",
+    "response",
+    "persist",
+    "total",
+]
+
+
+@dataclass
+class BenchmarkConfig:
+    conversations: int = 10
+    messages_per_conversation: int = 3
+    concurrency: int = 5
+    tool_count: int = 3
+    latencies: Latencies = field(default_factory=Latencies)
+    # The production poller checks room metadata every 150ms; keep it configurable
+    # so the poll interval itself can be benchmarked.
+    poll_interval: Optional[float] = None
+
+
+@dataclass
+class StageStats:
+    count: int
+    p50: float
+    p95: float
+    p99: float
+    max: float
+
+
+@dataclass
+class BenchmarkReport:
+    requests: int
+    errors: int
+    wall_seconds: float
+    stages: Dict[str, StageStats]
+    error_samples: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def format_table(self) -> str:
+        lines = [
+            f"requests={self.requests} errors={self.errors} wall={self.wall_seconds:.2f}s",
+            f"{'stage':<18}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}",
+        ]
+        for name, stats in self.stages.items():
+            lines.append(
+                f"{name:<18}{stats.count:>6}{stats.p50:>10.1f}{stats.p95:>10.1f}{stats.p99:>10.1f}{stats.max:>10.1f}"
+            )
+        for sample in self.error_samples:
+            lines.append(f"error: {sample}")
+        return "\n".join(lines)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples: List[Dict[str, float]]) -> Dict[str, StageStats]:
+    names = [name for name in STAGE_ORDER if any(name in s for s in samples)]
+    names += sorted({name for s in samples for name in s} - set(names))
+    summary: Dict[str, StageStats] = {}
+    for name in names:
+        values = [s[name] for s in samples if name in s]
+        summary[name] = StageStats(
+            count=len(values),
+            p50=round(percentile(values, 50), 2),
+            p95=round(percentile(values, 95), 2),
+            p99=round(percentile(values, 99), 2),
+            max=round(max(values), 2),
+        )
+    return summary
+
+
+def _stream_error(body: str) -> Optional[str]:
+    """Return the error carried by an SSE body, or None when the stream completed."""
+    done = False
+    for line in body.splitlines():
+        if not line.startswith("data: "):
+            continue
+        payload = json.loads(line[len("data: "):])
+        if payload.get("error"):
+            return str(payload["error"])
+        done = done or bool(payload.get("done"))
+    return None if done else "stream ended without a final response"
+
+
+async def run_benchmark(config: Optional[BenchmarkConfig] = None) -> BenchmarkReport:
+    """Run the configured conversations against the stand-ins and summarize stage timings."""
+    import httpx
+    from fastapi import FastAPI
+
+    from app.api import embed
+    from app.api.v1 import trigger
+
+    config = config or BenchmarkConfig()
+    samples: List[Dict[str, float]] = []
+    errors: List[str] = []
+
+    def sink(event: str, stages: Dict[str, float], details: Dict[str, Any]) -> None:
+        if event == EVENT:
+            samples.append(stages)
+
+    app = FastAPI()
+    app.include_router(embed.router)
+
+    original_poll = trigger.poll_for_text_response_streaming
+    if config.poll_interval is not None:
+        def poll(manager, room_name, **kwargs):
+            kwargs.setdefault("poll_interval", config.poll_interval)
+            return original_poll(manager, room_name, **kwargs)
+
+        trigger.poll_for_text_response_streaming = poll
+
+    semaphore = asyncio.Semaphore(max(1, config.concurrency))
+    add_stage_sink(sink)
+    started = time.perf_counter()
+    try:
+        with StandInEnvironment(config.latencies, tool_count=config.tool_count):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as http:
+
+                async def conversation() -> None:
+                    async with semaphore:
+                        conversation_id = str(uuid.uuid4())
+                        for turn in range(config.messages_per_conversation):
+                            form = {
+                                "client_id": BENCH_CLIENT_ID,
+                                "agent_slug": BENCH_AGENT_SLUG,
+                                "message": f"benchmark message {turn}",
+                                "conversation_id": conversation_id,
+                            }
+                            try:
+                                response = await http.post("/api/embed/text/stream", data=form)
+                                error = _stream_error(response.text)
+                            except Exception as exc:
+                                error = f"{type(exc).__name__}: {exc}"
+                            if error:
+                                errors.append(error)
+
+                await asyncio.gather(*(conversation() for _ in range(config.conversations)))
+    finally:
+        remove_stage_sink(sink)
+        trigger.poll_for_text_response_streaming = original_poll
+
+    return BenchmarkReport(
+        requests=config.conversations * config.messages_per_conversation,
+        errors=len(errors),
+        wall_seconds=round(time.perf_counter() - started, 3),
+        stages=summarize(samples),
+        error_samples=sorted(set(errors))[:5],
+    )
+
+
+def check_budgets(report: BenchmarkReport, budgets: Dict[str, float]) -> List[str]:
+    """Stages whose p95 exceeds its budget (ms), as human-readable violations."""
+    violations = []
+    for stage, budget in budgets.items():
+        stats = report.stages.get(stage)
+        if stats is None:
+            violations.append(f"{stage}: no samples")
+        elif stats.p95 > budget:
+            violations.append(f"{stage}: p95 {stats.p95:.1f}ms > {budget:.1f}ms")
+    return violations
+
+
+def _parse_budget(value: str) -> tuple:
+    stage, _, ms = value.partition("=")
+    if not stage or not ms:
+        raise argparse.ArgumentTypeError("expected STAGE=MS")
+    return stage, float(ms)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    defaults = Latencies()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--conversations", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=3, help="messages per conversation")
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--tools", type=int, default=3, help="tools assigned to the agent")
+    parser.add_argument("--poll-interval", type=float, default=None, help="override the metadata poll interval (s)")
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    parser.add_argument("--fail-above", type=_parse_budget, action="append", default=[], metavar="STAGE=MS")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    latencies = Latencies(**{name: getattr(args, name) for name in asdict(defaults)})
+    report = asyncio.run(
+        run_benchmark(
+            BenchmarkConfig(
+                conversations=args.conversations,
+                messages_per_conversation=args.messages,
+                concurrency=args.concurrency,
+                tool_count=args.tools,
+                latencies=latencies,
+                poll_interval=args.poll_interval,
+            )
+        )
+    )
+
+    print(json.dumps(report.to_dict(), indent=2) if args.json else report.format_table())
+    violations = check_budgets(report, dict(args.fail_above))
+    for violation in violations:
+        print(f"budget exceeded: {violation}", file=sys.stderr)
+    return 1 if violations or report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
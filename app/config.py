@@ -112,6 +112,10 @@ class Settings(BaseSettings):
     telegram_verification_bot_token: Optional[str] = Field(default=None, description="Token for verification bot")
     telegram_verification_bot_username: Optional[str] = Field(default=None, description="Username (without @) for verification bot")
 
+    # AssemblyAI completion webhooks for Lingua (polling is used when the secret is unset)
+    assemblyai_webhook_secret: Optional[str] = Field(default=None, description="Signs per-run AssemblyAI callback tokens")
+    assemblyai_webhook_base_url: Optional[str] = Field(default=None, description="Public base URL for AssemblyAI callbacks (defaults to https://<domain_name>)")
+
     # Perplexity MCP container configuration
     perplexity_mcp_image: str = Field(default="perplexity-mcp:latest")
     perplexity_mcp_container_name: str = Field(default="perplexity-mcp")
@@ -34,6 +34,8 @@ async def lifespan(app: FastAPI):
 
     worker = None
     worker_task = None
+    media_worker = None
+    media_worker_task = None
 
     try:
         # Startup
@@ -84,6 +86,14 @@ async def lifespan(app: FastAPI):
 
         wordpress_sites_api.wordpress_service = wordpress_site_service
 
+        # Shared services for the public embed endpoints
+        try:
+            from app.services.embed_services import get_embed_services
+
+            get_embed_services()
+        except Exception as e:
+            logger.warning(f"Embed services will initialize on first use: {e}")
+
         logger.info("All services initialized successfully")
 
         # Verify platform has valid LiveKit credentials
@@ -109,12 +119,28 @@ async def lifespan(app: FastAPI):
         except RuntimeError as e:
             logger.warning(f"Provisioning worker disabled: {e}")
 
+        # Execute Lingua / Content Catalyst / Image Catalyst runs in this process
+        # unless dedicated media run workers handle them
+        from app.services.media_run_worker import build_media_run_worker, in_process_workers_enabled
+        from app.services.media_runs import set_local_media_run_worker
+
+        if in_process_workers_enabled():
+            media_worker = build_media_run_worker()
+            set_local_media_run_worker(media_worker)
+            media_worker_task = asyncio.create_task(media_worker.run())
+            logger.info("Media run worker task started")
+
         yield
     finally:
         if worker:
             worker.stop()
         if worker_task:
             await worker_task
+        if media_worker:
+            media_worker.stop()
+            set_local_media_run_worker(None)
+        if media_worker_task:
+            await media_worker_task
 
         # Shutdown
         logger.info("Shutting down Autonomite SaaS Backend")
@@ -255,13 +281,14 @@ async def auth_exception_handler(request: Request, exc):
         )
 
 # Include webhook routers
-from app.api.webhooks import livekit_router, supabase_router
+from app.api.webhooks import assemblyai_router, livekit_router, supabase_router
 from app.api.webhooks.telegram import router as telegram_router
 from app.api.embed import router as embed_router
 
 app.include_router(livekit_router, prefix="/webhooks", tags=["webhooks"])
 app.include_router(supabase_router, prefix="/webhooks", tags=["webhooks"])
 app.include_router(telegram_router, prefix="/webhooks", tags=["webhooks"])
+app.include_router(assemblyai_router, prefix="/webhooks", tags=["webhooks"])
 app.include_router(embed_router)
 
 # Lightweight debug endpoint to verify resolved LiveKit configuration quickly
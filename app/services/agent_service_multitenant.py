@@ -12,6 +12,7 @@ import json
 
 from app.models.agent import Agent, AgentCreate, AgentUpdate, VoiceSettings, WebhookSettings
 from app.services.client_connection_manager import get_connection_manager, ClientConfigurationError
+from app.services.embed_config_cache import invalidate_embed_config
 
 logger = logging.getLogger(__name__)
 
@@ -195,6 +196,7 @@ class AgentService:
             
             if result.data:
                 logger.info(f"Created agent {agent_data.slug} for client {client_id}")
+                await invalidate_embed_config(client_id)
                 return self._parse_agent_data(result.data[0], str(client_id))
             
             return None
@@ -238,6 +240,7 @@ class AgentService:
             
             if result.data:
                 logger.info(f"Updated agent {agent_slug} for client {client_id}")
+                await invalidate_embed_config(client_id)
                 return self._parse_agent_data(result.data[0], str(client_id))
             
             return None
@@ -260,6 +263,7 @@ class AgentService:
             
             if result.data:
                 logger.info(f"Deleted agent {agent_slug} for client {client_id}")
+                await invalidate_embed_config(client_id)
                 return True
             
             return False
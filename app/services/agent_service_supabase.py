@@ -10,6 +10,7 @@ import json
 from app.models.agent import Agent, AgentCreate, AgentUpdate, VoiceSettings, WebhookSettings
 from app.models.client import ChannelSettings, TelegramChannelSettings
 from app.services.client_service_supabase import ClientService
+from app.services.embed_config_cache import invalidate_embed_config
 
 logger = logging.getLogger(__name__)
 
@@ -339,6 +340,7 @@ class AgentService:
                 created_agent_data = result.data[0]
                 # Ensure client_id is set for parsing
                 created_agent_data["client_id"] = client_id
+                await invalidate_embed_config(client_id)
                 return self._parse_agent_data(created_agent_data, client_id)
             
             logger.error(f"Agent creation returned no data for client {client_id}")
@@ -495,6 +497,7 @@ class AgentService:
 
                 if result.data:
                     agent_data = result.data[0]
+                    await invalidate_embed_config(client_id)
                     return self._parse_agent_data(agent_data, client_id)
 
                 # Fallback: if update returned no rows (e.g., RLS prevents returning), try fetching the row
@@ -511,6 +514,7 @@ class AgentService:
                     refetch = refetch_q.execute()
                     if refetch.data:
                         agent_data = refetch.data[0]
+                        await invalidate_embed_config(client_id)
                         return self._parse_agent_data(agent_data, client_id)
                 except Exception as _:
                     pass
@@ -531,6 +535,7 @@ class AgentService:
         
         try:
             result = client_supabase.table("agents").delete().eq("slug", agent_slug).execute()
+            await invalidate_embed_config(client_id)
             return len(result.data) > 0 if result.data else False
             
         except Exception as e:
@@ -24,6 +24,26 @@ class AIProcessor:
         }
         self.http_client = httpx.AsyncClient(timeout=30.0)
     
+    def resolve_embedding_config(
+        self,
+        context: str = 'document',
+        client_settings: Optional[Dict] = None
+    ) -> Dict[str, Any]:
+        """Resolve the provider, model and dimension used for a given embedding context"""
+        if client_settings:
+            embedding_config = client_settings.get('embedding', {})
+            provider = embedding_config.get('provider', 'openai')
+            if context == 'document':
+                model = embedding_config.get('document_model', 'text-embedding-3-small')
+            else:
+                model = embedding_config.get('conversation_model', 'text-embedding-3-small')
+            dimension = embedding_config.get('dimension', None)
+        else:
+            provider = 'openai'
+            model = self.default_embedding_models.get(context, 'text-embedding-3-small')
+            dimension = None
+        return {'provider': provider, 'model': model, 'dimension': dimension}
+
     async def generate_embeddings(
         self, 
         text: str, 
@@ -35,21 +55,11 @@ class AIProcessor:
             if not text or not text.strip():
                 return None
             
-            # Get embedding configuration from client settings
-            if client_settings:
-                embedding_config = client_settings.get('embedding', {})
-                provider = embedding_config.get('provider', 'openai')
-                if context == 'document':
-                    model = embedding_config.get('document_model', 'text-embedding-3-small')
-                else:
-                    model = embedding_config.get('conversation_model', 'text-embedding-3-small')
-                dimension = embedding_config.get('dimension', None)
-                api_keys = client_settings.get('api_keys', {})
-            else:
-                provider = 'openai'
-                model = self.default_embedding_models.get(context, 'text-embedding-3-small')
-                dimension = None
-                api_keys = {}
+            embedding_config = self.resolve_embedding_config(context, client_settings)
+            provider = embedding_config['provider']
+            model = embedding_config['model']
+            dimension = embedding_config['dimension']
+            api_keys = client_settings.get('api_keys', {}) if client_settings else {}
             
             logger.info(f"Generating embeddings with provider={provider}, model={model}, context={context}")
             
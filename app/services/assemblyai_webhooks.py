@@ -0,0 +1,45 @@
+"""
+AssemblyAI Completion Webhooks
+
+Per-run callback URLs and auth tokens for AssemblyAI transcripts submitted by
+Lingua runs. Enabled when ``ASSEMBLYAI_WEBHOOK_SECRET`` is configured;
+otherwise runs fall back to polling.
+
+- The callback URL names the run, so the webhook can resume it directly.
+- AssemblyAI echoes the token in ``WEBHOOK_AUTH_HEADER``; it is an HMAC of the
+  run id, so a leaked token only ever resumes its own run.
+"""
+import hashlib
+import hmac
+import logging
+from typing import Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_AUTH_HEADER = "X-Sidekick-Webhook-Token"
+WEBHOOK_PATH = "/webhooks/assemblyai/transcripts"
+
+
+def webhooks_enabled() -> bool:
+    return bool(settings.assemblyai_webhook_secret)
+
+
+def webhook_token(run_id: str) -> str:
+    secret = (settings.assemblyai_webhook_secret or "").encode("utf-8")
+    return hmac.new(secret, run_id.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def verify_webhook_token(run_id: str, token: Optional[str]) -> bool:
+    if not webhooks_enabled() or not token:
+        return False
+    return hmac.compare_digest(token, webhook_token(run_id))
+
+
+def webhook_for_run(run_id: str) -> Optional[Tuple[str, Tuple[str, str]]]:
+    """``(callback_url, (auth_header, token))`` for a run, or None when webhooks are disabled."""
+    if not webhooks_enabled():
+        return None
+    base_url = (settings.assemblyai_webhook_base_url or f"https://{settings.domain_name}").rstrip("/")
+    return f"{base_url}{WEBHOOK_PATH}/{run_id}", (WEBHOOK_AUTH_HEADER, webhook_token(run_id))
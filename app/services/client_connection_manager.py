@@ -8,7 +8,7 @@ their own Supabase project.
 import os
 import logging
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from uuid import UUID
 from supabase import create_client, Client
 from functools import lru_cache
@@ -47,6 +47,8 @@ class ClientConnectionManager:
         
         # Cache for client configurations to reduce database queries
         self._client_cache: Dict[str, Dict[str, Any]] = {}
+        # Tenant clients keyed by client_id, reused while the credentials are unchanged
+        self._db_clients: Dict[str, Tuple[Tuple[str, str], Client]] = {}
     
     def get_client_db_client(self, client_id: UUID) -> Client:
         """
@@ -87,11 +89,13 @@ class ClientConnectionManager:
                 f"Please configure Supabase URL and service role key for this client."
             )
         
-        # Create and return client connection
-        return create_client(
-            client_config['supabase_url'],
-            client_config['supabase_service_role_key']
-        )
+        # Reuse the tenant's client (and its HTTP connection pool) until its credentials change
+        credentials = (client_config['supabase_url'], client_config['supabase_service_role_key'])
+        pooled = self._db_clients.get(client_id_str)
+        if pooled is None or pooled[0] != credentials:
+            pooled = (credentials, create_client(*credentials))
+            self._db_clients[client_id_str] = pooled
+        return pooled[1]
     
     def _load_client_config(self, client_id: UUID) -> None:
         """
@@ -260,9 +264,11 @@ class ClientConnectionManager:
         """
         if client_id:
             self._client_cache.pop(str(client_id), None)
+            self._db_clients.pop(str(client_id), None)
             logger.info(f"Cleared cache for client {client_id}")
         else:
             self._client_cache.clear()
+            self._db_clients.clear()
             logger.info("Cleared entire client cache")
 
 
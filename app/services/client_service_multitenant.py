@@ -11,6 +11,8 @@ import json
 
 from app.models.platform_client import PlatformClient as Client, PlatformClientCreate as ClientCreate, PlatformClientUpdate as ClientUpdate, APIKeys, PlatformClientSettings
 from app.services.client_connection_manager import get_connection_manager, ClientConfigurationError
+from app.services.credential_cache import invalidate_client_credentials
+from app.services.embed_config_cache import invalidate_embed_config
 
 logger = logging.getLogger(__name__)
 
@@ -245,6 +247,7 @@ class ClientService:
                             },
                             on_conflict="client_id,job_type",
                         ).execute()
+                        await self._notify_provisioning_queue(client_id, "supabase_project")
                     except Exception as job_error:
                         logger.error(
                             f"Error queueing provisioning job for client {client_id}: {job_error}"
@@ -334,6 +337,8 @@ class ClientService:
             
             if result.data:
                 logger.info(f"Updated client {client_id}")
+                await invalidate_embed_config(client_id)
+                invalidate_client_credentials(client_id)
                 # Clear cache for updated client
                 self.connection_manager.clear_cache(UUID(client_id))
                 return self._parse_client_data(result.data[0])
@@ -351,6 +356,7 @@ class ClientService:
             
             if result.data:
                 logger.info(f"Deleted client {client_id}")
+                await invalidate_embed_config(client_id)
                 # Clear cache for deleted client
                 self.connection_manager.clear_cache(UUID(client_id))
                 return True
@@ -361,6 +367,20 @@ class ClientService:
             logger.error(f"Error deleting client {client_id}: {e}")
             return False
 
+    async def _notify_provisioning_queue(self, client_id: str, job_type: str) -> None:
+        """Wake provisioning workers on transports without the table trigger (no-op when polling)."""
+        try:
+            from app.services.job_queue import publish_job_notification
+            from app.services.onboarding.provisioning_worker import PROVISIONING_JOBS_CHANNEL
+
+            await publish_job_notification(
+                PROVISIONING_JOBS_CHANNEL,
+                {"client_id": client_id, "job_type": job_type},
+                database_triggered=True,
+            )
+        except Exception as e:
+            logger.debug(f"Provisioning queue notification skipped: {e}")
+
     async def retry_provisioning(self, client_id: str) -> bool:
         """Reset provisioning state and enqueue a fresh provisioning job."""
         try:
@@ -384,6 +404,7 @@ class ClientService:
                 "claimed_at": None,
                 "last_error": None,
             }, on_conflict="client_id,job_type").execute()
+            await self._notify_provisioning_queue(client_id, "supabase_project")
 
             self.connection_manager.clear_cache(UUID(client_id))
             logger.info(f"Re-queued provisioning for client {client_id}")
@@ -15,6 +15,8 @@ import httpx
 
 from app.models.client import Client, ClientCreate, ClientUpdate, ClientInDB, APIKeys, ClientSettings
 from app.config import settings
+from app.services.credential_cache import invalidate_client_credentials
+from app.services.embed_config_cache import invalidate_embed_config
 
 
 class ClientService:
@@ -299,6 +301,8 @@ class ClientService:
             result = self.supabase.table(self.table_name).update(update_dict).eq("id", client_id).execute()
             
             if result.data:
+                await invalidate_embed_config(client_id)
+                invalidate_client_credentials(client_id)
                 return self._db_to_model(result.data[0])
             else:
                 raise HTTPException(status_code=500, detail="Failed to update client")
@@ -308,6 +312,7 @@ class ClientService:
     async def delete_client(self, client_id: str) -> bool:
         """Delete a client"""
         result = self.supabase.table(self.table_name).delete().eq("id", client_id).execute()
+        await invalidate_embed_config(client_id)
         
         return len(result.data) > 0 if result.data else False
     
@@ -12,6 +12,7 @@ import httpx
 
 logger = logging.getLogger(__name__)
 
+from app.services.credential_cache import invalidate_client_credentials
 from app.models.client import Client, ClientCreate, ClientUpdate, ClientInDB, APIKeys, ClientSettings
 
 
@@ -122,6 +123,7 @@ class ClientService:
                 
                 if result.data and len(result.data) > 0:
                     logger.info(f"Successfully updated client {client_id} in Supabase")
+                    invalidate_client_credentials(client_id)
                     return self._db_to_model(result.data[0])
                 else:
                     logger.error(f"No data returned from Supabase update for client {client_id}")
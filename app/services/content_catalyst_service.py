@@ -896,22 +896,22 @@ class ContentCatalystService:
         )
 
     async def _scrape_url(self, url: str) -> Optional[Dict[str, Any]]:
-        """Scrape a URL using Firecrawl"""
-        if not self.firecrawl_api_key:
-            logger.warning("No Firecrawl API key configured")
-            return None
+        """Scrape a URL using the shared, cached web scraper engine"""
+        from app.services.web_scraper import ScrapeError, web_scraper
 
-        try:
-            from app.services.firecrawl_scraper import FirecrawlScraper
-            scraper = FirecrawlScraper(self.firecrawl_api_key)
-            result = await scraper.scrape_url(url)
-            await scraper.close()
+        if not url.startswith(("http://", "https://")):
+            url = f"https://{url}"
 
+        try:
+            page = await web_scraper.scrape(url)
             return {
-                "url": result.get("url", url),
-                "title": result.get("metadata", {}).get("title", ""),
-                "content": result.get("markdown", ""),
+                "url": page.source_url,
+                "title": page.title,
+                "content": page.markdown,
             }
+        except ScrapeError as e:
+            logger.warning(f"URL scraping failed: {e}")
+            return None
         except Exception as e:
             logger.error(f"URL scraping failed: {e}")
             return None
@@ -0,0 +1,296 @@
+"""
+Conversation State Store
+
+Keeps a bounded, token-budgeted rolling window of recent messages per
+conversation so text-mode dispatches don't re-query ``conversation_transcripts``
+on every message.
+
+- Redis-backed when ``REDIS_URL`` (or ``REDIS_HOST``) is configured, so the
+  FastAPI layer (which persists turns) and agent workers (which read history)
+  share one window; in-memory LRU otherwise.
+- Windows are hydrated from the database only on a miss, then appended to as
+  turns are stored (append-only-if-present, so a partial window is never
+  created).
+- Writers that bypass ``store_turn`` (streamed voice transcripts, widget
+  rows) call ``invalidate_conversation_state`` instead of appending, and voice
+  sessions start from a fresh window, so the next read re-hydrates.
+
+No dependency on ``app.config`` so the agent container can import it.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.utils.redis_url import redis_url_from_env
+
+logger = logging.getLogger(__name__)
+
+# Append to an existing window only (RPUSHX), trim to max_messages while keeping
+# the seed sentinel at index 0, refresh the TTL and return the pushed length.
+_APPEND_SCRIPT = """
+local key = KEYS[1]
+local max_messages = tonumber(ARGV[1])
+local ttl = tonumber(ARGV[2])
+local n = redis.call('RPUSHX', key, unpack(ARGV, 3))
+if n == 0 then
+  return 0
+end
+local overflow = n - (max_messages + 1)
+if overflow > 0 then
+  local sentinel = redis.call('LINDEX', key, 0)
+  redis.call('LTRIM', key, overflow + 1, -1)
+  redis.call('LPUSH', key, sentinel)
+end
+redis.call('EXPIRE', key, ttl)
+return n
+"""
+
+HistoryLoader = Callable[[], Awaitable[List[Dict[str, str]]]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 chars/token) used for window budgeting."""
+    return len(text or "") // 4 + 4
+
+
+class ConversationStateStore:
+    """
+    Rolling per-conversation message window.
+
+    Args:
+        redis_url: Redis URL; None keeps state in process memory only
+        max_messages: Hard cap on messages kept per conversation
+        token_budget: Approximate token budget for the returned window
+        ttl_seconds: Idle expiry for a conversation's window
+        local_capacity: Max conversations kept by the in-memory backend
+    """
+
+    KEY_PREFIX = "conv_state"
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        max_messages: int = 50,
+        token_budget: int = 6000,
+        ttl_seconds: int = 6 * 3600,
+        local_capacity: int = 512,
+    ):
+        self.max_messages = max_messages
+        self.token_budget = token_budget
+        self.ttl_seconds = ttl_seconds
+        self.local_capacity = local_capacity
+
+        self._redis = None
+        if redis_url:
+            try:
+                import redis.asyncio as aioredis
+
+                self._redis = aioredis.from_url(redis_url, decode_responses=True)
+            except Exception as e:
+                logger.warning(f"Conversation state Redis unavailable, using memory: {e}")
+
+        # conversation_id -> {"messages": [...], "expires_at": float}
+        self._local: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._hydrating: Dict[str, asyncio.Future] = {}
+
+    @property
+    def is_shared(self) -> bool:
+        """True when the window is shared across processes (Redis).
+
+        In-memory windows are only visible to the process that seeded them, so
+        that process must append its own turns.
+        """
+        return self._redis is not None
+
+    # ------------------------------------------------------------------
+    # Keys / windowing helpers
+    # ------------------------------------------------------------------
+
+    def _messages_key(self, conversation_id: str) -> str:
+        return f"{self.KEY_PREFIX}:{conversation_id}:messages"
+
+    def _apply_budget(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Keep the newest messages that fit the token budget."""
+        kept: List[Dict[str, str]] = []
+        used = 0
+        for msg in reversed(messages[-self.max_messages:]):
+            cost = estimate_tokens(msg.get("content", ""))
+            if kept and used + cost > self.token_budget:
+                break
+            kept.append(msg)
+            used += cost
+        kept.reverse()
+        return kept
+
+    # ------------------------------------------------------------------
+    # Backend primitives
+    # ------------------------------------------------------------------
+
+    async def _read(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        if self._redis is not None:
+            pipe = self._redis.pipeline()
+            pipe.exists(self._messages_key(conversation_id))
+            pipe.lrange(self._messages_key(conversation_id), 0, -1)
+            exists, raw_messages = await pipe.execute()
+            if not exists:
+                return None
+            messages = [json.loads(item) for item in raw_messages if item]
+            return {"messages": [m for m in messages if m.get("role") != "_seed"]}
+
+        entry = self._local.get(conversation_id)
+        if entry is None:
+            return None
+        if entry["expires_at"] < time.monotonic():
+            self._local.pop(conversation_id, None)
+            return None
+        self._local.move_to_end(conversation_id)
+        return entry
+
+    async def _seed(self, conversation_id: str, messages: List[Dict[str, str]]) -> None:
+        messages = messages[-self.max_messages:]
+        if self._redis is not None:
+            key = self._messages_key(conversation_id)
+            pipe = self._redis.pipeline()
+            pipe.delete(key)
+            # A sentinel keeps the key present for empty conversations so RPUSHX appends work
+            pipe.rpush(key, json.dumps({"role": "_seed", "content": ""}), *[json.dumps(m) for m in messages])
+            pipe.expire(key, self.ttl_seconds)
+            await pipe.execute()
+            return
+
+        self._local[conversation_id] = {
+            "messages": list(messages),
+            "expires_at": time.monotonic() + self.ttl_seconds,
+        }
+        self._local.move_to_end(conversation_id)
+        while len(self._local) > self.local_capacity:
+            self._local.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def get_history(
+        self,
+        conversation_id: str,
+        loader: HistoryLoader,
+    ) -> List[Dict[str, str]]:
+        """
+        Return the rolling window for ``conversation_id``.
+
+        ``loader`` is awaited only on a miss (or on backend failure) and must
+        return the most recent messages in chronological order.
+        """
+        if not conversation_id:
+            return []
+
+        try:
+            state = await self._read(conversation_id)
+            if state is not None:
+                logger.info(
+                    f"📜 Conversation state hit for {conversation_id}: {len(state['messages'])} messages"
+                )
+                return self._apply_budget(state["messages"])
+        except Exception as e:
+            logger.warning(f"Conversation state read failed, loading from database: {e}")
+            return self._apply_budget(await loader())
+
+        # Coalesce concurrent hydrations of the same conversation
+        pending = self._hydrating.get(conversation_id)
+        if pending is not None:
+            return self._apply_budget(await asyncio.shield(pending))
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._hydrating[conversation_id] = future
+        try:
+            messages = await loader()
+            future.set_result(messages)
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            self._hydrating.pop(conversation_id, None)
+
+        try:
+            await self._seed(conversation_id, messages)
+        except Exception as e:
+            logger.warning(f"Conversation state seed failed: {e}")
+        return self._apply_budget(messages)
+
+    async def append_messages(self, conversation_id: str, messages: List[Dict[str, str]]) -> None:
+        """Append messages to an existing window (no-op if the window isn't loaded)."""
+        messages = [
+            {"role": m["role"], "content": m["content"]}
+            for m in messages
+            if m.get("role") in ("user", "assistant") and m.get("content")
+        ]
+        if not conversation_id or not messages:
+            return
+
+        try:
+            if self._redis is not None:
+                await self._redis.eval(
+                    _APPEND_SCRIPT,
+                    1,
+                    self._messages_key(conversation_id),
+                    self.max_messages,
+                    self.ttl_seconds,
+                    *[json.dumps(m) for m in messages],
+                )
+            else:
+                entry = self._local.get(conversation_id)
+                if entry is None:
+                    return
+                entry["messages"].extend(messages)
+                del entry["messages"][:-self.max_messages]
+                entry["expires_at"] = time.monotonic() + self.ttl_seconds
+        except Exception as e:
+            logger.warning(f"Conversation state append failed; invalidating {conversation_id}: {e}")
+            await self.invalidate(conversation_id)
+
+    async def append_turn(self, conversation_id: str, user_text: str, assistant_text: str) -> None:
+        """Append a stored user/assistant turn."""
+        await self.append_messages(
+            conversation_id,
+            [{"role": "user", "content": user_text}, {"role": "assistant", "content": assistant_text}],
+        )
+
+    async def invalidate(self, conversation_id: str) -> None:
+        """Drop a conversation's window; the next read re-hydrates from the database."""
+        self._local.pop(conversation_id, None)
+        if self._redis is not None:
+            try:
+                await self._redis.delete(self._messages_key(conversation_id))
+            except Exception as e:
+                logger.debug(f"Conversation state invalidate failed: {e}")
+
+
+_store: Optional[ConversationStateStore] = None
+
+
+def get_conversation_state_store() -> ConversationStateStore:
+    """Get or create the process-wide conversation state store."""
+    global _store
+    if _store is None:
+        backend = (os.getenv("CONVERSATION_STATE_BACKEND") or "").strip().lower()
+        _store = ConversationStateStore(
+            redis_url=None if backend == "memory" else redis_url_from_env("CONVERSATION_STATE_REDIS_URL"),
+            max_messages=int(os.getenv("CONVERSATION_STATE_MAX_MESSAGES", "50")),
+            token_budget=int(os.getenv("CONVERSATION_STATE_TOKEN_BUDGET", "6000")),
+        )
+    return _store
+
+
+async def invalidate_conversation_state(conversation_id: Optional[str]) -> None:
+    """Drop a conversation's window after a write that did not go through ``store_turn``."""
+    if not conversation_id:
+        return
+    try:
+        await get_conversation_state_store().invalidate(conversation_id)
+    except Exception as e:
+        logger.warning(f"Conversation state invalidation failed for {conversation_id}: {e}")
@@ -0,0 +1,205 @@
+"""
+Credential Cache
+
+Process-wide, in-memory TTL cache for tenant API keys so job startup doesn't
+pay a platform-database round trip (or a fresh Supabase client) per dispatch.
+
+- Values live in process memory only; nothing secret is written to Redis.
+- Single-flight refresh: concurrent misses for the same key share one load
+  (threads via a per-key lock, asyncio callers via a shared future).
+- Empty/failed loads are never cached; an expired value is served for a short
+  grace window when a refresh comes back empty (stale-if-error).
+- ``invalidate(scope)`` drops a client's entries locally and, when Redis is
+  configured, bumps a per-scope generation counter so other processes (agent
+  workers) reload on their next lookup.
+
+No dependency on ``app.config`` so the agent container can import it.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.utils.redis_url import redis_url_from_env
+
+logger = logging.getLogger(__name__)
+
+PLATFORM_SCOPE = "platform"
+
+
+@dataclass
+class _Entry:
+    value: Any
+    expires_at: float
+    generation: Optional[str]
+
+
+class CredentialCache:
+    """
+    TTL cache keyed by (scope, name); scope is a client_id or ``PLATFORM_SCOPE``.
+
+    Args:
+        ttl_seconds: Freshness window for cached credentials
+        stale_grace_seconds: How long past expiry a value may be served when a refresh fails
+        redis_url: Optional Redis URL used only for cross-process invalidation counters
+    """
+
+    GENERATION_PREFIX = "credential_cache:gen"
+
+    def __init__(
+        self,
+        ttl_seconds: float = 300.0,
+        stale_grace_seconds: float = 600.0,
+        redis_url: Optional[str] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.stale_grace_seconds = stale_grace_seconds
+        self._entries: Dict[Tuple[str, str], _Entry] = {}
+        self._guard = threading.Lock()
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+        self._redis = None
+        if redis_url:
+            try:
+                import redis
+
+                self._redis = redis.Redis.from_url(
+                    redis_url, decode_responses=True, socket_timeout=0.25, socket_connect_timeout=0.25
+                )
+            except Exception as e:
+                logger.warning(f"Credential cache invalidation bus unavailable: {e}")
+
+    # ------------------------------------------------------------------
+    # Generation counters (cross-process invalidation)
+    # ------------------------------------------------------------------
+
+    def _generation(self, scope: str) -> Optional[str]:
+        if self._redis is None:
+            return None
+        try:
+            return self._redis.get(f"{self.GENERATION_PREFIX}:{scope}") or "0"
+        except Exception as e:
+            logger.debug(f"Credential cache generation lookup failed: {e}")
+            return None
+
+    def _fresh(self, entry: Optional[_Entry], generation: Optional[str]) -> bool:
+        if entry is None or entry.expires_at < time.monotonic():
+            return False
+        return generation is None or entry.generation is None or entry.generation == generation
+
+    def _store(self, key: Tuple[str, str], value: Any, generation: Optional[str]) -> None:
+        with self._guard:
+            self._entries[key] = _Entry(value, time.monotonic() + self.ttl_seconds, generation)
+
+    def _stale(self, key: Tuple[str, str]) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry.expires_at < self.stale_grace_seconds:
+            return entry.value
+        return None
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def get(self, scope: str, name: str, loader: Callable[[], Any]) -> Any:
+        """Return the cached value or call ``loader()`` once (blocking callers)."""
+        key = (str(scope), name)
+        generation = self._generation(key[0])
+        if self._fresh(self._entries.get(key), generation):
+            return self._entries[key].value
+
+        with self._guard:
+            lock = self._key_locks.setdefault(key, threading.Lock())
+        with lock:
+            # Another thread may have refreshed while we waited
+            if self._fresh(self._entries.get(key), generation):
+                return self._entries[key].value
+            value = loader()
+            if value:
+                self._store(key, value, generation)
+                return value
+            stale = self._stale(key)
+            if stale is not None:
+                logger.warning(f"Credential refresh for {key[0]}/{name} came back empty; serving cached value")
+                return stale
+            return value
+
+    async def aget(self, scope: str, name: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Async variant of ``get``; concurrent misses await a single ``loader()``."""
+        key = (str(scope), name)
+        generation = await asyncio.to_thread(self._generation, key[0]) if self._redis is not None else None
+        if self._fresh(self._entries.get(key), generation):
+            return self._entries[key].value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+            if value:
+                self._store(key, value, generation)
+            else:
+                stale = self._stale(key)
+                if stale is not None:
+                    logger.warning(f"Credential refresh for {key[0]}/{name} came back empty; serving cached value")
+                    value = stale
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            stale = self._stale(key)
+            if stale is not None:
+                logger.warning(f"Credential refresh for {key[0]}/{name} failed ({e}); serving cached value")
+                return stale
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    def invalidate(self, scope: Optional[str] = None) -> None:
+        """Drop a scope's entries (all entries when ``scope`` is None) here and in other processes."""
+        with self._guard:
+            if scope is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == str(scope)]:
+                    self._entries.pop(key, None)
+        if self._redis is not None and scope is not None:
+            try:
+                self._redis.incr(f"{self.GENERATION_PREFIX}:{scope}")
+            except Exception as e:
+                logger.warning(f"Credential cache invalidation broadcast failed for {scope}: {e}")
+
+
+_cache: Optional[CredentialCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_credential_cache() -> CredentialCache:
+    """Get or create the process-wide credential cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CredentialCache(
+                    ttl_seconds=float(os.getenv("CREDENTIAL_CACHE_TTL_SECONDS", "300")),
+                    stale_grace_seconds=float(os.getenv("CREDENTIAL_CACHE_STALE_GRACE_SECONDS", "600")),
+                    redis_url=redis_url_from_env("CREDENTIAL_CACHE_REDIS_URL"),
+                )
+    return _cache
+
+
+def invalidate_client_credentials(client_id: str) -> None:
+    """Invalidate cached credentials after a client's keys or key mode change."""
+    get_credential_cache().invalidate(str(client_id))
@@ -0,0 +1,170 @@
+"""
+Dispatch Config Store
+
+Content-addressed store for the heavy part of agent dispatch config (system
+prompt, tool definitions, tools_config, embedding settings, ...), so LiveKit
+job metadata only carries a small signed reference.
+
+- ``put`` hashes the canonical JSON of a config and the hash is its version:
+  identical configs (the common case across conversations of one agent) share
+  one entry, entries never change, and workers can cache them indefinitely.
+- References are HMAC-signed with ``DISPATCH_CONFIG_SECRET`` (falling back to
+  ``LIVEKIT_API_SECRET``, which both the API and workers hold) and expire, so a
+  worker only loads config the platform dispatched.
+- Secrets (``SECRET_CONFIG_FIELDS``: provider API keys, the tenant service
+  role key) are never stored; as with the credential cache, nothing secret is
+  written to Redis. They stay in the job metadata itself, as before.
+- Redis-backed when ``DISPATCH_CONFIG_BACKEND=redis``; ``memory`` keeps entries
+  in process (API and worker in one process, e.g. tests). Disabled when unset,
+  in which case dispatch sends the full config inline as before.
+
+No dependency on ``app.config`` so the agent container can import it.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.utils.redis_url import redis_url_from_env
+
+logger = logging.getLogger(__name__)
+
+# Dispatch fields that are never written to the store
+SECRET_CONFIG_FIELDS = ("api_keys", "supabase_service_role_key")
+
+
+class DispatchConfigError(ValueError):
+    """A config reference could not be verified or resolved."""
+
+
+class DispatchConfigStore:
+    """
+    Versioned dispatch config entries with a local LRU cache.
+
+    Args:
+        secret: HMAC key for references
+        redis_url: Redis URL; None keeps entries in process memory only
+        ttl_seconds: Lifetime of stored entries (refreshed when re-put)
+        ref_ttl_seconds: Lifetime of a signed reference
+        local_capacity: Entries kept in the local cache
+    """
+
+    KEY_PREFIX = "dispatch_config"
+
+    def __init__(
+        self,
+        secret: str,
+        redis_url: Optional[str] = None,
+        ttl_seconds: int = 24 * 3600,
+        ref_ttl_seconds: int = 3600,
+        local_capacity: int = 64,
+    ):
+        if not secret:
+            raise ValueError("Dispatch config store requires a signing secret")
+        self._secret = secret.encode("utf-8")
+        self.ttl_seconds = ttl_seconds
+        self.ref_ttl_seconds = ref_ttl_seconds
+        self.local_capacity = local_capacity
+
+        self._redis = None
+        if redis_url:
+            import redis.asyncio as aioredis
+
+            self._redis = aioredis.from_url(redis_url, decode_responses=True)
+
+        # version -> (config, monotonic time it was last written to the backend)
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+
+    @staticmethod
+    def version_of(config: Dict[str, Any]) -> str:
+        canonical = json.dumps(config, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+    def _key(self, version: str) -> str:
+        return f"{self.KEY_PREFIX}:{version}"
+
+    def _sign(self, version: str, expires: int) -> str:
+        return hmac.new(self._secret, f"{version}.{expires}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def _remember(self, version: str, config: Dict[str, Any], written_at: float) -> None:
+        self._local[version] = (config, written_at)
+        self._local.move_to_end(version)
+        while len(self._local) > self.local_capacity:
+            self._local.popitem(last=False)
+
+    async def put(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Store ``config`` minus its secret fields (if not recently stored) and return a signed reference."""
+        config = {k: v for k, v in config.items() if k not in SECRET_CONFIG_FIELDS}
+        version = self.version_of(config)
+        now = time.monotonic()
+        cached = self._local.get(version)
+        # Re-write at most once per half TTL so hot configs never expire under a worker
+        if cached is None or now - cached[1] > self.ttl_seconds / 2:
+            if self._redis is not None:
+                await self._redis.set(self._key(version), json.dumps(config, default=str), ex=self.ttl_seconds)
+            self._remember(version, config, now)
+        else:
+            self._local.move_to_end(version)
+
+        expires = int(time.time()) + self.ref_ttl_seconds
+        return {"version": version, "expires": expires, "sig": self._sign(version, expires)}
+
+    async def resolve(self, ref: Dict[str, Any]) -> Dict[str, Any]:
+        """Verify a reference and return its config (local cache first)."""
+        try:
+            version = str(ref["version"])
+            expires = int(ref["expires"])
+            sig = str(ref["sig"])
+        except (KeyError, TypeError, ValueError):
+            raise DispatchConfigError("Malformed dispatch config reference")
+        if not hmac.compare_digest(sig, self._sign(version, expires)):
+            raise DispatchConfigError("Dispatch config reference signature mismatch")
+        if expires < time.time():
+            raise DispatchConfigError(f"Dispatch config reference {version} expired")
+
+        cached = self._local.get(version)
+        if cached is not None:
+            self._local.move_to_end(version)
+            return cached[0]
+
+        raw = await self._redis.get(self._key(version)) if self._redis is not None else None
+        if not raw:
+            raise DispatchConfigError(f"Dispatch config {version} not found")
+        config = json.loads(raw)
+        # Entries are immutable, so a cached copy never needs revalidation
+        self._remember(version, config, time.monotonic())
+        return config
+
+
+_store: Optional[DispatchConfigStore] = None
+_store_resolved = False
+
+
+def get_dispatch_config_store() -> Optional[DispatchConfigStore]:
+    """Process-wide store selected by ``DISPATCH_CONFIG_BACKEND``; None when disabled."""
+    global _store, _store_resolved
+    if _store_resolved:
+        return _store
+    _store_resolved = True
+
+    backend = (os.getenv("DISPATCH_CONFIG_BACKEND") or "").strip().lower()
+    if backend not in ("redis", "memory"):
+        return None
+    secret = os.getenv("DISPATCH_CONFIG_SECRET") or os.getenv("LIVEKIT_API_SECRET") or ""
+    try:
+        if backend == "redis":
+            url = redis_url_from_env("DISPATCH_CONFIG_REDIS_URL")
+            if not url:
+                logger.warning("DISPATCH_CONFIG_BACKEND=redis but no Redis URL configured; sending config inline")
+                return None
+            _store = DispatchConfigStore(secret, redis_url=url)
+        else:
+            _store = DispatchConfigStore(secret)
+    except Exception as e:
+        logger.warning(f"Dispatch config store '{backend}' unavailable; sending config inline: {e}")
+        _store = None
+    return _store
@@ -6,6 +6,7 @@ Handles text extraction, chunking, and vectorization of uploaded documents
 
 import asyncio
 import hashlib
+import json
 import time
 import logging
 import os
@@ -66,6 +67,9 @@ class DocumentProcessor:
         self.chunk_overlap = 50  # words
         # Default vector dimension expected by Supabase columns (use 1024 everywhere)
         self.default_embedding_dim = int(os.getenv("EMBEDDING_VECTOR_DIM", "1024"))
+        # Concurrent embedding requests per document and rows per chunk write/lookup
+        self.embedding_concurrency = max(1, int(os.getenv("DOCUMENT_EMBEDDING_CONCURRENCY", "4")))
+        self.chunk_batch_size = max(1, int(os.getenv("DOCUMENT_CHUNK_BATCH_SIZE", "50")))
 
         default_upload_root = Path(__file__).resolve().parents[2] / 'data' / 'uploads'
         upload_root = os.getenv("DOCUMENT_UPLOAD_ROOT", str(default_upload_root))
@@ -320,17 +324,11 @@ class DocumentProcessor:
                 file_info['size'],
             )
 
+            replaces_document_id = None
             if existing_document:
                 if replace_existing:
-                    try:
-                        supabase_client.table('documents').delete().eq('id', existing_document['id']).execute()
-                        logger.info("Deleted existing document %s to replace with new upload", existing_document['id'])
-                    except Exception as delete_error:
-                        logger.error(f"Failed to delete existing document {existing_document['id']}: {delete_error}")
-                        return {
-                            'success': False,
-                            'error': f'Failed to replace existing document: {delete_error}'
-                        }
+                    # Keep the old copy until the new one is ready so its chunk vectors can be reused
+                    replaces_document_id = str(existing_document['id'])
                 else:
                     logger.info(
                         "Skipping upload for '%s' (duplicate ready document %s)",
@@ -426,7 +424,13 @@ class DocumentProcessor:
             
             # Start async processing
             asyncio.create_task(
-                self._process_document_async(document_id, file_path, agent_ids, client_id)
+                self._process_document_async(
+                    document_id,
+                    file_path,
+                    agent_ids,
+                    client_id,
+                    replaces_document_id=replaces_document_id,
+                )
             )
             
             return {
@@ -558,7 +562,8 @@ class DocumentProcessor:
         document_id: str, 
         file_path: str, 
         agent_ids: List[str] = None,
-        client_id: str = None
+        client_id: str = None,
+        replaces_document_id: Optional[str] = None,
     ):
         """Async document processing pipeline"""
         async with self._processing_semaphore:
@@ -616,33 +621,19 @@ class DocumentProcessor:
                     cleaned_text[:2000], client_settings
                 )
 
-                # Process chunks
-                processed_chunks = []
-                for i, chunk in enumerate(chunks):
-                    try:
-                        chunk_embeddings = await self._generate_chunk_embeddings(chunk, client_settings)
-                        chunk_id = await self._store_document_chunk(
-                            document_id=document_id,
-                            chunk_text=chunk,
-                            chunk_index=i,
-                            embeddings=chunk_embeddings,
-                            client_id=client_id,
-                            supabase=supabase_client,
-                        )
-
-                        if chunk_id:
-                            processed_chunks.append({
-                                'id': chunk_id,
-                                'index': i,
-                                'text': chunk,
-                                'has_embeddings': bool(chunk_embeddings)
-                            })
-                    except Exception as e:
-                        logger.warning(f"Failed to process chunk {i} for document {document_id}: {e}")
+                # Store chunks, embedding only text whose hash has no reusable vector
+                chunk_stats = await self._sync_document_chunks(
+                    document_id,
+                    chunks,
+                    client_settings,
+                    supabase_client,
+                )
 
                 extra_metadata = {
                     'truncated_chunks': truncated_chunks,
                     'original_chunk_count': total_chunks_before_truncation,
+                    'chunks_embedded': chunk_stats['embedded'],
+                    'chunks_reused': chunk_stats['reused'] + chunk_stats['unchanged'],
                 }
 
                 # Update document with results
@@ -650,16 +641,28 @@ class DocumentProcessor:
                     document_id=document_id,
                     content=cleaned_text,
                     embeddings=document_embeddings,
-                    chunk_count=len(processed_chunks),
+                    chunk_count=chunk_stats['stored'],
                     agent_ids=agent_ids,
                     client_id=client_id,
                     supabase=supabase_client,
                     extra_metadata=extra_metadata,
                 )
 
-                logger.info(f"Completed processing for document {document_id}")
+                logger.info(
+                    f"Completed processing for document {document_id} "
+                    f"({chunk_stats['embedded']} chunks embedded, "
+                    f"{chunk_stats['reused'] + chunk_stats['unchanged']} reused)"
+                )
                 success = True
 
+                # Only reached when every chunk batch was stored (_sync_document_chunks raises otherwise)
+                if replaces_document_id and replaces_document_id != str(document_id):
+                    try:
+                        supabase_client.table('documents').delete().eq('id', replaces_document_id).execute()
+                        logger.info("Deleted document %s replaced by %s", replaces_document_id, document_id)
+                    except Exception as delete_error:
+                        logger.error(f"Failed to delete replaced document {replaces_document_id}: {delete_error}")
+
             except Exception as e:
                 logger.error(f"Error in async document processing for {document_id}: {e}")
                 await self._update_document_status(
@@ -856,6 +859,182 @@ class DocumentProcessor:
             logger.error(f"Error generating chunk embeddings: {e}")
             return None
 
+    def _chunk_content_hash(self, chunk_text: str) -> str:
+        """SHA256 of whitespace-normalized chunk text (stable across re-extraction)."""
+        normalized = ' '.join((chunk_text or '').split())
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def _embedding_signature(self, client_settings: Optional[Dict] = None) -> Dict[str, Any]:
+        """Embedding provider/model/dimension recorded with each chunk vector."""
+        config = self.ai_processor.resolve_embedding_config('chunk', client_settings)
+        return {
+            'embedding_provider': config['provider'],
+            'embedding_model': config['model'],
+            'embedding_dimension': self._get_target_embedding_dim(client_settings),
+        }
+
+    @staticmethod
+    def _matches_signature(chunk_metadata: Optional[Dict[str, Any]], signature: Dict[str, Any]) -> bool:
+        """True when a stored chunk was embedded with the given config."""
+        chunk_metadata = chunk_metadata or {}
+        if not chunk_metadata.get('has_embeddings'):
+            return False
+        return all(chunk_metadata.get(key) == value for key, value in signature.items())
+
+    @staticmethod
+    def _parse_vector(value: Any) -> Optional[List[float]]:
+        """pgvector columns come back from PostgREST as '[0.1,0.2,...]' strings."""
+        if value is None:
+            return None
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                return None
+        return [float(v) for v in value] if value else None
+
+    async def _load_reusable_vectors(
+        self,
+        supabase_client,
+        content_hashes: List[str],
+        signature: Dict[str, Any],
+    ) -> Dict[str, List[float]]:
+        """Find stored chunk vectors (any document) for the given hashes and embedding config."""
+        found: Dict[str, List[float]] = {}
+        pending = sorted(set(h for h in content_hashes if h))
+        for start in range(0, len(pending), self.chunk_batch_size):
+            batch = pending[start:start + self.chunk_batch_size]
+            try:
+                result = supabase_client.table('document_chunks') \
+                    .select('embeddings_vec,chunk_metadata') \
+                    .in_('chunk_metadata->>content_hash', batch) \
+                    .execute()
+            except Exception as e:
+                logger.debug(f"Chunk hash lookup failed; embedding {len(batch)} hashes fresh: {e}")
+                continue
+            for row in result.data or []:
+                chunk_metadata = row.get('chunk_metadata') or {}
+                content_hash = chunk_metadata.get('content_hash')
+                if content_hash in found or not self._matches_signature(chunk_metadata, signature):
+                    continue
+                vector = self._parse_vector(row.get('embeddings_vec'))
+                if vector and len(vector) == signature['embedding_dimension']:
+                    found[content_hash] = vector
+        return found
+
+    async def _embed_chunk_texts(self, texts: List[str], client_settings: Optional[Dict] = None) -> List[Optional[List[float]]]:
+        """Embed chunk texts with bounded concurrency (order preserved)."""
+        semaphore = asyncio.Semaphore(self.embedding_concurrency)
+
+        async def _embed(text: str) -> Optional[List[float]]:
+            async with semaphore:
+                return await self._generate_chunk_embeddings(text, client_settings)
+
+        return await asyncio.gather(*[_embed(text) for text in texts])
+
+    async def _sync_document_chunks(
+        self,
+        document_id: str,
+        chunks: List[str],
+        client_settings: Optional[Dict],
+        supabase_client,
+        existing_rows: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict[str, int]:
+        """
+        Make a document's stored chunks match ``chunks``, embedding only new or changed text.
+
+        Rows whose index, content hash and embedding config already match are left
+        untouched; other chunks reuse a stored vector with the same hash and config
+        (from this or any other document) before falling back to the embedding API.
+        New rows are written in batches and superseded rows are deleted. If any
+        batch fails to store, the superseded rows are kept and ``RuntimeError``
+        is raised so the caller marks the document failed instead of ready.
+        """
+        signature = self._embedding_signature(client_settings)
+        hashes = [self._chunk_content_hash(chunk) for chunk in chunks]
+
+        if existing_rows is None:
+            try:
+                existing_rows = supabase_client.table('document_chunks') \
+                    .select('id,chunk_index,chunk_metadata') \
+                    .eq('document_id', document_id) \
+                    .execute().data or []
+            except Exception as e:
+                logger.warning(f"Could not load existing chunks for document {document_id}: {e}")
+                existing_rows = []
+
+        unchanged: Dict[int, str] = {}
+        for row in existing_rows:
+            index = row.get('chunk_index')
+            chunk_metadata = row.get('chunk_metadata') or {}
+            if (
+                isinstance(index, int)
+                and 0 <= index < len(chunks)
+                and index not in unchanged
+                and chunk_metadata.get('content_hash') == hashes[index]
+                and self._matches_signature(chunk_metadata, signature)
+            ):
+                unchanged[index] = str(row['id'])
+
+        changed = [i for i in range(len(chunks)) if i not in unchanged]
+        reusable = await self._load_reusable_vectors(
+            supabase_client, [hashes[i] for i in changed], signature
+        )
+
+        # Embed each missing hash once, even if the text repeats within the document
+        to_embed: Dict[str, str] = {}
+        for i in changed:
+            if hashes[i] not in reusable and chunks[i].strip():
+                to_embed.setdefault(hashes[i], chunks[i])
+        embedded = dict(zip(to_embed.keys(), await self._embed_chunk_texts(list(to_embed.values()), client_settings)))
+
+        rows = []
+        reused_count = 0
+        for i in changed:
+            vector = reusable.get(hashes[i])
+            if vector is not None:
+                reused_count += 1
+            else:
+                vector = embedded.get(hashes[i])
+            rows.append(self._build_chunk_row(document_id, chunks[i], i, vector, hashes[i], signature))
+
+        stored = len(unchanged)
+        failed = 0
+        for start in range(0, len(rows), self.chunk_batch_size):
+            batch = rows[start:start + self.chunk_batch_size]
+            try:
+                supabase_client.table('document_chunks').insert(batch).execute()
+                stored += len(batch)
+            except Exception as e:
+                failed += len(batch)
+                logger.warning(
+                    f"Failed to store chunks {batch[0]['chunk_index']}-{batch[-1]['chunk_index']} "
+                    f"for document {document_id}: {e}"
+                )
+
+        if failed:
+            # Keep the previous chunks searchable; the next sync replaces them once every batch lands
+            raise RuntimeError(
+                f"Failed to store {failed} of {len(rows)} chunks for document {document_id}; "
+                f"previous chunks were kept"
+            )
+
+        kept_ids = set(unchanged.values())
+        stale_ids = [str(row['id']) for row in existing_rows if str(row['id']) not in kept_ids]
+        for start in range(0, len(stale_ids), self.chunk_batch_size):
+            batch = stale_ids[start:start + self.chunk_batch_size]
+            try:
+                supabase_client.table('document_chunks').delete().in_('id', batch).execute()
+            except Exception as e:
+                logger.warning(f"Failed to delete superseded chunks for document {document_id}: {e}")
+
+        return {
+            'stored': stored,
+            'unchanged': len(unchanged),
+            'reused': reused_count,
+            'embedded': len(to_embed),
+        }
+
     async def reprocess_from_chunks(
         self,
         document_id: str,
@@ -873,7 +1052,7 @@ class DocumentProcessor:
             return False
 
         try:
-            chunks_resp = supabase_client.table('document_chunks').select('id,content,chunk_index').eq('document_id', document_id).order('chunk_index').execute()
+            chunks_resp = supabase_client.table('document_chunks').select('id,content,chunk_index,chunk_metadata').eq('document_id', document_id).order('chunk_index').execute()
             chunks = chunks_resp.data or []
             if not chunks:
                 await self._update_document_status(
@@ -891,20 +1070,29 @@ class DocumentProcessor:
             _, client_settings = await self._get_client_context(client_id) if client_id else (None, None)
             doc_emb = await self._generate_document_embeddings(cleaned[:2000], client_settings)
 
-            # Refresh chunk embeddings
-            for c in chunks:
-                emb = await self._generate_chunk_embeddings(c.get('content') or '', client_settings)
-                supabase_client.table('document_chunks').update({'embeddings_vec': emb}).eq('id', c['id']).execute()
+            # Refresh only chunks whose text or embedding config changed
+            chunk_stats = await self._sync_document_chunks(
+                document_id,
+                [c.get('content') or '' for c in chunks],
+                client_settings,
+                supabase_client,
+                existing_rows=chunks,
+            )
 
             await self._finalize_document_processing(
                 document_id=document_id,
                 content=cleaned,
                 embeddings=doc_emb,
-                chunk_count=len(chunks),
+                chunk_count=chunk_stats['stored'],
                 agent_ids=[],
                 client_id=client_id,
                 supabase=supabase_client,
-                extra_metadata={'reembedded_from_chunks': True, 'recovered_at': time.time()},
+                extra_metadata={
+                    'reembedded_from_chunks': True,
+                    'recovered_at': time.time(),
+                    'chunks_embedded': chunk_stats['embedded'],
+                    'chunks_reused': chunk_stats['reused'] + chunk_stats['unchanged'],
+                },
             )
             return True
         except Exception as e:
@@ -952,6 +1140,41 @@ class DocumentProcessor:
                 target = None
         return int(target) if target else self.default_embedding_dim
     
+    def _build_chunk_row(
+        self,
+        document_id: str,
+        chunk_text: str,
+        chunk_index: int,
+        embeddings: Optional[List[float]] = None,
+        content_hash: Optional[str] = None,
+        signature: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Build a document_chunks row, recording the content hash and embedding config."""
+        # For clients with bigint document IDs, convert to int
+        try:
+            doc_id_for_chunk = int(document_id)
+        except ValueError:
+            # If it's not a valid int, keep as string (UUID case)
+            doc_id_for_chunk = document_id
+
+        chunk_metadata = {
+            'word_count': len(chunk_text.split()),
+            'character_count': len(chunk_text),
+            'has_embeddings': bool(embeddings),
+            'content_hash': content_hash or self._chunk_content_hash(chunk_text),
+        }
+        if embeddings and signature:
+            chunk_metadata.update(signature)
+
+        return {
+            'id': str(uuid.uuid4()),
+            'document_id': doc_id_for_chunk,
+            'content': chunk_text,
+            'chunk_index': chunk_index,
+            'embeddings_vec': embeddings,  # Store in vector column for pgvector similarity search
+            'chunk_metadata': chunk_metadata,
+        }
+
     async def _store_document_chunk(
         self,
         document_id: str,
@@ -963,25 +1186,9 @@ class DocumentProcessor:
     ) -> Optional[str]:
         """Store a document chunk in Supabase"""
         try:
-            # For clients with bigint document IDs, convert to int
-            try:
-                doc_id_for_chunk = int(document_id)
-            except ValueError:
-                # If it's not a valid int, keep as string (UUID case)
-                doc_id_for_chunk = document_id
-            
-            chunk_data = {
-                'id': str(uuid.uuid4()),
-                'document_id': doc_id_for_chunk,
-                'content': chunk_text,
-                'chunk_index': chunk_index,
-                'embeddings_vec': embeddings,  # Store in vector column for pgvector similarity search
-                'chunk_metadata': {
-                    'word_count': len(chunk_text.split()),
-                    'character_count': len(chunk_text),
-                    'has_embeddings': bool(embeddings)
-                }
-            }
+            # No client settings here, so the embedding config is not recorded and the
+            # vector is never reused for a different config
+            chunk_data = self._build_chunk_row(document_id, chunk_text, chunk_index, embeddings)
             
             # Use client-specific Supabase if client_id provided
             supabase_client = supabase
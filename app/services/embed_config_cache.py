@@ -0,0 +1,242 @@
+"""
+Embed Config Cache
+
+Two-tier cache for the template context behind ``/embed/{client_id}/{agent_slug}``
+(agent profile, tools, chat modes, Supertab settings), so embed page loads skip
+the platform and tenant lookups.
+
+- A bounded in-process LRU sits in front of Redis, which every API replica
+  shares when a Redis URL is configured (process memory only otherwise).
+- Entries are fresh for ``fresh_seconds`` and are then served stale for up to
+  ``stale_seconds`` while a single background refresh reloads them; replicas
+  elect the refresher with a short Redis lock.
+- Concurrent misses for a key in one process share a single load.
+- ``invalidate_embed_config(client_id)`` bumps a per-client generation that is
+  part of every key, so agent and client updates show up on all replicas on
+  their next request; superseded entries simply age out of Redis.
+- Failed loads are never cached; a failed refresh keeps serving the stale entry.
+- Without Redis an invalidation only reaches the local process, so the stale
+  window is capped at ``LOCAL_MAX_STALE_SECONDS``, near the old 60s page TTL.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.utils.redis_url import redis_url_from_env
+
+logger = logging.getLogger(__name__)
+
+EmbedConfigLoader = Callable[[], Awaitable[Dict[str, Any]]]
+
+# Longest an entry may be served when other replicas cannot see invalidations
+LOCAL_MAX_STALE_SECONDS = 90.0
+
+
+@dataclass
+class _Entry:
+    data: Dict[str, Any]
+    fresh_until: float
+    stale_until: float
+
+
+class EmbedConfigCache:
+    """
+    Stale-while-revalidate cache of embed template contexts keyed by (client_id, agent_slug).
+
+    Args:
+        redis_url: Shared tier; None keeps entries in process memory only
+        fresh_seconds: How long an entry is served without refreshing
+        stale_seconds: How long past loading an entry may still be served while it refreshes
+        local_capacity: Entries kept in the in-process LRU
+        refresh_lock_seconds: How long one replica holds the right to refresh a key
+    """
+
+    KEY_PREFIX = "embed_config"
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        fresh_seconds: float = 60.0,
+        stale_seconds: float = 900.0,
+        local_capacity: int = 512,
+        refresh_lock_seconds: int = 30,
+    ):
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = max(stale_seconds, fresh_seconds)
+        self.local_capacity = local_capacity
+        self.refresh_lock_seconds = refresh_lock_seconds
+
+        self._redis = None
+        if redis_url:
+            import redis.asyncio as aioredis
+
+            self._redis = aioredis.from_url(
+                redis_url, decode_responses=True, socket_timeout=0.25, socket_connect_timeout=0.25
+            )
+
+        self._local: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._local_generations: Dict[str, int] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+    # ------------------------------------------------------------------
+    # Tiers
+    # ------------------------------------------------------------------
+
+    async def _generation(self, client_id: str) -> str:
+        if self._redis is None:
+            return str(self._local_generations.get(client_id, 0))
+        try:
+            return await self._redis.get(f"{self.KEY_PREFIX}:gen:{client_id}") or "0"
+        except Exception as e:
+            logger.debug(f"Embed config generation lookup failed: {e}")
+            return str(self._local_generations.get(client_id, 0))
+
+    def _local_get(self, key: str) -> Optional[_Entry]:
+        entry = self._local.get(key)
+        if entry is not None:
+            self._local.move_to_end(key)
+        return entry
+
+    def _local_put(self, key: str, entry: _Entry) -> None:
+        self._local[key] = entry
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_capacity:
+            self._local.popitem(last=False)
+
+    async def _remote_get(self, key: str) -> Optional[_Entry]:
+        if self._redis is None:
+            return None
+        try:
+            raw = await self._redis.get(f"{self.KEY_PREFIX}:{key}")
+        except Exception as e:
+            logger.debug(f"Embed config read failed for {key}: {e}")
+            return None
+        if not raw:
+            return None
+        payload = json.loads(raw)
+        return _Entry(payload["data"], payload["fresh_until"], payload["stale_until"])
+
+    async def _store(self, key: str, data: Dict[str, Any]) -> None:
+        now = time.time()
+        entry = _Entry(data, now + self.fresh_seconds, now + self.stale_seconds)
+        self._local_put(key, entry)
+        if self._redis is None:
+            return
+        try:
+            payload = {"data": data, "fresh_until": entry.fresh_until, "stale_until": entry.stale_until}
+            await self._redis.set(f"{self.KEY_PREFIX}:{key}", json.dumps(payload), ex=int(self.stale_seconds) + 1)
+        except Exception as e:
+            logger.warning(f"Embed config write failed for {key}: {e}")
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    async def get(self, client_id: str, agent_slug: str, loader: EmbedConfigLoader) -> Dict[str, Any]:
+        """Return the embed config, calling ``loader()`` on a miss or refreshing it in the background when stale."""
+        key = f"{client_id}:{await self._generation(client_id)}:{agent_slug}"
+        now = time.time()
+
+        entry = self._local_get(key)
+        if entry is None or entry.fresh_until <= now:
+            # Another replica may have loaded or refreshed it already
+            remote = await self._remote_get(key)
+            if remote is not None and (entry is None or remote.fresh_until > entry.fresh_until):
+                entry = remote
+                self._local_put(key, entry)
+
+        if entry is not None and now < entry.fresh_until:
+            return entry.data
+        if entry is not None and now < entry.stale_until:
+            self._schedule_refresh(key, loader)
+            return entry.data
+        return await self._load(key, loader)
+
+    async def _load(self, key: str, loader: EmbedConfigLoader) -> Dict[str, Any]:
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            data = await loader()
+            await self._store(key, data)
+            future.set_result(data)
+            return data
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Waiters re-raise it; don't warn about an unretrieved exception
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def _schedule_refresh(self, key: str, loader: EmbedConfigLoader) -> None:
+        if key in self._refreshing or key in self._inflight:
+            return
+        task = asyncio.create_task(self._refresh(key, loader))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    async def _refresh(self, key: str, loader: EmbedConfigLoader) -> None:
+        if self._redis is not None:
+            try:
+                lock_key = f"{self.KEY_PREFIX}:refresh:{key}"
+                if not await self._redis.set(lock_key, "1", nx=True, ex=self.refresh_lock_seconds):
+                    return  # Another replica is refreshing it
+            except Exception as e:
+                logger.debug(f"Embed config refresh lock unavailable for {key}: {e}")
+        try:
+            await self._load(key, loader)
+            logger.debug(f"Refreshed embed config {key}")
+        except Exception as e:
+            logger.warning(f"Embed config refresh failed for {key}; serving stale entry: {e}")
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    async def invalidate(self, client_id: str) -> None:
+        """Drop a client's entries here and, via its generation, on every other replica."""
+        prefix = f"{client_id}:"
+        for key in [k for k in self._local if k.startswith(prefix)]:
+            self._local.pop(key, None)
+        self._local_generations[client_id] = self._local_generations.get(client_id, 0) + 1
+        if self._redis is not None:
+            try:
+                await self._redis.incr(f"{self.KEY_PREFIX}:gen:{client_id}")
+            except Exception as e:
+                logger.warning(f"Embed config invalidation broadcast failed for {client_id}: {e}")
+
+
+_cache: Optional[EmbedConfigCache] = None
+
+
+def get_embed_config_cache() -> EmbedConfigCache:
+    """Get or create the process-wide embed config cache."""
+    global _cache
+    if _cache is None:
+        redis_url = redis_url_from_env("EMBED_CONFIG_REDIS_URL")
+        stale_seconds = float(os.getenv("EMBED_CONFIG_STALE_SECONDS", "900"))
+        if not redis_url:
+            stale_seconds = min(stale_seconds, LOCAL_MAX_STALE_SECONDS)
+        _cache = EmbedConfigCache(
+            redis_url=redis_url,
+            fresh_seconds=float(os.getenv("EMBED_CONFIG_FRESH_SECONDS", "60")),
+            stale_seconds=stale_seconds,
+        )
+    return _cache
+
+
+async def invalidate_embed_config(client_id: Any) -> None:
+    """Invalidate cached embed pages after a client's or one of its agents' settings change."""
+    try:
+        await get_embed_config_cache().invalidate(str(client_id))
+    except Exception as e:
+        logger.warning(f"Embed config invalidation failed for {client_id}: {e}")
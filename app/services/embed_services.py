@@ -0,0 +1,90 @@
+"""
+Embed Services
+
+Process-wide service container for the public embed endpoints, plus a cheap
+per-request context on top of it.
+
+- ``EmbedServices`` builds the multi-tenant agent/client services and the
+  tools service once (at startup via ``get_embed_services()``), so requests
+  no longer construct services or platform Supabase clients of their own.
+- Tenant database clients come from the connection manager, which keeps one
+  client (and its HTTP connection pool) per tenant until its credentials change.
+- ``EmbedRequestContext`` memoizes the agent and platform client lookups
+  for a single request; nothing is shared between requests, so
+  settings changes are picked up by the next one.
+"""
+import logging
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from app.config import settings
+from app.services.agent_service_multitenant import AgentService as MultitenantAgentService
+from app.services.client_connection_manager import ClientConnectionManager, get_connection_manager
+from app.services.client_service_multitenant import ClientService as MultitenantClientService
+from app.services.client_service_supabase_enhanced import ClientService as SupabaseClientService
+from app.services.tools_service_supabase import ToolsService
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class EmbedServices:
+    """Long-lived services shared by every embed request in this process."""
+
+    def __init__(
+        self,
+        connection_manager: Optional[ClientConnectionManager] = None,
+        agent_service: Optional[MultitenantAgentService] = None,
+        client_service: Optional[MultitenantClientService] = None,
+        tools_service: Optional[ToolsService] = None,
+    ):
+        self.connection_manager = connection_manager or get_connection_manager()
+        self.agents = agent_service or MultitenantAgentService()
+        self.clients = client_service or MultitenantClientService()
+        self.tools = tools_service or ToolsService(
+            client_service=SupabaseClientService(settings.supabase_url, settings.supabase_service_role_key)
+        )
+
+    def request(self, client_id: str) -> "EmbedRequestContext":
+        """Start a lookup context for one request against ``client_id``."""
+        return EmbedRequestContext(self, client_id)
+
+
+class EmbedRequestContext:
+    """Memoized per-request lookups for one client; create one per request via ``EmbedServices.request``."""
+
+    def __init__(self, services: EmbedServices, client_id: str):
+        self.services = services
+        self.client_id = client_id
+        self.client_uuid = UUID(client_id)
+        self._agents: Dict[str, Any] = {}
+        self._client: Any = _MISSING
+
+    async def agent(self, agent_slug: str):
+        """The client's agent by slug (None when it does not exist)."""
+        if agent_slug not in self._agents:
+            self._agents[agent_slug] = await self.services.agents.get_agent(self.client_uuid, agent_slug)
+        return self._agents[agent_slug]
+
+    async def client(self):
+        """The platform client record (None when it does not exist)."""
+        if self._client is _MISSING:
+            self._client = await self.services.clients.get_client(self.client_id)
+        return self._client
+
+    def tenant_supabase(self):
+        """The client's own Supabase database (pooled per tenant by the connection manager)."""
+        return self.services.connection_manager.get_client_db_client(self.client_uuid)
+
+
+_services: Optional[EmbedServices] = None
+
+
+def get_embed_services() -> EmbedServices:
+    """Get or create the process-wide embed service container."""
+    global _services
+    if _services is None:
+        _services = EmbedServices()
+        logger.info("Embed services initialized")
+    return _services
@@ -0,0 +1,412 @@
+"""
+Job Queue Engine
+
+Shared, notification-driven job runner for background work (client
+provisioning jobs, media runs).
+
+- Wakeups come from a ``JobNotifier`` (Postgres LISTEN/NOTIFY, Redis streams,
+  or in-memory for local use/tests); a slow fallback poll covers missed
+  notifications, so an idle worker issues almost no queries.
+- Work is claimed atomically by a caller-supplied ``claim`` coroutine, backed
+  by an RPC using ``FOR UPDATE SKIP LOCKED`` with a visibility timeout so
+  claims held by crashed workers become claimable again.
+- Each job type runs in its own lane with an independent concurrency limit.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Lane name meaning "claim any job type"
+ANY_JOB_TYPE = "*"
+
+NotificationCallback = Callable[[str, str], None]
+ClaimFn = Callable[[str, int], Awaitable[List[Any]]]
+JobHandler = Callable[[Any], Awaitable[None]]
+
+
+# ---------------------------------------------------------------------------
+# Notifiers
+# ---------------------------------------------------------------------------
+
+
+class JobNotifier(ABC):
+    """Delivers "new work available" signals between enqueuers and workers."""
+
+    # True when database triggers already announce new rows on this transport
+    delivers_database_triggers = False
+
+    @abstractmethod
+    async def subscribe(self, channel: str, callback: NotificationCallback) -> None:
+        """Invoke ``callback(channel, payload)`` whenever ``channel`` is notified."""
+
+    @abstractmethod
+    async def publish(self, channel: str, payload: str = "") -> None:
+        """Signal subscribers of ``channel``. Must never raise."""
+
+    async def close(self) -> None:
+        """Release connections."""
+
+
+class InMemoryNotifier(JobNotifier):
+    """Process-local notifier; the stand-in for local development and tests."""
+
+    def __init__(self) -> None:
+        self._subscribers: Dict[str, List[NotificationCallback]] = {}
+
+    async def subscribe(self, channel: str, callback: NotificationCallback) -> None:
+        self._subscribers.setdefault(channel, []).append(callback)
+
+    async def publish(self, channel: str, payload: str = "") -> None:
+        for callback in list(self._subscribers.get(channel, [])):
+            try:
+                callback(channel, payload)
+            except Exception as exc:  # pragma: no cover - defensive logging
+                logger.warning("Job notification callback failed: %s", exc)
+
+
+class PostgresNotifier(JobNotifier):
+    """
+    LISTEN/NOTIFY over a dedicated asyncpg connection.
+
+    Notifications are emitted by database triggers on the queue tables, so
+    enqueuers that only talk to PostgREST still wake workers.
+    """
+
+    RECONNECT_DELAY = 5.0
+    delivers_database_triggers = True
+
+    def __init__(self, dsn: str) -> None:
+        self.dsn = dsn
+        self._conn: Any = None
+        self._listeners: Dict[str, List[NotificationCallback]] = {}
+        self._lock = asyncio.Lock()
+        self._supervisor: Optional[asyncio.Task] = None
+
+    async def _ensure_connection(self) -> Any:
+        async with self._lock:
+            if self._conn is not None and not self._conn.is_closed():
+                return self._conn
+            import asyncpg
+
+            self._conn = await asyncpg.connect(self.dsn)
+            self._conn.add_termination_listener(lambda _conn: self._schedule_reconnect())
+            for channel in self._listeners:
+                await self._conn.add_listener(channel, self._dispatch)
+            return self._conn
+
+    def _dispatch(self, _conn: Any, _pid: int, channel: str, payload: str) -> None:
+        for callback in list(self._listeners.get(channel, [])):
+            try:
+                callback(channel, payload)
+            except Exception as exc:  # pragma: no cover - defensive logging
+                logger.warning("Job notification callback failed: %s", exc)
+
+    def _schedule_reconnect(self) -> None:
+        if self._supervisor and not self._supervisor.done():
+            return
+        self._supervisor = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        while True:
+            await asyncio.sleep(self.RECONNECT_DELAY)
+            try:
+                self._conn = None
+                await self._ensure_connection()
+                logger.info("Job queue LISTEN connection re-established")
+                # Listeners may have missed notifications while disconnected
+                for channel in self._listeners:
+                    self._dispatch(None, 0, channel, "reconnect")
+                return
+            except Exception as exc:
+                logger.warning("Job queue LISTEN reconnect failed: %s", exc)
+
+    async def subscribe(self, channel: str, callback: NotificationCallback) -> None:
+        connected = self._conn is not None and not self._conn.is_closed()
+        first = channel not in self._listeners
+        self._listeners.setdefault(channel, []).append(callback)
+        conn = await self._ensure_connection()
+        # A fresh connection already registered every known channel
+        if first and connected:
+            await conn.add_listener(channel, self._dispatch)
+
+    async def publish(self, channel: str, payload: str = "") -> None:
+        try:
+            conn = await self._ensure_connection()
+            await conn.execute("SELECT pg_notify($1, $2)", channel, payload)
+        except Exception as exc:
+            logger.debug("pg_notify on %s failed: %s", channel, exc)
+
+    async def close(self) -> None:
+        if self._supervisor and not self._supervisor.done():
+            self._supervisor.cancel()
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+
+
+class RedisStreamNotifier(JobNotifier):
+    """
+    Redis streams notifier (one stream per channel, ``job_queue:<channel>``).
+
+    Used where the platform database cannot be reached directly; enqueuers
+    must publish explicitly since there are no database triggers.
+    """
+
+    STREAM_MAXLEN = 1000
+    BLOCK_MS = 5000
+
+    def __init__(self, redis_url: str) -> None:
+        import redis.asyncio as aioredis
+
+        self._redis = aioredis.from_url(redis_url, decode_responses=True)
+        self._readers: Dict[str, asyncio.Task] = {}
+        self._listeners: Dict[str, List[NotificationCallback]] = {}
+
+    @staticmethod
+    def _stream(channel: str) -> str:
+        return f"job_queue:{channel}"
+
+    async def _read_loop(self, channel: str) -> None:
+        last_id = "$"
+        stream = self._stream(channel)
+        while True:
+            try:
+                entries = await self._redis.xread({stream: last_id}, block=self.BLOCK_MS, count=100)
+                for _stream_name, messages in entries or []:
+                    for message_id, fields in messages:
+                        last_id = message_id
+                        payload = (fields or {}).get("payload", "")
+                        for callback in list(self._listeners.get(channel, [])):
+                            callback(channel, payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Redis job stream read failed for %s: %s", channel, exc)
+                await asyncio.sleep(1.0)
+
+    async def subscribe(self, channel: str, callback: NotificationCallback) -> None:
+        self._listeners.setdefault(channel, []).append(callback)
+        if channel not in self._readers:
+            self._readers[channel] = asyncio.create_task(self._read_loop(channel))
+
+    async def publish(self, channel: str, payload: str = "") -> None:
+        try:
+            await self._redis.xadd(
+                self._stream(channel),
+                {"payload": payload},
+                maxlen=self.STREAM_MAXLEN,
+                approximate=True,
+            )
+        except Exception as exc:
+            logger.debug("Redis job stream publish on %s failed: %s", channel, exc)
+
+    async def close(self) -> None:
+        for task in self._readers.values():
+            task.cancel()
+        self._readers.clear()
+        await self._redis.close()
+
+
+_default_notifier: Optional[JobNotifier] = None
+
+
+def get_job_notifier() -> Optional[JobNotifier]:
+    """
+    Return the process-wide notifier selected by ``JOB_QUEUE_BACKEND``.
+
+    ``postgres`` (default when ``DATABASE_URL`` is set), ``redis``, ``memory``
+    or ``poll``. Returns None for ``poll`` or when nothing is configured, in
+    which case queues fall back to interval polling.
+    """
+    global _default_notifier
+    if _default_notifier is not None:
+        return _default_notifier
+
+    from app.config import settings
+
+    backend = (os.getenv("JOB_QUEUE_BACKEND") or "").strip().lower()
+    if not backend:
+        backend = "postgres" if settings.database_url else "poll"
+
+    try:
+        if backend == "postgres" and settings.database_url:
+            _default_notifier = PostgresNotifier(settings.database_url)
+        elif backend == "redis":
+            _default_notifier = RedisStreamNotifier(settings.redis_url)
+        elif backend == "memory":
+            _default_notifier = InMemoryNotifier()
+    except Exception as exc:
+        logger.warning("Job queue notifier '%s' unavailable, falling back to polling: %s", backend, exc)
+        _default_notifier = None
+    return _default_notifier
+
+
+async def publish_job_notification(channel: str, payload: Any = "", database_triggered: bool = False) -> None:
+    """
+    Best-effort wakeup for workers of ``channel`` (no-op when polling).
+
+    Pass ``database_triggered=True`` for channels fed by a table trigger; the
+    Postgres notifier then relies on the trigger instead of publishing twice.
+    """
+    notifier = get_job_notifier()
+    if notifier is None:
+        return
+    if database_triggered and notifier.delivers_database_triggers:
+        return
+    if not isinstance(payload, str):
+        payload = json.dumps(payload, default=str)
+    await notifier.publish(channel, payload)
+
+
+# ---------------------------------------------------------------------------
+# Queue runner
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class _Lane:
+    job_type: str
+    handler: JobHandler
+    concurrency: int
+    active: Set[asyncio.Task] = field(default_factory=set)
+
+    @property
+    def free_slots(self) -> int:
+        return max(0, self.concurrency - len(self.active))
+
+
+class JobQueue:
+    """
+    Runs jobs claimed from a database-backed queue.
+
+    Args:
+        channel: Notification channel that signals new work
+        claim: ``await claim(job_type, limit)`` atomically claims up to
+            ``limit`` jobs of ``job_type`` (``ANY_JOB_TYPE`` for all types)
+        notifier: Wakeup source; None means interval polling only
+        fallback_interval: Seconds between safety polls when no notification
+            arrives (also the polling interval when ``notifier`` is None)
+        database_triggered: The channel is fed by a table trigger, so
+            ``notify`` only publishes on notifiers without trigger delivery
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        claim: ClaimFn,
+        notifier: Optional[JobNotifier] = None,
+        fallback_interval: float = 60.0,
+        database_triggered: bool = False,
+    ) -> None:
+        self.channel = channel
+        self.database_triggered = database_triggered
+        self._claim = claim
+        self.notifier = notifier
+        self.fallback_interval = fallback_interval
+        self._lanes: Dict[str, _Lane] = {}
+        self._wakeup = asyncio.Event()
+        self._shutdown = asyncio.Event()
+
+    def register(self, job_type: str, handler: JobHandler, concurrency: int = 1) -> None:
+        """Register a handler and concurrency limit for ``job_type``."""
+        self._lanes[job_type] = _Lane(job_type=job_type, handler=handler, concurrency=max(1, concurrency))
+
+    def wake(self) -> None:
+        """Trigger an immediate claim pass."""
+        self._wakeup.set()
+
+    def _on_notification(self, _channel: str, _payload: str) -> None:
+        self._wakeup.set()
+
+    async def notify(self, payload: Any = "") -> None:
+        """Wake this process and any other workers listening on the channel."""
+        self.wake()
+        if self.notifier is not None and not (self.database_triggered and self.notifier.delivers_database_triggers):
+            if not isinstance(payload, str):
+                payload = json.dumps(payload, default=str)
+            await self.notifier.publish(self.channel, payload)
+
+    def stop(self) -> None:
+        self._shutdown.set()
+        self._wakeup.set()
+
+    @property
+    def active_count(self) -> int:
+        return sum(len(lane.active) for lane in self._lanes.values())
+
+    async def run(self) -> None:
+        """Claim and execute jobs until ``stop()`` is called."""
+        if self.notifier is not None:
+            try:
+                await self.notifier.subscribe(self.channel, self._on_notification)
+            except Exception as exc:
+                logger.warning(
+                    "Job queue %s could not subscribe to notifications (%s); polling every %.0fs",
+                    self.channel, exc, self.fallback_interval,
+                )
+
+        try:
+            while not self._shutdown.is_set():
+                self._wakeup.clear()
+                await self._claim_pass()
+
+                # Completed jobs and notifications set the wakeup event
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.fallback_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            pending = [task for lane in self._lanes.values() for task in lane.active]
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _claim_pass(self) -> None:
+        """Claim work for every lane with free slots."""
+        for lane in self._lanes.values():
+            free = lane.free_slots
+            if free <= 0:
+                continue
+            try:
+                jobs = await self._claim(lane.job_type, free)
+            except Exception as exc:
+                logger.warning("Job queue %s claim for %s failed: %s", self.channel, lane.job_type, exc)
+                continue
+            for job in jobs:
+                self._start(lane, job)
+
+    def _start(self, lane: _Lane, job: Any) -> None:
+        task = asyncio.create_task(self._execute(lane, job))
+        lane.active.add(task)
+
+        def _done(t: asyncio.Task) -> None:
+            lane.active.discard(t)
+            # A slot just freed up - look for more work
+            self._wakeup.set()
+
+        task.add_done_callback(_done)
+
+    async def _execute(self, lane: _Lane, job: Any) -> None:
+        try:
+            await lane.handler(job)
+        except Exception as exc:  # pragma: no cover - handlers record their own failures
+            logger.exception("Job queue %s handler for %s failed: %s", self.channel, lane.job_type, exc)
+
+
+__all__ = [
+    "ANY_JOB_TYPE",
+    "InMemoryNotifier",
+    "JobNotifier",
+    "JobQueue",
+    "PostgresNotifier",
+    "RedisStreamNotifier",
+    "get_job_notifier",
+    "publish_job_notification",
+]
@@ -8,15 +8,19 @@ Supports multiple output formats (SRT, VTT, plain text) and LLM-based translatio
 import logging
 import json
 import asyncio
+import os
 import re
 import uuid
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime, timezone
 from dataclasses import dataclass, asdict, field
 from enum import Enum
 
 import httpx
 
+from app.services.media_segmenter import MediaSegment
+from app.services.media_upload import SIGNED_URL_TTL_SECONDS, upload_generated
+
 logger = logging.getLogger(__name__)
 
 
@@ -26,6 +30,27 @@ logger = logging.getLogger(__name__)
 
 ASSEMBLYAI_BASE_URL = "https://api.assemblyai.com/v2"
 
+# Platform-level AssemblyAI API key (fallback for clients without their own key)
+PLATFORM_ASSEMBLYAI_KEY = os.getenv("ASSEMBLYAI_API_KEY")
+
+# Concurrent AssemblyAI jobs per run in long-media mode
+LONG_MEDIA_CONCURRENCY = int(os.getenv("LINGUA_LONG_MEDIA_CONCURRENCY", "4"))
+
+# Per-language subtitle files are written here once a run completes
+LINGUA_OUTPUT_BUCKET = "lingua-outputs"
+# Characters of transcript text included in status summaries
+TEXT_PREVIEW_CHARS = 500
+
+# Run status -> (progress percent, phase label) reported to clients
+LINGUA_STATUS_PROGRESS = {
+    "pending": (10, "Starting transcription..."),
+    "running": (10, "Starting transcription..."),
+    "transcribing": (40, "Transcribing audio..."),
+    "translating": (70, "Translating subtitles..."),
+    "complete": (100, "Complete"),
+    "failed": (0, "Failed"),
+}
+
 # Supported languages for transcription (AssemblyAI)
 TRANSCRIPTION_LANGUAGES = {
     "auto": "Auto-detect",
@@ -78,6 +103,18 @@ class TranscriptSegment:
     def to_dict(self) -> Dict[str, Any]:
         return asdict(self)
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TranscriptSegment":
+        return cls(start=data["start"], end=data["end"], text=data["text"])
+
+
+def _segment_window(segments: List[TranscriptSegment], offset: int, limit: int) -> Dict[str, Any]:
+    return {
+        "segment_count": len(segments),
+        "segments_offset": offset,
+        "segments": [s.to_dict() for s in segments[offset:offset + limit]],
+    }
+
 
 @dataclass
 class TranscriptionResult:
@@ -101,6 +138,30 @@ class TranscriptionResult:
             "confidence": self.confidence,
         }
 
+    def summary(self, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """Status view: metadata, a text preview and one window of segments."""
+        return {
+            "transcript_id": self.transcript_id,
+            "text_preview": self.text[:TEXT_PREVIEW_CHARS],
+            "language_code": self.language_code,
+            "duration_ms": self.duration_ms,
+            "word_count": self.word_count,
+            "confidence": self.confidence,
+            **_segment_window(self.segments, offset, limit),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TranscriptionResult":
+        return cls(
+            transcript_id=data["transcript_id"],
+            text=data.get("text", ""),
+            segments=[TranscriptSegment.from_dict(s) for s in data.get("segments", [])],
+            language_code=data.get("language_code", "en"),
+            duration_ms=data.get("duration_ms", 0),
+            word_count=data.get("word_count", 0),
+            confidence=data.get("confidence", 0.0),
+        )
+
 
 @dataclass
 class TranslationResult:
@@ -118,6 +179,24 @@ class TranslationResult:
             "text": self.text,
         }
 
+    def summary(self, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """Status view: metadata, a text preview and one window of segments."""
+        return {
+            "language_code": self.language_code,
+            "language_name": self.language_name,
+            "text_preview": self.text[:TEXT_PREVIEW_CHARS],
+            **_segment_window(self.segments, offset, limit),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TranslationResult":
+        return cls(
+            language_code=data["language_code"],
+            language_name=data.get("language_name", data["language_code"]),
+            segments=[TranscriptSegment.from_dict(s) for s in data.get("segments", [])],
+            text=data.get("text", ""),
+        )
+
 
 @dataclass
 class LinguaResult:
@@ -126,11 +205,24 @@ class LinguaResult:
     status: str  # pending, transcribing, translating, complete, failed
     original_transcript: Optional[TranscriptionResult] = None
     translations: Dict[str, TranslationResult] = field(default_factory=dict)
+    # Storage paths in LINGUA_OUTPUT_BUCKET, keyed by language
     srt_urls: Dict[str, str] = field(default_factory=dict)
     vtt_urls: Dict[str, str] = field(default_factory=dict)
     txt_urls: Dict[str, str] = field(default_factory=dict)
     error: Optional[str] = None
 
+    def languages(self) -> Dict[str, List[TranscriptSegment]]:
+        """Segments per output language, original transcript first."""
+        outputs = {}
+        if self.original_transcript:
+            outputs[self.original_transcript.language_code] = self.original_transcript.segments
+        for lang_code, translation in self.translations.items():
+            outputs.setdefault(lang_code, translation.segments)
+        return outputs
+
+    def output_paths(self, output_format: str) -> Dict[str, str]:
+        return getattr(self, f"{output_format}_urls")
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             "run_id": self.run_id,
@@ -143,39 +235,66 @@ class LinguaResult:
             "error": self.error,
         }
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LinguaResult":
+        transcript = data.get("original_transcript")
+        return cls(
+            run_id=data["run_id"],
+            status=data["status"],
+            original_transcript=TranscriptionResult.from_dict(transcript) if transcript else None,
+            translations={k: TranslationResult.from_dict(v) for k, v in (data.get("translations") or {}).items()},
+            srt_urls=data.get("srt_urls") or {},
+            vtt_urls=data.get("vtt_urls") or {},
+            txt_urls=data.get("txt_urls") or {},
+            error=data.get("error"),
+        )
+
 
 # ============================================================================
 # Format Generators
 # ============================================================================
 
+def iter_srt(segments: Iterable[TranscriptSegment]) -> Iterator[str]:
+    """Yield SRT subtitles one cue at a time."""
+    for i, segment in enumerate(segments, 1):
+        separator = "\n" if i > 1 else ""  # Blank line between entries
+        yield f"{separator}{i}\n{_ms_to_srt_time(segment.start)} --> {_ms_to_srt_time(segment.end)}\n{segment.text}\n"
+
+
+def iter_vtt(segments: Iterable[TranscriptSegment]) -> Iterator[str]:
+    """Yield WebVTT subtitles one cue at a time."""
+    yield "WEBVTT\n"
+    for segment in segments:
+        yield f"\n{_ms_to_vtt_time(segment.start)} --> {_ms_to_vtt_time(segment.end)}\n{segment.text}\n"
+
+
+def iter_txt(segments: Iterable[TranscriptSegment]) -> Iterator[str]:
+    """Yield a plain text transcript one segment at a time."""
+    for i, segment in enumerate(segments):
+        yield f" {segment.text}" if i else segment.text
+
+
 def generate_srt(segments: List[TranscriptSegment]) -> str:
     """Generate SRT format subtitles from segments."""
-    srt_lines = []
-    for i, segment in enumerate(segments, 1):
-        start_time = _ms_to_srt_time(segment.start)
-        end_time = _ms_to_srt_time(segment.end)
-        srt_lines.append(f"{i}")
-        srt_lines.append(f"{start_time} --> {end_time}")
-        srt_lines.append(segment.text)
-        srt_lines.append("")  # Blank line between entries
-    return "\n".join(srt_lines)
+    return "".join(iter_srt(segments))
 
 
 def generate_vtt(segments: List[TranscriptSegment]) -> str:
     """Generate WebVTT format subtitles from segments."""
-    vtt_lines = ["WEBVTT", ""]
-    for segment in segments:
-        start_time = _ms_to_vtt_time(segment.start)
-        end_time = _ms_to_vtt_time(segment.end)
-        vtt_lines.append(f"{start_time} --> {end_time}")
-        vtt_lines.append(segment.text)
-        vtt_lines.append("")
-    return "\n".join(vtt_lines)
+    return "".join(iter_vtt(segments))
 
 
 def generate_txt(segments: List[TranscriptSegment]) -> str:
     """Generate plain text transcript from segments."""
-    return " ".join(segment.text for segment in segments)
+    return "".join(iter_txt(segments))
+
+
+# Output format -> (cue generator, content type)
+SUBTITLE_FORMATS: Dict[str, Tuple[Callable[[Iterable[TranscriptSegment]], Iterator[str]], str]] = {
+    "srt": (iter_srt, "application/x-subrip"),
+    "vtt": (iter_vtt, "text/vtt"),
+    "txt": (iter_txt, "text/plain"),
+}
 
 
 def _ms_to_srt_time(ms: int) -> str:
@@ -280,8 +399,18 @@ class AssemblyAIClient:
         self,
         audio_url: str,
         language_code: Optional[str] = None,
+        webhook_url: Optional[str] = None,
+        webhook_auth: Optional[Tuple[str, str]] = None,
+        audio_start_from: Optional[int] = None,
+        audio_end_at: Optional[int] = None,
     ) -> str:
-        """Submit audio for transcription. Returns transcript ID."""
+        """
+        Submit audio for transcription. Returns transcript ID.
+
+        With ``webhook_url`` AssemblyAI POSTs ``{"transcript_id", "status"}``
+        there on completion, sending ``webhook_auth`` as a (header, value) pair.
+        ``audio_start_from``/``audio_end_at`` (ms) transcribe only that window.
+        """
         payload = {
             "audio_url": audio_url,
             "punctuate": True,
@@ -293,6 +422,16 @@ class AssemblyAIClient:
         else:
             payload["language_detection"] = True
 
+        if webhook_url:
+            payload["webhook_url"] = webhook_url
+            if webhook_auth:
+                payload["webhook_auth_header_name"], payload["webhook_auth_header_value"] = webhook_auth
+
+        if audio_start_from is not None:
+            payload["audio_start_from"] = audio_start_from
+        if audio_end_at is not None:
+            payload["audio_end_at"] = audio_end_at
+
         async with httpx.AsyncClient() as client:
             response = await client.post(
                 f"{ASSEMBLYAI_BASE_URL}/transcript",
@@ -394,7 +533,15 @@ class LinguaService:
 
         # Wait for completion
         result = await self.assemblyai.wait_for_transcription(transcript_id)
+        return self.transcription_from_result(transcript_id, result, source_language)
 
+    def transcription_from_result(
+        self,
+        transcript_id: str,
+        result: Dict[str, Any],
+        source_language: Optional[str] = None,
+    ) -> TranscriptionResult:
+        """Build a TranscriptionResult from a completed AssemblyAI transcript."""
         # Parse segments from words
         segments = self._parse_segments(result)
 
@@ -408,6 +555,81 @@ class LinguaService:
             confidence=result.get("confidence", 0.0),
         )
 
+    async def transcribe_segmented(
+        self,
+        audio_url: str,
+        plan: List[MediaSegment],
+        source_language: Optional[str] = None,
+        on_segment: Optional[Callable[[int, List[TranscriptSegment]], Awaitable[Any]]] = None,
+        concurrency: int = LONG_MEDIA_CONCURRENCY,
+    ) -> TranscriptionResult:
+        """
+        Long-media mode: transcribe each planned window as its own concurrent
+        AssemblyAI job and stitch the words back onto the source timeline.
+
+        ``on_segment(index, segments)`` is awaited as each window finishes
+        (in completion order), so callers can start work on early windows.
+        """
+        logger.info(f"Starting segmented transcription ({len(plan)} segments) for audio: {audio_url[:50]}...")
+        semaphore = asyncio.Semaphore(concurrency)
+        finished: Dict[int, Tuple[str, Dict[str, Any], List[Dict[str, Any]]]] = {}
+
+        async def _transcribe(segment: MediaSegment) -> None:
+            async with semaphore:
+                transcript_id = await self.assemblyai.submit_transcription(
+                    audio_url=audio_url,
+                    language_code=source_language,
+                    audio_start_from=segment.start_ms,
+                    audio_end_at=segment.end_ms,
+                )
+                result = await self.assemblyai.wait_for_transcription(transcript_id)
+            words = self._owned_words(result.get("words") or [], segment)
+            finished[segment.index] = (transcript_id, result, words)
+            logger.info(f"Segment {segment.index + 1}/{len(plan)} transcribed: {transcript_id} ({len(words)} words)")
+            if on_segment:
+                await on_segment(segment.index, self._words_to_segments(words) if words else [])
+
+        tasks = [asyncio.create_task(_transcribe(segment)) for segment in plan]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        ordered = [finished[segment.index] for segment in plan]
+        words = [word for _, _, segment_words in ordered for word in segment_words]
+        text = " ".join(word.get("text", "") for word in words)
+        languages = [result.get("language_code") for _, result, _ in ordered if result.get("language_code")]
+        confidences = [
+            (result.get("confidence") or 0.0, len(segment_words))
+            for _, result, segment_words in ordered if segment_words
+        ]
+        total_words = sum(count for _, count in confidences)
+
+        return TranscriptionResult(
+            transcript_id=",".join(transcript_id for transcript_id, _, _ in ordered),
+            text=text,
+            segments=self._words_to_segments(words) if words else [],
+            language_code=max(set(languages), key=languages.count) if languages else (source_language or "en"),
+            duration_ms=max(segment.end_ms for segment in plan),
+            word_count=len(words),
+            confidence=sum(c * n for c, n in confidences) / total_words if total_words else 0.0,
+        )
+
+    @staticmethod
+    def _owned_words(words: List[Dict[str, Any]], segment: MediaSegment) -> List[Dict[str, Any]]:
+        """Words on the source timeline that fall in the segment's owned range."""
+        if not words:
+            return []
+        # Timestamps should already be on the source timeline; shift them if they came back window-relative
+        offset = segment.start_ms if words[0].get("start", 0) < segment.start_ms - 1000 else 0
+        shifted = [
+            {**word, "start": word.get("start", 0) + offset, "end": word.get("end", 0) + offset}
+            for word in words
+        ]
+        return [word for word in shifted if segment.owns(word["start"], word["end"])]
+
     def _parse_segments(self, result: Dict[str, Any]) -> List[TranscriptSegment]:
         """Parse transcript result into timed segments suitable for subtitles."""
         segments = []
@@ -545,26 +767,63 @@ class LinguaService:
         audio_url: str,
         source_language: Optional[str] = None,
         target_languages: Optional[List[str]] = None,
+        run_id: Optional[str] = None,
+        progress: Optional[Callable[..., Awaitable[Any]]] = None,
+        transcript: Optional[TranscriptionResult] = None,
+        plan: Optional[List[MediaSegment]] = None,
     ) -> LinguaResult:
-        """Full LINGUA pipeline: transcribe, translate, generate formats."""
-        run_id = str(uuid.uuid4())
+        """
+        Full LINGUA pipeline: transcribe, translate, generate formats.
+
+        ``progress(status=..., progress_percent=..., current_phase=...)`` is
+        awaited on each status change when given. Pass ``transcript`` to skip
+        transcription (e.g. when it completed via webhook). With a long-media
+        ``plan`` segments are transcribed concurrently and each one's
+        translation starts as soon as it is transcribed.
+        """
+        run_id = run_id or str(uuid.uuid4())
         result = LinguaResult(run_id=run_id, status="transcribing")
 
+        async def _report(status: str) -> None:
+            if progress:
+                percent, phase = LINGUA_STATUS_PROGRESS[status]
+                await progress(status=status, progress_percent=percent, current_phase=phase)
+
+        languages = [lang for lang in target_languages or [] if lang in TRANSLATION_LANGUAGES]
+        # Long-media mode: per-segment translations, keyed by language then segment index
+        segment_translations: Dict[str, Dict[int, asyncio.Task]] = {lang: {} for lang in languages}
+
+        async def _translate_segment(index: int, segments: List[TranscriptSegment]) -> None:
+            for lang in languages:
+                segment_translations[lang][index] = asyncio.create_task(self.translate_segments(segments, lang))
+
         try:
             # Step 1: Transcribe
-            transcript = await self.transcribe(audio_url, source_language)
+            if transcript is None:
+                await _report("transcribing")
+                if plan:
+                    transcript = await self.transcribe_segmented(
+                        audio_url, plan, source_language, on_segment=_translate_segment,
+                    )
+                else:
+                    transcript = await self.transcribe(audio_url, source_language)
             result.original_transcript = transcript
             result.status = "translating" if target_languages else "complete"
+            if target_languages:
+                await _report("translating")
 
             # Step 2: Translate to each target language
-            if target_languages:
-                for lang in target_languages:
-                    if lang in TRANSLATION_LANGUAGES:
-                        translation = await self.translate_segments(
-                            transcript.segments,
-                            lang,
-                        )
-                        result.translations[lang] = translation
+            for lang in languages:
+                if segment_translations[lang]:
+                    parts = [await segment_translations[lang][i] for i in sorted(segment_translations[lang])]
+                    result.translations[lang] = TranslationResult(
+                        language_code=lang,
+                        language_name=TRANSLATION_LANGUAGES[lang],
+                        segments=[seg for part in parts for seg in part.segments],
+                        text=" ".join(part.text for part in parts if part.text),
+                    )
+                else:
+                    result.translations[lang] = await self.translate_segments(transcript.segments, lang)
 
             result.status = "complete"
             logger.info(f"LINGUA processing complete: {run_id}")
@@ -573,6 +832,10 @@ class LinguaService:
             logger.error(f"LINGUA processing failed: {e}", exc_info=True)
             result.status = "failed"
             result.error = str(e)
+        finally:
+            for tasks in segment_translations.values():
+                for task in tasks.values():
+                    task.cancel()
 
         return result
 
@@ -581,6 +844,124 @@ class LinguaService:
 # Helper Functions
 # ============================================================================
 
+def lingua_service_for_client(client: Any, needs_translation: bool) -> LinguaService:
+    """
+    Build a LinguaService from a client's API keys.
+
+    Raises ValueError (with a user-facing message) when a required key is missing.
+    """
+    # AssemblyAI key: client-specific, then additional_settings, then platform fallback
+    assemblyai_key = getattr(client.settings.api_keys, 'assemblyai_api_key', None)
+    if not assemblyai_key:
+        assemblyai_key = client.additional_settings.get('api_keys', {}).get('assemblyai_api_key')
+    if not assemblyai_key:
+        assemblyai_key = PLATFORM_ASSEMBLYAI_KEY
+        if assemblyai_key:
+            logger.info(f"Using platform AssemblyAI key for client {getattr(client, 'id', '?')}")
+    if not assemblyai_key:
+        raise ValueError("AssemblyAI API key not configured. Contact your administrator.")
+
+    # LLM key for translation (prefer Groq, fallback to others)
+    llm_key = None
+    llm_provider = "groq"
+    if client.settings.api_keys.groq_api_key:
+        llm_key = client.settings.api_keys.groq_api_key
+        llm_provider = "groq"
+    elif client.settings.api_keys.openai_api_key:
+        llm_key = client.settings.api_keys.openai_api_key
+        llm_provider = "openai"
+    elif client.settings.api_keys.deepinfra_api_key:
+        llm_key = client.settings.api_keys.deepinfra_api_key
+        llm_provider = "deepinfra"
+
+    if not llm_key and needs_translation:
+        raise ValueError(
+            "Translation requires an LLM API key (Groq, OpenAI, or DeepInfra). Add one in Settings → API Keys."
+        )
+
+    return LinguaService(
+        assemblyai_api_key=assemblyai_key,
+        llm_api_key=llm_key or "",
+        llm_provider=llm_provider,
+    )
+
+
+async def store_lingua_outputs(
+    result: LinguaResult,
+    client_sb: Any,
+    client_id: str,
+    output_formats: Optional[List[str]] = None,
+) -> None:
+    """
+    Write each language's subtitle files to ``LINGUA_OUTPUT_BUCKET`` once,
+    streamed cue by cue, recording the storage paths on ``result``.
+    """
+    formats = [f for f in (output_formats or list(SUBTITLE_FORMATS)) if f in SUBTITLE_FORMATS]
+    for lang_code, segments in result.languages().items():
+        for output_format in formats:
+            generate, content_type = SUBTITLE_FORMATS[output_format]
+            path = f"lingua/{client_id}/{result.run_id}/{lang_code}.{output_format}"
+            size = await upload_generated(
+                client_sb,
+                LINGUA_OUTPUT_BUCKET,
+                path,
+                f"{content_type}; charset=utf-8",
+                lambda: (cue.encode("utf-8") for cue in generate(segments)),
+            )
+            result.output_paths(output_format)[lang_code] = path
+            logger.info(f"Stored LINGUA {output_format} for {lang_code}: {path} ({size} bytes)")
+
+
+def output_path_map(result: LinguaResult) -> Dict[str, Dict[str, str]]:
+    """Stored object paths per language and format; saved with results instead of expiring URLs."""
+    paths: Dict[str, Dict[str, str]] = {}
+    for output_format in SUBTITLE_FORMATS:
+        for lang_code, path in result.output_paths(output_format).items():
+            paths.setdefault(lang_code, {})[output_format] = path
+    return paths
+
+
+async def sign_output_paths(client_sb: Any, paths: List[str]) -> Dict[str, str]:
+    """Signed download URLs for objects in ``LINGUA_OUTPUT_BUCKET``, keyed by path."""
+    if not paths:
+        return {}
+    responses = await asyncio.to_thread(
+        client_sb.storage.from_(LINGUA_OUTPUT_BUCKET).create_signed_urls,
+        paths,
+        SIGNED_URL_TTL_SECONDS,
+    )
+    return {item["path"]: item["signedURL"] for item in responses if not item.get("error")}
+
+
+async def sign_lingua_history(client_sb: Any, messages: List[Dict[str, Any]]) -> None:
+    """
+    Give saved LINGUA widget messages fresh download URLs, signed from their
+    stored ``output_paths`` as the history is read.
+    """
+    widgets = []
+    for message in messages:
+        metadata = message.get("metadata")
+        widget = metadata.get("widget") if isinstance(metadata, dict) else None
+        data = widget.get("data") if isinstance(widget, dict) and widget.get("type") == "lingua" else None
+        if isinstance(data, dict) and data.get("output_paths"):
+            widgets.append(data)
+    if not widgets:
+        return
+    try:
+        signed = await sign_output_paths(
+            client_sb,
+            [path for data in widgets for formats in data["output_paths"].values() for path in formats.values()],
+        )
+    except Exception as e:
+        logger.warning(f"Could not sign LINGUA outputs in history: {e}")
+        signed = {}
+    for data in widgets:
+        data["download_urls"] = {
+            lang_code: {fmt: signed[path] for fmt, path in formats.items() if path in signed}
+            for lang_code, formats in data["output_paths"].items()
+        }
+
+
 def get_available_transcription_languages() -> Dict[str, str]:
     """Return available transcription languages."""
     return TRANSCRIPTION_LANGUAGES.copy()
@@ -0,0 +1,201 @@
+"""
+Media Run Worker
+
+Handlers that execute queued Lingua, Content Catalyst and Image Catalyst runs
+from the shared media run registry. API keys are resolved from the client
+record at execution time, so queued run params never carry secrets.
+
+Runs inside the API process by default; set ``MEDIA_RUN_WORKERS=0`` on API
+replicas and run ``python -m app.services.media_run_worker`` to execute runs
+in dedicated worker processes instead.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Set
+
+from app.services.job_queue import get_job_notifier
+from app.services.media_runs import MediaRunStore, MediaRunWorker, ParkRun, RunUpdate, get_media_run_store
+
+logger = logging.getLogger(__name__)
+
+LINGUA_RUN = "lingua"
+CONTENT_CATALYST_RUN = "content_catalyst"
+IMAGE_CATALYST_RUN = "image_catalyst"
+
+# With completion webhooks a parked transcript is only re-checked this often
+TRANSCRIPT_FALLBACK_POLL_SECONDS = 300.0
+TRANSCRIPT_MAX_WAIT_SECONDS = 3600.0
+
+CONTENT_CATALYST_PHASES = ["research", "architecture", "drafting", "integrity", "polishing", "complete"]
+
+DEFAULT_CONCURRENCY = {
+    LINGUA_RUN: 4,
+    CONTENT_CATALYST_RUN: 2,
+    IMAGE_CATALYST_RUN: 4,
+}
+
+
+async def run_lingua(run: Dict[str, Any], update: RunUpdate) -> Dict[str, Any]:
+    from app.core.dependencies import get_client_service
+    from app.services.lingua_service import lingua_service_for_client, store_lingua_outputs
+    from app.services.media_segmenter import plan_long_media
+
+    params = run["params"]
+    client = await get_client_service().get_client(params["client_id"])
+    if not client:
+        raise ValueError(f"Client {params['client_id']} not found")
+    service = lingua_service_for_client(client, needs_translation=bool(params.get("target_languages")))
+
+    # Long media is split into concurrent segment jobs (polled); otherwise one job, via webhook when enabled
+    plan = None if run.get("transcript_id") else await plan_long_media(params["audio_url"])
+    transcript = None if plan else await _webhook_transcript(run, service, update)
+    result = await service.process_full(
+        audio_url=params["audio_url"],
+        source_language=params.get("source_language"),
+        target_languages=params.get("target_languages") or None,
+        run_id=run["run_id"],
+        progress=update,
+        transcript=transcript,
+        plan=plan,
+    )
+    if result.status == "complete":
+        # Status responses link to these files instead of carrying subtitle content
+        try:
+            client_sb = await get_client_service().get_client_supabase_client(params["client_id"], auto_sync=False)
+            await store_lingua_outputs(result, client_sb, params["client_id"], params.get("output_formats"))
+        except Exception as e:
+            logger.warning(f"[LINGUA] Could not store outputs for run {run['run_id']}; downloads will stream from the API: {e}")
+    return {"status": result.status, "error": result.error, "result": result.to_dict()}
+
+
+async def _webhook_transcript(run: Dict[str, Any], service: Any, update: RunUpdate) -> Optional[Any]:
+    """
+    Webhook-completion transcription: submit with a callback and park the run
+    until AssemblyAI calls back (or the fallback re-check), then return the
+    finished transcript. None when webhooks are disabled (the service polls).
+    """
+    from app.services.assemblyai_webhooks import webhook_for_run
+    from app.services.lingua_service import LINGUA_STATUS_PROGRESS
+
+    params = run["params"]
+    transcript_id = run.get("transcript_id")
+    if not transcript_id:
+        webhook = webhook_for_run(run["run_id"])
+        if webhook is None:
+            return None
+        callback_url, auth = webhook
+        transcript_id = await service.assemblyai.submit_transcription(
+            audio_url=params["audio_url"],
+            language_code=params.get("source_language"),
+            webhook_url=callback_url,
+            webhook_auth=auth,
+        )
+        logger.info(f"[LINGUA] Run {run['run_id']} waiting on AssemblyAI transcript {transcript_id}")
+        percent, phase = LINGUA_STATUS_PROGRESS["transcribing"]
+        # Recorded before parking: a crash must not resubmit, and an early callback must match
+        await update(
+            status="transcribing",
+            progress_percent=percent,
+            current_phase=phase,
+            transcript_id=transcript_id,
+            transcript_submitted_at=time.time(),
+        )
+        raise ParkRun(TRANSCRIPT_FALLBACK_POLL_SECONDS)
+
+    result = await service.assemblyai.get_transcription_status(transcript_id)
+    status = result.get("status")
+    if status == "error":
+        raise Exception(f"Transcription failed: {result.get('error', 'Unknown error')}")
+    if status != "completed":
+        if time.time() - float(run.get("transcript_submitted_at") or 0) > TRANSCRIPT_MAX_WAIT_SECONDS:
+            raise Exception(f"Transcription timed out after {TRANSCRIPT_MAX_WAIT_SECONDS:.0f} seconds")
+        raise ParkRun(TRANSCRIPT_FALLBACK_POLL_SECONDS)
+    return service.transcription_from_result(transcript_id, result, params.get("source_language"))
+
+
+async def run_content_catalyst(run: Dict[str, Any], update: RunUpdate) -> Dict[str, Any]:
+    from app.services.content_catalyst_service import (
+        ContentCatalystConfig,
+        SourceType,
+        get_content_catalyst_service,
+    )
+
+    params = run["params"]
+    service = await get_content_catalyst_service(params["client_id"], agent_id=params.get("agent_id"))
+    config = ContentCatalystConfig(**{**params["config"], "source_type": SourceType(params["config"]["source_type"])})
+
+    # The pipeline reports progress through a sync callback; forward it as run updates
+    pending: Set[asyncio.Task] = set()
+
+    def _progress(phase: str, status: str, message: str) -> None:
+        index = CONTENT_CATALYST_PHASES.index(phase) if phase in CONTENT_CATALYST_PHASES else 0
+        task = asyncio.create_task(update(
+            current_phase=phase,
+            phase_status=status,
+            phase_message=message,
+            phases_completed=CONTENT_CATALYST_PHASES[:index],
+            progress_percent=min(95, index * 20),
+        ))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+
+    try:
+        _, article_1, article_2 = await service.run_full_pipeline(
+            config=config,
+            run_id=run["run_id"],
+            agent_id=params.get("agent_id"),
+            user_id=params.get("user_id"),
+            conversation_id=params.get("conversation_id"),
+            session_id=params.get("session_id"),
+            progress_callback=_progress,
+        )
+    finally:
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    return {
+        "current_phase": "complete",
+        "phases_completed": CONTENT_CATALYST_PHASES[:-1],
+        "result": {"article_1": article_1, "article_2": article_2},
+    }
+
+
+async def run_image_catalyst(run: Dict[str, Any], update: RunUpdate) -> Dict[str, Any]:
+    from app.services.image_catalyst_service import ImageCatalystService, ImageMode
+
+    params = dict(run["params"])
+    params["mode"] = ImageMode(params["mode"])
+    await update(current_phase="Generating image...", progress_percent=20)
+    result = await ImageCatalystService().generate(**params)
+    return {"status": result.status, "error": result.error, "result": result.to_dict()}
+
+
+def build_media_run_worker(
+    store: Optional[MediaRunStore] = None,
+    concurrency: Optional[Dict[str, int]] = None,
+) -> MediaRunWorker:
+    """Worker with the Lingua, Content Catalyst and Image Catalyst handlers registered."""
+    worker = MediaRunWorker(store or get_media_run_store(), notifier=get_job_notifier())
+    limits = {**DEFAULT_CONCURRENCY, **(concurrency or {})}
+    worker.register(LINGUA_RUN, run_lingua, concurrency=limits[LINGUA_RUN])
+    worker.register(CONTENT_CATALYST_RUN, run_content_catalyst, concurrency=limits[CONTENT_CATALYST_RUN])
+    worker.register(IMAGE_CATALYST_RUN, run_image_catalyst, concurrency=limits[IMAGE_CATALYST_RUN])
+    return worker
+
+
+def in_process_workers_enabled() -> bool:
+    return (os.getenv("MEDIA_RUN_WORKERS") or "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+async def _main() -> None:
+    worker = build_media_run_worker()
+    try:
+        await worker.run()
+    finally:
+        await worker.store.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
@@ -0,0 +1,736 @@
+"""
+Media Run Registry
+
+Shared run state and worker pool for long media jobs (Lingua transcription,
+Content Catalyst articles, Image Catalyst generations), so any API replica can
+start, execute, report on and stream a run.
+
+- ``MediaRunStore`` holds one JSON record per run plus an append-only stream
+  of progress events. Redis-backed when ``MEDIA_RUN_BACKEND=redis``; the
+  default ``memory`` store keeps the single-process behaviour.
+- Runs are queued per kind and claimed with a lease that the executing worker
+  renews; a worker that dies mid-run lets the lease lapse and the run is
+  picked up again (up to ``max_attempts``). Each claim stamps a fresh lease
+  token on the record and the worker's writes are fenced on it, so a worker
+  whose lease lapsed cannot overwrite the run once it has been reclaimed.
+- ``MediaRunWorker`` executes claimed runs on the shared ``JobQueue`` runner,
+  woken by the job notifier on submit. It runs inside the API process unless
+  ``MEDIA_RUN_WORKERS=0``, in which case a separate
+  ``python -m app.services.media_run_worker`` process does the work.
+- A handler waiting on an external service (e.g. an AssemblyAI transcript)
+  raises ``ParkRun``: the run frees its worker slot and sleeps in the lease
+  set until ``resume_media_run`` (called from a webhook) requeues it, or the
+  park lapses and a worker re-checks it as a slow fallback.
+- ``stream_media_run_events`` turns the event stream into Server-Sent Events
+  so clients follow progress without polling.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.services.job_queue import JobNotifier, JobQueue
+from app.utils.redis_url import redis_url_from_env
+
+logger = logging.getLogger(__name__)
+
+MEDIA_RUNS_CHANNEL = "media_runs"
+TERMINAL_STATUSES = frozenset({"complete", "failed"})
+
+# Record fields left out of progress events (results can be megabytes of transcript)
+_EVENT_EXCLUDED_FIELDS = frozenset({"params", "result", "lease"})
+
+RunUpdate = Callable[..., Awaitable[Optional[Dict[str, Any]]]]
+# record -> (fields to merge or None, queue commands to run in the same transaction or None)
+TransactPlan = Callable[[Dict[str, Any]], Tuple[Optional[Dict[str, Any]], Optional[Callable[[Any], None]]]]
+MediaRunHandler = Callable[[Dict[str, Any], RunUpdate], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class LeaseLost(RuntimeError):
+    """The run was reclaimed by another worker; the caller's lease token is stale."""
+
+
+class ParkRun(Exception):
+    """
+    Raised by a handler to suspend a run until it is resumed or ``resume_after``
+    seconds pass; ``fields`` are merged into the record while it is parked.
+    """
+
+    def __init__(self, resume_after: float, **fields: Any) -> None:
+        super().__init__(f"parked for {resume_after}s")
+        self.resume_after = resume_after
+        self.fields = fields
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _check_lease(record: Dict[str, Any], lease: Optional[str]) -> None:
+    """Fencing check for writes made under a claim (``lease=None`` writes unconditionally)."""
+    if lease is not None and record.get("lease") != lease:
+        raise LeaseLost(f"media run {record['run_id']} was reclaimed by another worker")
+
+
+def _event_for(record: Dict[str, Any], fields: Dict[str, Any]) -> Dict[str, Any]:
+    event = {k: v for k, v in fields.items() if k not in _EVENT_EXCLUDED_FIELDS}
+    event.update(
+        run_id=record["run_id"],
+        kind=record["kind"],
+        status=record.get("status"),
+        progress_percent=record.get("progress_percent", 0),
+        current_phase=record.get("current_phase"),
+    )
+    if record.get("status") in TERMINAL_STATUSES:
+        event["done"] = True
+        event["error"] = record.get("error")
+    return event
+
+
+class MediaRunStore(ABC):
+    """Run records, progress events and the per-kind run queue."""
+
+    RUN_TTL_SECONDS = 7 * 24 * 3600
+
+    @staticmethod
+    def _new_record(kind: str, params: Dict[str, Any], run_id: Optional[str], fields: Dict[str, Any]) -> Dict[str, Any]:
+        now = _now_iso()
+        record = {
+            "run_id": run_id or str(uuid.uuid4()),
+            "kind": kind,
+            "status": "pending",
+            "progress_percent": 0,
+            "current_phase": None,
+            "attempts": 0,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+            "params": params,
+        }
+        record.update(fields)
+        return record
+
+    @abstractmethod
+    async def create(self, kind: str, params: Dict[str, Any], *, run_id: Optional[str] = None, **fields: Any) -> Dict[str, Any]:
+        """Record a new run and queue it for a worker."""
+
+    @abstractmethod
+    async def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Current record for ``run_id`` (None when unknown or expired)."""
+
+    @abstractmethod
+    async def update(self, run_id: str, *, lease: Optional[str] = None, **fields: Any) -> Optional[Dict[str, Any]]:
+        """
+        Merge ``fields`` into the record and publish a progress event.
+
+        With ``lease`` (the token ``claim`` stamped on the record) the write is
+        applied only while that claim is current; otherwise ``LeaseLost``.
+        """
+
+    @abstractmethod
+    async def events(self, run_id: str, after: Optional[str], timeout: float) -> List[Tuple[str, Dict[str, Any]]]:
+        """Events after id ``after`` (all when None), waiting up to ``timeout`` for the first."""
+
+    @abstractmethod
+    async def claim(self, kind: str, limit: int, lease_seconds: float) -> List[Dict[str, Any]]:
+        """
+        Take up to ``limit`` queued runs of ``kind`` (including ones whose lease
+        lapsed); each returned record carries its new ``lease`` token.
+        """
+
+    @abstractmethod
+    async def renew(self, kind: str, run_id: str, lease_seconds: float, lease: Optional[str] = None) -> None:
+        """Extend the lease on a run being executed (``LeaseLost`` when ``lease`` is stale)."""
+
+    @abstractmethod
+    async def release(self, kind: str, run_id: str, lease: Optional[str] = None) -> None:
+        """Drop the lease once a run has finished (``LeaseLost`` when ``lease`` is stale)."""
+
+    @abstractmethod
+    async def park(
+        self, kind: str, run_id: str, resume_after: float, lease: Optional[str] = None, **fields: Any
+    ) -> bool:
+        """
+        Hold a run out of the queue until ``resume_after``, merging ``fields``
+        (marked ``parked``) into the record in the same step, so a resume never
+        sees a resumable run without them. A resume that arrived while the run
+        was still executing requeues it straight away instead (returns True).
+        """
+
+    @abstractmethod
+    async def resume(self, kind: str, run_id: str, **fields: Any) -> bool:
+        """
+        Merge ``fields`` and move a parked run to the front of the queue. When
+        the run is not parked yet, the request is remembered (``resume_pending``)
+        for its ``park`` and False is returned.
+        """
+
+    async def close(self) -> None:
+        """Release connections."""
+
+
+class InMemoryMediaRunStore(MediaRunStore):
+    """Process-local store; one API process with in-process workers, and tests."""
+
+    def __init__(self) -> None:
+        self._runs: Dict[str, Dict[str, Any]] = {}
+        self._events: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+        self._pending: Dict[str, Deque[str]] = {}
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._seq = 0
+        self._changed = asyncio.Condition()
+
+    async def _append(self, record: Dict[str, Any], fields: Dict[str, Any]) -> None:
+        self._seq += 1
+        self._events.setdefault(record["run_id"], []).append((str(self._seq), _event_for(record, fields)))
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def create(self, kind: str, params: Dict[str, Any], *, run_id: Optional[str] = None, **fields: Any) -> Dict[str, Any]:
+        record = self._new_record(kind, params, run_id, fields)
+        self._runs[record["run_id"]] = record
+        self._pending.setdefault(kind, deque()).append(record["run_id"])
+        await self._append(record, {})
+        return dict(record)
+
+    async def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        record = self._runs.get(run_id)
+        return dict(record) if record is not None else None
+
+    async def update(self, run_id: str, *, lease: Optional[str] = None, **fields: Any) -> Optional[Dict[str, Any]]:
+        record = self._runs.get(run_id)
+        if record is None:
+            return None
+        _check_lease(record, lease)
+        record.update(fields, updated_at=_now_iso())
+        await self._append(record, fields)
+        return dict(record)
+
+    async def events(self, run_id: str, after: Optional[str], timeout: float) -> List[Tuple[str, Dict[str, Any]]]:
+        def _after() -> List[Tuple[str, Dict[str, Any]]]:
+            floor = int(after) if after else 0
+            return [(eid, event) for eid, event in self._events.get(run_id, []) if int(eid) > floor]
+
+        found = _after()
+        if found or timeout <= 0:
+            return found
+        try:
+            async with self._changed:
+                await asyncio.wait_for(self._changed.wait_for(lambda: bool(_after())), timeout)
+        except asyncio.TimeoutError:
+            return []
+        return _after()
+
+    async def claim(self, kind: str, limit: int, lease_seconds: float) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        pending = self._pending.setdefault(kind, deque())
+        for run_id, (lease_kind, deadline) in list(self._leases.items()):
+            if lease_kind == kind and deadline < now:
+                del self._leases[run_id]
+                pending.appendleft(run_id)
+
+        claimed: List[Dict[str, Any]] = []
+        while pending and len(claimed) < limit:
+            run_id = pending.popleft()
+            record = self._runs.get(run_id)
+            if record is None or record.get("status") in TERMINAL_STATUSES:
+                continue
+            self._leases[run_id] = (kind, now + lease_seconds)
+            record["lease"] = uuid.uuid4().hex
+            claimed.append(dict(record))
+        return claimed
+
+    def _fence(self, run_id: str, lease: Optional[str]) -> None:
+        record = self._runs.get(run_id)
+        if record is not None:
+            _check_lease(record, lease)
+
+    async def renew(self, kind: str, run_id: str, lease_seconds: float, lease: Optional[str] = None) -> None:
+        self._fence(run_id, lease)
+        if run_id in self._leases:
+            self._leases[run_id] = (kind, time.monotonic() + lease_seconds)
+
+    async def release(self, kind: str, run_id: str, lease: Optional[str] = None) -> None:
+        self._fence(run_id, lease)
+        self._leases.pop(run_id, None)
+
+    async def park(
+        self, kind: str, run_id: str, resume_after: float, lease: Optional[str] = None, **fields: Any
+    ) -> bool:
+        record = self._runs.get(run_id)
+        if record is None:
+            return False
+        _check_lease(record, lease)
+        requeued = bool(record.get("resume_pending"))
+        if requeued:
+            self._leases.pop(run_id, None)
+            self._pending.setdefault(kind, deque()).appendleft(run_id)
+        else:
+            self._leases[run_id] = (kind, time.monotonic() + resume_after)
+        fields = {**fields, "parked": True}
+        record.update(fields, resume_pending=False, updated_at=_now_iso())
+        await self._append(record, fields)
+        return requeued
+
+    async def resume(self, kind: str, run_id: str, **fields: Any) -> bool:
+        record = self._runs.get(run_id)
+        if record is None:
+            return False
+        resumed = bool(record.get("parked")) and self._leases.pop(run_id, None) is not None
+        if resumed:
+            self._pending.setdefault(kind, deque()).appendleft(run_id)
+        record.update(fields, resume_pending=not resumed, updated_at=_now_iso())
+        await self._append(record, fields)
+        return resumed
+
+
+# Requeue lapsed leases, then move up to ARGV[3] ids from the pending list to the lease set
+_CLAIM_SCRIPT = """
+local now = tonumber(ARGV[1])
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)
+for _, id in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], id)
+    redis.call('LPUSH', KEYS[1], id)
+end
+local claimed = {}
+for i = 1, tonumber(ARGV[3]) do
+    local id = redis.call('LPOP', KEYS[1])
+    if not id then break end
+    redis.call('ZADD', KEYS[2], tonumber(ARGV[2]), id)
+    table.insert(claimed, id)
+end
+return claimed
+"""
+
+# Move a leased id back to the head of the pending list (atomic against a concurrent claim)
+_RESUME_SCRIPT = """
+if redis.call('ZREM', KEYS[2], ARGV[1]) == 1 then
+    redis.call('LPUSH', KEYS[1], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+
+class RedisMediaRunStore(MediaRunStore):
+    """
+    Redis-backed store shared by every API replica and worker.
+
+    Records are JSON strings, events a capped stream per run, the queue a list
+    per kind and leases a sorted set scored by lease deadline.
+    """
+
+    EVENTS_MAXLEN = 500
+
+    def __init__(self, redis_url: str) -> None:
+        import redis.asyncio as aioredis
+
+        self._redis = aioredis.from_url(redis_url, decode_responses=True)
+
+    @staticmethod
+    def _run_key(run_id: str) -> str:
+        return f"media_run:{run_id}"
+
+    @staticmethod
+    def _events_key(run_id: str) -> str:
+        return f"media_run:{run_id}:events"
+
+    @staticmethod
+    def _queue_keys(kind: str) -> Tuple[str, str]:
+        return f"media_runs:{kind}:pending", f"media_runs:{kind}:leases"
+
+    def _write(self, pipe: Any, record: Dict[str, Any], fields: Dict[str, Any], publish: bool = True) -> None:
+        run_id = record["run_id"]
+        pipe.set(self._run_key(run_id), json.dumps(record, default=str), ex=self.RUN_TTL_SECONDS)
+        if not publish:
+            return
+        pipe.xadd(
+            self._events_key(run_id),
+            {"event": json.dumps(_event_for(record, fields), default=str)},
+            maxlen=self.EVENTS_MAXLEN,
+            approximate=True,
+        )
+        pipe.expire(self._events_key(run_id), self.RUN_TTL_SECONDS)
+
+    async def create(self, kind: str, params: Dict[str, Any], *, run_id: Optional[str] = None, **fields: Any) -> Dict[str, Any]:
+        record = self._new_record(kind, params, run_id, fields)
+        pipe = self._redis.pipeline()
+        self._write(pipe, record, {})
+        pipe.rpush(self._queue_keys(kind)[0], record["run_id"])
+        await pipe.execute()
+        return record
+
+    async def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self._redis.get(self._run_key(run_id))
+        return json.loads(raw) if raw else None
+
+    async def _transact(self, run_id: str, lease: Optional[str], plan: TransactPlan, publish: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Read-check-write the record under WATCH. ``plan(record)`` returns the
+        fields to merge and queue commands to run with them; the lease check,
+        the record and those commands commit together, or the step is retried
+        when another writer (a reclaiming worker, a webhook) got there first.
+        """
+        from redis.exceptions import WatchError
+
+        key = self._run_key(run_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    raw = await pipe.get(key)
+                    if not raw:
+                        return None
+                    record = json.loads(raw)
+                    _check_lease(record, lease)
+                    fields, queue_ops = plan(record)
+                    pipe.multi()
+                    if fields is not None:
+                        record.update(fields, updated_at=_now_iso())
+                        self._write(pipe, record, fields, publish)
+                    if queue_ops is not None:
+                        queue_ops(pipe)
+                    await pipe.execute()
+                    return record
+                except WatchError:
+                    continue
+
+    async def update(self, run_id: str, *, lease: Optional[str] = None, **fields: Any) -> Optional[Dict[str, Any]]:
+        return await self._transact(run_id, lease, lambda _record: (fields, None))
+
+    async def events(self, run_id: str, after: Optional[str], timeout: float) -> List[Tuple[str, Dict[str, Any]]]:
+        block = max(1, int(timeout * 1000)) if timeout > 0 else None
+        entries = await self._redis.xread({self._events_key(run_id): after or "0-0"}, block=block, count=100)
+        events: List[Tuple[str, Dict[str, Any]]] = []
+        for _stream, items in entries or []:
+            for entry_id, fields in items:
+                try:
+                    events.append((entry_id, json.loads((fields or {}).get("event") or "{}")))
+                except ValueError:
+                    logger.warning(f"Dropping malformed media run event {entry_id} for {run_id}")
+        return events
+
+    async def claim(self, kind: str, limit: int, lease_seconds: float) -> List[Dict[str, Any]]:
+        pending_key, lease_key = self._queue_keys(kind)
+        now = time.time()
+        run_ids = await self._redis.eval(_CLAIM_SCRIPT, 2, pending_key, lease_key, now, now + lease_seconds, limit)
+        claimed: List[Dict[str, Any]] = []
+        for run_id in run_ids or []:
+            # A new token fences off whoever held this run before its lease lapsed
+            token = uuid.uuid4().hex
+            record = await self._transact(run_id, None, lambda _record: ({"lease": token}, None), publish=False)
+            if record is None or record.get("status") in TERMINAL_STATUSES:
+                await self._redis.zrem(lease_key, run_id)
+                continue
+            claimed.append(record)
+        return claimed
+
+    async def renew(self, kind: str, run_id: str, lease_seconds: float, lease: Optional[str] = None) -> None:
+        lease_key = self._queue_keys(kind)[1]
+        await self._transact(
+            run_id,
+            lease,
+            lambda _record: (None, lambda pipe: pipe.zadd(lease_key, {run_id: time.time() + lease_seconds}, xx=True)),
+        )
+
+    async def release(self, kind: str, run_id: str, lease: Optional[str] = None) -> None:
+        lease_key = self._queue_keys(kind)[1]
+        if lease is None:
+            await self._redis.zrem(lease_key, run_id)
+            return
+        await self._transact(run_id, lease, lambda _record: (None, lambda pipe: pipe.zrem(lease_key, run_id)))
+
+    async def park(
+        self, kind: str, run_id: str, resume_after: float, lease: Optional[str] = None, **fields: Any
+    ) -> bool:
+        pending_key, lease_key = self._queue_keys(kind)
+        requeued = False
+
+        def plan(record: Dict[str, Any]):
+            nonlocal requeued
+            requeued = bool(record.get("resume_pending"))
+
+            def queue_ops(pipe: Any) -> None:
+                if requeued:
+                    pipe.eval(_RESUME_SCRIPT, 2, pending_key, lease_key, run_id)
+                else:
+                    pipe.zadd(lease_key, {run_id: time.time() + resume_after})
+
+            return {**fields, "parked": True, "resume_pending": False}, queue_ops
+
+        return await self._transact(run_id, lease, plan) is not None and requeued
+
+    async def resume(self, kind: str, run_id: str, **fields: Any) -> bool:
+        pending_key, lease_key = self._queue_keys(kind)
+        resumed = False
+
+        def plan(record: Dict[str, Any]):
+            nonlocal resumed
+            resumed = bool(record.get("parked"))
+            if not resumed:
+                return {**fields, "resume_pending": True}, None
+            # Same transaction; a no-op when a worker already reclaimed the lapsed park
+            return {**fields, "resume_pending": False}, lambda pipe: pipe.eval(
+                _RESUME_SCRIPT, 2, pending_key, lease_key, run_id
+            )
+
+        return await self._transact(run_id, None, plan) is not None and resumed
+
+    async def close(self) -> None:
+        await self._redis.close()
+
+
+_store: Optional[MediaRunStore] = None
+
+
+def get_media_run_store() -> MediaRunStore:
+    """Process-wide store selected by ``MEDIA_RUN_BACKEND`` (``redis`` or ``memory``)."""
+    global _store
+    if _store is not None:
+        return _store
+
+    backend = (os.getenv("MEDIA_RUN_BACKEND") or "memory").strip().lower()
+    if backend == "redis":
+        url = redis_url_from_env("MEDIA_RUN_REDIS_URL")
+        if url:
+            try:
+                _store = RedisMediaRunStore(url)
+            except Exception as e:
+                logger.warning(f"Media run store 'redis' unavailable; runs stay in this process: {e}")
+        else:
+            logger.warning("MEDIA_RUN_BACKEND=redis but no Redis URL configured; runs stay in this process")
+    if _store is None:
+        _store = InMemoryMediaRunStore()
+    return _store
+
+
+# ---------------------------------------------------------------------------
+# Workers
+# ---------------------------------------------------------------------------
+
+
+class MediaRunWorker:
+    """
+    Executes queued media runs.
+
+    Handlers receive the run record and an ``update(**fields)`` coroutine for
+    progress; whatever dict they return is merged into the final record
+    (status defaults to ``complete``). Exceptions mark the run failed.
+
+    Args:
+        store: Run registry to claim from
+        notifier: Wakeup source; None means interval polling only
+        lease_seconds: Claim lease, renewed while a handler runs
+        max_attempts: Executions (including ones cut short by a crash) before a run is failed
+    """
+
+    def __init__(
+        self,
+        store: MediaRunStore,
+        notifier: Optional[JobNotifier] = None,
+        lease_seconds: float = 120.0,
+        max_attempts: int = 2,
+        fallback_interval: Optional[float] = None,
+    ) -> None:
+        self.store = store
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, MediaRunHandler] = {}
+        self.queue = JobQueue(
+            channel=MEDIA_RUNS_CHANNEL,
+            claim=self._claim,
+            notifier=notifier,
+            # Lapsed leases are only noticed on a claim pass, so keep the safety poll modest
+            fallback_interval=fallback_interval or (30.0 if notifier else 2.0),
+        )
+
+    def register(self, kind: str, handler: MediaRunHandler, concurrency: int = 2) -> None:
+        self._handlers[kind] = handler
+        self.queue.register(kind, partial(self._execute, kind), concurrency=concurrency)
+
+    def wake(self) -> None:
+        self.queue.wake()
+
+    def stop(self) -> None:
+        self.queue.stop()
+
+    async def run(self) -> None:
+        logger.info(f"MediaRunWorker {self.worker_id} started for {sorted(self._handlers)}")
+        try:
+            await self.queue.run()
+        finally:
+            logger.info(f"MediaRunWorker {self.worker_id} stopped")
+
+    async def _claim(self, kind: str, limit: int) -> List[Dict[str, Any]]:
+        return await self.store.claim(kind, limit, self.lease_seconds)
+
+    async def _keep_lease(self, kind: str, run_id: str, lease: Optional[str]) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await self.store.renew(kind, run_id, self.lease_seconds, lease=lease)
+            except LeaseLost as e:
+                logger.warning(f"Stopped renewing media run {run_id}: {e}")
+                return
+            except Exception as e:
+                logger.warning(f"Could not renew lease on media run {run_id}: {e}")
+
+    async def _execute(self, kind: str, run: Dict[str, Any]) -> None:
+        run_id = run["run_id"]
+        lease = run.get("lease")
+        update = partial(self.store.update, run_id, lease=lease)
+        attempts = int(run.get("attempts") or 0) + 1
+        try:
+            if attempts > self.max_attempts:
+                logger.error(f"Media run {run_id} abandoned after {attempts - 1} attempts")
+                await update(status="failed", current_phase="Failed", error="Run was interrupted and could not be resumed")
+                await self.store.release(kind, run_id, lease=lease)
+                return
+            await self._run_handler(kind, run, lease, attempts)
+        except LeaseLost as e:
+            # Another worker owns the run now; leave its record and lease alone
+            logger.warning(f"Media run {run_id} ({kind}) abandoned by {self.worker_id}: {e}")
+
+    async def _run_handler(self, kind: str, run: Dict[str, Any], lease: Optional[str], attempts: int) -> None:
+        run_id = run["run_id"]
+        update = partial(self.store.update, run_id, lease=lease)
+        keeper = asyncio.create_task(self._keep_lease(kind, run_id, lease))
+        release = True
+        try:
+            run = await update(
+                status="running" if not run.get("parked") else run["status"],
+                attempts=attempts,
+                worker_id=self.worker_id,
+                parked=False,
+                # A resume requested before this execution started is served by it
+                resume_pending=False,
+            ) or run
+            outcome = await self._handlers[kind](run, update) or {}
+            final = {"status": "complete", "progress_percent": 100, "current_phase": "Complete", **outcome}
+            if final["status"] == "failed":
+                final.update(progress_percent=0, current_phase="Failed")
+            await update(**final)
+        except ParkRun as park:
+            # Waiting on an external service is not a failed attempt
+            release = False
+            keeper.cancel()
+            if await self.store.park(kind, run_id, park.resume_after, lease=lease, attempts=attempts - 1, **park.fields):
+                self.wake()
+        except LeaseLost:
+            release = False
+            raise
+        except Exception as e:
+            logger.error(f"Media run {run_id} ({kind}) failed: {e}", exc_info=True)
+            await update(status="failed", progress_percent=0, current_phase="Failed", error=str(e))
+        finally:
+            keeper.cancel()
+            if release:
+                await self.store.release(kind, run_id, lease=lease)
+
+
+_local_worker: Optional[MediaRunWorker] = None
+
+
+def set_local_media_run_worker(worker: Optional[MediaRunWorker]) -> None:
+    """Register the worker running in this process so submissions wake it directly."""
+    global _local_worker
+    _local_worker = worker
+
+
+async def submit_media_run(
+    kind: str,
+    params: Dict[str, Any],
+    *,
+    run_id: Optional[str] = None,
+    store: Optional[MediaRunStore] = None,
+    **fields: Any,
+) -> Dict[str, Any]:
+    """Record and queue a run, then wake workers. ``params`` must not carry secrets."""
+    store = store or get_media_run_store()
+    record = await store.create(kind, params, run_id=run_id, **fields)
+    if _local_worker is not None:
+        _local_worker.wake()
+    try:
+        from app.services.job_queue import publish_job_notification
+
+        await publish_job_notification(MEDIA_RUNS_CHANNEL, {"kind": kind, "run_id": record["run_id"]})
+    except Exception as e:
+        logger.warning(f"Could not notify media run workers: {e}")
+    return record
+
+
+async def resume_media_run(kind: str, run_id: str, store: Optional[MediaRunStore] = None, **fields: Any) -> bool:
+    """
+    Requeue a parked run now (e.g. from a completion webhook), merging
+    ``fields`` into its record in the same step. False when the run is not
+    parked yet; it is then requeued as soon as it parks.
+    """
+    store = store or get_media_run_store()
+    record = await store.get(run_id)
+    if not record or record.get("kind") != kind:
+        return False
+    if not await store.resume(kind, run_id, **fields):
+        return False
+    if _local_worker is not None:
+        _local_worker.wake()
+    try:
+        from app.services.job_queue import publish_job_notification
+
+        await publish_job_notification(MEDIA_RUNS_CHANNEL, {"kind": kind, "run_id": run_id})
+    except Exception as e:
+        logger.warning(f"Could not notify media run workers: {e}")
+    return True
+
+
+async def wait_for_media_run(run_id: str, timeout: float, store: Optional[MediaRunStore] = None) -> Optional[Dict[str, Any]]:
+    """Block until the run finishes (or ``timeout``) and return its record."""
+    store = store or get_media_run_store()
+    deadline = time.monotonic() + timeout
+    after: Optional[str] = None
+    while True:
+        record = await store.get(run_id)
+        if record is None or record.get("status") in TERMINAL_STATUSES:
+            return record
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return record
+        for event_id, _event in await store.events(run_id, after, min(remaining, 15.0)):
+            after = event_id
+
+
+async def stream_media_run_events(
+    run_id: str,
+    last_event_id: Optional[str] = None,
+    heartbeat_seconds: float = 15.0,
+    store: Optional[MediaRunStore] = None,
+) -> AsyncIterator[str]:
+    """
+    Server-Sent Events for a run: every progress event (resumable through
+    ``Last-Event-ID``), comment heartbeats while idle, closing after the
+    terminal event.
+    """
+    store = store or get_media_run_store()
+    after = last_event_id
+    while True:
+        events = await store.events(run_id, after, heartbeat_seconds)
+        if not events:
+            record = await store.get(run_id)
+            if record is None:
+                yield f"event: error\ndata: {json.dumps({'run_id': run_id, 'error': 'Run not found'})}\n\n"
+                return
+            yield ": keepalive\n\n"
+            continue
+        for event_id, event in events:
+            after = event_id
+            yield f"id: {event_id}\nevent: progress\ndata: {json.dumps(event, default=str)}\n\n"
+            if event.get("done"):
+                return
@@ -0,0 +1,205 @@
+"""
+Media Segmenter
+
+Plans long recordings as overlapping, silence-aligned windows so they can be
+transcribed concurrently (Lingua long-media mode).
+
+- The duration comes from an ``ffprobe`` header read first; only media at
+  least ``LONG_MEDIA_MIN_MS`` long gets the ``ffmpeg silencedetect`` pass,
+  which decodes the whole remote URL (nothing is downloaded to disk or held
+  in memory).
+- Cuts land in the longest silence near each target boundary (hard cut when
+  there is none), and each window extends ``overlap_ms`` past its cuts so a
+  word straddling a hard cut is still heard whole by one window.
+- Each window owns ``[keep_start_ms, keep_end_ms)``; words are kept by the
+  window owning their midpoint, so the overlap is never transcribed twice.
+- Without ffmpeg (or for short media) ``plan_long_media`` returns None and
+  callers fall back to a single transcription job.
+"""
+import asyncio
+import logging
+import os
+import re
+import shutil
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Media shorter than this goes through a single job (0 disables long-media mode)
+LONG_MEDIA_MIN_MS = int(float(os.getenv("LINGUA_LONG_MEDIA_MIN_SECONDS", "900")) * 1000)
+SEGMENT_TARGET_MS = 5 * 60 * 1000
+SEGMENT_OVERLAP_MS = 3000
+# How far either side of a target boundary to look for a silence to cut in
+SEGMENT_SEARCH_MS = 60 * 1000
+
+SILENCE_NOISE_DB = -35
+SILENCE_MIN_SECONDS = 0.4
+PROBE_TIMEOUT_SECONDS = 300.0
+DURATION_PROBE_TIMEOUT_SECONDS = 30.0
+
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+_SILENCE_START_RE = re.compile(r"silence_start:\s*(-?\d+(?:\.\d+)?)")
+_SILENCE_END_RE = re.compile(r"silence_end:\s*(\d+(?:\.\d+)?)")
+
+
+@dataclass(frozen=True)
+class MediaSegment:
+    """A window of the source media to transcribe on its own."""
+    index: int
+    start_ms: int
+    end_ms: int
+    keep_start_ms: int
+    keep_end_ms: int
+
+    def owns(self, start_ms: int, end_ms: int) -> bool:
+        midpoint = (start_ms + end_ms) / 2
+        return self.keep_start_ms <= midpoint < self.keep_end_ms
+
+
+def segmenter_available() -> bool:
+    return shutil.which("ffmpeg") is not None and shutil.which("ffprobe") is not None
+
+
+def plan_segments(
+    duration_ms: int,
+    silences: List[Tuple[int, int]],
+    target_ms: int = SEGMENT_TARGET_MS,
+    overlap_ms: int = SEGMENT_OVERLAP_MS,
+    search_ms: int = SEGMENT_SEARCH_MS,
+) -> List[MediaSegment]:
+    """Split ``[0, duration_ms)`` into windows of roughly ``target_ms``, cutting at silences."""
+    cuts = [0]
+    # Stop once the remainder fits comfortably in one window, so the tail is never a sliver
+    while duration_ms - cuts[-1] > target_ms * 1.5:
+        target = cuts[-1] + target_ms
+        nearby = [
+            (start, end) for start, end in silences
+            if abs((start + end) / 2 - target) <= search_ms and (start + end) / 2 > cuts[-1]
+        ]
+        if nearby:
+            start, end = max(nearby, key=lambda s: (s[1] - s[0], -abs((s[0] + s[1]) / 2 - target)))
+            cuts.append((start + end) // 2)
+        else:
+            cuts.append(target)
+    cuts.append(duration_ms)
+
+    return [
+        MediaSegment(
+            index=i,
+            start_ms=max(0, keep_start - overlap_ms),
+            end_ms=min(duration_ms, keep_end + overlap_ms),
+            keep_start_ms=keep_start,
+            # The last window owns everything after its start, even past the probed duration
+            keep_end_ms=keep_end if i < len(cuts) - 2 else keep_end + 24 * 3600 * 1000,
+        )
+        for i, (keep_start, keep_end) in enumerate(zip(cuts, cuts[1:]))
+    ]
+
+
+def parse_silencedetect(output: str) -> Tuple[Optional[int], List[Tuple[int, int]]]:
+    """``(duration_ms, [(silence_start_ms, silence_end_ms), ...])`` from ffmpeg's stderr."""
+    duration_ms = None
+    match = _DURATION_RE.search(output)
+    if match:
+        hours, minutes, seconds = match.groups()
+        duration_ms = int((int(hours) * 3600 + int(minutes) * 60 + float(seconds)) * 1000)
+
+    silences: List[Tuple[int, int]] = []
+    start: Optional[float] = None
+    for line in output.splitlines():
+        started = _SILENCE_START_RE.search(line)
+        if started:
+            start = max(0.0, float(started.group(1)))
+            continue
+        ended = _SILENCE_END_RE.search(line)
+        if ended and start is not None:
+            silences.append((int(start * 1000), int(float(ended.group(1)) * 1000)))
+            start = None
+    return duration_ms, silences
+
+
+async def probe_silences(
+    audio_url: str,
+    noise_db: int = SILENCE_NOISE_DB,
+    min_silence_seconds: float = SILENCE_MIN_SECONDS,
+    timeout: float = PROBE_TIMEOUT_SECONDS,
+) -> Optional[Tuple[int, List[Tuple[int, int]]]]:
+    """Run ffmpeg silence detection over the media; None when ffmpeg is missing or fails."""
+    if not segmenter_available():
+        return None
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-nostdin", "-hide_banner", "-nostats", "-vn",
+        "-i", audio_url,
+        "-af", f"silencedetect=noise={noise_db}dB:d={min_silence_seconds}",
+        "-f", "null", "-",
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        _, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        logger.warning(f"Silence detection timed out after {timeout:.0f}s for {audio_url[:50]}")
+        return None
+    if process.returncode != 0:
+        logger.warning(f"Silence detection failed (exit {process.returncode}) for {audio_url[:50]}")
+        return None
+
+    duration_ms, silences = parse_silencedetect(stderr.decode("utf-8", errors="replace"))
+    if not duration_ms:
+        return None
+    return duration_ms, silences
+
+
+async def probe_duration(audio_url: str, timeout: float = DURATION_PROBE_TIMEOUT_SECONDS) -> Optional[int]:
+    """Media duration in ms from the container header (ffprobe); None when unknown or ffprobe fails."""
+    if not segmenter_available():
+        return None
+    process = await asyncio.create_subprocess_exec(
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        audio_url,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        stdout, _ = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        logger.warning(f"Duration probe timed out after {timeout:.0f}s for {audio_url[:50]}")
+        return None
+    if process.returncode != 0:
+        logger.warning(f"Duration probe failed (exit {process.returncode}) for {audio_url[:50]}")
+        return None
+    try:
+        return int(float(stdout.decode("utf-8", errors="replace").strip()) * 1000)
+    except ValueError:
+        # "N/A" for streams without a duration in their header
+        return None
+
+
+async def plan_long_media(audio_url: str, min_duration_ms: int = LONG_MEDIA_MIN_MS) -> Optional[List[MediaSegment]]:
+    """Segment plan for long media, or None when a single transcription job should be used."""
+    if min_duration_ms <= 0:
+        return None
+    # Cheap header read first; silencedetect decodes the whole file, so it only runs for long media
+    header_ms = await probe_duration(audio_url)
+    if header_ms is None or header_ms < min_duration_ms:
+        return None
+    probed = await probe_silences(audio_url)
+    if probed is None:
+        return None
+    duration_ms, silences = probed
+    if duration_ms < min_duration_ms:
+        return None
+    segments = plan_segments(duration_ms, silences)
+    if len(segments) < 2:
+        return None
+    logger.info(
+        f"Long media ({duration_ms / 60000:.1f} min, {len(silences)} silences) split into {len(segments)} segments"
+    )
+    return segments
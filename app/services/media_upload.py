@@ -0,0 +1,414 @@
+"""
+Media Upload Pipeline
+
+Shared streaming upload path for the Lingua, Content Catalyst and Image
+Catalyst upload endpoints. An upload never sits in API memory as a whole:
+
+- The multipart part is read in fixed-size chunks (Starlette spools parts above
+  1MB to a temporary file, so only the chunk being sent is held in memory).
+- Declared MIME type and size are checked before anything is read; the real
+  size is enforced while streaming and the first bytes are sniffed, so a
+  renamed PDF or executable is rejected without being stored.
+- A sha256 of the payload is computed incrementally as chunks go out.
+- Files that fit in one chunk use the plain storage upload; larger ones go
+  through Supabase's TUS resumable endpoint one 6MB part at a time, and a
+  failed part is resumed from the offset the server reports.
+- Server-generated files (``upload_generated``) go the same way from a
+  re-iterable chunk source, so they are never materialized either.
+"""
+import asyncio
+import base64
+import hashlib
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Iterable, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException, UploadFile
+
+logger = logging.getLogger(__name__)
+
+# Supabase's TUS endpoint requires every part except the last to be exactly 6MB
+TUS_CHUNK_SIZE = 6 * 1024 * 1024
+TUS_PART_RETRIES = 3
+SIGNED_URL_TTL_SECONDS = 3600
+
+# (magic bytes, offset, media kind); checked in order against the first chunk
+_SIGNATURES: Tuple[Tuple[bytes, int, str], ...] = (
+    (b"\x89PNG\r\n\x1a\n", 0, "image"),
+    (b"\xff\xd8\xff", 0, "image"),
+    (b"GIF8", 0, "image"),
+    (b"II*\x00", 0, "image"),  # TIFF, little-endian
+    (b"MM\x00*", 0, "image"),  # TIFF, big-endian
+    (b"BM", 0, "image"),
+    (b"ID3", 0, "audio"),
+    (b"fLaC", 0, "audio"),
+    (b"OggS", 0, "audio"),
+    (b"\x1aE\xdf\xa3", 0, "audio"),  # WebM / Matroska
+    (b"#!AMR", 0, "audio"),
+    (b"%PDF", 0, "document"),
+    (b"PK\x03\x04", 0, "archive"),
+    (b"MZ", 0, "executable"),
+    (b"\x7fELF", 0, "executable"),
+)
+
+# ISO base media (``ftyp`` box) major brands that aren't plain MP4/QuickTime video
+_FTYP_BRANDS = {
+    b"M4A ": "audio",
+    b"M4B ": "audio",
+    b"M4P ": "audio",
+    b"F4A ": "audio",
+    b"heic": "image",
+    b"heix": "image",
+    b"hevc": "image",
+    b"heim": "image",
+    b"heis": "image",
+    b"mif1": "image",
+    b"msf1": "image",
+    b"avif": "image",
+    b"avis": "image",
+}
+
+# Kinds each policy media kind accepts besides its own: audio uploads are
+# transcribed from the audio track, which MP4/MOV video containers carry too
+_ACCEPTED_KINDS = {"audio": ("audio", "video")}
+
+
+def sniff_media_kind(head: bytes) -> Optional[str]:
+    """Best-effort media kind ("audio", "image", "video", ...) from a file's first bytes."""
+    if head[:4] == b"RIFF" and len(head) >= 12:
+        return {b"WAVE": "audio", b"WEBP": "image", b"AVI ": "video"}.get(head[8:12])
+    if head[4:8] == b"ftyp" and len(head) >= 12:
+        return _FTYP_BRANDS.get(head[8:12], "video")
+    for magic, offset, kind in _SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            return kind
+    # Bare MPEG audio frame (MP3 without ID3 tag, ADTS AAC)
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0:
+        return "audio"
+    text = head.lstrip(b"\xef\xbb\xbf \t\r\n")
+    if text.startswith(b"<svg") or (text.startswith(b"<?xml") and b"<svg" in text):
+        return "image"
+    return None
+
+
+def _kind_allowed(kind: str, policy: "UploadPolicy") -> bool:
+    return kind in _ACCEPTED_KINDS.get(policy.media_kind, (policy.media_kind,))
+
+
+@dataclass(frozen=True)
+class UploadPolicy:
+    """Per-endpoint rules for an upload."""
+
+    label: str
+    bucket: str
+    path_prefix: str
+    max_bytes: int
+    allowed_types: Tuple[str, ...]
+    media_kind: str
+    invalid_type_detail: str
+    too_large_detail: str  # may reference {size_mb}
+    default_content_type: str
+    default_ext: str
+    # Reject payloads whose first bytes match no known signature (images only;
+    # audio codecs are too varied to require one)
+    require_signature: bool = False
+
+
+@dataclass
+class StoredUpload:
+    """Result of a completed upload."""
+
+    bucket: str
+    path: str
+    size: int
+    sha256: str
+    content_type: str
+    signed_url: str
+
+
+def _declared_size(file: UploadFile) -> int:
+    size = getattr(file, "size", None)
+    if size is not None:
+        return size
+    # Older Starlette does not record the size; the spooled file can tell us
+    position = file.file.tell()
+    file.file.seek(0, 2)
+    size = file.file.tell()
+    file.file.seek(position)
+    return size
+
+
+def _ensure_bucket(client_sb: Any, bucket_name: str) -> bool:
+    try:
+        # Use minimal options - file_size_limit may exceed plan limits
+        result = client_sb.storage.create_bucket(bucket_name, options={"public": False})
+        logger.info(f"Created bucket '{bucket_name}': {result}")
+        return True
+    except Exception as e:
+        error_str = str(e).lower()
+        if "already exists" in error_str or "duplicate" in error_str:
+            logger.debug(f"Bucket '{bucket_name}' already exists")
+            return True
+        logger.warning(f"Could not create bucket '{bucket_name}': {e}")
+    try:
+        buckets = client_sb.storage.list_buckets()
+        bucket_names = [b.get('name') or b.get('id') for b in buckets]
+        return bucket_name in bucket_names
+    except Exception as list_err:
+        logger.warning(f"Could not list buckets: {list_err}")
+        return False
+
+
+class _TusUpload:
+    """One resumable upload session against Supabase storage."""
+
+    def __init__(self, http: httpx.AsyncClient, supabase_url: str, supabase_key: str):
+        self._http = http
+        self._endpoint = f"{supabase_url.rstrip('/')}/storage/v1/upload/resumable"
+        self._auth = {
+            "Authorization": f"Bearer {supabase_key}",
+            "apikey": supabase_key,
+            "tus-resumable": "1.0.0",
+        }
+        self.url: Optional[str] = None
+        self.offset = 0
+
+    async def create(self, bucket: str, path: str, content_type: str, length: int) -> None:
+        metadata = ",".join(
+            f"{key} {base64.b64encode(value.encode()).decode()}"
+            for key, value in (("bucketName", bucket), ("objectName", path), ("contentType", content_type))
+        )
+        resp = await self._http.post(
+            self._endpoint,
+            headers={**self._auth, "x-upsert": "true", "upload-length": str(length), "upload-metadata": metadata},
+        )
+        if resp.status_code not in (200, 201):
+            raise Exception(f"Failed to initiate resumable upload: {resp.text}")
+        self.url = resp.headers.get("location")
+        if not self.url:
+            raise Exception("No upload URL returned from TUS endpoint")
+
+    async def _server_offset(self) -> int:
+        resp = await self._http.head(self.url, headers=self._auth)
+        if resp.status_code not in (200, 204) or "upload-offset" not in resp.headers:
+            raise Exception(f"Could not resume upload: HEAD returned {resp.status_code}")
+        return int(resp.headers["upload-offset"])
+
+    async def send(self, chunk: bytes) -> None:
+        """Append ``chunk`` at the current offset, resuming from the server's offset on failure."""
+        start = self.offset
+        end = start + len(chunk)
+        last_error: Optional[str] = None
+        for attempt in range(TUS_PART_RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(0.5 * attempt)
+                try:
+                    self.offset = await self._server_offset()
+                except Exception as e:
+                    last_error = str(e)
+                    continue
+                if self.offset == end:
+                    return
+                if not start <= self.offset < end:
+                    raise Exception(f"Upload offset {self.offset} outside part {start}-{end}")
+            try:
+                resp = await self._http.patch(
+                    self.url,
+                    headers={
+                        **self._auth,
+                        "upload-offset": str(self.offset),
+                        "content-type": "application/offset+octet-stream",
+                    },
+                    content=chunk[self.offset - start:],
+                )
+            except httpx.HTTPError as e:
+                last_error = str(e)
+                continue
+            if resp.status_code in (200, 204):
+                self.offset = int(resp.headers.get("upload-offset", end))
+                if self.offset == end:
+                    return
+                last_error = f"server accepted {self.offset - start} of {len(chunk)} bytes"
+            elif resp.status_code >= 500 or resp.status_code == 409:
+                last_error = f"{resp.status_code} - {resp.text}"
+            else:
+                raise Exception(f"Failed to upload file: {resp.text}")
+        raise Exception(f"Failed to upload part at offset {start}: {last_error}")
+
+    async def abort(self) -> None:
+        if not self.url:
+            return
+        try:
+            await self._http.delete(self.url, headers=self._auth)
+        except Exception as e:
+            logger.debug(f"Could not terminate upload {self.url}: {e}")
+
+
+def _too_large(policy: UploadPolicy, size: int) -> HTTPException:
+    return HTTPException(status_code=400, detail=policy.too_large_detail.format(size_mb=size / (1024 * 1024)))
+
+
+async def stream_upload(
+    file: UploadFile,
+    client_sb: Any,
+    client_id: str,
+    policy: UploadPolicy,
+    *,
+    chunk_size: int = TUS_CHUNK_SIZE,
+    http_client: Optional[httpx.AsyncClient] = None,
+) -> StoredUpload:
+    """
+    Validate and stream ``file`` into the client's storage bucket.
+
+    Raises HTTPException 400 for rejected files and 500 for storage failures;
+    returns the stored object's path, size, sha256 and a 1 hour signed URL.
+    """
+    content_type = file.content_type or ""
+    if not any(allowed in content_type for allowed in policy.allowed_types):
+        raise HTTPException(status_code=400, detail=policy.invalid_type_detail)
+    declared_size = _declared_size(file)
+    logger.info(f"[{policy.label}] Uploading file: {file.filename}, size: {declared_size / (1024 * 1024):.1f}MB")
+    if declared_size > policy.max_bytes:
+        raise _too_large(policy, declared_size)
+
+    content_type = content_type or policy.default_content_type
+    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    file_ext = file.filename.split('.')[-1] if file.filename and '.' in file.filename else policy.default_ext
+    storage_path = f"{policy.path_prefix}/{client_id}/{timestamp}_{uuid.uuid4().hex[:8]}.{file_ext}"
+    bucket = policy.bucket
+
+    digest = hashlib.sha256()
+    await file.seek(0)
+    chunk = await file.read(chunk_size)
+    # Wide enough for an SVG's XML prolog and doctype before the <svg> tag
+    kind = sniff_media_kind(chunk[:512])
+    if (kind is None and policy.require_signature) or (kind is not None and not _kind_allowed(kind, policy)):
+        logger.warning(f"[{policy.label}] Rejected {file.filename}: declared {content_type}, content looks like {kind or 'unknown'}")
+        raise HTTPException(status_code=400, detail=policy.invalid_type_detail)
+
+    if not await asyncio.to_thread(_ensure_bucket, client_sb, bucket):
+        raise HTTPException(
+            status_code=500,
+            detail=f"Storage bucket '{bucket}' does not exist in the client's Supabase project. Please create it in Supabase Dashboard → Storage → New Bucket."
+        )
+
+    size = 0
+    try:
+        if len(chunk) < chunk_size or declared_size <= chunk_size:
+            # Single part: the plain upload is one request instead of two
+            size = len(chunk)
+            if size > policy.max_bytes:
+                raise _too_large(policy, size)
+            digest.update(chunk)
+            logger.info(f"[{policy.label}] Uploading file to {bucket}/{storage_path}")
+            await asyncio.to_thread(
+                client_sb.storage.from_(bucket).upload,
+                path=storage_path,
+                file=chunk,
+                file_options={"content-type": content_type},
+            )
+        else:
+            logger.info(f"[{policy.label}] Using resumable upload to {bucket}/{storage_path} in {chunk_size // (1024 * 1024)}MB parts")
+            own_client = http_client is None
+            http = http_client or httpx.AsyncClient(timeout=300.0)
+            tus = _TusUpload(http, client_sb.supabase_url, client_sb.supabase_key)
+            completed = False
+            try:
+                await tus.create(bucket, storage_path, content_type, declared_size)
+                while chunk:
+                    size += len(chunk)
+                    if size > policy.max_bytes or size > declared_size:
+                        raise _too_large(policy, max(size, declared_size))
+                    digest.update(chunk)
+                    await tus.send(chunk)
+                    chunk = await file.read(chunk_size)
+                if size != declared_size:
+                    raise Exception(f"Upload ended at {size} of {declared_size} bytes")
+                completed = True
+            finally:
+                if not completed:
+                    await tus.abort()
+                if own_client:
+                    await http.aclose()
+            logger.info(f"[{policy.label}] TUS upload complete: {size} bytes")
+
+        signed_url = await asyncio.to_thread(
+            client_sb.storage.from_(bucket).create_signed_url,
+            path=storage_path,
+            expires_in=SIGNED_URL_TTL_SECONDS,
+        )
+    except HTTPException:
+        raise
+    except Exception as storage_error:
+        logger.error(f"[{policy.label}] Storage upload failed: {storage_error}")
+        raise HTTPException(status_code=500, detail=f"Failed to upload file: {str(storage_error)}")
+
+    if not signed_url or not signed_url.get("signedURL"):
+        raise HTTPException(status_code=500, detail="Failed to generate signed URL")
+
+    return StoredUpload(
+        bucket=bucket,
+        path=storage_path,
+        size=size,
+        sha256=digest.hexdigest(),
+        content_type=content_type,
+        signed_url=signed_url["signedURL"],
+    )
+
+
+async def upload_generated(
+    client_sb: Any,
+    bucket: str,
+    path: str,
+    content_type: str,
+    chunks: Callable[[], Iterable[bytes]],
+    *,
+    chunk_size: int = TUS_CHUNK_SIZE,
+    http_client: Optional[httpx.AsyncClient] = None,
+) -> int:
+    """
+    Store generated content without holding it in memory; returns its size.
+
+    ``chunks()`` must yield the same bytes each call: it is iterated once to
+    measure the length (TUS needs it up front) and again to send the parts.
+    """
+    length = sum(len(chunk) for chunk in chunks())
+    if not await asyncio.to_thread(_ensure_bucket, client_sb, bucket):
+        raise Exception(f"Storage bucket '{bucket}' does not exist")
+
+    if length <= chunk_size:
+        await asyncio.to_thread(
+            client_sb.storage.from_(bucket).upload,
+            path=path,
+            file=b"".join(chunks()),
+            file_options={"content-type": content_type, "upsert": "true"},
+        )
+        return length
+
+    own_client = http_client is None
+    http = http_client or httpx.AsyncClient(timeout=300.0)
+    tus = _TusUpload(http, client_sb.supabase_url, client_sb.supabase_key)
+    completed = False
+    try:
+        await tus.create(bucket, path, content_type, length)
+        # Every part but the last must be exactly chunk_size
+        buffer = bytearray()
+        for chunk in chunks():
+            buffer += chunk
+            while len(buffer) >= chunk_size:
+                await tus.send(bytes(buffer[:chunk_size]))
+                del buffer[:chunk_size]
+        if buffer:
+            await tus.send(bytes(buffer))
+        if tus.offset != length:
+            raise Exception(f"Upload ended at {tus.offset} of {length} bytes")
+        completed = True
+    finally:
+        if not completed:
+            await tus.abort()
+        if own_client:
+            await http.aclose()
+    return length
@@ -4,11 +4,14 @@ from __future__ import annotations
 import asyncio
 import logging
 import os
+import socket
+import uuid
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from app.services.client_connection_manager import get_connection_manager
+from app.services.job_queue import JobQueue, get_job_notifier
 from app.services.schema_sync import apply_schema, project_ref_from_url
 from app.services.onboarding.supabase_management import (
     SupabaseManagementError,
@@ -17,6 +20,15 @@ from app.services.onboarding.supabase_management import (
 
 logger = logging.getLogger(__name__)
 
+# Notification channel fired by the client_provisioning_jobs trigger
+PROVISIONING_JOBS_CHANNEL = "client_provisioning_jobs"
+
+# Default per-type concurrency; project creation hits the Management API rate limits
+DEFAULT_JOB_CONCURRENCY = {
+    "supabase_project": 2,
+    "schema_sync": 4,
+}
+
 
 @dataclass
 class ProvisioningJob:
@@ -38,12 +50,14 @@ class ProvisioningJob:
 
 
 class ProvisioningWorker:
-    """Polls provisioning jobs and orchestrates onboarding steps."""
+    """Claims provisioning jobs on notification and orchestrates onboarding steps."""
 
     def __init__(
         self,
         management_token: Optional[str] = None,
         poll_interval: float = 5.0,
+        concurrency: Optional[Dict[str, int]] = None,
+        visibility_timeout: float = 900.0,
     ) -> None:
         self.connection_manager = get_connection_manager()
         self.platform_db = self.connection_manager.platform_client
@@ -51,41 +65,84 @@ class ProvisioningWorker:
         if not self.management_token:
             raise RuntimeError("SUPABASE_ACCESS_TOKEN must be configured for provisioning worker")
         self.poll_interval = poll_interval
-        self._shutdown = asyncio.Event()
+        self.visibility_timeout = visibility_timeout
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._claim_rpc_available = True
+
+        notifier = get_job_notifier()
+        # With notifications the poll is only a safety net for missed signals
+        fallback_interval = poll_interval if notifier is None else max(poll_interval, 60.0)
+        self.queue = JobQueue(
+            channel=PROVISIONING_JOBS_CHANNEL,
+            claim=self._claim_jobs,
+            notifier=notifier,
+            fallback_interval=fallback_interval,
+            database_triggered=True,
+        )
+        limits = {**DEFAULT_JOB_CONCURRENCY, **(concurrency or {})}
+        for job_type, limit in limits.items():
+            self.queue.register(job_type, self._run_job, concurrency=limit)
 
     async def run(self) -> None:
         """Start the provisioning loop until shutdown is requested."""
-        logger.info("ProvisioningWorker started")
+        logger.info("ProvisioningWorker %s started", self.worker_id)
         try:
-            while not self._shutdown.is_set():
-                job = await self._claim_next_job()
-                if not job:
-                    await asyncio.sleep(self.poll_interval)
-                    continue
-
-                try:
-                    await self._process_job(job)
-                except Exception as exc:  # pragma: no cover - defensive logging
-                    logger.exception("Provisioning job %s failed: %s", job.id, exc)
-                    await self._record_failure(job, str(exc))
-                    await asyncio.sleep(self.poll_interval)
+            await self.queue.run()
         finally:
             logger.info("ProvisioningWorker shutting down")
 
     def stop(self) -> None:
-        self._shutdown.set()
+        self.queue.stop()
+
+    async def _run_job(self, job: ProvisioningJob) -> None:
+        try:
+            await self._process_job(job)
+        except Exception as exc:  # pragma: no cover - defensive logging
+            logger.exception("Provisioning job %s failed: %s", job.id, exc)
+            await self._record_failure(job, str(exc))
 
-    async def _claim_next_job(self) -> Optional[ProvisioningJob]:
+    async def _claim_jobs(self, job_type: str, limit: int) -> List[ProvisioningJob]:
+        """Atomically claim up to ``limit`` jobs of ``job_type``.
+
+        Uses the ``claim_provisioning_jobs`` RPC (``FOR UPDATE SKIP LOCKED`` with
+        a visibility timeout). Falls back to the legacy conditional update when
+        the RPC has not been deployed to the platform database yet.
+        """
+        if self._claim_rpc_available:
+            def _claim_rpc() -> List[ProvisioningJob]:
+                result = self.platform_db.rpc(
+                    "claim_provisioning_jobs",
+                    {
+                        "p_job_type": job_type,
+                        "p_limit": limit,
+                        "p_visibility_timeout_seconds": int(self.visibility_timeout),
+                        "p_worker_id": self.worker_id,
+                    },
+                ).execute()
+                return [ProvisioningJob.from_dict(row) for row in result.data or []]
+
+            try:
+                return await asyncio.to_thread(_claim_rpc)
+            except Exception as exc:
+                if "claim_provisioning_jobs" not in str(exc) and "PGRST202" not in str(exc):
+                    raise
+                logger.warning("claim_provisioning_jobs RPC unavailable; using legacy claim: %s", exc)
+                self._claim_rpc_available = False
+
+        job = await self._claim_next_job(job_type)
+        return [job] if job else []
+
+    async def _claim_next_job(self, job_type: Optional[str] = None) -> Optional[ProvisioningJob]:
         def _claim() -> Optional[ProvisioningJob]:
-            result = (
+            query = (
                 self.platform_db
                 .table("client_provisioning_jobs")
                 .select("*")
                 .is_("claimed_at", None)
-                .order("created_at")
-                .limit(1)
-                .execute()
             )
+            if job_type:
+                query = query.eq("job_type", job_type)
+            result = query.order("created_at").limit(1).execute()
             if not result.data:
                 return None
 
@@ -247,6 +304,7 @@ class ProvisioningWorker:
             }, on_conflict="client_id,job_type").execute()
 
         await asyncio.to_thread(_enqueue)
+        await self.queue.notify({"client_id": client_id, "job_type": job_type})
 
     async def _delete_job(self, job_id: str) -> None:
         def _delete() -> None:
@@ -272,4 +330,4 @@ class ProvisioningWorker:
         await asyncio.to_thread(_update)
 
 
-__all__ = ["ProvisioningWorker", "ProvisioningJob"]
+__all__ = ["ProvisioningWorker", "ProvisioningJob", "PROVISIONING_JOBS_CHANNEL"]
@@ -0,0 +1,563 @@
+"""Resumable bulk re-embedding for tenant embedding-model migrations.
+
+Replaces the one-off root backfill scripts. For each vector column the job:
+
+1. claims a lease on a per-column progress row in the tenant database
+   (``embedding_reembed_progress``) and adds a shadow column ``<column>_next``
+2. streams rows with keyset pagination (``id > last_id order by id``), embeds
+   each page with bounded concurrency and writes the vectors *and* the new
+   checkpoint in one statement, so a crash resumes from the last page written
+3. runs catch-up passes for rows written behind the cursor while it ran
+4. builds the ANN index on the shadow column (renamed with it at swap time)
+
+Only once every column is backfilled are the columns swapped by rename, each
+inside one transaction that refuses to swap while rows are still missing; the
+client's embedding settings are flipped (``on_swapped``) after the last swap,
+so queries keep using the old model against the old vectors until then.
+
+The old vectors stay readable until the swap and are kept as ``<column>_prev``
+for rollback (``drop_previous`` removes them). Progress rows are keyed by the
+embedding signature (provider/model/dimension); changing it restarts the column.
+The tenant schema pins every vector column to ``vector(1024)``, so other
+dimensions are rejected.
+
+SQL runs through the same ``execute``/``query`` callables as
+``VectorIndexManager``, normally the Supabase Management API.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.services.vector_index_manager import ExecuteFn, QueryFn, VectorIndexManager
+
+logger = logging.getLogger(__name__)
+
+# (text, context) -> vector; context is 'chunk' or 'document' as in DocumentProcessor
+EmbedFn = Callable[[str, str], Awaitable[Optional[List[float]]]]
+
+# VECTOR_DIMENSION_PATCH_SQL (schema_sync) pins tenant vector columns to this size
+SUPPORTED_DIMENSION = 1024
+
+PROGRESS_TABLE = "embedding_reembed_progress"
+
+PROGRESS_TABLE_SQL = f"""
+create table if not exists public.{PROGRESS_TABLE} (
+  target text primary key,
+  signature jsonb not null,
+  status text not null default 'backfilling',
+  last_id text,
+  processed bigint not null default 0,
+  failed bigint not null default 0,
+  worker_id text,
+  error text,
+  started_at timestamptz not null default now(),
+  updated_at timestamptz not null default now()
+);
+""".strip()
+
+
+@dataclass(frozen=True)
+class ReembedTarget:
+    """A vector column and the text expression its embeddings are built from."""
+
+    table: str
+    column: str
+    text_expr: str
+    id_column: str = "id"
+    id_type: str = "uuid"
+    # embedding context, which picks the document or conversation model
+    context: str = "chunk"
+    # jsonb column that records the embedding signature (document_chunks.chunk_metadata)
+    metadata_column: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.table}.{self.column}"
+
+    @property
+    def shadow(self) -> str:
+        return f"{self.column}_next"
+
+    @property
+    def previous(self) -> str:
+        return f"{self.column}_prev"
+
+
+REEMBED_TARGETS: List[ReembedTarget] = [
+    ReembedTarget("document_chunks", "embeddings_vec", "content", metadata_column="chunk_metadata"),
+    # Document-level vectors are built from the first 2000 characters (DocumentProcessor)
+    ReembedTarget("documents", "embeddings", "left(content, 2000)", id_type="bigint", context="document"),
+    ReembedTarget("conversation_transcripts", "embeddings", "content"),
+    ReembedTarget("conversation_turn_embeddings", "embeddings", "user_message", id_column="turn_id"),
+]
+
+
+class LeaseLost(RuntimeError):
+    """Another worker took over the column (ours stopped heartbeating)."""
+
+
+def _literal(value: Any) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _renamed_index(table: str, name: str, old_column: str, new_column: str) -> Optional[str]:
+    """The name an index gets when its column is renamed (None when it isn't named after the column)."""
+    prefix = f"{table}_{old_column}_"
+    if not name.startswith(prefix):
+        return None
+    return f"{table}_{new_column}_{name[len(prefix):]}"
+
+
+def _vector_literal(vector: List[float]) -> str:
+    return "'[" + ",".join(repr(float(v)) for v in vector) + "]'"
+
+
+class ReembeddingJob:
+    """Re-embeds every configured vector column of one tenant database."""
+
+    def __init__(
+        self,
+        execute: ExecuteFn,
+        query: QueryFn,
+        embed: EmbedFn,
+        signature: Dict[str, Any],
+        targets: Optional[List[ReembedTarget]] = None,
+        batch_size: int = 64,
+        concurrency: int = 4,
+        lease_seconds: int = 300,
+        max_catchup_passes: int = 3,
+        drop_previous: bool = False,
+        worker_id: Optional[str] = None,
+        on_swapped: Optional[Callable[[], Awaitable[None]]] = None,
+    ):
+        self.execute = execute
+        self.query = query
+        self.embed = embed
+        self.signature = signature
+        self.dimension = int(signature.get("embedding_dimension") or SUPPORTED_DIMENSION)
+        if self.dimension != SUPPORTED_DIMENSION:
+            raise ValueError(
+                f"Re-embedding to {self.dimension} dimensions is not supported; "
+                f"tenant vector columns are vector({SUPPORTED_DIMENSION})"
+            )
+        self.targets = targets or REEMBED_TARGETS
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.lease_seconds = lease_seconds
+        self.max_catchup_passes = max_catchup_passes
+        self.drop_previous = drop_previous
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.on_swapped = on_swapped
+
+    # ------------------------------------------------------------------
+    # SQL helpers (blocking callables run off the event loop)
+    # ------------------------------------------------------------------
+
+    async def _run(self, sql: str) -> None:
+        ok, detail = await asyncio.to_thread(self.execute, sql)
+        if not ok:
+            raise RuntimeError(detail or "statement failed")
+
+    async def _rows(self, sql: str) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.query, sql)
+
+    # ------------------------------------------------------------------
+    # Lease / checkpoint
+    # ------------------------------------------------------------------
+
+    async def _claim(self, target: ReembedTarget) -> Optional[Dict[str, Any]]:
+        """Take (or resume) the column's progress row; None when another worker holds it."""
+        signature = _literal(json.dumps(self.signature, sort_keys=True))
+        existing = await self._rows(
+            f"select signature, status from public.{PROGRESS_TABLE} where target = {_literal(target.name)}"
+        )
+        restart = bool(existing) and self._signature_of(existing[0]) != self.signature
+
+        rows = await self._rows(f"""
+insert into public.{PROGRESS_TABLE} as p (target, signature, worker_id)
+values ({_literal(target.name)}, {signature}::jsonb, {_literal(self.worker_id)})
+on conflict (target) do update set
+  worker_id = excluded.worker_id,
+  updated_at = now(),
+  error = null,
+  signature = excluded.signature,
+  status = case when p.signature = excluded.signature then p.status else 'backfilling' end,
+  last_id = case when p.signature = excluded.signature then p.last_id else null end,
+  processed = case when p.signature = excluded.signature then p.processed else 0 end,
+  failed = case when p.signature = excluded.signature then p.failed else 0 end
+where p.worker_id is null
+   or p.worker_id = excluded.worker_id
+   or p.updated_at < now() - interval '{int(self.lease_seconds)} seconds'
+returning status, last_id, processed, failed
+""".strip())
+        if not rows:
+            return None
+        progress = dict(rows[0])
+        progress["restart"] = restart
+        return progress
+
+    @staticmethod
+    def _signature_of(row: Dict[str, Any]) -> Dict[str, Any]:
+        signature = row.get("signature") or {}
+        return json.loads(signature) if isinstance(signature, str) else signature
+
+    async def _set_status(self, target: ReembedTarget, status: Optional[str], error: Optional[str] = None) -> None:
+        """Advance the phase; ``status=None`` records an error and releases the lease in place."""
+        assignments = [f"error = {_literal(error) if error else 'null'}", "updated_at = now()"]
+        if status:
+            assignments.append(f"status = {_literal(status)}")
+        if status in (None, "swapped"):
+            assignments.append("worker_id = null")
+        await self._run(
+            f"update public.{PROGRESS_TABLE} set {', '.join(assignments)} "
+            f"where target = {_literal(target.name)} and worker_id = {_literal(self.worker_id)}"
+        )
+
+    # ------------------------------------------------------------------
+    # Phases
+    # ------------------------------------------------------------------
+
+    async def _prepare(self, target: ReembedTarget, restart: bool) -> None:
+        table = f"public.{target.table}"
+        if restart:
+            # Vectors from a previous signature must not survive into the swap
+            await self._run(f"alter table {table} drop column if exists {target.shadow}")
+        await self._run(f"alter table {table} add column if not exists {target.shadow} vector({self.dimension})")
+
+    async def _embed_page(self, target: ReembedTarget, rows: List[Dict[str, Any]]) -> Dict[str, List[float]]:
+        """Embed a page concurrently; identical texts are embedded once."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        texts = {row["text"] for row in rows if (row.get("text") or "").strip()}
+
+        async def _one(text: str) -> Tuple[str, Optional[List[float]]]:
+            async with semaphore:
+                try:
+                    return text, await self.embed(text, target.context)
+                except Exception as exc:
+                    logger.warning(f"Re-embedding failed for one row: {exc}")
+                    return text, None
+
+        results = await asyncio.gather(*[_one(text) for text in texts])
+        return {text: vector for text, vector in results if vector}
+
+    async def _write_page(
+        self,
+        target: ReembedTarget,
+        vectors: List[Tuple[str, List[float]]],
+        cursor: Optional[str],
+        failed: int,
+    ) -> None:
+        """Write one page of vectors and advance the checkpoint in a single statement."""
+        checkpoint = (
+            f"update public.{PROGRESS_TABLE} set "
+            f"last_id = coalesce({_literal(cursor) if cursor else 'null'}, last_id), "
+            f"processed = processed + (select count(*) from written), "
+            f"failed = failed + {int(failed)}, updated_at = now() "
+            f"where target = {_literal(target.name)} and worker_id = {_literal(self.worker_id)} "
+            f"returning processed"
+        )
+        if vectors:
+            values = ", ".join(f"({_literal(row_id)}, {_vector_literal(vec)})" for row_id, vec in vectors)
+            written = (
+                f"with v(id, vec) as (values {values}), written as ("
+                f"update public.{target.table} t set {target.shadow} = v.vec::vector "
+                f"from v where t.{target.id_column} = v.id::{target.id_type} returning 1) "
+            )
+        else:
+            written = "with written as (select 1 where false) "
+        rows = await self._rows(written + checkpoint)
+        if not rows:
+            raise LeaseLost(f"{target.name}: lease taken over by another worker")
+
+    async def _backfill(self, target: ReembedTarget, last_id: Optional[str], catch_up: bool = False) -> Tuple[int, int]:
+        """Walk the table in id order; returns (rows written, rows that failed to embed)."""
+        written = failed = 0
+        missing_only = (
+            f" and {target.shadow} is null and {target.column} is not null" if catch_up else ""
+        )
+        while True:
+            after = f" and {target.id_column} > {_literal(last_id)}::{target.id_type}" if last_id else ""
+            rows = await self._rows(
+                f"select {target.id_column}::text as id, {target.text_expr} as text "
+                f"from public.{target.table} "
+                f"where {target.text_expr} is not null{after}{missing_only} "
+                f"order by {target.id_column} limit {self.batch_size}"
+            )
+            if not rows:
+                return written, failed
+
+            embedded = await self._embed_page(target, rows)
+            vectors = [(row["id"], embedded[row["text"]]) for row in rows if row.get("text") in embedded]
+            page_failed = len(rows) - len(vectors)
+            last_id = rows[-1]["id"]
+            # Catch-up passes re-scan from the start, so they don't move the checkpoint
+            await self._write_page(target, vectors, None if catch_up else last_id, page_failed)
+            written += len(vectors)
+            failed += page_failed
+            if len(rows) < self.batch_size:
+                return written, failed
+
+    async def _build_shadow_index(self, target: ReembedTarget) -> None:
+        manager = VectorIndexManager(self.execute, self.query, targets=[(target.table, target.shadow)])
+        plans = await asyncio.to_thread(manager.inspect)
+        for plan in plans:
+            ok, detail = await asyncio.to_thread(manager.apply, plan)
+            if not ok:
+                raise RuntimeError(detail)
+
+    async def _column_indexes(self, table: str, column: str) -> List[str]:
+        rows = await self._rows(
+            "select ic.relname as name from pg_index ix "
+            "join pg_class ic on ic.oid = ix.indexrelid "
+            "join pg_attribute att on att.attrelid = ix.indrelid and att.attnum = any(ix.indkey) "
+            f"where ix.indrelid = {_literal(f'public.{table}')}::regclass and att.attname = {_literal(column)}"
+        )
+        return [row["name"] for row in rows]
+
+    def _swap_sql(
+        self,
+        target: ReembedTarget,
+        allowed_missing: int,
+        live_indexes: Sequence[str] = (),
+        shadow_indexes: Sequence[str] = (),
+    ) -> str:
+        """
+        One transaction that swaps the shadow column in by rename.
+
+        Indexes follow their columns' names (``<table>_<column>_...``), so the
+        shadow's index takes the live column's index name; otherwise the next
+        migration's ``create index ... if not exists`` would find that name taken
+        and the swapped-in column would be left without an index.
+        """
+        table = f"public.{target.table}"
+
+        def renames(names: Sequence[str], old_column: str, new_column: str) -> str:
+            statements = ""
+            for name in names:
+                new_name = _renamed_index(target.table, name, old_column, new_column)
+                if new_name:
+                    statements += f"  alter index if exists public.{name} rename to {new_name};\n"
+            return statements
+
+        stamp_metadata = ""
+        if target.metadata_column:
+            signature = _literal(json.dumps(self.signature, sort_keys=True))
+            stamp_metadata = (
+                f"  update {table} set {target.metadata_column} = "
+                f"coalesce({target.metadata_column}, '{{}}'::jsonb) || {signature}::jsonb "
+                f"where {target.shadow} is not null;\n"
+            )
+        return f"""
+do $$
+declare
+  missing bigint;
+begin
+  lock table {table} in share row exclusive mode;
+  select count(*) into missing from {table}
+    where {target.shadow} is null and {target.column} is not null and {target.text_expr} is not null;
+  if missing > {int(allowed_missing)} then
+    raise exception 'reembed_pending: % rows still missing new embeddings', missing;
+  end if;
+{stamp_metadata}  alter table {table} drop column if exists {target.previous};
+  alter table {table} rename column {target.column} to {target.previous};
+{renames(live_indexes, target.column, target.previous)}  alter table {table} rename column {target.shadow} to {target.column};
+{renames(shadow_indexes, target.shadow, target.column)}end$$;
+""".strip()
+
+    async def _swap(self, target: ReembedTarget) -> None:
+        allowed_missing = 0
+        for _ in range(self.max_catchup_passes):
+            _, failed = await self._backfill(target, None, catch_up=True)
+            allowed_missing = failed
+            live_indexes = await self._column_indexes(target.table, target.column)
+            shadow_indexes = await self._column_indexes(target.table, target.shadow)
+            ok, detail = await asyncio.to_thread(
+                self.execute, self._swap_sql(target, allowed_missing, live_indexes, shadow_indexes)
+            )
+            if ok:
+                break
+            if "reembed_pending" not in (detail or ""):
+                raise RuntimeError(detail)
+            logger.info(f"{target.name}: rows written during catch-up, running another pass")
+        else:
+            raise RuntimeError(f"{target.name}: rows still missing new embeddings after catch-up")
+
+        if self.drop_previous:
+            await self._run(f"alter table public.{target.table} drop column if exists {target.previous}")
+
+    # ------------------------------------------------------------------
+    # Orchestration
+    # ------------------------------------------------------------------
+
+    async def _column_exists(self, table: str, column: str) -> bool:
+        rows = await self._rows(
+            "select 1 from information_schema.columns where table_schema = 'public' "
+            f"and table_name = {_literal(table)} and column_name = {_literal(column)}"
+        )
+        return bool(rows)
+
+    async def _claim_for(self, target: ReembedTarget) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[bool, str]]]:
+        """Claim the column's lease; the second item is a final result when there is nothing to do."""
+        if not await self._column_exists(target.table, target.column):
+            return None, (True, "column missing; skipped")
+        progress = await self._claim(target)
+        if progress is None:
+            return None, (False, "another worker holds the lease")
+        if progress.get("status") == "swapped" and not progress["restart"]:
+            return None, (True, "already migrated")
+        return progress, None
+
+    async def _fail(self, target: ReembedTarget, exc: Exception) -> Tuple[bool, str]:
+        if isinstance(exc, LeaseLost):
+            return False, str(exc)
+        logger.error(f"Re-embedding {target.name} failed: {exc}")
+        # Keep the phase and checkpoint so the next run resumes here
+        await self._set_status(target, None, str(exc)[:500])
+        return False, str(exc)
+
+    async def backfill_target(self, target: ReembedTarget) -> Tuple[bool, str]:
+        """Fill the column's shadow and build its index; the live column is untouched."""
+        progress, done = await self._claim_for(target)
+        if done:
+            return done
+
+        try:
+            await self._prepare(target, progress["restart"])
+            if progress.get("status") == "backfilling":
+                written, failed = await self._backfill(target, progress.get("last_id"))
+                logger.info(f"{target.name}: backfilled {written} rows ({failed} failed) since checkpoint")
+                await self._set_status(target, "catching_up")
+            await self._build_shadow_index(target)
+        except Exception as exc:
+            return await self._fail(target, exc)
+        return True, "backfilled; waiting to swap"
+
+    async def swap_target(self, target: ReembedTarget) -> Tuple[bool, str]:
+        """Catch up and swap a backfilled column into place."""
+        progress, done = await self._claim_for(target)
+        if done:
+            return done
+        if progress.get("status") != "catching_up":
+            return False, f"not backfilled (status={progress.get('status')})"
+
+        try:
+            await self._swap(target)
+            await self._set_status(target, "swapped")
+        except Exception as exc:
+            return await self._fail(target, exc)
+
+        rows = await self._rows(
+            f"select processed, failed from public.{PROGRESS_TABLE} where target = {_literal(target.name)}"
+        )
+        totals = rows[0] if rows else {}
+        return True, f"swapped (processed={totals.get('processed')}, failed={totals.get('failed')})"
+
+    async def run(self) -> List[Tuple[str, bool, str]]:
+        """Backfill every target, then swap them all; returns apply_schema-style result tuples."""
+        await self._run(PROGRESS_TABLE_SQL)
+        backfilled = [(target, *await self.backfill_target(target)) for target in self.targets]
+        if not all(ok for _, ok, _ in backfilled):
+            # Swap nothing until every column has its new vectors
+            return [(f"reembed:{target.name}", ok, detail) for target, ok, detail in backfilled]
+
+        results: List[Tuple[str, bool, str]] = []
+        for target in self.targets:
+            ok, detail = await self.swap_target(target)
+            results.append((f"reembed:{target.name}", ok, detail))
+
+        if self.on_swapped and all(ok for _, ok, _ in results):
+            try:
+                await self.on_swapped()
+                results.append(("reembed:settings", True, "embedding settings updated"))
+            except Exception as exc:
+                logger.error(f"Re-embedding swapped but the settings update failed: {exc}")
+                results.append(("reembed:settings", False, str(exc)))
+        return results
+
+
+async def reembed_client(
+    client_id: str,
+    provider: str,
+    model: str,
+    dimension: int = SUPPORTED_DIMENSION,
+    document_model: Optional[str] = None,
+    management_token: Optional[str] = None,
+    **job_options: Any,
+) -> List[Tuple[str, bool, str]]:
+    """Re-embed a client's vectors with a new embedding model, then switch its settings to it.
+
+    The client keeps its current embedding settings (and its queries keep
+    matching the current vectors) until every column has been swapped.
+    """
+    from app.core.dependencies import get_client_service
+    from app.models.client import ClientUpdate, EmbeddingSettings
+    from app.services.document_processor import document_processor
+    from app.services.schema_sync import execute_sql, project_ref_from_url, query_sql
+
+    if int(dimension) != SUPPORTED_DIMENSION:
+        raise ValueError(f"Only {SUPPORTED_DIMENSION}-dimension embeddings are supported")
+    token = management_token or os.getenv("SUPABASE_ACCESS_TOKEN")
+    if not token:
+        raise RuntimeError("SUPABASE_ACCESS_TOKEN must be configured for re-embedding")
+
+    client_service = get_client_service()
+    supabase_config = await client_service.get_client_supabase_config(client_id, auto_sync=False)
+    if not supabase_config or supabase_config.get("_fallback"):
+        raise RuntimeError(f"Client {client_id} has no dedicated Supabase project")
+    _, client_settings = await document_processor._get_client_context(client_id)
+
+    embedding = {
+        **((client_settings or {}).get("embedding") or {}),
+        "provider": provider,
+        "conversation_model": model,
+        "document_model": document_model or model,
+        "dimension": int(dimension),
+    }
+    target_settings = {**(client_settings or {}), "embedding": embedding}
+    project_ref = project_ref_from_url(supabase_config["url"])
+
+    async def _embed(text: str, context: str) -> Optional[List[float]]:
+        if context == "document":
+            return await document_processor._generate_document_embeddings(text, target_settings)
+        return await document_processor._generate_chunk_embeddings(text, target_settings)
+
+    async def _flip_settings() -> None:
+        client = await client_service.get_client(client_id, auto_sync=False)
+        if not client:
+            raise RuntimeError(f"Client {client_id} not found")
+        settings = client.settings.copy(update={"embedding": EmbeddingSettings(**embedding)})
+        await client_service.update_client(client_id, ClientUpdate(settings=settings))
+        # Ingestion caches client settings per process; drop them so new chunks use the new model
+        document_processor.client_supabase_connections.pop(client_id, None)
+
+    job = ReembeddingJob(
+        execute=lambda sql: execute_sql(project_ref, token, sql, timeout=900),
+        query=lambda sql: query_sql(project_ref, token, sql),
+        embed=_embed,
+        signature=document_processor._embedding_signature(target_settings),
+        batch_size=int(os.getenv("REEMBED_BATCH_SIZE", "64")),
+        concurrency=int(os.getenv("REEMBED_CONCURRENCY", "4")),
+        on_swapped=_flip_settings,
+        **job_options,
+    )
+    results = await job.run()
+    for step, ok, detail in results:
+        log = logger.info if ok else logger.warning
+        log(f"Re-embed {client_id} {step}: {detail}")
+    return results
+
+
+__all__ = [
+    "REEMBED_TARGETS",
+    "SUPPORTED_DIMENSION",
+    "ReembedTarget",
+    "ReembeddingJob",
+    "reembed_client",
+]
@@ -17,6 +17,12 @@ from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+try:  # HTTP/2 lets concurrent prefetch + manual generations share one connection
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover - optional dependency
+    _HTTP2_AVAILABLE = False
+
 
 @dataclass
 class GeneratedImage:
@@ -54,6 +60,9 @@ class RunWareService:
     DEFAULT_SCHEDULER = "FlowMatchEulerDiscreteScheduler"
     DEFAULT_CFG_SCALE = 1.0  # FLUX klein works best with CFG ~1
 
+    # Keep the connection open between Ken Burns auto-generations
+    KEEPALIVE_EXPIRY = 120.0
+
     # Standard negative prompt for quality
     DEFAULT_NEGATIVE_PROMPT = (
         "blurry, low quality, low resolution, pixelated, "
@@ -77,7 +86,7 @@ class RunWareService:
         self._client: Optional[httpx.AsyncClient] = None
 
     async def _get_client(self) -> httpx.AsyncClient:
-        """Get or create the HTTP client"""
+        """Get or create the persistent (keep-alive) HTTP client"""
         if self._client is None or self._client.is_closed:
             self._client = httpx.AsyncClient(
                 base_url=self.BASE_URL,
@@ -86,9 +95,39 @@ class RunWareService:
                     "Content-Type": "application/json",
                 },
                 timeout=httpx.Timeout(120.0, connect=10.0),  # 120s total, 10s connect (GPT Image 1.5 can be slow)
+                limits=httpx.Limits(
+                    max_connections=8,
+                    max_keepalive_connections=4,
+                    keepalive_expiry=self.KEEPALIVE_EXPIRY,
+                ),
+                http2=_HTTP2_AVAILABLE,
             )
         return self._client
 
+    async def warm_up(self) -> bool:
+        """
+        Pre-establish the keep-alive connection to RunWare.
+
+        Sends a lightweight ``ping`` task so DNS, TCP and TLS setup are paid
+        once at session start instead of on the first image generation.
+
+        Returns:
+            True if the connection is ready, False otherwise
+        """
+        if not self.api_key:
+            return False
+        try:
+            client = await self._get_client()
+            response = await client.post(
+                "/tasks",
+                json=[{"taskType": "ping", "ping": True}],
+                timeout=httpx.Timeout(10.0),
+            )
+            return response.status_code == 200
+        except httpx.HTTPError as e:
+            logger.debug(f"RunWare warm-up failed: {e}")
+            return False
+
     async def close(self):
         """Close the HTTP client"""
         if self._client and not self._client.is_closed:
@@ -1,11 +1,12 @@
 """Shared helpers for applying Sidekick Forge schema patches to Supabase projects."""
 from __future__ import annotations
 
-from typing import Iterable, List, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import requests
 
 from app.config import settings
+from app.services.vector_index_manager import IndexPolicy, VectorIndexManager
 
 # SQL statements maintained as canonical schema patches
 
@@ -179,25 +180,6 @@ update public.conversation_transcripts
   set turn_id = coalesce(turn_id, gen_random_uuid());
 """.strip()
 
-IVFFLAT_PATCH_SQL = """
-create index if not exists documents_embeddings_ivfflat
-  on public.documents using ivfflat (embeddings vector_cosine_ops) with (lists = 16);
-
-create index if not exists documents_embedding_ivfflat
-  on public.documents using ivfflat (embedding vector_cosine_ops) with (lists = 16);
-
-create index if not exists documents_embedding_vec_ivfflat
-  on public.documents using ivfflat (embedding_vec vector_cosine_ops) with (lists = 16);
-
-create index if not exists document_chunks_embeddings_ivfflat
-  on public.document_chunks using ivfflat (embeddings vector_cosine_ops) with (lists = 16);
-
-create index if not exists document_chunks_embeddings_vec_ivfflat
-  on public.document_chunks using ivfflat (embeddings_vec vector_cosine_ops) with (lists = 16);
-
-create index if not exists conversation_transcripts_embeddings_ivfflat
-  on public.conversation_transcripts using ivfflat (embeddings vector_cosine_ops) with (lists = 16);
-""".strip()
 
 # RAG RPCs and missing helper tables/columns to keep tenant projects consistent
 RAG_PATCH_SQL = """
@@ -251,7 +233,62 @@ begin
 end;
 $$;
 
--- match_conversation_transcripts_secure for user-specific transcript search
+-- Turn-pair conversation memory: one row (and one embedding) per stored turn,
+-- paired by turn_id, so conversation search never joins transcripts at query time.
+create table if not exists public.conversation_turn_embeddings (
+  turn_id uuid primary key,
+  conversation_id uuid,
+  user_id uuid,
+  agent_id uuid,
+  user_message text not null,
+  agent_response text not null,
+  embeddings vector(1024),
+  created_at timestamptz not null default now()
+);
+
+create index if not exists conversation_turn_embeddings_user_agent_idx
+  on public.conversation_turn_embeddings (user_id, agent_id, created_at desc);
+
+-- One-time migrations record themselves here so repeat syncs skip them
+create table if not exists public.schema_migrations (
+  name text primary key,
+  applied_at timestamptz not null default now()
+);
+
+-- Backfill from transcripts that already share a turn_id (embedded user row per turn).
+-- New turns are written by store_turn, so this only has to run once per project.
+do $$
+begin
+  if not exists (select 1 from public.schema_migrations where name = 'conversation_turn_embeddings_backfill') then
+    insert into public.conversation_turn_embeddings (
+      turn_id, conversation_id, user_id, agent_id, user_message, agent_response, embeddings, created_at
+    )
+    select distinct on (u.turn_id)
+      u.turn_id,
+      u.conversation_id,
+      u.user_id,
+      u.agent_id,
+      u.content,
+      a.content,
+      u.embeddings,
+      u.created_at
+    from public.conversation_transcripts u
+    join public.conversation_transcripts a
+      on a.turn_id = u.turn_id and a.role = 'assistant'
+    where u.role = 'user'
+      and u.turn_id is not null
+      and u.embeddings is not null
+      and u.content is not null
+      and a.content is not null
+    order by u.turn_id, a.created_at
+    on conflict (turn_id) do nothing;
+    insert into public.schema_migrations (name) values ('conversation_turn_embeddings_backfill');
+  end if;
+end$$;
+
+-- match_conversation_transcripts_secure for user-specific transcript search.
+-- Resolves the agent once, then orders the turn table by distance so the ANN
+-- index (or the (user_id, agent_id) btree for small histories) drives the scan.
 create or replace function public.match_conversation_transcripts_secure(
   query_embeddings vector,
   agent_slug_param text,
@@ -267,28 +304,171 @@ returns table(
 )
 language plpgsql
 as $$
+declare
+  v_agent_id uuid;
 begin
+  select ag.id into v_agent_id
+  from public.agents ag
+  where ag.slug = agent_slug_param
+  limit 1;
+
+  if v_agent_id is null then
+    return;
+  end if;
+
+  -- pgvector >= 0.8: keep scanning the HNSW graph until the user/agent filter
+  -- yields match_count rows instead of returning a short result set
+  begin
+    perform set_config('hnsw.iterative_scan', 'relaxed_order', true);
+  exception when others then
+    null;
+  end;
+
   return query
   select
-    u.conversation_id,
-    u.content as user_message,
-    a.content as agent_response,
-    1 - (u.embeddings <=> query_embeddings) as similarity,
-    u.created_at
-  from public.conversation_transcripts u
-  join public.conversation_transcripts a
-    on a.conversation_id = u.conversation_id and a.role = 'assistant'
-  join public.agents ag on u.agent_id = ag.id
-  where u.role = 'user'
-    and u.embeddings is not null
-    and u.user_id = user_id_param
-    and ag.slug = agent_slug_param
-  order by u.embeddings <=> query_embeddings
-  limit match_count;
+    m.conversation_id,
+    m.user_message,
+    m.agent_response,
+    1 - m.distance as similarity,
+    m.created_at
+  from (
+    select
+      t.conversation_id,
+      t.user_message,
+      t.agent_response,
+      t.embeddings <=> query_embeddings as distance,
+      t.created_at
+    from public.conversation_turn_embeddings t
+    where t.user_id = user_id_param
+      and t.agent_id = v_agent_id
+      and t.embeddings is not null
+    order by t.embeddings <=> query_embeddings
+    limit match_count
+  ) m
+  order by m.distance;
 end;
 $$;
 
+-- Lexical search columns for hybrid retrieval (kept in sync by Postgres as
+-- generated columns). Titles use the 'simple' config so exact names and rare
+-- terms survive without stemming.
+alter table if exists public.document_chunks
+  add column if not exists content_tsv tsvector
+  generated always as (to_tsvector('english', coalesce(content, ''))) stored;
+
+alter table if exists public.documents
+  add column if not exists title_tsv tsvector
+  generated always as (
+    to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(file_name, ''))
+  ) stored;
+
+create index if not exists document_chunks_content_tsv_gin
+  on public.document_chunks using gin (content_tsv);
+
+create index if not exists documents_title_tsv_gin
+  on public.documents using gin (title_tsv);
+
+-- Chunk content hashes let re-uploads and reprocessing reuse existing vectors
+-- instead of re-embedding unchanged text.
+create index if not exists document_chunks_content_hash_idx
+  on public.document_chunks ((chunk_metadata->>'content_hash'));
+
+-- match_documents_hybrid: vector + full-text candidates fused with reciprocal-rank
+-- fusion (score = sum 1/(k + rank)) in one round trip. Lexical hits bypass the
+-- similarity threshold so exact-title and rare-term queries still surface.
+create or replace function public.match_documents_hybrid(
+  p_query_embedding vector,
+  p_query_text text,
+  p_agent_slug text,
+  p_match_threshold float8 default 0.0,
+  p_match_count integer default 12,
+  p_candidate_count integer default 50,
+  p_rrf_k integer default 60
+)
+returns table(
+  id text,
+  document_id text,
+  title text,
+  content text,
+  chunk_index int,
+  similarity float8,
+  text_rank float8,
+  rrf_score float8
+)
+language sql
+stable
+as $$
+  with agent_docs as (
+    select ad.document_id
+    from public.agent_documents ad
+    join public.agents a on a.id = ad.agent_id
+    where a.slug = p_agent_slug
+      and coalesce(ad.enabled, true)
+  ),
+  q as (
+    -- OR the query terms together; plainto_tsquery alone would require every word
+    select
+      to_tsquery('english', nullif(replace(plainto_tsquery('english', coalesce(p_query_text, ''))::text, ' & ', ' | '), '')) as content_q,
+      to_tsquery('simple', nullif(replace(plainto_tsquery('simple', coalesce(p_query_text, ''))::text, ' & ', ' | '), '')) as title_q
+  ),
+  vector_ranked as (
+    select v.id, v.similarity, row_number() over (order by v.distance) as rnk
+    from (
+      select
+        dc.id,
+        dc.embeddings_vec <=> p_query_embedding as distance,
+        1 - (dc.embeddings_vec <=> p_query_embedding) as similarity
+      from public.document_chunks dc
+      where dc.document_id in (select document_id from agent_docs)
+        and dc.embeddings_vec is not null
+      order by dc.embeddings_vec <=> p_query_embedding
+      limit p_candidate_count
+    ) v
+    where v.similarity > p_match_threshold
+  ),
+  lexical_ranked as (
+    select l.id, l.text_rank, row_number() over (order by l.text_rank desc) as rnk
+    from (
+      select
+        dc.id,
+        ts_rank_cd(dc.content_tsv, q.content_q)
+          + 2 * coalesce(ts_rank_cd(d.title_tsv, q.title_q), 0) as text_rank
+      from public.document_chunks dc
+      join public.documents d on d.id = dc.document_id
+      cross join q
+      where dc.document_id in (select document_id from agent_docs)
+        and (dc.content_tsv @@ q.content_q or d.title_tsv @@ q.title_q)
+      order by text_rank desc
+      limit p_candidate_count
+    ) l
+  ),
+  fused as (
+    select
+      coalesce(v.id, l.id) as id,
+      v.similarity,
+      l.text_rank,
+      coalesce(1.0 / (p_rrf_k + v.rnk), 0) + coalesce(1.0 / (p_rrf_k + l.rnk), 0) as rrf_score
+    from vector_ranked v
+    full outer join lexical_ranked l on l.id = v.id
+  )
+  select
+    f.id::text,
+    dc.document_id::text,
+    coalesce(d.title, 'Untitled')::text as title,
+    dc.content,
+    dc.chunk_index,
+    coalesce(f.similarity, 1 - (dc.embeddings_vec <=> p_query_embedding), 0)::float8 as similarity,
+    coalesce(f.text_rank, 0)::float8 as text_rank,
+    f.rrf_score::float8 as rrf_score
+  from fused f
+  join public.document_chunks dc on dc.id = f.id
+  join public.documents d on d.id = dc.document_id
+  order by f.rrf_score desc
+  limit p_match_count;
+$$;
+
 grant execute on function public.match_documents(vector, text, float8, integer) to anon, authenticated, service_role;
+grant execute on function public.match_documents_hybrid(vector, text, text, float8, integer, integer, integer) to anon, authenticated, service_role;
 grant execute on function public.match_conversation_transcripts_secure(vector, text, uuid, integer) to anon, authenticated, service_role;
 
 -- Ensure per-agent RAG result limits exist
@@ -309,7 +489,7 @@ def project_ref_from_url(url: str) -> str:
     return host.split(".supabase.co")[0]
 
 
-def execute_sql(project_ref: str, token: str, sql: str) -> Tuple[bool, str]:
+def execute_sql(project_ref: str, token: str, sql: str, timeout: int = 30) -> Tuple[bool, str]:
     """Execute raw SQL against a Supabase project via Management API."""
     url = SQL_ENDPOINT_TEMPLATE.format(project_ref=project_ref)
     headers = {
@@ -318,7 +498,7 @@ def execute_sql(project_ref: str, token: str, sql: str) -> Tuple[bool, str]:
         "Content-Type": "application/json",
     }
     payload = {"query": sql}
-    response = requests.post(url, headers=headers, json=payload, timeout=30)
+    response = requests.post(url, headers=headers, json=payload, timeout=timeout)
     if response.status_code in (200, 201):
         return True, ""
     try:
@@ -328,6 +508,38 @@ def execute_sql(project_ref: str, token: str, sql: str) -> Tuple[bool, str]:
     return False, detail
 
 
+def query_sql(project_ref: str, token: str, sql: str) -> List[Dict[str, Any]]:
+    """Run a read query via Management API and return its rows."""
+    url = SQL_ENDPOINT_TEMPLATE.format(project_ref=project_ref)
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "apikey": token,
+        "Content-Type": "application/json",
+    }
+    response = requests.post(url, headers=headers, json={"query": sql}, timeout=30)
+    if response.status_code not in (200, 201):
+        raise SchemaSyncError(f"Query failed for {project_ref}: {response.text}")
+    data = response.json()
+    if isinstance(data, dict):
+        return data.get("result") or data.get("data") or []
+    return data if isinstance(data, list) else []
+
+
+def sync_vector_indexes(
+    project_ref: str,
+    token: str,
+    policy: Optional[IndexPolicy] = None,
+) -> List[Tuple[str, bool, str]]:
+    """Size, (re)build and tune vector indexes for the project's current row counts."""
+    manager = VectorIndexManager(
+        # Concurrent index builds on large tables outlive the default timeout
+        execute=lambda sql: execute_sql(project_ref, token, sql, timeout=900),
+        query=lambda sql: query_sql(project_ref, token, sql),
+        policy=policy,
+    )
+    return manager.sync()
+
+
 def apply_schema(project_ref: str, token: str, include_indexes: bool = True) -> List[Tuple[str, bool, str]]:
     """Apply canonical schema patches to the given Supabase project.
 
@@ -348,8 +560,8 @@ def apply_schema(project_ref: str, token: str, include_indexes: bool = True) ->
     results.append(("rag_patch", ok_rag, detail_rag))
 
     if include_indexes:
-        ok_indexes, detail_indexes = execute_sql(project_ref, token, IVFFLAT_PATCH_SQL)
-        results.append(("ivfflat_indexes", ok_indexes, detail_indexes))
+        # One result per vector column: chosen index, row count and action taken
+        results.extend(sync_vector_indexes(project_ref, token))
 
     return results
 
@@ -384,5 +596,7 @@ __all__ = [
     "apply_schema",
     "project_ref_from_url",
     "execute_sql",
+    "query_sql",
+    "sync_vector_indexes",
     "fetch_platform_clients",
 ]
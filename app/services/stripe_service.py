@@ -11,6 +11,8 @@ from datetime import datetime
 
 import stripe
 
+from app.services.embed_config_cache import invalidate_embed_config
+
 logger = logging.getLogger(__name__)
 
 # Tier configuration
@@ -335,6 +337,7 @@ class StripeService:
         }
 
         supabase_client.table("clients").update(update_data).eq("id", client_id).execute()
+        await invalidate_embed_config(client_id)
         logger.info(f"Updated client {client_id} subscription status: {subscription.get('status')}")
 
     async def handle_subscription_deleted(
@@ -366,6 +369,7 @@ class StripeService:
             "subscription_status": "canceled",
             "subscription_canceled_at": datetime.utcnow().isoformat(),
         }).eq("id", client_id).execute()
+        await invalidate_embed_config(client_id)
 
         logger.info(f"Client {client_name} ({client_id}) subscription canceled")
 
@@ -414,6 +418,7 @@ class StripeService:
             ).isoformat()
 
         supabase_client.table("clients").update(update_data).eq("id", client_id).execute()
+        await invalidate_embed_config(client_id)
         logger.info(f"Updated subscription status for client {client_id}: {subscription_data.get('status')}")
 
 
@@ -0,0 +1,541 @@
+"""
+Text Conversation Sessions
+
+Long-lived per-conversation actors for text chat, so follow-up messages skip
+LiveKit room setup and job dispatch entirely.
+
+- The first message of a conversation still goes through room creation and
+  dispatch. The worker job that answers it then stays alive as the
+  conversation's actor (warm ``SidekickAgent``, chat history, tool registry)
+  and holds an owner lease for the conversation.
+- Follow-ups are queued on the conversation's inbox. The actor acknowledges
+  each turn immediately, then publishes the same payloads the room path
+  writes to room metadata (``text_response_partial``, ``text_response``,
+  ``streaming``, ...) on a per-turn reply stream.
+- Actors retire after ``TEXT_SESSION_IDLE_SECONDS`` (default 60) without
+  messages, since each one keeps a worker job busy, or when a turn carries a
+  different fingerprint. The fingerprint covers the agent config and the
+  user/client/agent identity, so an actor only serves the caller it was
+  started for. Turns that are not acknowledged within the ack timeout fall
+  back to room dispatch; actors stop accepting a margin before that timeout
+  and the client drains the reply stream once more before falling back, so a
+  turn is never answered by both paths.
+
+Backends: Redis streams (``TEXT_SESSION_BACKEND=redis``) or in-process queues
+(``memory``; only useful when API and worker share a process, e.g. tests).
+Disabled when unset.
+
+No dependency on ``app.config`` so the agent container can import it.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.utils.redis_url import redis_url_from_env
+
+logger = logging.getLogger(__name__)
+
+# Actors must accept a turn at least this long before the client gives up on it
+# (capped at a quarter of the ack timeout), which also absorbs clock skew
+ACK_MARGIN_SECONDS = 0.5
+
+# Agent context fields that change the behaviour of a warm actor, plus the
+# identity it serves; a turn whose fingerprint differs is handed back to
+# dispatch so the new config (and the caller's own context) is loaded.
+FINGERPRINT_FIELDS = (
+    "user_id",
+    "client_id",
+    "agent_id",
+    "system_prompt",
+    "voice_settings",
+    "tools",
+    "tools_config",
+    "tool_prompt_sections",
+    "dataset_ids",
+    "embedding",
+    "rerank",
+)
+
+TurnPublisher = Callable[[Dict[str, Any], int], Awaitable[None]]
+TurnHandler = Callable[[Dict[str, Any], TurnPublisher], Awaitable[None]]
+
+
+def session_fingerprint(agent_context: Dict[str, Any]) -> str:
+    """Stable hash of the dispatch config an actor was started with."""
+    snapshot = {field: agent_context.get(field) for field in FINGERPRINT_FIELDS}
+    tools = snapshot.get("tools") or []
+    # Tool payloads carry volatile fields (timestamps); identity is enough here
+    snapshot["tools"] = sorted(
+        str(tool.get("id") or tool.get("slug")) if isinstance(tool, dict) else str(tool) for tool in tools
+    )
+    encoded = json.dumps(snapshot, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+# ---------------------------------------------------------------------------
+# Buses
+# ---------------------------------------------------------------------------
+
+
+class TextSessionBus(ABC):
+    """Owner leases plus single-consumer message streams (inboxes and replies)."""
+
+    @abstractmethod
+    async def claim(self, conversation_id: str, owner: str, ttl: float) -> bool:
+        """Take or refresh the conversation's owner lease; False if someone else holds it."""
+
+    @abstractmethod
+    async def release(self, conversation_id: str, owner: str) -> None:
+        """Drop the lease if ``owner`` still holds it."""
+
+    @abstractmethod
+    async def owner(self, conversation_id: str) -> Optional[str]:
+        """Current lease holder, if any."""
+
+    @abstractmethod
+    async def push(self, stream: str, message: Dict[str, Any]) -> None:
+        """Append a message to ``stream``."""
+
+    @abstractmethod
+    async def pop(self, stream: str, timeout: float) -> List[Dict[str, Any]]:
+        """Remove and return pending messages, waiting up to ``timeout`` for the first."""
+
+    async def close(self) -> None:
+        """Release connections."""
+
+    @staticmethod
+    def inbox(conversation_id: str) -> str:
+        return f"text_session:{conversation_id}:inbox"
+
+    @staticmethod
+    def replies(turn_id: str) -> str:
+        return f"text_session:turn:{turn_id}"
+
+
+class InMemoryTextSessionBus(TextSessionBus):
+    """Process-local bus; the stand-in for local development and tests."""
+
+    def __init__(self) -> None:
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._streams: Dict[str, List[Dict[str, Any]]] = {}
+        self._changed = asyncio.Condition()
+
+    def _live_owner(self, conversation_id: str) -> Optional[str]:
+        lease = self._leases.get(conversation_id)
+        if lease and lease[1] > time.monotonic():
+            return lease[0]
+        self._leases.pop(conversation_id, None)
+        return None
+
+    async def claim(self, conversation_id: str, owner: str, ttl: float) -> bool:
+        current = self._live_owner(conversation_id)
+        if current not in (None, owner):
+            return False
+        self._leases[conversation_id] = (owner, time.monotonic() + ttl)
+        return True
+
+    async def release(self, conversation_id: str, owner: str) -> None:
+        if self._live_owner(conversation_id) == owner:
+            self._leases.pop(conversation_id, None)
+
+    async def owner(self, conversation_id: str) -> Optional[str]:
+        return self._live_owner(conversation_id)
+
+    async def push(self, stream: str, message: Dict[str, Any]) -> None:
+        async with self._changed:
+            self._streams.setdefault(stream, []).append(message)
+            self._changed.notify_all()
+
+    async def pop(self, stream: str, timeout: float) -> List[Dict[str, Any]]:
+        async with self._changed:
+            if self._streams.get(stream):
+                return self._streams.pop(stream)
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait_for(lambda: bool(self._streams.get(stream))),
+                    timeout=max(timeout, 0.0),
+                )
+            except asyncio.TimeoutError:
+                return []
+            return self._streams.pop(stream, [])
+
+
+# Take the lease when free or already ours; refresh its TTL either way
+_CLAIM_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if (not current) or current == ARGV[1] then
+  redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+  return 1
+end
+return 0
+"""
+
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisTextSessionBus(TextSessionBus):
+    """
+    Redis streams bus. Each stream has a single consumer (the owning actor for
+    an inbox, the waiting request for a reply stream), so entries are deleted
+    as they are read instead of tracking consumer groups.
+    """
+
+    STREAM_MAXLEN = 200
+    STREAM_TTL_SECONDS = 300
+
+    def __init__(self, redis_url: str) -> None:
+        import redis.asyncio as aioredis
+
+        self._redis = aioredis.from_url(redis_url, decode_responses=True)
+
+    @staticmethod
+    def _lease_key(conversation_id: str) -> str:
+        return f"text_session:{conversation_id}:owner"
+
+    async def claim(self, conversation_id: str, owner: str, ttl: float) -> bool:
+        result = await self._redis.eval(_CLAIM_SCRIPT, 1, self._lease_key(conversation_id), owner, int(ttl * 1000))
+        return bool(result)
+
+    async def release(self, conversation_id: str, owner: str) -> None:
+        await self._redis.eval(_RELEASE_SCRIPT, 1, self._lease_key(conversation_id), owner)
+
+    async def owner(self, conversation_id: str) -> Optional[str]:
+        return await self._redis.get(self._lease_key(conversation_id))
+
+    async def push(self, stream: str, message: Dict[str, Any]) -> None:
+        pipe = self._redis.pipeline()
+        pipe.xadd(stream, {"message": json.dumps(message, default=str)}, maxlen=self.STREAM_MAXLEN, approximate=True)
+        pipe.expire(stream, self.STREAM_TTL_SECONDS)
+        await pipe.execute()
+
+    async def pop(self, stream: str, timeout: float) -> List[Dict[str, Any]]:
+        entries = await self._redis.xread({stream: "0-0"}, block=max(1, int(timeout * 1000)), count=100)
+        messages: List[Dict[str, Any]] = []
+        entry_ids: List[str] = []
+        for _stream_name, items in entries or []:
+            for entry_id, fields in items:
+                entry_ids.append(entry_id)
+                try:
+                    messages.append(json.loads((fields or {}).get("message") or "{}"))
+                except ValueError:
+                    logger.warning(f"Dropping malformed text session message on {stream}")
+        if entry_ids:
+            await self._redis.xdel(stream, *entry_ids)
+        return messages
+
+    async def close(self) -> None:
+        await self._redis.close()
+
+
+_bus: Optional[TextSessionBus] = None
+_bus_resolved = False
+
+
+def get_text_session_bus() -> Optional[TextSessionBus]:
+    """
+    Return the process-wide bus selected by ``TEXT_SESSION_BACKEND``
+    (``redis`` or ``memory``). None when text sessions are disabled.
+    """
+    global _bus, _bus_resolved
+    if _bus_resolved:
+        return _bus
+    _bus_resolved = True
+
+    backend = (os.getenv("TEXT_SESSION_BACKEND") or "").strip().lower()
+    try:
+        if backend == "redis":
+            url = redis_url_from_env("TEXT_SESSION_REDIS_URL")
+            if url:
+                _bus = RedisTextSessionBus(url)
+            else:
+                logger.warning("TEXT_SESSION_BACKEND=redis but no Redis URL configured; text sessions disabled")
+        elif backend == "memory":
+            _bus = InMemoryTextSessionBus()
+    except Exception as e:
+        logger.warning(f"Text session bus '{backend}' unavailable; text sessions disabled: {e}")
+        _bus = None
+    return _bus
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+
+class TextSessionActor:
+    """
+    Serves one conversation's follow-up turns from inside a worker job.
+
+    Turns are acknowledged as soon as they are read and then handled one at a
+    time by ``handler(turn, publish)``, which calls ``publish(payload, retries)``
+    with the same payloads the room path writes to room metadata.
+
+    Args:
+        bus: Shared session bus
+        conversation_id: Conversation this actor owns
+        fingerprint: ``session_fingerprint`` of the config the agent was built with
+        handler: Runs one turn
+        idle_seconds: Retire after this long without a turn
+        lease_seconds: Owner lease TTL (refreshed every ``lease_seconds / 3``)
+        worker_id: Lease owner identity
+    """
+
+    def __init__(
+        self,
+        bus: TextSessionBus,
+        conversation_id: str,
+        fingerprint: Optional[str],
+        handler: TurnHandler,
+        idle_seconds: Optional[float] = None,
+        lease_seconds: float = 30.0,
+        worker_id: Optional[str] = None,
+    ):
+        self.bus = bus
+        self.conversation_id = conversation_id
+        self.fingerprint = fingerprint
+        self.handler = handler
+        self.idle_seconds = (
+            idle_seconds if idle_seconds is not None else float(os.getenv("TEXT_SESSION_IDLE_SECONDS", "60"))
+        )
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or f"{os.getenv('HOSTNAME', 'worker')}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.turns_served = 0
+        self._pending: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self._busy = False
+        self._stopping = False
+        self._last_activity = time.monotonic()
+
+    def stop(self) -> None:
+        """Retire at the next poll (e.g. the room was disconnected)."""
+        self._stopping = True
+
+    async def _reply(self, turn_id: str, event: Dict[str, Any]) -> None:
+        try:
+            await self.bus.push(TextSessionBus.replies(turn_id), event)
+        except Exception as e:
+            logger.warning(f"Text session reply for turn {turn_id} failed: {e}")
+
+    async def _accept(self, turn: Dict[str, Any]) -> bool:
+        turn_id = turn.get("turn_id")
+        if not turn_id:
+            return False
+        deadline = turn.get("ack_deadline")
+        if deadline and time.time() > float(deadline):
+            # The request already gave up and fell back to dispatch
+            await self._reply(turn_id, {"type": "retired", "reason": "expired"})
+            return False
+        if self.fingerprint and turn.get("fingerprint") != self.fingerprint:
+            # Also covers turns without a fingerprint: identity can't be checked, so never serve them
+            logger.info(f"Text session {self.conversation_id}: agent config or caller changed, retiring actor")
+            await self._reply(turn_id, {"type": "retired", "reason": "config_changed"})
+            self._stopping = True
+            return False
+        await self._reply(turn_id, {"type": "accepted", "worker_id": self.worker_id})
+        return True
+
+    async def _process(self) -> None:
+        while True:
+            turn = await self._pending.get()
+            turn_id = turn["turn_id"]
+            self._busy = True
+
+            async def publish(payload: Dict[str, Any], retries: int = 0, _turn_id: str = turn_id) -> None:
+                await self._reply(_turn_id, {"type": "update", "payload": payload})
+
+            try:
+                await self.handler(turn, publish)
+                self.turns_served += 1
+            except asyncio.CancelledError:
+                await self._reply(turn_id, {"type": "error", "error": "Text session closed"})
+                raise
+            except Exception as e:
+                logger.error(f"Text session turn {turn_id} failed: {type(e).__name__}: {e}")
+                await self._reply(turn_id, {"type": "error", "error": str(e)})
+            finally:
+                self._busy = False
+                self._last_activity = time.monotonic()
+
+    def _idle(self) -> bool:
+        return (
+            not self._busy
+            and self._pending.empty()
+            and time.monotonic() - self._last_activity >= self.idle_seconds
+        )
+
+    async def serve(self) -> None:
+        """Claim the conversation and serve turns until idle, stopped or displaced."""
+        if not await self.bus.claim(self.conversation_id, self.worker_id, self.lease_seconds):
+            logger.info(f"Text session {self.conversation_id} already has an actor; not serving")
+            return
+
+        logger.info(f"Text session actor started for {self.conversation_id} (idle={self.idle_seconds}s)")
+        inbox = TextSessionBus.inbox(self.conversation_id)
+        poll = max(0.05, min(self.lease_seconds / 3, 5.0))
+        processor = asyncio.create_task(self._process())
+        try:
+            while not self._stopping and not self._idle():
+                if not await self.bus.claim(self.conversation_id, self.worker_id, self.lease_seconds):
+                    logger.warning(f"Text session {self.conversation_id}: lease lost, retiring")
+                    break
+                for turn in await self.bus.pop(inbox, timeout=poll):
+                    if self._stopping:
+                        await self._reply(turn.get("turn_id", ""), {"type": "retired", "reason": "retiring"})
+                    elif await self._accept(turn):
+                        self._last_activity = time.monotonic()
+                        self._pending.put_nowait(turn)
+                if processor.done():
+                    break
+            # Let accepted turns finish before giving the conversation up
+            while not processor.done() and (self._busy or not self._pending.empty()):
+                await asyncio.sleep(poll)
+        finally:
+            await self.bus.release(self.conversation_id, self.worker_id)
+            processor.cancel()
+            # Anything that raced the release goes back to dispatch
+            try:
+                for turn in await self.bus.pop(inbox, timeout=0):
+                    await self._reply(turn.get("turn_id", ""), {"type": "retired", "reason": "retiring"})
+            except Exception:
+                pass
+            logger.info(f"Text session actor for {self.conversation_id} retired after {self.turns_served} turns")
+
+
+# ---------------------------------------------------------------------------
+# API side
+# ---------------------------------------------------------------------------
+
+
+class TextSessionTurn:
+    """An accepted turn; iterate ``updates()`` like ``poll_for_text_response_streaming``."""
+
+    def __init__(self, bus: TextSessionBus, turn_id: str, timeout: float):
+        self.bus = bus
+        self.turn_id = turn_id
+        self.timeout = timeout
+
+    async def updates(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield ``{"delta"}``, then ``{"done", "full_text", ...}`` or ``{"error"}``."""
+        stream = TextSessionBus.replies(self.turn_id)
+        deadline = time.monotonic() + self.timeout
+        last_partial_len = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                yield {"error": f"Text response timeout after {self.timeout}s"}
+                return
+            for event in await self.bus.pop(stream, timeout=min(remaining, 5.0)):
+                kind = event.get("type")
+                if kind in ("error", "retired"):
+                    yield {"error": event.get("error") or f"Text session retired ({event.get('reason')})"}
+                    return
+                if kind != "update":
+                    continue
+                payload = event.get("payload") or {}
+                partial = payload.get("text_response_partial") or ""
+                if len(partial) > last_partial_len:
+                    yield {"delta": partial[last_partial_len:]}
+                    last_partial_len = len(partial)
+                text_response = payload.get("text_response")
+                if text_response and payload.get("streaming") is not True:
+                    result = {
+                        "done": True,
+                        "full_text": text_response,
+                        "citations": payload.get("citations") or [],
+                        "tool_results": payload.get("tool_results") or [],
+                    }
+                    if payload.get("widget"):
+                        result["widget"] = payload["widget"]
+                    yield result
+                    return
+
+    async def result(self) -> Tuple[str, List[Dict[str, Any]], List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Wait for the final response: (text, citations, tool_results, widget)."""
+        async for update in self.updates():
+            if "error" in update:
+                raise RuntimeError(update["error"])
+            if update.get("done"):
+                return update["full_text"], update["citations"], update["tool_results"], update.get("widget")
+        raise RuntimeError("Text session ended without a response")
+
+
+class TextSessionClient:
+    """Submits follow-up turns to a live conversation actor."""
+
+    def __init__(self, bus: TextSessionBus, ack_timeout: float = 2.0, turn_timeout: float = 90.0):
+        self.bus = bus
+        self.ack_timeout = ack_timeout
+        self.turn_timeout = turn_timeout
+
+    async def submit(
+        self,
+        conversation_id: str,
+        user_message: str,
+        *,
+        fingerprint: Optional[str] = None,
+        user_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+    ) -> Optional[TextSessionTurn]:
+        """
+        Queue a turn for the conversation's actor.
+
+        Returns None when there is no live actor or it did not accept the turn
+        within ``ack_timeout``; the caller should dispatch as usual.
+        """
+        if not await self.bus.owner(conversation_id):
+            return None
+
+        turn_id = uuid.uuid4().hex
+        margin = min(ACK_MARGIN_SECONDS, self.ack_timeout / 4)
+        await self.bus.push(
+            TextSessionBus.inbox(conversation_id),
+            {
+                "turn_id": turn_id,
+                "conversation_id": conversation_id,
+                "user_message": user_message,
+                "user_id": user_id,
+                "session_id": session_id,
+                "fingerprint": fingerprint,
+                # Last moment the actor may accept; the client keeps listening for the full ack_timeout
+                "ack_deadline": time.time() + self.ack_timeout - margin,
+            },
+        )
+
+        stream = TextSessionBus.replies(turn_id)
+        deadline = time.monotonic() + self.ack_timeout
+        while True:
+            remaining = max(deadline - time.monotonic(), 0.0)
+            # The final pass (remaining == 0) still picks up an ack pushed right at the deadline
+            for event in await self.bus.pop(stream, timeout=remaining):
+                if event.get("type") == "accepted":
+                    return TextSessionTurn(self.bus, turn_id, self.turn_timeout)
+                logger.info(f"Text session turn for {conversation_id} not accepted: {event.get('reason') or event}")
+                return None
+            if remaining <= 0:
+                break
+        logger.info(f"Text session actor for {conversation_id} did not acknowledge in {self.ack_timeout}s")
+        return None
+
+
+def get_text_session_client() -> Optional[TextSessionClient]:
+    """Client over the process-wide bus, or None when text sessions are disabled."""
+    bus = get_text_session_bus()
+    if bus is None:
+        return None
+    return TextSessionClient(
+        bus,
+        ack_timeout=float(os.getenv("TEXT_SESSION_ACK_TIMEOUT", "2.0")),
+        turn_timeout=float(os.getenv("TEXT_SESSION_TURN_TIMEOUT", "90")),
+    )
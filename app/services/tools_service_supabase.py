@@ -5,6 +5,7 @@ from supabase import Client as SupabaseClient
 from app.models.tools import ToolCreate, ToolUpdate, ToolOut
 from app.services.client_service_supabase import ClientService
 from app.services.perplexity_mcp_manager import get_perplexity_mcp_manager
+from app.services.embed_config_cache import invalidate_embed_config
 
 
 class ToolsService:
@@ -273,6 +274,7 @@ class ToolsService:
         rows = [{"agent_id": agent_id, "tool_id": tid} for tid in tool_ids]
         if rows:
             platform_sb.table("agent_tools").insert(rows).execute()
+        await invalidate_embed_config(client_id)
 
     async def _augment_tool_for_agent(self, tool: ToolOut, client_id: str) -> ToolOut:
         if (tool.slug or "") == "perplexity_ask" and tool.enabled:
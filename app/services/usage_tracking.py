@@ -16,6 +16,8 @@ from datetime import datetime, date
 from dataclasses import dataclass, field
 from enum import Enum
 
+from app.services.credential_cache import get_credential_cache
+
 logger = logging.getLogger(__name__)
 
 
@@ -1041,9 +1043,14 @@ class PlatformKeyService:
         """
         Get API keys for a client.
         Returns platform keys if client uses_platform_keys, otherwise returns client's own keys.
+        Served from the process-wide credential cache; see invalidate_client_credentials.
         """
         self._ensure_initialized()
+        return await get_credential_cache().aget(
+            client_id, "resolved_keys", lambda: self._load_api_keys_for_client(client_id)
+        )
 
+    async def _load_api_keys_for_client(self, client_id: str) -> Dict[str, str]:
         use_platform = await self.should_use_platform_keys(client_id)
 
         if use_platform:
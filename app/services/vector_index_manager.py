@@ -0,0 +1,344 @@
+"""Adaptive pgvector index management for tenant Supabase projects.
+
+Replaces the fixed ``ivfflat (lists = 16)`` indexes that used to be built once at
+provisioning time (usually on empty tables). For every vector column the
+manager inspects how many embeddings exist and picks an index sized for it:
+
+* below ``min_index_rows``: no ANN index; an exact scan is fast and has perfect
+  recall, and IVFFlat centroids trained on an almost-empty table hurt recall
+* up to ``hnsw_max_rows``: HNSW, which needs no training and stays accurate as
+  the table grows
+* beyond that: IVFFlat with ``lists`` sized from the row count (cheaper to build
+  and hold in memory at that scale)
+
+Indexes are rebuilt ``CONCURRENTLY`` (new index first, then the old one is
+dropped) once the chosen method or parameters drift from the plan, and the
+search RPCs get per-function ``ivfflat.probes`` / ``hnsw.ef_search`` settings.
+"""
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ExecuteFn = Callable[[str], Tuple[bool, str]]
+QueryFn = Callable[[str], List[Dict[str, Any]]]
+
+# (table, column) pairs that carry embeddings
+VECTOR_INDEX_TARGETS: List[Tuple[str, str]] = [
+    ("documents", "embeddings"),
+    ("documents", "embedding"),
+    ("documents", "embedding_vec"),
+    ("document_chunks", "embeddings"),
+    ("document_chunks", "embeddings_vec"),
+    ("conversation_transcripts", "embeddings"),
+    ("conversation_turn_embeddings", "embeddings"),
+]
+
+# Search RPCs and the vector column each one scans
+RPC_VECTOR_COLUMNS: Dict[str, Tuple[str, str]] = {
+    "public.match_documents(vector, text, float8, integer)": ("documents", "embeddings"),
+    "public.match_documents_hybrid(vector, text, text, float8, integer, integer, integer)": (
+        "document_chunks",
+        "embeddings_vec",
+    ),
+    "public.match_conversation_transcripts_secure(vector, text, uuid, integer)": (
+        "conversation_turn_embeddings",
+        "embeddings",
+    ),
+}
+
+# Tables estimated below this are counted exactly (bounded) instead of trusting stats
+EXACT_COUNT_LIMIT = 200_000
+
+
+@dataclass
+class IndexPolicy:
+    """Thresholds for choosing and sizing vector indexes."""
+
+    min_index_rows: int = 5_000
+    hnsw_max_rows: int = 1_000_000
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 64
+    hnsw_ef_search: int = 80
+    # Rebuild IVFFlat once the ideal list count drifts by more than this factor
+    ivfflat_drift_factor: float = 2.0
+
+
+@dataclass
+class ExistingIndex:
+    name: str
+    method: str
+    valid: bool = True
+    options: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class VectorIndexPlan:
+    """Desired index for one vector column and what it takes to get there."""
+
+    table: str
+    column: str
+    rows: int
+    method: str  # "none" | "hnsw" | "ivfflat"
+    params: Dict[str, int] = field(default_factory=dict)
+    search_settings: Dict[str, int] = field(default_factory=dict)
+    action: str = "keep"  # "keep" | "create" | "rebuild" | "drop"
+    reason: str = ""
+    existing: List[ExistingIndex] = field(default_factory=list)
+
+    @property
+    def target(self) -> str:
+        return f"{self.table}.{self.column}"
+
+    @property
+    def index_name(self) -> Optional[str]:
+        if self.method == "hnsw":
+            return f"{self.table}_{self.column}_hnsw_m{self.params['m']}"
+        if self.method == "ivfflat":
+            return f"{self.table}_{self.column}_ivfflat_l{self.params['lists']}"
+        return None
+
+    def describe(self) -> str:
+        params = ",".join(f"{k}={v}" for k, v in self.params.items())
+        index = f"{self.method}({params})" if params else self.method
+        existing = ", ".join(f"{ix.method}:{ix.name}{'' if ix.valid else ' (invalid)'}" for ix in self.existing) or "none"
+        return f"rows={self.rows} index={index} existing=[{existing}] action={self.action} ({self.reason})"
+
+
+def _ivfflat_lists(rows: int) -> int:
+    # pgvector guidance: rows/1000 up to 1M rows, sqrt(rows) beyond
+    lists = rows // 1000 if rows <= 1_000_000 else int(math.sqrt(rows))
+    return max(lists, 10)
+
+
+def _parse_options(raw: Any) -> Dict[str, str]:
+    options: Dict[str, str] = {}
+    for item in raw or []:
+        key, _, value = str(item).partition("=")
+        options[key] = value
+    return options
+
+
+def plan_index(
+    table: str,
+    column: str,
+    rows: int,
+    existing: List[ExistingIndex],
+    policy: Optional[IndexPolicy] = None,
+) -> VectorIndexPlan:
+    """Decide the index for a column given its embedding count and current indexes."""
+    policy = policy or IndexPolicy()
+    plan = VectorIndexPlan(table=table, column=column, rows=rows, method="none", existing=existing)
+
+    if rows < policy.min_index_rows:
+        plan.action = "drop" if existing else "keep"
+        plan.reason = f"below {policy.min_index_rows} rows; exact scan"
+        return plan
+
+    if rows <= policy.hnsw_max_rows:
+        plan.method = "hnsw"
+        plan.params = {"m": policy.hnsw_m, "ef_construction": policy.hnsw_ef_construction}
+        plan.search_settings = {"hnsw.ef_search": policy.hnsw_ef_search}
+    else:
+        lists = _ivfflat_lists(rows)
+        plan.method = "ivfflat"
+        plan.params = {"lists": lists}
+        plan.search_settings = {"ivfflat.probes": max(1, int(math.sqrt(lists)))}
+
+    current = [ix for ix in existing if ix.valid and ix.method == plan.method]
+    if not existing:
+        plan.action, plan.reason = "create", "no vector index"
+    elif not current:
+        plan.action, plan.reason = "rebuild", f"switching to {plan.method}"
+    elif len(existing) > 1:
+        plan.action, plan.reason = "rebuild", "duplicate or invalid indexes"
+    elif plan.method == "ivfflat":
+        built_lists = int(current[0].options.get("lists") or 0)
+        target = plan.params["lists"]
+        drift = max(built_lists, target) / max(min(built_lists, target), 1)
+        if drift > policy.ivfflat_drift_factor:
+            plan.action, plan.reason = "rebuild", f"lists {built_lists} -> {target}"
+        else:
+            plan.reason = f"lists={built_lists} within tolerance"
+    else:
+        plan.reason = "hnsw in place"
+    return plan
+
+
+class VectorIndexManager:
+    """Inspects and reconciles vector indexes for one tenant database."""
+
+    def __init__(
+        self,
+        execute: ExecuteFn,
+        query: QueryFn,
+        policy: Optional[IndexPolicy] = None,
+        targets: Optional[List[Tuple[str, str]]] = None,
+    ):
+        self.execute = execute
+        self.query = query
+        self.policy = policy or IndexPolicy()
+        self.targets = targets or VECTOR_INDEX_TARGETS
+
+    # ------------------------------------------------------------------
+    # Inspection
+    # ------------------------------------------------------------------
+
+    def _inventory_sql(self) -> str:
+        pairs = ", ".join(f"('{table}', '{column}')" for table, column in self.targets)
+        return f"""
+select
+  c.table_name,
+  c.column_name,
+  greatest(pc.reltuples, 0)::bigint as estimated_rows,
+  s.null_frac,
+  (
+    select coalesce(json_agg(json_build_object(
+      'name', ic.relname,
+      'method', am.amname,
+      'valid', ix.indisvalid,
+      'options', ic.reloptions
+    )), '[]'::json)
+    from pg_index ix
+    join pg_class ic on ic.oid = ix.indexrelid
+    join pg_am am on am.oid = ic.relam
+    join pg_attribute att on att.attrelid = ix.indrelid and att.attnum = any(ix.indkey)
+    where ix.indrelid = pc.oid
+      and att.attname = c.column_name
+      and am.amname in ('ivfflat', 'hnsw')
+  ) as indexes
+from information_schema.columns c
+join pg_class pc on pc.relname = c.table_name and pc.relnamespace = 'public'::regnamespace
+left join pg_stats s
+  on s.schemaname = 'public' and s.tablename = c.table_name and s.attname = c.column_name and not s.inherited
+where c.table_schema = 'public'
+  and c.udt_name = 'vector'
+  and (c.table_name, c.column_name) in ({pairs})
+""".strip()
+
+    def inspect(self) -> List[VectorIndexPlan]:
+        """Plan every existing vector column; counts come from stats, or exactly for small tables."""
+        rows = self.query(self._inventory_sql())
+        inventory: List[Tuple[str, str, int, Optional[float], List[ExistingIndex]]] = []
+        needs_count: List[Tuple[str, str]] = []
+        for row in rows:
+            table, column = row["table_name"], row["column_name"]
+            estimated = int(row.get("estimated_rows") or 0)
+            null_frac = row.get("null_frac")
+            raw_indexes = row.get("indexes") or []
+            if isinstance(raw_indexes, str):
+                raw_indexes = json.loads(raw_indexes)
+            existing = [
+                ExistingIndex(
+                    name=ix["name"],
+                    method=ix["method"],
+                    valid=bool(ix.get("valid", True)),
+                    options=_parse_options(ix.get("options")),
+                )
+                for ix in raw_indexes
+            ]
+            inventory.append((table, column, estimated, null_frac, existing))
+            if estimated < EXACT_COUNT_LIMIT or null_frac is None:
+                needs_count.append((table, column))
+
+        exact: Dict[Tuple[str, str], int] = {}
+        if needs_count:
+            counts_sql = "\nunion all\n".join(
+                f"select '{table}' as table_name, '{column}' as column_name, count(*)::bigint as rows "
+                f"from (select 1 from public.{table} where {column} is not null limit {EXACT_COUNT_LIMIT + 1}) t"
+                for table, column in needs_count
+            )
+            for row in self.query(counts_sql):
+                exact[(row["table_name"], row["column_name"])] = int(row["rows"])
+
+        plans = []
+        for table, column, estimated, null_frac, existing in inventory:
+            if (table, column) in exact and exact[(table, column)] <= EXACT_COUNT_LIMIT:
+                count = exact[(table, column)]
+            else:
+                count = int(estimated * (1 - float(null_frac or 0)))
+            plans.append(plan_index(table, column, count, existing, self.policy))
+        return plans
+
+    # ------------------------------------------------------------------
+    # Reconciliation
+    # ------------------------------------------------------------------
+
+    def _create_sql(self, plan: VectorIndexPlan) -> str:
+        with_clause = ", ".join(f"{k} = {v}" for k, v in plan.params.items())
+        return (
+            f"create index concurrently if not exists {plan.index_name} "
+            f"on public.{plan.table} using {plan.method} ({plan.column} vector_cosine_ops) "
+            f"with ({with_clause})"
+        )
+
+    def apply(self, plan: VectorIndexPlan) -> Tuple[bool, str]:
+        """Bring one column's indexes in line with its plan.
+
+        Each statement runs on its own because CONCURRENTLY can't run inside a
+        transaction block. The old index is only dropped after the new one built.
+        """
+        if plan.action == "keep":
+            return True, plan.describe()
+
+        if plan.action in ("create", "rebuild") and plan.index_name:
+            stale_same_name = [ix for ix in plan.existing if ix.name == plan.index_name and not ix.valid]
+            for ix in stale_same_name:
+                self.execute(f"drop index concurrently if exists public.{ix.name}")
+            ok, detail = self.execute(self._create_sql(plan))
+            if not ok:
+                return False, f"{plan.describe()} -> create failed: {detail}"
+
+        for ix in plan.existing:
+            if ix.name == plan.index_name and ix.valid:
+                continue
+            ok, detail = self.execute(f"drop index concurrently if exists public.{ix.name}")
+            if not ok:
+                return False, f"{plan.describe()} -> drop {ix.name} failed: {detail}"
+        return True, plan.describe()
+
+    def apply_search_settings(self, plans: List[VectorIndexPlan]) -> Tuple[bool, str]:
+        """Pin probes / ef_search on each search RPC for the index it scans."""
+        by_target = {(p.table, p.column): p for p in plans}
+        statements = []
+        for signature, target in RPC_VECTOR_COLUMNS.items():
+            plan = by_target.get(target)
+            if not plan or not plan.search_settings:
+                continue
+            for setting, value in plan.search_settings.items():
+                statements.append(f"alter function {signature} set {setting} = {int(value)};")
+        if not statements:
+            return True, "no ANN indexes; exact scans"
+        # Functions may be missing on partially provisioned tenants; skip those quietly
+        body = "\n".join(
+            f"  begin execute '{stmt.rstrip(';')}'; exception when undefined_function then null; end;"
+            for stmt in statements
+        )
+        ok, detail = self.execute(f"do $$\nbegin\n{body}\nend$$;")
+        return ok, detail or f"{len(statements)} RPC search settings applied"
+
+    def sync(self) -> List[Tuple[str, bool, str]]:
+        """Inspect, reconcile and report; returns apply_schema-style result tuples."""
+        try:
+            plans = self.inspect()
+        except Exception as exc:
+            return [("vector_indexes", False, f"inspection failed: {exc}")]
+
+        results: List[Tuple[str, bool, str]] = []
+        for plan in plans:
+            ok, detail = self.apply(plan)
+            results.append((f"vector_index:{plan.target}", ok, detail))
+        ok, detail = self.apply_search_settings(plans)
+        results.append(("vector_search_settings", ok, detail))
+        return results
+
+
+__all__ = [
+    "IndexPolicy",
+    "ExistingIndex",
+    "VectorIndexPlan",
+    "VectorIndexManager",
+    "plan_index",
+]
@@ -0,0 +1,362 @@
+"""
+Web Scraping Engine
+
+Shared, cached web scraper used by the agent's built-in ``scrape_url`` fallback
+and by Content Catalyst when a source URL is provided.
+
+- One pooled ``aiohttp.ClientSession`` per event loop (no session per call)
+- Streaming download with a hard byte ceiling
+- HTML parsing + markdown conversion in a worker thread, off the event loop
+- Process-wide content cache keyed by URL, revalidated with ETag/Last-Modified
+  and evicted by TTL / LRU size
+
+This module intentionally has no dependency on ``app.config`` so it can be
+imported from the standalone agent container.
+"""
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+}
+
+_STRIP_TAGS = ["script", "style", "nav", "header", "footer", "aside", "noscript", "iframe"]
+_MAIN_SELECTORS = ["main", "article", "[role='main']", ".content", "#content", ".post", ".article"]
+
+
+class ScrapeError(Exception):
+    """Raised when a page cannot be fetched or is not scrapeable HTML"""
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class ScrapedPage:
+    """Parsed page content as returned by the scraper"""
+    title: str
+    description: str
+    markdown: str
+    source_url: str
+    links: List[str] = field(default_factory=list)
+    truncated: bool = False
+    from_cache: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "title": self.title,
+            "description": self.description,
+            "markdown": self.markdown,
+            "links": list(self.links),
+            "source_url": self.source_url,
+            "truncated": self.truncated,
+            "from_cache": self.from_cache,
+        }
+
+
+@dataclass
+class _CacheEntry:
+    page: ScrapedPage
+    expires_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+def parse_html(html_content: str, final_url: str) -> Dict[str, Any]:
+    """
+    Extract title, description, main-content markdown and absolute links.
+
+    Pure and thread-safe; runs in a worker thread via ``asyncio.to_thread``.
+    Links are always extracted so a single cache entry can serve callers that
+    do and do not ask for them.
+    """
+    try:
+        from bs4 import BeautifulSoup
+        import html2text
+    except ImportError as e:
+        raise ScrapeError("Web scraping libraries not available. Please contact support.") from e
+
+    try:
+        soup = BeautifulSoup(html_content, "lxml")
+    except Exception:
+        soup = BeautifulSoup(html_content, "html.parser")
+
+    # Extract title
+    title = "Untitled"
+    if soup.title and soup.title.string:
+        title = soup.title.string.strip()
+    elif soup.find("h1"):
+        title = soup.find("h1").get_text(strip=True)
+
+    # Extract description from meta tags
+    description = ""
+    meta_desc = soup.find("meta", attrs={"name": "description"})
+    if meta_desc and meta_desc.get("content"):
+        description = meta_desc["content"].strip()
+    else:
+        og_desc = soup.find("meta", attrs={"property": "og:description"})
+        if og_desc and og_desc.get("content"):
+            description = og_desc["content"].strip()
+
+    links: List[str] = []
+    for a_tag in soup.find_all("a", href=True):
+        href = a_tag["href"]
+        if href.startswith(("http://", "https://")):
+            links.append(href)
+    links = list(dict.fromkeys(links))  # Remove duplicates while preserving order
+
+    # Remove unwanted elements before conversion
+    for tag in soup.find_all(_STRIP_TAGS):
+        tag.decompose()
+
+    main_content = None
+    for selector in _MAIN_SELECTORS:
+        main_content = soup.select_one(selector)
+        if main_content:
+            break
+    if not main_content:
+        main_content = soup.find("body") or soup
+
+    h2t = html2text.HTML2Text()
+    h2t.ignore_links = False
+    h2t.ignore_images = True
+    h2t.ignore_emphasis = False
+    h2t.body_width = 0  # No wrapping
+    h2t.skip_internal_links = True
+
+    markdown_content = h2t.handle(str(main_content))
+    markdown_content = re.sub(r"\n{3,}", "\n\n", markdown_content).strip()
+
+    return {
+        "title": title,
+        "description": description,
+        "markdown": markdown_content,
+        "links": links,
+        "source_url": final_url,
+    }
+
+
+class WebScraper:
+    """
+    Pooled, cached HTML scraper.
+
+    A single instance is shared process-wide (see ``web_scraper``) so repeated
+    scrapes of the same URL - within a conversation or across tenants - are
+    served from memory or revalidated with a cheap conditional request.
+    """
+
+    DEFAULT_MAX_BYTES = 5 * 1024 * 1024  # 5 MB
+    DEFAULT_TIMEOUT = 30.0
+    DEFAULT_CACHE_TTL = 900.0  # 15 minutes
+    DEFAULT_CACHE_SIZE = 256
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        timeout: float = DEFAULT_TIMEOUT,
+        cache_ttl: float = DEFAULT_CACHE_TTL,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        connection_limit: int = 20,
+    ):
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self.connection_limit = connection_limit
+
+        self._cache: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # ------------------------------------------------------------------
+    # Session management
+    # ------------------------------------------------------------------
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Get or create the pooled session bound to the running loop"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.connection_limit, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(headers=DEFAULT_HEADERS, connector=connector)
+            self._session_loop = loop
+        return self._session
+
+    async def close(self) -> None:
+        """Close the pooled session"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _cache_key(url: str) -> str:
+        return url.split("#", 1)[0].strip()
+
+    def _cache_get(self, key: str) -> Optional[_CacheEntry]:
+        entry = self._cache.get(key)
+        if entry is not None:
+            self._cache.move_to_end(key)
+        return entry
+
+    def _cache_put(self, key: str, entry: _CacheEntry) -> None:
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, url: Optional[str] = None) -> None:
+        """Drop one URL (or everything) from the cache"""
+        if url is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(self._cache_key(url), None)
+
+    # ------------------------------------------------------------------
+    # Scraping
+    # ------------------------------------------------------------------
+
+    async def scrape(
+        self,
+        url: str,
+        include_links: bool = False,
+        timeout: Optional[float] = None,
+    ) -> ScrapedPage:
+        """
+        Fetch and parse a URL, using the cache when possible.
+
+        Concurrent scrapes of the same URL share a single download.
+
+        Raises:
+            ScrapeError: On network or HTTP errors, timeouts, non-HTML content or parse failures
+        """
+        key = self._cache_key(url)
+        entry = self._cache_get(key)
+        if entry is not None and entry.expires_at > time.monotonic():
+            return self._shape(entry.page, include_links, from_cache=True)
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            page = await asyncio.shield(pending)
+            return self._shape(page, include_links, from_cache=True)
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            page = await self._fetch(key, entry, timeout or self.timeout)
+            future.set_result(page)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Avoid "exception was never retrieved" when nobody else waited
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        return self._shape(page, include_links, from_cache=page.from_cache)
+
+    @staticmethod
+    def _shape(page: ScrapedPage, include_links: bool, from_cache: bool) -> ScrapedPage:
+        return replace(page, links=list(page.links) if include_links else [], from_cache=from_cache)
+
+    async def _fetch(self, key: str, stale: Optional[_CacheEntry], timeout: float) -> ScrapedPage:
+        session = await self._get_session()
+
+        headers: Dict[str, str] = {}
+        if stale is not None:
+            if stale.etag:
+                headers["If-None-Match"] = stale.etag
+            if stale.last_modified:
+                headers["If-Modified-Since"] = stale.last_modified
+
+        client_timeout = aiohttp.ClientTimeout(total=timeout)
+        try:
+            async with session.get(key, headers=headers, allow_redirects=True, timeout=client_timeout) as resp:
+                if resp.status == 304 and stale is not None:
+                    stale.expires_at = time.monotonic() + self.cache_ttl
+                    self._cache_put(key, stale)
+                    logger.debug(f"Scrape cache revalidated: {key}")
+                    return replace(stale.page, from_cache=True)
+
+                if resp.status >= 400:
+                    raise ScrapeError(f"HTTP {resp.status} error fetching URL", status_code=resp.status)
+
+                content_type = resp.headers.get("Content-Type", "")
+                lowered = content_type.lower()
+                if "text/html" not in lowered and "application/xhtml" not in lowered:
+                    raise ScrapeError(f"URL returned non-HTML content type: {content_type}")
+
+                body, truncated = await self._read_capped(resp)
+                charset = resp.charset or "utf-8"
+                final_url = str(resp.url)
+                etag = resp.headers.get("ETag")
+                last_modified = resp.headers.get("Last-Modified")
+        except asyncio.TimeoutError as e:
+            raise ScrapeError(f"Timed out after {timeout:.0f}s fetching URL") from e
+        except aiohttp.ClientError as e:
+            raise ScrapeError(f"Failed to fetch URL: {e}") from e
+
+        try:
+            html_content = body.decode(charset, errors="replace")
+        except LookupError:
+            html_content = body.decode("utf-8", errors="replace")
+
+        parsed = await asyncio.to_thread(parse_html, html_content, final_url)
+        page = ScrapedPage(
+            title=parsed["title"],
+            description=parsed["description"],
+            markdown=parsed["markdown"],
+            source_url=parsed["source_url"],
+            links=parsed["links"],
+            truncated=truncated,
+        )
+
+        self._cache_put(
+            key,
+            _CacheEntry(
+                page=page,
+                expires_at=time.monotonic() + self.cache_ttl,
+                etag=etag,
+                last_modified=last_modified,
+            ),
+        )
+        return page
+
+    async def _read_capped(self, resp: aiohttp.ClientResponse) -> "tuple[bytes, bool]":
+        """Stream the response body, stopping at ``max_bytes``"""
+        buf = bytearray()
+        truncated = False
+        async for chunk in resp.content.iter_chunked(self.CHUNK_SIZE):
+            remaining = self.max_bytes - len(buf)
+            if len(chunk) >= remaining:
+                buf.extend(chunk[:remaining])
+                truncated = True
+                break
+            buf.extend(chunk)
+        if truncated:
+            logger.info(f"Scrape body truncated at {self.max_bytes} bytes: {resp.url}")
+        return bytes(buf), truncated
+
+
+# Process-wide shared instance
+web_scraper = WebScraper()
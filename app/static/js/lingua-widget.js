@@ -330,7 +330,8 @@ class LinguaWidget extends BaseWidget {
                     this.results = {
                         transcript: status.transcript,
                         translations: status.translations,
-                        download_urls: status.download_urls
+                        download_urls: status.download_urls,
+                        output_paths: status.output_paths
                     };
                     this.setPhase('complete');
                     this.renderCompletePhase();
@@ -471,7 +472,8 @@ class LinguaWidget extends BaseWidget {
         }).join('');
 
         // Preview of transcript
-        const previewText = transcript?.text ? transcript.text.substring(0, 200) + (transcript.text.length > 200 ? '...' : '') : '';
+        const previewSource = transcript?.text_preview || '';
+        const previewText = previewSource ? previewSource.substring(0, 200) + (previewSource.length > 200 ? '...' : '') : '';
 
         this.element.innerHTML = `
             <div class="lingua-header p-4 border-b border-white/10">
@@ -530,11 +532,18 @@ class LinguaWidget extends BaseWidget {
 
         // Copy transcript
         const copyBtn = this.element.querySelector('#lingua-copy-btn');
-        copyBtn?.addEventListener('click', () => {
-            if (this.results?.transcript?.text) {
-                navigator.clipboard.writeText(this.results.transcript.text);
+        copyBtn?.addEventListener('click', async () => {
+            // Status responses only carry a preview; the full text comes from the TXT download
+            const txtUrl = this.results?.download_urls?.[this.results?.transcript?.language_code]?.txt;
+            if (!txtUrl) return;
+            try {
+                const response = await fetch(txtUrl);
+                if (!response.ok) throw new Error(`Download failed: ${response.status}`);
+                await navigator.clipboard.writeText(await response.text());
                 copyBtn.textContent = '✅ Copied!';
                 setTimeout(() => copyBtn.textContent = '📋 Copy Transcript', 2000);
+            } catch (error) {
+                console.error('[lingua-widget] Copy failed:', error);
             }
         });
 
@@ -549,20 +558,23 @@ class LinguaWidget extends BaseWidget {
         });
     }
 
-    downloadFile(langCode, format) {
+    async downloadFile(langCode, format) {
         if (!this.results?.download_urls?.[langCode]?.[format]) {
             alert('Download not available');
             return;
         }
 
-        const content = this.results.download_urls[langCode][format];
-        const mimeTypes = {
-            'srt': 'application/x-subrip',
-            'vtt': 'text/vtt',
-            'txt': 'text/plain'
-        };
-
-        const blob = new Blob([content], { type: mimeTypes[format] || 'text/plain' });
+        // Signed storage URLs are cross-origin, so fetch and save as a blob to keep the filename
+        let blob;
+        try {
+            const response = await fetch(this.results.download_urls[langCode][format]);
+            if (!response.ok) throw new Error(`Download failed: ${response.status}`);
+            blob = await response.blob();
+        } catch (error) {
+            console.error('[lingua-widget] Download failed:', error);
+            alert('Download failed. Please try again.');
+            return;
+        }
         const url = URL.createObjectURL(blob);
         const a = document.createElement('a');
         a.href = url;
@@ -631,7 +643,12 @@ class LinguaWidget extends BaseWidget {
                 body: JSON.stringify({
                     conversation_id: this.config.conversationId,
                     run_id: this.runId,
-                    result_data: this.results
+                    // Signed URLs expire; history re-signs the stored output paths
+                    result_data: {
+                        transcript: this.results.transcript,
+                        translations: this.results.translations,
+                        output_paths: this.results.output_paths
+                    }
                 })
             });
         } catch (error) {
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.webhooks.assemblyai import router as assemblyai_router
+from app.config import settings
+from app.services import media_run_worker, media_runs
+from app.services.assemblyai_webhooks import WEBHOOK_AUTH_HEADER, webhook_token
+from app.services.lingua_service import LinguaService
+from app.services.media_runs import InMemoryMediaRunStore, MediaRunWorker, submit_media_run
+
+
+class _FakeAssemblyAI:
+    def __init__(self) -> None:
+        self.submitted: List[Dict[str, Any]] = []
+        self.status_checks = 0
+        self.status = "processing"
+
+    async def submit_transcription(self, audio_url: str, language_code: Optional[str] = None, webhook_url=None, webhook_auth=None) -> str:
+        self.submitted.append({"audio_url": audio_url, "webhook_url": webhook_url, "webhook_auth": webhook_auth})
+        return "tr-1"
+
+    async def get_transcription_status(self, transcript_id: str) -> Dict[str, Any]:
+        self.status_checks += 1
+        return {
+            "status": self.status,
+            "text": "Hello there.",
+            "language_code": "en",
+            "audio_duration": 2,
+            "words": [{"text": "Hello", "start": 0, "end": 400}, {"text": "there.", "start": 400, "end": 900}],
+        }
+
+    async def wait_for_transcription(self, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        raise AssertionError("webhook mode must not poll")
+
+
+@pytest.fixture
+def lingua_env(monkeypatch: pytest.MonkeyPatch):
+    store = InMemoryMediaRunStore()
+    assemblyai = _FakeAssemblyAI()
+    service = LinguaService(assemblyai_api_key="key", llm_api_key="")
+    service.assemblyai = assemblyai
+
+    class _Clients:
+        async def get_client(self, client_id: str) -> Any:
+            return SimpleNamespace(id=client_id)
+
+    monkeypatch.setattr(settings, "assemblyai_webhook_secret", "hook-secret")
+    monkeypatch.setattr(settings, "assemblyai_webhook_base_url", "https://api.example.test")
+    monkeypatch.setattr("app.core.dependencies.get_client_service", lambda: _Clients())
+    monkeypatch.setattr("app.services.lingua_service.lingua_service_for_client", lambda client, needs_translation: service)
+    monkeypatch.setattr("app.services.job_queue.get_job_notifier", lambda: None)
+    monkeypatch.setattr(media_runs, "get_media_run_store", lambda: store)
+    monkeypatch.setattr("app.api.webhooks.assemblyai.get_media_run_store", lambda: store)
+
+    worker = MediaRunWorker(store, fallback_interval=0.05)
+    worker.register(media_run_worker.LINGUA_RUN, media_run_worker.run_lingua)
+    media_runs.set_local_media_run_worker(worker)
+    yield store, assemblyai, worker
+    media_runs.set_local_media_run_worker(None)
+
+
+async def _wait_for(store: InMemoryMediaRunStore, run_id: str, predicate) -> Dict[str, Any]:
+    for _ in range(100):
+        record = await store.get(run_id)
+        if predicate(record):
+            return record
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"run never reached expected state: {record}")
+
+
+@pytest.mark.asyncio
+async def test_transcript_webhook_resumes_the_parked_run(lingua_env) -> None:
+    store, assemblyai, worker = lingua_env
+    serving = asyncio.create_task(worker.run())
+    run = await submit_media_run("lingua", {"client_id": "c1", "audio_url": "https://files/talk.mp3"}, store=store)
+    run_id = run["run_id"]
+
+    parked = await _wait_for(store, run_id, lambda r: r.get("parked"))
+    assert parked["status"] == "transcribing" and parked["transcript_id"] == "tr-1"
+    assert assemblyai.submitted[0]["webhook_url"] == f"https://api.example.test/webhooks/assemblyai/transcripts/{run_id}"
+    assert assemblyai.submitted[0]["webhook_auth"] == (WEBHOOK_AUTH_HEADER, webhook_token(run_id))
+    assert assemblyai.status_checks == 0  # parked, not polling
+    assert worker.queue.active_count == 0
+
+    app = FastAPI()
+    app.include_router(assemblyai_router, prefix="/webhooks")
+    assemblyai.status = "completed"
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        url = f"/webhooks/assemblyai/transcripts/{run_id}"
+        body = {"transcript_id": "tr-1", "status": "completed"}
+        assert (await http.post(url, json=body, headers={WEBHOOK_AUTH_HEADER: "forged"})).status_code == 401
+        wrong = await http.post(url, json={**body, "transcript_id": "tr-2"}, headers={WEBHOOK_AUTH_HEADER: webhook_token(run_id)})
+        assert wrong.status_code == 409
+        ok = await http.post(url, json=body, headers={WEBHOOK_AUTH_HEADER: webhook_token(run_id)})
+        assert ok.json() == {"success": True, "resumed": True}
+
+    done = await _wait_for(store, run_id, lambda r: r["status"] == "complete")
+    assert done["result"]["original_transcript"]["text"] == "Hello there."
+    assert done["attempts"] == 1 and assemblyai.status_checks == 1
+    worker.stop()
+    await asyncio.wait_for(serving, 2)
+
+
+@pytest.mark.asyncio
+async def test_lapsed_park_rechecks_and_parks_again_until_done(lingua_env) -> None:
+    store, assemblyai, worker = lingua_env
+    run = await store.create("lingua", {"client_id": "c1", "audio_url": "https://files/talk.mp3"})
+
+    [claimed] = await store.claim("lingua", 1, lease_seconds=60)
+    await worker._execute("lingua", claimed)
+    await store.park("lingua", run["run_id"], 0)  # fallback timer fires
+
+    [recheck] = await store.claim("lingua", 1, lease_seconds=60)
+    await worker._execute("lingua", recheck)
+    record = await store.get(run["run_id"])
+    assert record["parked"] and record["status"] == "transcribing" and record["attempts"] == 0
+    assert assemblyai.status_checks == 1 and len(assemblyai.submitted) == 1
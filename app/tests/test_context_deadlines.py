@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from app.tests.utils.agent_loader import load_agent_module
+
+
+def _context_manager(budget_ms: int = 200):
+    context = load_agent_module("context.py", "agent_context_for_tests")
+    manager = object.__new__(context.AgentContextManager)
+    manager.agent_config = {
+        "system_prompt": "You are Ada.",
+        "name": "Ada",
+        "context_latency_budget_ms": budget_ms,
+        "context_deadlines_ms": {"user_profile": 50, "user_overview": 50, "conversation_rag": 100},
+    }
+    manager.client_id = "client-1"
+    manager.prompt_layout = "prefix_stable"
+    manager._last_prefix_hash = None
+    manager.context_budget, manager.source_policies = manager._load_context_policies()
+    manager._last_good_context = {}
+    return manager
+
+
+def _source(value, delay: float = 0.0, error: Exception | None = None):
+    async def _run(*_args, **_kwargs):
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return value, delay
+
+    return _run
+
+
+@pytest.mark.asyncio
+async def test_late_and_failing_sources_degrade_without_blocking_the_turn() -> None:
+    manager = _context_manager(budget_ms=200)
+    manager._last_good_context["user_overview"] = {"identity": {"name": "Ada"}}
+
+    manager._gather_user_profile = _source({"name": "Ada"})
+    manager._gather_user_overview = _source({"fresh": True}, delay=5)
+    manager._gather_knowledge_rag = _source([{"title": "Pricing", "excerpt": "...", "relevance": 0.9}], delay=0.12)
+    manager._gather_conversation_rag = _source([], error=RuntimeError("rpc down"))
+
+    started = time.perf_counter()
+    result = await manager.build_complete_context("what does it cost?", "user-1")
+    elapsed = time.perf_counter() - started
+
+    # Knowledge (essential) finished after the other deadlines, nothing waited for the 5s overview
+    assert elapsed < 1.0
+    degraded = result["context_metadata"]["performance"]["degraded_sources"]
+    assert degraded["user_overview"]["reason"] == "deadline"
+    assert degraded["user_overview"]["served"] == "stale"
+    assert degraded["conversation_rag"]["reason"] == "error"
+    assert degraded["conversation_rag"]["served"] == "dropped"
+    assert "knowledge_rag" not in degraded
+
+    raw = result["raw_context_data"]
+    assert raw["user_overview"] == {"identity": {"name": "Ada"}}
+    assert raw["knowledge_results"][0]["title"] == "Pricing"
+    assert raw["conversation_results"] == []
+
+
+@pytest.mark.asyncio
+async def test_strict_mode_still_fails_fast() -> None:
+    manager = _context_manager(budget_ms=0)
+    manager._gather_user_profile = _source({})
+    manager._gather_user_overview = _source({})
+    manager._gather_knowledge_rag = _source([])
+    manager._gather_conversation_rag = _source([], error=RuntimeError("rpc down"))
+
+    with pytest.raises(RuntimeError):
+        await manager.build_complete_context("hello there", "user-1")
+
+
+def test_latency_budget_is_opt_in(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("CONTEXT_LATENCY_BUDGET_MS", raising=False)
+    context = load_agent_module("context.py", "agent_context_default_budget")
+    manager = object.__new__(context.AgentContextManager)
+    manager.agent_config = {"system_prompt": "You are Ada."}
+    budget, _ = manager._load_context_policies()
+    # Without an explicit budget every source is awaited; nothing is dropped
+    assert budget == 0
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Dict, List
+
+import pytest
+
+from app.services.conversation_state import ConversationStateStore
+
+
+def _turn(i: int) -> List[Dict[str, str]]:
+    return [{"role": "user", "content": f"q{i}"}, {"role": "assistant", "content": f"a{i}"}]
+
+
+@pytest.mark.asyncio
+async def test_history_hydrates_once_then_appends() -> None:
+    store = ConversationStateStore(redis_url=None)
+    calls = 0
+
+    async def loader() -> List[Dict[str, str]]:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return _turn(0)
+
+    first, second = await asyncio.gather(
+        store.get_history("c1", loader), store.get_history("c1", loader)
+    )
+    assert first == second == _turn(0)
+
+    await store.append_turn("c1", "q1", "a1")
+    assert await store.get_history("c1", loader) == _turn(0) + _turn(1)
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_append_without_window_is_noop() -> None:
+    store = ConversationStateStore(redis_url=None)
+    await store.append_turn("missing", "q", "a")
+
+    async def loader() -> List[Dict[str, str]]:
+        return []
+
+    assert await store.get_history("missing", loader) == []
+
+
+@pytest.mark.asyncio
+async def test_overflow_is_trimmed_and_invalidation_rehydrates() -> None:
+    store = ConversationStateStore(redis_url=None, max_messages=4)
+    rows = _turn(0) + _turn(1)
+
+    async def loader() -> List[Dict[str, str]]:
+        return list(rows)
+
+    await store.get_history("c2", loader)
+    await store.append_turn("c2", "q2", "a2")
+    assert await store.get_history("c2", loader) == _turn(1) + _turn(2)
+
+    # A voice transcript written straight to the database is picked up after invalidation
+    rows += _turn(2) + [{"role": "user", "content": "spoken"}]
+    await store.invalidate("c2")
+    assert (await store.get_history("c2", loader))[-1] == {"role": "user", "content": "spoken"}
+
+
+@pytest.mark.asyncio
+async def test_window_respects_token_budget() -> None:
+    store = ConversationStateStore(redis_url=None, token_budget=40)
+
+    async def loader() -> List[Dict[str, str]]:
+        return [{"role": "user", "content": "x" * 200}, {"role": "assistant", "content": "short"}]
+
+    history = await store.get_history("c3", loader)
+    assert history == [{"role": "assistant", "content": "short"}]
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Dict, List
+
+import pytest
+
+from app.services.credential_cache import CredentialCache
+
+
+def test_concurrent_threads_share_one_load_and_invalidate_reloads() -> None:
+    cache = CredentialCache(ttl_seconds=60)
+    loads: List[int] = []
+
+    def loader() -> Dict[str, str]:
+        loads.append(1)
+        time.sleep(0.05)
+        return {"openai_api_key": f"sk-{len(loads)}"}
+
+    results: List[Dict[str, str]] = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get("client-1", "byok_keys", loader)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert all(result == {"openai_api_key": "sk-1"} for result in results)
+
+    cache.invalidate("client-1")
+    assert cache.get("client-1", "byok_keys", loader) == {"openai_api_key": "sk-2"}
+
+
+def test_empty_refresh_serves_stale_value_within_grace() -> None:
+    cache = CredentialCache(ttl_seconds=0.01, stale_grace_seconds=60)
+    assert cache.get("client-1", "byok_keys", lambda: {"groq_api_key": "gsk_1"}) == {"groq_api_key": "gsk_1"}
+    time.sleep(0.02)
+
+    # Platform DB hiccup: loader swallows the error and returns {}
+    assert cache.get("client-1", "byok_keys", lambda: {}) == {"groq_api_key": "gsk_1"}
+    # Empty results are never cached
+    assert cache.get("client-2", "byok_keys", lambda: {}) == {}
+
+
+@pytest.mark.asyncio
+async def test_async_misses_are_single_flight() -> None:
+    cache = CredentialCache(ttl_seconds=60)
+    calls: List[str] = []
+
+    async def loader() -> Dict[str, str]:
+        calls.append("load")
+        await asyncio.sleep(0.02)
+        return {"cartesia_api_key": "ck"}
+
+    results = await asyncio.gather(*[cache.aget("client-1", "resolved_keys", loader) for _ in range(5)])
+
+    assert calls == ["load"]
+    assert results == [{"cartesia_api_key": "ck"}] * 5
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+import gc
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.api.v1 import trigger
+from app.services.dispatch_config import DispatchConfigError, DispatchConfigStore
+
+CONFIG = {
+    "system_prompt": "You are helpful. " * 500,
+    "tools": [{"slug": "search", "type": "n8n"}],
+    "api_keys": {"openai_api_key": "sk-test"},
+}
+# Secrets are never stored; they travel in the job metadata
+STORED = {k: v for k, v in CONFIG.items() if k != "api_keys"}
+
+
+@pytest.mark.asyncio
+async def test_reference_resolves_to_the_same_versioned_config() -> None:
+    api_side = DispatchConfigStore("secret")
+    ref = await api_side.put(CONFIG)
+    assert ref["version"] == DispatchConfigStore.version_of(STORED)
+    assert (await api_side.put(dict(CONFIG)))["version"] == ref["version"]
+
+    assert await api_side.resolve(ref) == STORED
+    changed = await api_side.put({**CONFIG, "system_prompt": "Be brief."})
+    assert changed["version"] != ref["version"]
+
+
+@pytest.mark.asyncio
+async def test_tampered_or_expired_references_are_rejected() -> None:
+    store = DispatchConfigStore("secret")
+    ref = await store.put(CONFIG)
+
+    with pytest.raises(DispatchConfigError):
+        await DispatchConfigStore("other-secret").resolve(ref)
+    with pytest.raises(DispatchConfigError):
+        await store.resolve({**ref, "expires": ref["expires"] + 60})
+
+    store.ref_ttl_seconds = -1
+    with pytest.raises(DispatchConfigError):
+        await store.resolve(await store.put(CONFIG))
+
+
+@pytest.mark.asyncio
+async def test_dispatch_metadata_keeps_per_job_fields_inline(monkeypatch: pytest.MonkeyPatch) -> None:
+    store = DispatchConfigStore("secret")
+    monkeypatch.setattr(trigger, "get_dispatch_config_store", lambda: store)
+    job_metadata = {
+        **CONFIG,
+        "client_id": "client-1",
+        "agent_slug": "helper",
+        "conversation_id": "conv-1",
+        "mode": "text",
+        "user_message": "hi",
+    }
+
+    slim = await trigger._externalize_dispatch_config(dict(job_metadata))
+
+    assert set(slim) == {"client_id", "agent_slug", "conversation_id", "mode", "user_message", "api_keys", "config_ref"}
+    assert len(json.dumps(slim)) < len(json.dumps(job_metadata)) / 10
+    config = await store.resolve(slim["config_ref"])
+    assert "api_keys" not in config
+    assert {**config, **{k: v for k, v in slim.items() if k != "config_ref"}} == job_metadata
+
+
+def test_dispatch_api_clients_are_per_loop_and_released_with_it(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(trigger.api, "LiveKitAPI", lambda **kwargs: SimpleNamespace(**kwargs))
+    manager = SimpleNamespace(url="wss://lk.example", api_key="key", api_secret="secret")
+
+    async def dispatch_twice():
+        first = trigger._get_dispatch_api(manager)
+        assert trigger._get_dispatch_api(manager) is first
+        return first
+
+    first = asyncio.run(dispatch_twice())
+    gc.collect()
+    assert len(trigger._dispatch_api_clients) == 0
+    assert asyncio.run(dispatch_twice()) is not first
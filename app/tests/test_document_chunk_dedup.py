@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from app.services.document_processor import DocumentProcessor
+
+SETTINGS = {"embedding": {"provider": "openai", "conversation_model": "text-embedding-3-small", "dimension": 4}}
+
+
+class _Result:
+    def __init__(self, data: List[Dict[str, Any]]) -> None:
+        self.data = data
+
+
+class _Query:
+    def __init__(self, table: "_Table", action: str, payload: Any = None) -> None:
+        self.table = table
+        self.action = action
+        self.payload = payload
+        self.filters: List[Any] = []
+
+    def select(self, *_args: Any) -> "_Query":
+        return self
+
+    def eq(self, column: str, value: Any) -> "_Query":
+        self.filters.append(lambda row: str(row.get(column)) == str(value))
+        return self
+
+    def in_(self, column: str, values: List[Any]) -> "_Query":
+        if column.startswith("chunk_metadata->>"):
+            key = column.split("->>", 1)[1]
+            self.filters.append(lambda row: (row.get("chunk_metadata") or {}).get(key) in values)
+        else:
+            self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def execute(self) -> _Result:
+        matches = [row for row in self.table.rows if all(f(row) for f in self.filters)]
+        if self.action == "insert":
+            self.table.rows.extend(self.payload)
+            return _Result(self.payload)
+        if self.action == "delete":
+            self.table.rows = [row for row in self.table.rows if row not in matches]
+            return _Result(matches)
+        # PostgREST returns pgvector columns as strings
+        return _Result([
+            {**row, "embeddings_vec": json.dumps(row["embeddings_vec"]) if row.get("embeddings_vec") else None}
+            for row in matches
+        ])
+
+
+class _Table:
+    def __init__(self) -> None:
+        self.rows: List[Dict[str, Any]] = []
+
+    def select(self, *_args: Any) -> _Query:
+        return _Query(self, "select")
+
+    def insert(self, rows: List[Dict[str, Any]]) -> _Query:
+        return _Query(self, "insert", rows)
+
+    def delete(self) -> _Query:
+        return _Query(self, "delete")
+
+
+class _Supabase:
+    def __init__(self) -> None:
+        self.chunks = _Table()
+
+    def table(self, name: str) -> _Table:
+        assert name == "document_chunks"
+        return self.chunks
+
+
+def _processor(embedded: List[str]) -> DocumentProcessor:
+    processor = DocumentProcessor()
+
+    async def _embed(text: str, client_settings: Optional[Dict] = None) -> List[float]:
+        embedded.append(text)
+        return [float(len(text)), 0.0, 0.0, 1.0]
+
+    processor._generate_chunk_embeddings = _embed
+    return processor
+
+
+@pytest.mark.asyncio
+async def test_reupload_embeds_only_changed_chunks() -> None:
+    embedded: List[str] = []
+    processor = _processor(embedded)
+    supabase = _Supabase()
+
+    first = await processor._sync_document_chunks("1", ["alpha text", "beta text", "gamma text"], SETTINGS, supabase)
+    assert first == {"stored": 3, "unchanged": 0, "reused": 0, "embedded": 3}
+    meta = supabase.chunks.rows[0]["chunk_metadata"]
+    assert meta["embedding_model"] == "text-embedding-3-small"
+    assert meta["embedding_dimension"] == 4
+    assert len(meta["content_hash"]) == 64
+
+    # Same document reprocessed with one edited chunk and one chunk moved
+    embedded.clear()
+    second = await processor._sync_document_chunks("1", ["alpha  text", "gamma text", "delta text"], SETTINGS, supabase)
+    assert embedded == ["delta text"]
+    assert second == {"stored": 3, "unchanged": 1, "reused": 1, "embedded": 1}
+    assert sorted(row["chunk_index"] for row in supabase.chunks.rows) == [0, 1, 2]
+
+    # A different document with identical text reuses the stored vectors
+    embedded.clear()
+    third = await processor._sync_document_chunks("2", ["gamma text", "delta text"], SETTINGS, supabase)
+    assert embedded == []
+    assert third["reused"] == 2
+
+
+@pytest.mark.asyncio
+async def test_embedding_config_change_forces_reembedding() -> None:
+    embedded: List[str] = []
+    processor = _processor(embedded)
+    supabase = _Supabase()
+
+    await processor._sync_document_chunks("1", ["alpha text"], SETTINGS, supabase)
+    embedded.clear()
+
+    changed = {"embedding": {**SETTINGS["embedding"], "conversation_model": "text-embedding-3-large"}}
+    stats = await processor._sync_document_chunks("1", ["alpha text"], changed, supabase)
+
+    assert embedded == ["alpha text"]
+    assert stats == {"stored": 1, "unchanged": 0, "reused": 0, "embedded": 1}
+    assert [row["chunk_metadata"]["embedding_model"] for row in supabase.chunks.rows] == ["text-embedding-3-large"]
+
+
+@pytest.mark.asyncio
+async def test_failed_insert_keeps_previous_chunks(monkeypatch: pytest.MonkeyPatch) -> None:
+    processor = _processor([])
+    processor.chunk_batch_size = 1
+    supabase = _Supabase()
+    await processor._sync_document_chunks("1", ["alpha text", "beta text"], SETTINGS, supabase)
+    previous = list(supabase.chunks.rows)
+
+    real_insert = _Table.insert
+
+    def flaky_insert(table: _Table, rows: List[Dict[str, Any]]) -> _Query:
+        if rows[0]["content"] == "delta text":
+            raise ConnectionError("insert timed out")
+        return real_insert(table, rows)
+
+    monkeypatch.setattr(_Table, "insert", flaky_insert)
+    with pytest.raises(RuntimeError):
+        await processor._sync_document_chunks("1", ["gamma text", "delta text"], SETTINGS, supabase)
+
+    assert all(row in supabase.chunks.rows for row in previous)
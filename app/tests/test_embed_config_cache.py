@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict
+
+import pytest
+
+from app.services import embed_config_cache
+from app.services.embed_config_cache import EmbedConfigCache
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+class _Loader:
+    """Counts loads; each load waits on ``gate`` so concurrent callers overlap."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def __call__(self) -> Dict[str, Any]:
+        self.calls += 1
+        await self.gate.wait()
+        return {"agent": {"name": f"Ada v{self.calls}"}}
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> _Clock:
+    clock = _Clock()
+    monkeypatch.setattr(embed_config_cache.time, "time", clock.time)
+    return clock
+
+
+@pytest.mark.asyncio
+async def test_misses_coalesce_and_stale_entries_refresh_once_in_background(clock: _Clock) -> None:
+    cache = EmbedConfigCache(fresh_seconds=60, stale_seconds=600)
+    loader = _Loader()
+    loader.gate.clear()
+
+    waiting = [asyncio.create_task(cache.get("c1", "ada", loader)) for _ in range(5)]
+    await asyncio.sleep(0)
+    loader.gate.set()
+    results = await asyncio.gather(*waiting)
+    assert loader.calls == 1 and all(r["agent"]["name"] == "Ada v1" for r in results)
+
+    clock.now += 120  # past fresh, within stale
+    loader.gate.clear()
+    stale = [await cache.get("c1", "ada", loader) for _ in range(3)]
+    assert [r["agent"]["name"] for r in stale] == ["Ada v1"] * 3
+    loader.gate.set()
+    await asyncio.gather(*cache._refreshing.values())
+    assert loader.calls == 2
+    assert (await cache.get("c1", "ada", loader))["agent"]["name"] == "Ada v2"
+
+    clock.now += 1000  # past stale: load inline
+    assert (await cache.get("c1", "ada", loader))["agent"]["name"] == "Ada v3"
+
+
+@pytest.mark.asyncio
+async def test_invalidation_and_failed_loads(clock: _Clock) -> None:
+    cache = EmbedConfigCache(fresh_seconds=60, stale_seconds=600)
+    loader = _Loader()
+    await cache.get("c1", "ada", loader)
+    await cache.get("c2", "ada", loader)
+
+    await cache.invalidate("c1")
+    assert (await cache.get("c1", "ada", loader))["agent"]["name"] == "Ada v3"
+    assert (await cache.get("c2", "ada", loader))["agent"]["name"] == "Ada v2"
+
+    async def failing() -> Dict[str, Any]:
+        raise ValueError("Client not found")
+
+    with pytest.raises(ValueError):
+        await cache.get("c3", "ada", failing)
+    assert (await cache.get("c3", "ada", loader))["agent"]["name"] == "Ada v4"
+
+    # A failed background refresh keeps serving the stale entry
+    clock.now += 120
+    assert (await cache.get("c3", "ada", failing))["agent"]["name"] == "Ada v4"
+    await asyncio.gather(*cache._refreshing.values())
+    assert (await cache.get("c3", "ada", loader))["agent"]["name"] == "Ada v4"
+    await asyncio.gather(*cache._refreshing.values())
+
+
+def test_process_local_cache_caps_the_stale_window(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(embed_config_cache, "_cache", None)
+    monkeypatch.setattr(embed_config_cache, "redis_url_from_env", lambda var: None)
+    monkeypatch.setenv("EMBED_CONFIG_STALE_SECONDS", "900")
+    assert embed_config_cache.get_embed_config_cache().stale_seconds == embed_config_cache.LOCAL_MAX_STALE_SECONDS
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, List
+from uuid import UUID
+
+import pytest
+
+from app.services import client_connection_manager
+from app.services.client_connection_manager import ClientConnectionManager
+from app.services.embed_services import EmbedServices
+
+CLIENT_ID = "11111111-2222-3333-4444-555555555555"
+
+
+@pytest.fixture
+def manager(monkeypatch: pytest.MonkeyPatch) -> ClientConnectionManager:
+    created: List[Any] = []
+
+    def fake_create_client(url: str, key: str) -> Any:
+        client = SimpleNamespace(url=url, key=key)
+        created.append(client)
+        return client
+
+    monkeypatch.setenv("SUPABASE_URL", "https://platform.supabase.co")
+    monkeypatch.setenv("SUPABASE_SERVICE_ROLE_KEY", "platform-key")
+    monkeypatch.setattr(client_connection_manager, "create_client", fake_create_client)
+    manager = ClientConnectionManager()
+    manager.created = created
+    manager._client_cache[CLIENT_ID] = {"supabase_url": "https://tenant.supabase.co", "supabase_service_role_key": "k1"}
+    return manager
+
+
+def test_tenant_clients_are_reused_until_credentials_change(manager: ClientConnectionManager) -> None:
+    first = manager.get_client_db_client(UUID(CLIENT_ID))
+    assert manager.get_client_db_client(UUID(CLIENT_ID)) is first
+
+    manager._client_cache[CLIENT_ID]["supabase_service_role_key"] = "k2"
+    rotated = manager.get_client_db_client(UUID(CLIENT_ID))
+    assert rotated is not first and rotated.key == "k2"
+
+    manager.clear_cache(UUID(CLIENT_ID))
+    manager._client_cache[CLIENT_ID] = {"supabase_url": "https://tenant.supabase.co", "supabase_service_role_key": "k2"}
+    assert manager.get_client_db_client(UUID(CLIENT_ID)) is not rotated
+    assert len(manager.created) == 4  # platform client + three tenant clients
+
+
+class _Agents:
+    def __init__(self) -> None:
+        self.calls: List[str] = []
+
+    async def get_agent(self, client_id: UUID, agent_slug: str) -> Any:
+        self.calls.append(f"agent:{agent_slug}")
+        return SimpleNamespace(slug=agent_slug, enabled=True) if agent_slug == "ada" else None
+
+
+class _Clients:
+    def __init__(self, calls: List[str]) -> None:
+        self.calls = calls
+
+    async def get_client(self, client_id: str) -> Any:
+        self.calls.append("client")
+        return None
+
+
+@pytest.mark.asyncio
+async def test_request_context_memoizes_lookups_per_request(manager: ClientConnectionManager) -> None:
+    agents = _Agents()
+    services = EmbedServices(
+        connection_manager=manager, agent_service=agents, client_service=_Clients(agents.calls), tools_service=object()
+    )
+
+    lookups = services.request(CLIENT_ID)
+    for _ in range(2):
+        assert (await lookups.agent("ada")).slug == "ada"
+        assert await lookups.agent("missing") is None
+        assert await lookups.client() is None
+    assert lookups.tenant_supabase() is lookups.tenant_supabase()
+    assert agents.calls == ["agent:ada", "agent:missing", "client"]
+
+    # A new request sees fresh data
+    await services.request(CLIENT_ID).agent("ada")
+    assert agents.calls[-1] == "agent:ada" and len(agents.calls) == 4
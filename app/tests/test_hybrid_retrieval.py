@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import types
+from typing import Any, Dict, List
+
+import pytest
+
+from app.tests.utils.agent_loader import load_agent_module
+
+
+class _MissingFunction(Exception):
+    code = "PGRST202"
+
+
+class _FakeSupabase:
+    def __init__(self, rows: Dict[str, List[Dict[str, Any]]], missing: tuple = ()) -> None:
+        self.rows = rows
+        self.missing = missing
+        self.calls: List[str] = []
+
+    def rpc(self, name: str, params: Dict[str, Any]) -> Any:
+        self.calls.append(name)
+
+        def execute() -> Any:
+            if name in self.missing:
+                raise _MissingFunction(f"Could not find the function public.{name}")
+            return types.SimpleNamespace(data=self.rows.get(name, []))
+
+        return types.SimpleNamespace(execute=execute)
+
+
+class _Embedder:
+    async def create_embedding(self, text: str) -> List[float]:
+        return [0.1, 0.2]
+
+
+def _chunk(chunk_id: str, title: str, similarity: float, rrf: float | None = None) -> Dict[str, Any]:
+    row = {"id": chunk_id, "document_id": title, "title": title, "content": f"{title} text", "similarity": similarity}
+    if rrf is not None:
+        row["rrf_score"] = rrf
+    return row
+
+
+@pytest.mark.asyncio
+async def test_hybrid_mode_keeps_fused_order() -> None:
+    citations = load_agent_module("citations_service.py", "agent_citations_service_for_tests")
+    supabase = _FakeSupabase(
+        {
+            "match_documents_hybrid": [
+                # Exact-title lexical hit with weak cosine similarity ranks first after fusion
+                _chunk("c1", "Divine Plan", 0.21, rrf=0.032),
+                _chunk("c2", "Other", 0.55, rrf=0.016),
+            ]
+        }
+    )
+    service = citations.RAGCitationsService(supabase, _Embedder(), "agent", retrieval_mode="hybrid")
+
+    result = await service.retrieve_with_citations("Divine Plan", client_id="c", rerank_enabled=False)
+
+    assert supabase.calls == ["match_documents_hybrid"]
+    assert [c.title for c in result.citations] == ["Divine Plan", "Other"]
+    assert result.rerank_info["retrieval_mode"] == "hybrid"
+
+
+@pytest.mark.asyncio
+async def test_hybrid_mode_falls_back_when_rpc_missing() -> None:
+    citations = load_agent_module("citations_service.py", "agent_citations_service_for_tests")
+    supabase = _FakeSupabase(
+        {"match_documents": [_chunk("c2", "Other", 0.55)]},
+        missing=("match_documents_hybrid",),
+    )
+    service = citations.RAGCitationsService(supabase, _Embedder(), "agent", retrieval_mode="hybrid")
+
+    first = await service.retrieve_with_citations("query", client_id="c", rerank_enabled=False)
+    await service.retrieve_with_citations("query", client_id="c", rerank_enabled=False)
+
+    assert first.rerank_info["retrieval_mode"] == "vector"
+    # The missing RPC is only probed once per service instance
+    assert supabase.calls == ["match_documents_hybrid", "match_documents", "match_documents"]
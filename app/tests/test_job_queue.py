@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+
+from app.services.job_queue import InMemoryNotifier, JobQueue
+
+
+class _FakeTable:
+    """In-memory job table with claim-once semantics."""
+
+    def __init__(self) -> None:
+        self.pending: List[Dict[str, Any]] = []
+        self.claim_calls = 0
+
+    async def claim(self, job_type: str, limit: int) -> List[Dict[str, Any]]:
+        self.claim_calls += 1
+        matched = [job for job in self.pending if job["type"] == job_type][:limit]
+        for job in matched:
+            self.pending.remove(job)
+        return matched
+
+
+@pytest.mark.asyncio
+async def test_job_queue_wakes_on_notification_and_respects_lane_limits() -> None:
+    table = _FakeTable()
+    notifier = InMemoryNotifier()
+    queue = JobQueue(channel="jobs", claim=table.claim, notifier=notifier, fallback_interval=30.0)
+
+    running: Dict[str, int] = {"slow": 0}
+    peak: Dict[str, int] = {"slow": 0}
+    done: List[str] = []
+
+    async def slow_handler(job: Dict[str, Any]) -> None:
+        running["slow"] += 1
+        peak["slow"] = max(peak["slow"], running["slow"])
+        await asyncio.sleep(0.05)
+        running["slow"] -= 1
+        done.append(job["id"])
+
+    async def fast_handler(job: Dict[str, Any]) -> None:
+        done.append(job["id"])
+
+    queue.register("slow", slow_handler, concurrency=2)
+    queue.register("fast", fast_handler, concurrency=1)
+
+    runner = asyncio.create_task(queue.run())
+    await asyncio.sleep(0.01)
+
+    table.pending.extend({"id": f"s{i}", "type": "slow"} for i in range(5))
+    table.pending.append({"id": "f0", "type": "fast"})
+    await notifier.publish("jobs", "")
+
+    for _ in range(100):
+        if len(done) == 6:
+            break
+        await asyncio.sleep(0.01)
+
+    queue.stop()
+    await runner
+
+    assert sorted(done) == ["f0", "s0", "s1", "s2", "s3", "s4"]
+    assert peak["slow"] == 2
+
+
+class _TriggerNotifier(InMemoryNotifier):
+    """Stands in for Postgres, where a table trigger already announces new rows."""
+
+    delivers_database_triggers = True
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.published: List[str] = []
+
+    async def publish(self, channel: str, payload: str = "") -> None:
+        self.published.append(channel)
+        await super().publish(channel, payload)
+
+
+@pytest.mark.asyncio
+async def test_trigger_fed_channels_are_not_published_twice() -> None:
+    notifier = _TriggerNotifier()
+    triggered = JobQueue(channel="jobs", claim=_FakeTable().claim, notifier=notifier, database_triggered=True)
+    plain = JobQueue(channel="media", claim=_FakeTable().claim, notifier=notifier)
+
+    await triggered.notify({"job_type": "schema_sync"})
+    await plain.notify({"run_id": "r1"})
+    # The trigger-fed channel still wakes its own process, but leaves publishing to the trigger
+    assert triggered._wakeup.is_set()
+    assert notifier.published == ["media"]
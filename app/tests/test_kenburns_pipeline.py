@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+import gc
+import time
+import types
+from typing import Any, Dict, List
+
+import pytest
+
+from app.agent_modules.kenburns_tools import KenBurnsToolBuilder, _PrefetchedImage
+
+
+class _FakeRunware:
+    """Each generation blocks until ``release`` is set (or fails with ``error``)."""
+
+    def __init__(self, error: Exception | None = None) -> None:
+        self.error = error
+        self.prompts: List[str] = []
+        self.started_at: List[float] = []
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+        self.warmed = False
+
+    async def warm_up(self) -> bool:
+        self.warmed = True
+        return True
+
+    async def generate_image(self, prompt: str, **_: Any) -> Any:
+        self.prompts.append(prompt)
+        self.started_at.append(time.time())
+        self.started.set()
+        if self.error is not None:
+            raise self.error
+        await self.release.wait()
+        return types.SimpleNamespace(image_url=f"https://img/{len(self.prompts)}", generation_time_ms=200.0)
+
+
+class _FakeRoom:
+    def __init__(self) -> None:
+        self.published: List[float] = []
+        self.first_published = asyncio.Event()
+
+        async def publish_data(payload: bytes, reliable: bool = True) -> None:
+            self.published.append(time.time())
+            self.first_published.set()
+
+        self.local_participant = types.SimpleNamespace(publish_data=publish_data)
+
+
+@pytest.mark.asyncio
+async def test_auto_generation_prefetches_ahead_of_schedule() -> None:
+    room = _FakeRoom()
+    runware = _FakeRunware()
+    builder = KenBurnsToolBuilder(
+        room=room,  # type: ignore[arg-type]
+        kenburns_config={"auto_interval": 0.5, "expected_generation_seconds": 0.3},
+        runware_service=runware,
+    )
+    builder.start_auto_generation()
+    try:
+        await asyncio.wait_for(runware.started.wait(), 2)
+        # Generation starts before the image is due, and nothing is shown until it finishes
+        assert runware.started_at[0] < builder._next_display_at()
+        assert runware.warmed is True and not room.published
+
+        runware.release.set()
+        await asyncio.wait_for(room.first_published.wait(), 2)
+        assert len(room.published) == 1
+    finally:
+        builder.stop_auto_generation()
+
+
+@pytest.mark.asyncio
+async def test_failed_prefetch_is_retrieved_without_an_awaiter() -> None:
+    loop = asyncio.get_running_loop()
+    reported: List[Dict[str, Any]] = []
+    previous_handler = loop.get_exception_handler()
+    loop.set_exception_handler(lambda _loop, context: reported.append(context))
+    try:
+        builder = KenBurnsToolBuilder(
+            room=_FakeRoom(),  # type: ignore[arg-type]
+            kenburns_config={},
+            runware_service=_FakeRunware(error=RuntimeError("runware down")),
+        )
+        task = builder._ensure_prefetch()
+        assert task is not None
+        await asyncio.wait([task])
+        builder._prefetch_task = None
+        del task
+        gc.collect()
+    finally:
+        loop.set_exception_handler(previous_handler)
+    assert not [c for c in reported if "never retrieved" in c.get("message", "")]
+
+
+def test_take_prefetched_drops_images_from_stale_context() -> None:
+    builder = KenBurnsToolBuilder(
+        room=_FakeRoom(),  # type: ignore[arg-type]
+        kenburns_config={"prefetch_depth": 3},
+        runware_service=_FakeRunware(),
+    )
+    for version in (1, 1, 2):
+        builder._prefetch_buffer.append(
+            _PrefetchedImage(prompt=f"v{version}", result=None, context_version=version, created_at=0.0)
+        )
+
+    item = builder._take_prefetched()
+    assert item is not None and item.context_version == 2
+    assert not builder._prefetch_buffer
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from app.services.lingua_service import LinguaService, TranscriptSegment, TranslationResult
+from app.services import media_segmenter
+from app.services.media_segmenter import parse_silencedetect, plan_long_media, plan_segments
+
+MINUTE = 60 * 1000
+
+SILENCEDETECT_STDERR = """
+Input #0, mp3, from 'https://files/talk.mp3':
+  Duration: 00:20:30.50, start: 0.000000, bitrate: 128 kb/s
+[silencedetect @ 0x1] silence_start: 290.2
+[silencedetect @ 0x1] silence_end: 291.4 | silence_duration: 1.2
+[silencedetect @ 0x1] silence_start: 300.1
+[silencedetect @ 0x1] silence_end: 300.5 | silence_duration: 0.4
+[silencedetect @ 0x1] silence_start: 905.0
+[silencedetect @ 0x1] silence_end: 907.0 | silence_duration: 2.0
+"""
+
+
+def test_plan_cuts_at_the_longest_nearby_silence() -> None:
+    duration_ms, silences = parse_silencedetect(SILENCEDETECT_STDERR)
+    assert duration_ms == 1230500
+    assert silences == [(290200, 291400), (300100, 300500), (905000, 907000)]
+
+    plan = plan_segments(duration_ms, silences, target_ms=5 * MINUTE, overlap_ms=3000)
+    cuts = [segment.keep_start_ms for segment in plan]
+    # 290.8s beats the shorter silence nearer the target; no silence near 590.8s, so a hard cut there
+    assert cuts == [0, 290800, 590800, 906000]
+    assert plan[1].start_ms == 287800 and plan[1].end_ms == 593800
+    assert plan[-1].end_ms == duration_ms
+    # Every instant is owned by exactly one segment
+    for ms in (0, 290799, 290800, 906000, duration_ms):
+        assert sum(segment.owns(ms, ms) for segment in plan) == 1
+
+
+class _SegmentedAssemblyAI:
+    """Answers window jobs with absolute word timestamps; the first window waits for a translation to start."""
+
+    def __init__(self) -> None:
+        self.windows: Dict[str, Dict[str, int]] = {}
+        self.translation_started = asyncio.Event()
+
+    async def submit_transcription(self, audio_url: str, language_code: Optional[str] = None, **window: Any) -> str:
+        transcript_id = f"tr-{len(self.windows)}"
+        self.windows[transcript_id] = window
+        return transcript_id
+
+    async def wait_for_transcription(self, transcript_id: str, **kwargs: Any) -> Dict[str, Any]:
+        window = self.windows[transcript_id]
+        if window["audio_start_from"] == 0:
+            await self.translation_started.wait()
+        start, end = window["audio_start_from"], window["audio_end_at"]
+        words = [
+            {"text": f"w{ms // 1000}.", "start": ms, "end": ms + 500}
+            for ms in range(start, end - 500, 1000)
+        ]
+        return {"status": "completed", "language_code": "en", "confidence": 0.9, "words": words}
+
+
+class _RecordingService(LinguaService):
+    def __init__(self) -> None:
+        super().__init__(assemblyai_api_key="key", llm_api_key="")
+        self.assemblyai = _SegmentedAssemblyAI()
+
+    async def translate_segments(self, segments: List[TranscriptSegment], target_language: str, batch_size: int = 10) -> TranslationResult:
+        self.assemblyai.translation_started.set()
+        return TranslationResult(
+            language_code=target_language,
+            language_name=target_language,
+            segments=[TranscriptSegment(s.start, s.end, s.text.upper()) for s in segments],
+            text=" ".join(s.text.upper() for s in segments),
+        )
+
+
+@pytest.mark.asyncio
+async def test_silence_detection_only_runs_for_long_media(monkeypatch: pytest.MonkeyPatch) -> None:
+    durations = {"short.mp3": 3 * MINUTE, "long.mp3": 1230500}
+    detected: List[str] = []
+
+    async def probe_duration(url: str) -> Optional[int]:
+        return durations[url]
+
+    async def probe_silences(url: str):
+        detected.append(url)
+        return parse_silencedetect(SILENCEDETECT_STDERR)
+
+    monkeypatch.setattr(media_segmenter, "probe_duration", probe_duration)
+    monkeypatch.setattr(media_segmenter, "probe_silences", probe_silences)
+
+    assert await plan_long_media("short.mp3", min_duration_ms=15 * MINUTE) is None
+    assert len(await plan_long_media("long.mp3", min_duration_ms=15 * MINUTE)) == 4
+    assert detected == ["long.mp3"]
+
+
+@pytest.mark.asyncio
+async def test_segments_are_transcribed_concurrently_and_stitched_in_order() -> None:
+    service = _RecordingService()
+    plan = plan_segments(12000, [(5800, 6200)], target_ms=6000, overlap_ms=2000)
+    assert len(plan) == 2
+
+    # Only completes if the second segment's translation starts while the first is still transcribing
+    result = await asyncio.wait_for(
+        service.process_full("https://files/talk.mp3", target_languages=["es"], plan=plan), 2
+    )
+
+    assert result.status == "complete", result.error
+    transcript = result.original_transcript
+    starts = [segment.start for segment in transcript.segments]
+    # Overlapping words (4s-8s were heard by both windows) appear exactly once, in timeline order
+    assert starts == list(range(0, 11001, 1000))
+    assert transcript.transcript_id == "tr-0,tr-1" and transcript.word_count == 12
+    assert result.translations["es"].segments[0].text == "W0."
+    assert [s.start for s in result.translations["es"].segments] == starts
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.v1.lingua import router as lingua_router
+from app.core.dependencies import get_client_service
+from app.services import lingua_service
+from app.services.lingua_service import (
+    LinguaResult,
+    TranscriptionResult,
+    TranscriptSegment,
+    TranslationResult,
+    generate_srt,
+    sign_lingua_history,
+    store_lingua_outputs,
+)
+from app.services.media_runs import InMemoryMediaRunStore
+
+
+class _Bucket:
+    def __init__(self, storage: "_Storage", name: str) -> None:
+        self._storage = storage
+        self._name = name
+
+    def upload(self, path: str, file: bytes, file_options: Dict[str, str]) -> None:
+        self._storage.objects[path] = file
+
+    def create_signed_urls(self, paths: List[str], expires_in: int) -> List[Dict[str, Any]]:
+        return [{"path": p, "error": None, "signedURL": f"https://storage.test/{self._name}/{p}?token=x"} for p in paths]
+
+
+class _Storage:
+    def __init__(self) -> None:
+        self.objects: Dict[str, bytes] = {}
+
+    def create_bucket(self, name: str, options: Dict[str, Any]) -> None:
+        return None
+
+    def from_(self, name: str) -> _Bucket:
+        return _Bucket(self, name)
+
+
+class _Table:
+    def __init__(self, rows: List[Dict[str, Any]]) -> None:
+        self._rows = rows
+
+    def insert(self, row: Dict[str, Any]) -> "_Table":
+        self._rows.append(row)
+        return self
+
+    def execute(self) -> None:
+        return None
+
+
+class _ClientSupabase:
+    supabase_url = "https://client.supabase.test"
+    supabase_key = "service-key"
+
+    def __init__(self) -> None:
+        self.storage = _Storage()
+        self.rows: List[Dict[str, Any]] = []
+
+    def table(self, name: str) -> _Table:
+        return _Table(self.rows)
+
+
+def _result(run_id: str, segment_count: int) -> LinguaResult:
+    segments = [TranscriptSegment(i * 1000, i * 1000 + 900, f"line {i}") for i in range(segment_count)]
+    translated = [TranscriptSegment(s.start, s.end, s.text.replace("line", "linea")) for s in segments]
+    return LinguaResult(
+        run_id=run_id,
+        status="complete",
+        original_transcript=TranscriptionResult("tr-1", " ".join(s.text for s in segments), segments, "en", 0, 0, 0.9),
+        translations={"es": TranslationResult("es", "Spanish", translated, " ".join(s.text for s in translated))},
+    )
+
+
+@pytest.fixture
+def lingua_api(monkeypatch: pytest.MonkeyPatch):
+    store = InMemoryMediaRunStore()
+    client_sb = _ClientSupabase()
+
+    class _Clients:
+        async def get_client_supabase_client(self, client_id: str, auto_sync: bool = False) -> _ClientSupabase:
+            return client_sb
+
+    monkeypatch.setattr("app.api.v1.lingua.get_media_run_store", lambda: store)
+    app = FastAPI()
+    app.include_router(lingua_router, prefix="/api/v1")
+    app.dependency_overrides[get_client_service] = lambda: _Clients()
+    return store, client_sb, httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_status_pages_segments_and_links_stored_outputs(lingua_api) -> None:
+    store, client_sb, http = lingua_api
+    run = await store.create("lingua", {}, client_id="c1")
+    result = _result(run["run_id"], 250)
+    await store_lingua_outputs(result, client_sb, "c1", ["srt", "txt"])
+    await store.update(run["run_id"], status="complete", result=result.to_dict())
+
+    srt_path = f"lingua/c1/{run['run_id']}/es.srt"
+    assert client_sb.storage.objects[srt_path] == generate_srt(result.translations["es"].segments).encode()
+    assert not any(path.endswith(".vtt") for path in client_sb.storage.objects)
+
+    async with http:
+        status = (await http.get(f"/api/v1/lingua/status/{run['run_id']}", params={"client_id": "c1", "offset": 200, "limit": 20})).json()
+
+    transcript = status["transcript"]
+    assert transcript["segment_count"] == 250 and transcript["segments_offset"] == 200
+    assert [s["text"] for s in transcript["segments"]][:2] == ["line 200", "line 201"] and len(transcript["segments"]) == 20
+    assert "text" not in transcript and len(transcript["text_preview"]) == lingua_service.TEXT_PREVIEW_CHARS
+    assert status["translations"]["es"]["segments"][0]["text"] == "linea 200"
+    assert status["download_urls"]["es"] == {
+        "srt": f"https://storage.test/lingua-outputs/{srt_path}?token=x",
+        "txt": f"https://storage.test/lingua-outputs/lingua/c1/{run['run_id']}/es.txt?token=x",
+    }
+
+
+@pytest.mark.asyncio
+async def test_unstored_outputs_stream_from_the_api(lingua_api) -> None:
+    store, _, http = lingua_api
+    run = await store.create("lingua", {}, client_id="c1")
+    result = _result(run["run_id"], 3)
+    await store.update(run["run_id"], status="complete", result=result.to_dict())
+
+    async with http:
+        status = (await http.get(f"/api/v1/lingua/status/{run['run_id']}", params={"client_id": "c1"})).json()
+        vtt_url = status["download_urls"]["en"]["vtt"]
+        assert vtt_url.startswith(f"/api/v1/lingua/status/{run['run_id']}/download/en/vtt")
+        download = await http.get(vtt_url)
+        assert (await http.get(vtt_url.replace("c1", "c2"))).status_code == 404
+
+    assert download.text.startswith("WEBVTT\n\n00:00:00.000 --> 00:00:00.900\nline 0\n")
+    assert download.headers["content-disposition"] == 'attachment; filename="transcript_en.vtt"'
+
+
+@pytest.mark.asyncio
+async def test_saved_results_keep_storage_paths_and_are_signed_on_read(lingua_api) -> None:
+    store, client_sb, http = lingua_api
+    run = await store.create("lingua", {}, client_id="c1")
+    result = _result(run["run_id"], 3)
+    await store_lingua_outputs(result, client_sb, "c1", ["srt"])
+    await store.update(run["run_id"], status="complete", result=result.to_dict())
+
+    async with http:
+        stored = await http.post(
+            "/api/v1/lingua/store-result",
+            params={"client_id": "c1"},
+            json={
+                "conversation_id": "conv-1",
+                "run_id": run["run_id"],
+                "result_data": {"transcript": {}, "download_urls": {"es": {"srt": "https://expired"}}},
+            },
+        )
+    assert stored.status_code == 200
+
+    data = client_sb.rows[0]["metadata"]["widget"]["data"]
+    srt_path = f"lingua/c1/{run['run_id']}/es.srt"
+    assert "download_urls" not in data and data["output_paths"]["es"] == {"srt": srt_path}
+
+    await sign_lingua_history(client_sb, client_sb.rows)
+    assert data["download_urls"]["es"] == {"srt": f"https://storage.test/lingua-outputs/{srt_path}?token=x"}
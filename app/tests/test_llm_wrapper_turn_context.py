@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+from livekit.agents import llm
+
+from app.agent_modules.llm_wrapper import ContextAwareLLM
+
+
+class _BaseLLM:
+    def chat(self, *, chat_ctx, **_kwargs):
+        return chat_ctx
+
+
+class _ContextManager:
+    def __init__(self) -> None:
+        self.calls: List[str] = []
+
+    async def build_complete_context(self, user_message: str, user_id: str) -> Dict[str, Any]:
+        self.calls.append(user_message)
+        await asyncio.sleep(0.01)
+        return {"enhanced_system_prompt": f"context for {user_message}", "context_metadata": {}}
+
+
+@pytest.mark.asyncio
+async def test_tool_follow_up_calls_reuse_turn_context() -> None:
+    manager = _ContextManager()
+    wrapper = ContextAwareLLM(_BaseLLM(), manager, user_id="user-1")
+
+    chat_ctx = llm.ChatContext()
+    chat_ctx.add_message(role="system", content="base prompt")
+    chat_ctx.add_message(role="user", content="book a meeting")
+
+    first = await wrapper.chat(chat_ctx)
+
+    # Tool round-trip within the same turn
+    call = llm.FunctionCall(call_id="c1", name="calendar", arguments="{}")
+    chat_ctx.items.append(call)
+    chat_ctx.items.append(llm.FunctionCallOutput(call_id="c1", name="calendar", output="booked", is_error=False))
+    second = await wrapper.chat(chat_ctx)
+
+    assert manager.calls == ["book a meeting"]
+    assert first.items[0].text_content == "context for book a meeting"
+    assert [item.type for item in second.items] == ["message", "message", "function_call", "function_call_output"]
+    # Items are carried over, not re-created
+    assert second.items[2] is call
+
+    # A new user message starts a new turn
+    chat_ctx.add_message(role="user", content="and email the team")
+    await wrapper.chat(chat_ctx)
+    assert manager.calls == ["book a meeting", "and email the team"]
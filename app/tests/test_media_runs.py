@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Dict, List
+
+import pytest
+
+from app.services.media_runs import (
+    InMemoryMediaRunStore,
+    LeaseLost,
+    MediaRunWorker,
+    stream_media_run_events,
+    submit_media_run,
+    wait_for_media_run,
+)
+
+
+@pytest.mark.asyncio
+async def test_worker_executes_runs_and_streams_progress(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("app.services.job_queue.get_job_notifier", lambda: None)
+    store = InMemoryMediaRunStore()
+    worker = MediaRunWorker(store, fallback_interval=0.05)
+
+    async def transcribe(run: Dict[str, Any], update) -> Dict[str, Any]:
+        await update(status="transcribing", progress_percent=40, current_phase="Transcribing audio...")
+        await asyncio.sleep(0.01)
+        return {"result": {"text": run["params"]["audio_url"].upper()}}
+
+    worker.register("lingua", transcribe)
+    serving = asyncio.create_task(worker.run())
+
+    run = await submit_media_run("lingua", {"audio_url": "talk.mp3"}, store=store, client_id="client-1")
+    done = await wait_for_media_run(run["run_id"], timeout=2, store=store)
+
+    assert done["status"] == "complete" and done["result"] == {"text": "TALK.MP3"}
+    assert done["client_id"] == "client-1" and done["attempts"] == 1
+
+    frames = [frame async for frame in stream_media_run_events(run["run_id"], store=store)]
+    events = [json.loads(frame.split("data: ", 1)[1]) for frame in frames]
+    assert [e["status"] for e in events] == ["pending", "running", "transcribing", "complete"]
+    assert events[-1]["done"] and events[-1]["progress_percent"] == 100
+    assert all("result" not in e and "params" not in e for e in events)
+
+    # Reconnecting with Last-Event-ID only replays what was missed
+    last_id = frames[-2].split("\n", 1)[0][len("id: "):]
+    replay = [frame async for frame in stream_media_run_events(run["run_id"], last_event_id=last_id, store=store)]
+    assert len(replay) == 1 and '"done": true' in replay[0]
+
+    worker.stop()
+    await asyncio.wait_for(serving, 2)
+
+
+@pytest.mark.asyncio
+async def test_lapsed_lease_is_reclaimed_then_abandoned() -> None:
+    store = InMemoryMediaRunStore()
+    run = await store.create("lingua", {"audio_url": "talk.mp3"})
+
+    assert [r["run_id"] for r in await store.claim("lingua", 5, lease_seconds=0.01)] == [run["run_id"]]
+    assert await store.claim("lingua", 5, lease_seconds=0.01) == []
+    await store.update(run["run_id"], status="running", attempts=2)  # worker died mid-run
+    await asyncio.sleep(0.02)
+
+    reclaimed = await store.claim("lingua", 5, lease_seconds=60)
+    assert [r["run_id"] for r in reclaimed] == [run["run_id"]]
+
+    worker = MediaRunWorker(store, max_attempts=2)
+    calls: List[str] = []
+
+    async def handler(run: Dict[str, Any], update) -> None:
+        calls.append(run["run_id"])
+
+    worker.register("lingua", handler)
+    await worker._execute("lingua", reclaimed[0])
+
+    record = await store.get(run["run_id"])
+    assert calls == [] and record["status"] == "failed" and "interrupted" in record["error"]
+    assert await store.claim("lingua", 5, lease_seconds=60) == []
+
+
+@pytest.mark.asyncio
+async def test_handler_errors_mark_the_run_failed() -> None:
+    store = InMemoryMediaRunStore()
+    worker = MediaRunWorker(store)
+
+    async def broken(run: Dict[str, Any], update) -> None:
+        raise RuntimeError("AssemblyAI unavailable")
+
+    worker.register("image_catalyst", broken)
+    run = await store.create("image_catalyst", {})
+    [claimed] = await store.claim("image_catalyst", 1, lease_seconds=60)
+    await worker._execute("image_catalyst", claimed)
+
+    record = await store.get(run["run_id"])
+    assert record["status"] == "failed" and record["error"] == "AssemblyAI unavailable"
+    assert record["current_phase"] == "Failed"
+
+
+@pytest.mark.asyncio
+async def test_stale_lease_holder_cannot_write_after_reclaim() -> None:
+    store = InMemoryMediaRunStore()
+    run = await store.create("lingua", {"audio_url": "talk.mp3"})
+    [first] = await store.claim("lingua", 1, lease_seconds=0.01)
+    await asyncio.sleep(0.02)
+    [second] = await store.claim("lingua", 1, lease_seconds=60)
+    assert first["lease"] != second["lease"]
+
+    with pytest.raises(LeaseLost):
+        await store.update(run["run_id"], lease=first["lease"], status="complete")
+    with pytest.raises(LeaseLost):
+        await store.release("lingua", run["run_id"], lease=first["lease"])
+
+    # The stale worker gives up quietly; the run stays with the new holder
+    worker = MediaRunWorker(store)
+    calls: List[str] = []
+
+    async def handler(run: Dict[str, Any], update) -> None:
+        calls.append(run["run_id"])
+
+    worker.register("lingua", handler)
+    await worker._execute("lingua", first)
+    assert calls == [] and (await store.get(run["run_id"]))["status"] == "pending"
+
+    await store.update(run["run_id"], lease=second["lease"], status="complete")
+    assert (await store.get(run["run_id"]))["status"] == "complete"
+
+
+@pytest.mark.asyncio
+async def test_resume_that_beats_the_park_requeues_on_park() -> None:
+    store = InMemoryMediaRunStore()
+    run = await store.create("lingua", {"audio_url": "talk.mp3"})
+    [claimed] = await store.claim("lingua", 1, lease_seconds=60)
+
+    # The webhook lands while the handler is still between submit and park
+    assert not await store.resume("lingua", run["run_id"], transcript_status="completed")
+    requeued = await store.park("lingua", run["run_id"], 3600, lease=claimed["lease"], transcript_id="tr-1")
+    assert requeued
+
+    [again] = await store.claim("lingua", 1, lease_seconds=60)
+    assert again["transcript_id"] == "tr-1" and again["transcript_status"] == "completed" and again["parked"]
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import hashlib
+import io
+from dataclasses import replace
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+
+from app.services.media_upload import UploadPolicy, sniff_media_kind, stream_upload, upload_generated
+
+POLICY = UploadPolicy(
+    label="test",
+    bucket="audio-uploads",
+    path_prefix="lingua",
+    max_bytes=64,
+    allowed_types=("audio/",),
+    media_kind="audio",
+    invalid_type_detail="Invalid file type.",
+    too_large_detail="File too large ({size_mb:.1f}MB).",
+    default_content_type="audio/mpeg",
+    default_ext="mp3",
+)
+
+
+class _Bucket:
+    def __init__(self, storage: "_Storage", name: str):
+        self._storage = storage
+        self._name = name
+
+    def upload(self, path: str, file: bytes, file_options: Dict[str, str]) -> Dict[str, str]:
+        self._storage.uploads.append((self._name, path, file))
+        return {"path": path}
+
+    def create_signed_url(self, path: str, expires_in: int) -> Dict[str, str]:
+        return {"signedURL": f"https://storage.test/{self._name}/{path}?token=x"}
+
+
+class _Storage:
+    def __init__(self) -> None:
+        self.uploads: List[Any] = []
+
+    def create_bucket(self, name: str, options: Dict[str, Any]) -> None:
+        raise Exception("The resource already exists")
+
+    def from_(self, name: str) -> _Bucket:
+        return _Bucket(self, name)
+
+
+class _ClientSupabase:
+    supabase_url = "https://client.supabase.test"
+    supabase_key = "service-key"
+
+    def __init__(self) -> None:
+        self.storage = _Storage()
+
+
+class _TusServer:
+    """Minimal TUS endpoint; ``fail_patches`` PATCHes die after storing half their body."""
+
+    def __init__(self, fail_patches: int = 0) -> None:
+        self.data = b""
+        self.length = 0
+        self.patches: List[int] = []
+        self.deleted = False
+        self.fail_patches = fail_patches
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            self.length = int(request.headers["upload-length"])
+            return httpx.Response(201, headers={"location": "https://client.supabase.test/upload/1"})
+        if request.method == "HEAD":
+            return httpx.Response(200, headers={"upload-offset": str(len(self.data))})
+        if request.method == "DELETE":
+            self.deleted = True
+            return httpx.Response(204)
+        assert int(request.headers["upload-offset"]) == len(self.data)
+        body = request.content
+        self.patches.append(len(body))
+        if self.fail_patches:
+            self.fail_patches -= 1
+            self.data += body[: len(body) // 2]
+            return httpx.Response(503, text="gateway timeout")
+        self.data += body
+        return httpx.Response(204, headers={"upload-offset": str(len(self.data))})
+
+
+def _upload(payload: bytes, content_type: str = "audio/mpeg", size: Any = "auto") -> UploadFile:
+    return UploadFile(
+        file=io.BytesIO(payload),
+        size=len(payload) if size == "auto" else size,
+        filename="talk.mp3",
+        headers=Headers({"content-type": content_type}),
+    )
+
+
+MP3 = b"ID3" + bytes(range(47))  # 50 bytes
+
+
+@pytest.mark.asyncio
+async def test_large_upload_streams_in_resumable_parts(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("app.services.media_upload.asyncio.sleep", _no_sleep)
+    server = _TusServer(fail_patches=1)
+    client_sb = _ClientSupabase()
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(server.handle)) as http:
+        stored = await stream_upload(_upload(MP3), client_sb, "client-1", POLICY, chunk_size=16, http_client=http)
+
+    assert server.data == MP3 and server.length == len(MP3)
+    # First part resumed from the server's offset after the failure; the rest in 16 byte parts
+    assert server.patches == [16, 8, 16, 16, 2]
+    assert stored.size == len(MP3)
+    assert stored.sha256 == hashlib.sha256(MP3).hexdigest()
+    assert stored.path.startswith("lingua/client-1/") and stored.path.endswith(".mp3")
+    assert stored.signed_url.startswith("https://storage.test/audio-uploads/")
+    assert client_sb.storage.uploads == []
+
+
+@pytest.mark.asyncio
+async def test_small_upload_uses_a_single_storage_call() -> None:
+    client_sb = _ClientSupabase()
+    stored = await stream_upload(_upload(MP3), client_sb, "client-1", POLICY, chunk_size=1024)
+
+    assert client_sb.storage.uploads == [("audio-uploads", stored.path, MP3)]
+    assert stored.sha256 == hashlib.sha256(MP3).hexdigest()
+
+
+@pytest.mark.asyncio
+async def test_oversized_and_mislabelled_files_are_rejected() -> None:
+    server = _TusServer()
+    client_sb = _ClientSupabase()
+
+    with pytest.raises(HTTPException) as declared:
+        await stream_upload(_upload(MP3 * 2), client_sb, "client-1", POLICY)
+    assert declared.value.status_code == 400 and "too large" in declared.value.detail
+
+    # A size that under-reports the payload is caught while streaming and the upload is terminated
+    async with httpx.AsyncClient(transport=httpx.MockTransport(server.handle)) as http:
+        with pytest.raises(HTTPException) as streamed:
+            await stream_upload(_upload(MP3 * 2, size=40), client_sb, "client-1", POLICY, chunk_size=16, http_client=http)
+    assert streamed.value.status_code == 400
+    assert server.deleted and len(server.data) <= 40
+
+    with pytest.raises(HTTPException) as disguised:
+        await stream_upload(_upload(b"%PDF-1.7" + bytes(20)), client_sb, "client-1", POLICY)
+    assert disguised.value.detail == "Invalid file type."
+    with pytest.raises(HTTPException):
+        await stream_upload(_upload(MP3, content_type="application/pdf"), client_sb, "client-1", POLICY)
+    assert client_sb.storage.uploads == []
+
+
+@pytest.mark.asyncio
+async def test_generated_content_is_regrouped_into_fixed_size_parts() -> None:
+    server = _TusServer()
+    cues = [f"{i}\nline {i}\n".encode() for i in range(10)]
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(server.handle)) as http:
+        size = await upload_generated(
+            _ClientSupabase(), "lingua-outputs", "lingua/c/r/en.srt", "application/x-subrip",
+            lambda: iter(cues), chunk_size=16, http_client=http,
+        )
+
+    payload = b"".join(cues)
+    assert size == server.length == len(payload) and server.data == payload
+    assert server.patches == [16] * (len(payload) // 16) + [len(payload) % 16]
+
+
+def test_sniffing_recognises_common_media() -> None:
+    assert sniff_media_kind(b"RIFF\x00\x00\x00\x00WAVEfmt ") == "audio"
+    assert sniff_media_kind(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "image"
+    assert sniff_media_kind(b"\x00\x00\x00\x20ftypM4A ") == "audio"
+    assert sniff_media_kind(b"\xff\xfb\x90\x00") == "audio"
+    assert sniff_media_kind(b"\xff\xd8\xff\xe0") == "image"
+    assert sniff_media_kind(b"hello") is None
+
+
+def test_sniffing_reads_ftyp_brands_and_other_image_formats() -> None:
+    assert sniff_media_kind(b"\x00\x00\x00\x18ftypisom\x00\x00\x02\x00") == "video"
+    assert sniff_media_kind(b"\x00\x00\x00\x14ftypqt  \x00\x00\x00\x00") == "video"
+    assert sniff_media_kind(b"\x00\x00\x00\x18ftypheic\x00\x00\x00\x00") == "image"
+    assert sniff_media_kind(b"\x00\x00\x00\x1cftypavif\x00\x00\x00\x00") == "image"
+    assert sniff_media_kind(b"BM6\x00\x0c\x00") == "image"
+    assert sniff_media_kind(b"II*\x00\x08\x00") == "image"
+    assert sniff_media_kind(b'<?xml version="1.0"?>\n<svg xmlns="http://www.w3.org/2000/svg">') == "image"
+
+
+@pytest.mark.asyncio
+async def test_video_containers_pass_audio_policies_but_not_image_ones() -> None:
+    mp4 = b"\x00\x00\x00\x18ftypmp42" + b"\x00" * 40
+    client_sb = _ClientSupabase()
+    stored = await stream_upload(_upload(mp4, content_type="audio/mp4"), client_sb, "client-1", POLICY)
+    assert stored.size == len(mp4)
+
+    image_policy = replace(POLICY, allowed_types=("image/",), media_kind="image", require_signature=True)
+    with pytest.raises(HTTPException):
+        await stream_upload(_upload(mp4, content_type="image/png"), client_sb, "client-1", image_policy)
+
+
+async def _no_sleep(_: float) -> None:
+    return None
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import types
+
+from app.tests.utils.agent_loader import load_agent_module
+
+
+def _context_manager():
+    context = load_agent_module("context.py", "agent_context_for_tests")
+    manager = object.__new__(context.AgentContextManager)
+    manager.agent_config = {"system_prompt": "You are Ada.", "name": "Ada"}
+    manager.prompt_layout = "prefix_stable"
+    manager._last_prefix_hash = None
+    return manager
+
+
+def _knowledge(title: str):
+    return [{"title": title, "relevance": 0.9, "excerpt": f"Details about {title}"}]
+
+
+def test_prefix_stable_layout_keeps_rag_last_and_prefix_identical() -> None:
+    manager = _context_manager()
+    overview = {"identity": {"name": "Sam", "role": "Founder"}}
+
+    first = manager._compose_prompt("You are Ada.", {}, overview, _knowledge("Pricing"), [])
+    second = manager._compose_prompt("You are Ada.", {}, overview, _knowledge("Roadmap"), [])
+
+    assert first["stable_prefix"] == second["stable_prefix"]
+    assert first["enhanced_prompt"].startswith(first["stable_prefix"])
+    names = [seg.name for seg in first["segments"]]
+    assert names == ["agent_prompt", "guidance", "user_context", "turn_context"]
+    assert "Pricing" in first["turn_context_prompt"]
+    assert "Pricing" not in first["stable_prefix"]
+    # Per-turn timestamp footer lives in the volatile tail only
+    assert "Context generated at" not in first["stable_prefix"]
+
+    meta_first = manager._prompt_layout_metadata(first)
+    meta_second = manager._prompt_layout_metadata(second)
+    assert meta_first["stable_prefix_changed"] is True
+    assert meta_second["stable_prefix_changed"] is False
+    assert "content" not in meta_first["prompt_segments"][0]
+
+
+def test_prompt_cache_stats_reports_hit_rates() -> None:
+    prompt_layout = load_agent_module("prompt_layout.py", "agent_prompt_layout_for_tests")
+    stats = prompt_layout.PromptCacheStats(label="openai")
+
+    assert stats.record(types.SimpleNamespace(type="tts_metrics")) is None
+    stats.record(types.SimpleNamespace(prompt_tokens=2000, prompt_cached_tokens=0, ttft=0.9))
+    last = stats.record(
+        types.SimpleNamespace(metrics=types.SimpleNamespace(prompt_tokens=2000, prompt_cached_tokens=1536, ttft=0.3))
+    )
+
+    assert last["hit_rate"] == 0.768
+    assert stats.turns == 2
+    assert round(stats.hit_rate, 3) == 0.384
+    assert prompt_layout.prompt_cache_key("openai", "client", "agent") == prompt_layout.prompt_cache_key(
+        "openai", "client", "agent"
+    )
+    assert prompt_layout.prompt_cache_key("deepinfra", "client", "agent") is None
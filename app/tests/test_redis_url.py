@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+import pytest
+
+from app.config import settings
+from app.utils.redis_url import redis_url_from_env
+
+
+def test_store_override_then_shared_url_then_platform_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+    for var in ("CREDENTIAL_CACHE_REDIS_URL", "REDIS_URL", "REDIS_HOST"):
+        monkeypatch.delenv(var, raising=False)
+    # Nothing configured: stores stay in process memory
+    assert redis_url_from_env("CREDENTIAL_CACHE_REDIS_URL") is None
+
+    monkeypatch.setenv("REDIS_HOST", "redis")
+    assert redis_url_from_env("CREDENTIAL_CACHE_REDIS_URL") == settings.redis_url
+
+    monkeypatch.setenv("REDIS_URL", "redis://shared:6379/0")
+    assert redis_url_from_env("CREDENTIAL_CACHE_REDIS_URL") == "redis://shared:6379/0"
+
+    monkeypatch.setenv("CREDENTIAL_CACHE_REDIS_URL", "redis://credentials:6379/2")
+    assert redis_url_from_env("CREDENTIAL_CACHE_REDIS_URL") == "redis://credentials:6379/2"
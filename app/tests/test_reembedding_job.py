@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+
+from app.services.reembedding_job import REEMBED_TARGETS, ReembeddingJob, ReembedTarget
+
+TARGET = ReembedTarget("document_chunks", "embeddings_vec", "content", metadata_column="chunk_metadata")
+SIGNATURE = {"embedding_provider": "siliconflow", "embedding_model": "Qwen/Qwen3-Embedding-4B", "embedding_dimension": 1024}
+
+
+class _TenantDb:
+    """Just enough of the tenant database to drive the job's statements."""
+
+    def __init__(self, row_count: int, indexed_rows: int = 0) -> None:
+        self.rows = {f"00000000-0000-0000-0000-{i:012d}": f"chunk {i}" for i in range(row_count)}
+        self.shadow: Dict[str, str] = {}
+        self.progress: Optional[Dict[str, Any]] = None
+        self.swapped = False
+        self.fail_on_write: Optional[int] = None
+        self.writes = 0
+        # Vector indexes (name -> column); indexed_rows is the row count the index planner sees
+        self.indexed_rows = indexed_rows
+        self.indexes: Dict[str, str] = {}
+
+    def _drop_column(self, column: str) -> None:
+        self.indexes = {name: col for name, col in self.indexes.items() if col != column}
+
+    def execute(self, sql: str) -> Tuple[bool, str]:
+        if sql.startswith("do $$"):
+            missing = [i for i in self.rows if i not in self.shadow]
+            if missing:
+                return False, f"reembed_pending: {len(missing)} rows still missing new embeddings"
+            for line in sql.splitlines():
+                if match := re.search(r"drop column if exists (\w+);", line):
+                    self._drop_column(match.group(1))
+                elif match := re.search(r"rename column (\w+) to (\w+);", line):
+                    old, new = match.groups()
+                    self.indexes = {name: new if col == old else col for name, col in self.indexes.items()}
+                elif match := re.search(r"alter index if exists public\.(\w+) rename to (\w+);", line):
+                    self.indexes[match.group(2)] = self.indexes.pop(match.group(1))
+            self.swapped = True
+        elif match := re.match(r"create index concurrently if not exists (\w+) on \S+ using \w+ \((\w+)", sql):
+            self.indexes.setdefault(match.group(1), match.group(2))
+        elif match := re.match(r"drop index concurrently if exists public\.(\w+)", sql):
+            self.indexes.pop(match.group(1), None)
+        elif match := re.match(r"alter table \S+ drop column if exists (\w+_next)", sql):
+            self._drop_column(match.group(1))
+            self.shadow.clear()
+            self.swapped = False
+        elif sql.startswith("update public.embedding_reembed_progress"):
+            match = re.search(r"status = '(\w+)'", sql)
+            if match:
+                self.progress["status"] = match.group(1)
+            if "worker_id = null" in sql:
+                self.progress["worker_id"] = None
+        return True, ""
+
+    def query(self, sql: str) -> List[Dict[str, Any]]:
+        if "information_schema.columns" in sql:
+            if "udt_name" not in sql:
+                return [{"?column?": 1}]  # Column probe succeeds
+            if not self.indexed_rows:
+                return []  # Nothing to index
+            table, column = re.search(r"in \(\('(\w+)', '(\w+)'\)\)", sql).groups()
+            indexes = [{"name": n, "method": "hnsw", "valid": True} for n, c in self.indexes.items() if c == column]
+            return [{"table_name": table, "column_name": column, "estimated_rows": self.indexed_rows, "null_frac": 0, "indexes": indexes}]
+        if "count(*)::bigint as rows" in sql:
+            table, column = re.search(r"select '(\w+)' as table_name, '(\w+)'", sql).groups()
+            return [{"table_name": table, "column_name": column, "rows": self.indexed_rows}]
+        if sql.startswith("select ic.relname"):
+            column = re.search(r"att\.attname = '(\w+)'", sql).group(1)
+            return [{"name": n} for n, c in self.indexes.items() if c == column]
+        if sql.startswith("select signature, status"):
+            return [dict(self.progress)] if self.progress else []
+        if sql.startswith("insert into public.embedding_reembed_progress"):
+            worker = re.search(r"jsonb, '([^']+)'\)", sql).group(1)
+            signature = json.loads(re.search(r"'(\{[^']*\})'::jsonb", sql).group(1))
+            if self.progress is None or (self.progress["signature"] != signature and self.progress.get("worker_id") is None):
+                self.progress = {"status": "backfilling", "last_id": None, "processed": 0, "failed": 0, "signature": signature}
+            elif self.progress.get("worker_id") not in (None, worker):
+                return []
+            self.progress["worker_id"] = worker
+            return [dict(self.progress)]
+        if sql.startswith("select id::text"):
+            after = re.search(r"> '([^']+)'::uuid", sql)
+            limit = int(re.search(r"limit (\d+)", sql).group(1))
+            ids = sorted(i for i in self.rows if not after or i > after.group(1))
+            if "_next is null" in sql:
+                ids = [i for i in ids if i not in self.shadow]
+            return [{"id": i, "text": self.rows[i]} for i in ids[:limit]]
+        if sql.startswith("with "):
+            self.writes += 1
+            if self.writes == self.fail_on_write:
+                raise ConnectionError("management API timeout")
+            for row_id, vec in re.findall(r"\('([^']+)', '(\[[^']*\])'\)", sql):
+                self.shadow[row_id] = vec
+            cursor = re.search(r"coalesce\('([^']+)', last_id\)", sql)
+            if cursor:
+                self.progress["last_id"] = cursor.group(1)
+            self.progress["processed"] += len(re.findall(r"\('[^']+', '\[", sql))
+            return [{"processed": self.progress["processed"]}]
+        if sql.startswith("select processed, failed"):
+            return [{"processed": self.progress["processed"], "failed": self.progress["failed"]}]
+        raise AssertionError(f"unexpected query: {sql[:80]}")
+
+
+def _job(
+    db: _TenantDb,
+    embedded: List[str],
+    worker_id: str,
+    flips: Optional[List[str]] = None,
+    signature: Dict[str, Any] = SIGNATURE,
+) -> ReembeddingJob:
+    async def embed(text: str, context: str) -> List[float]:
+        embedded.append(text)
+        return [0.1, 0.2, 0.3, 0.4]
+
+    async def flip() -> None:
+        assert db.swapped, "settings must not change before the swap"
+        flips.append(worker_id)
+
+    return ReembeddingJob(
+        execute=db.execute,
+        query=db.query,
+        embed=embed,
+        signature=signature,
+        targets=[TARGET],
+        batch_size=3,
+        worker_id=worker_id,
+        on_swapped=flip if flips is not None else None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_crashed_job_resumes_from_checkpoint_and_swaps() -> None:
+    db = _TenantDb(row_count=8)
+    db.fail_on_write = 2
+    embedded: List[str] = []
+    flips: List[str] = []
+
+    results = await _job(db, embedded, "worker-a", flips).run()
+    assert results[0][1] is False
+    assert flips == []
+    assert db.progress["last_id"] == "00000000-0000-0000-0000-000000000002"
+    assert db.progress["worker_id"] is None
+    assert not db.swapped
+
+    embedded.clear()
+    results = await _job(db, embedded, "worker-b", flips).run()
+
+    assert results == [
+        ("reembed:document_chunks.embeddings_vec", True, "swapped (processed=8, failed=0)"),
+        ("reembed:settings", True, "embedding settings updated"),
+    ]
+    assert flips == ["worker-b"]
+    # Rows before the checkpoint were not embedded again
+    assert "chunk 0" not in embedded and "chunk 2" not in embedded
+    assert sorted(db.shadow) == sorted(db.rows)
+    assert db.swapped and db.progress["status"] == "swapped"
+
+    # A finished column is a no-op on the next run
+    assert (await _job(db, embedded, "worker-c").run())[0][2] == "already migrated"
+
+
+@pytest.mark.asyncio
+async def test_swapped_column_keeps_its_index_across_migrations() -> None:
+    db = _TenantDb(row_count=4, indexed_rows=10_000)
+    live_index = "document_chunks_embeddings_vec_hnsw_m16"
+    db.indexes[live_index] = "embeddings_vec"
+
+    for model in ("Qwen/Qwen3-Embedding-4B", "Qwen/Qwen3-Embedding-8B"):
+        results = await _job(db, [], f"worker-{model}", signature={**SIGNATURE, "embedding_model": model}).run()
+        assert results[0][1] is True, results
+        # The shadow index was built and took the live column's index name at the swap
+        assert db.indexes[live_index] == "embeddings_vec"
+        assert not any("_next_" in name for name in db.indexes)
+
+
+def test_swap_refuses_with_missing_rows_and_stamps_chunk_metadata() -> None:
+    job = _job(_TenantDb(row_count=0), [], "worker-a")
+    sql = job._swap_sql(TARGET, allowed_missing=2)
+
+    assert "lock table public.document_chunks in share row exclusive mode" in sql
+    assert "if missing > 2 then" in sql
+    assert "chunk_metadata = coalesce(chunk_metadata" in sql
+    assert sql.index("rename column embeddings_vec to embeddings_vec_prev") < sql.index(
+        "rename column embeddings_vec_next to embeddings_vec"
+    )
+
+
+def test_targets_cover_document_vectors_and_dimension_is_pinned() -> None:
+    documents = next(t for t in REEMBED_TARGETS if t.table == "documents")
+    assert (documents.column, documents.id_type, documents.context) == ("embeddings", "bigint", "document")
+
+    with pytest.raises(ValueError):
+        ReembeddingJob(
+            execute=lambda sql: (True, ""),
+            query=lambda sql: [],
+            embed=None,
+            signature={**SIGNATURE, "embedding_dimension": 4096},
+        )
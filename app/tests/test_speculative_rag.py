@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import asyncio
+from typing import List
+
+import pytest
+
+from app.tests.utils.agent_loader import load_agent_module
+
+
+@pytest.fixture(scope="module")
+def speculative_rag():
+    return load_agent_module("speculative_rag.py", "agent_speculative_rag_for_tests")
+
+
+def test_text_divergence_counts_appended_and_corrected_words(speculative_rag) -> None:
+    div = speculative_rag.text_divergence
+    norm = speculative_rag.normalize_query
+
+    assert div(norm("What's the refund policy?"), norm("whats the refund policy")) == 0.0
+    assert div(norm("what is the refund policy"), norm("what is the refund policy please")) < 0.1
+    assert div(norm("what is the refund policy"), norm("how do I reset my password")) > 0.8
+
+
+@pytest.mark.asyncio
+async def test_stable_interim_is_reused_for_matching_final(speculative_rag) -> None:
+    calls: List[str] = []
+
+    async def retrieve(text: str) -> str:
+        calls.append(text)
+        await asyncio.sleep(0.02)
+        return f"ctx:{text}"
+
+    retriever = speculative_rag.SpeculativeRetriever(retrieve, stable_after=0.01)
+
+    # Rapid interim updates are debounced into a single speculative retrieval
+    retriever.observe("what is the")
+    retriever.observe("what is the refund")
+    retriever.observe("what is the refund policy for")
+    await asyncio.sleep(0.02)
+
+    task = retriever.take("What is the refund policy for?")
+    assert task is not None
+    assert await task == "ctx:what is the refund policy for"
+    assert calls == ["what is the refund policy for"]
+    assert retriever.stats == {"launched": 1, "hits": 1, "misses": 0}
+
+
+@pytest.mark.asyncio
+async def test_divergent_final_discards_speculation(speculative_rag) -> None:
+    started = asyncio.Event()
+
+    async def retrieve(text: str) -> str:
+        started.set()
+        await asyncio.sleep(10)
+        return text
+
+    retriever = speculative_rag.SpeculativeRetriever(retrieve, stable_after=0.0)
+    retriever.observe("tell me about the pricing tiers")
+    await asyncio.wait_for(started.wait(), timeout=1)
+    (entry,) = retriever._entries.values()
+
+    assert retriever.take("actually cancel my subscription today") is None
+    await asyncio.sleep(0)
+    assert entry.task.cancelled()
+    assert retriever.stats["misses"] == 1
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import pytest
+
+from app.benchmarks.standins import Latencies
+from app.benchmarks.text_chat import BenchmarkConfig, check_budgets, percentile, run_benchmark
+from app.utils.stage_timer import StageTimer, add_stage_sink, remove_stage_sink
+
+
+def test_stage_timer_laps_marks_and_notifies_sinks_once() -> None:
+    seen = []
+
+    def sink(event, stages, details):
+        seen.append((event, stages, details))
+
+    add_stage_sink(sink)
+    try:
+        timer = StageTimer("unit")
+        timer.lap("a")
+        timer.mark("first")
+        timer.mark("first")
+        timer.lap("b")
+        timer.finish(ok=True)
+        timer.finish(ok=False)
+    finally:
+        remove_stage_sink(sink)
+
+    assert len(seen) == 1
+    event, stages, details = seen[0]
+    assert event == "unit" and details == {"ok": True}
+    assert set(stages) == {"a", "first", "b", "total"}
+    assert stages["total"] >= stages["a"] + stages["b"] - 0.01
+
+
+def test_percentile_is_nearest_rank() -> None:
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile([], 95) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_benchmark_reports_every_stage_of_the_text_path() -> None:
+    latencies = Latencies(
+        platform_db_ms=1,
+        tenant_db_ms=1,
+        livekit_api_ms=1,
+        embedder_ms=1,
+        reranker_ms=1,
+        llm_first_token_ms=5,
+        llm_token_interval_ms=1,
+        llm_tokens=3,
+        jitter=0,
+    )
+    report = await run_benchmark(
+        BenchmarkConfig(conversations=2, messages_per_conversation=2, concurrency=2, latencies=latencies, poll_interval=0.01)
+    )
+
+    assert report.errors == 0, report.error_samples
+    for stage in ("config_resolution", "context_build", "tool_manifest", "dispatch", "first_token", "persist", "total"):
+        assert report.stages[stage].count == 4
+    assert report.stages["first_token"].p50 <= report.stages["total"].p50
+    assert check_budgets(report, {"total": 0.001}) and not check_budgets(report, {"total": 60_000})
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Dict, List
+
+import pytest
+
+from app.services.text_sessions import (
+    ACK_MARGIN_SECONDS,
+    InMemoryTextSessionBus,
+    TextSessionActor,
+    TextSessionClient,
+    session_fingerprint,
+)
+
+CONTEXT = {
+    "system_prompt": "Be brief.",
+    "tools": [{"id": "t1", "slug": "search"}],
+    "dataset_ids": [1, 2],
+    "user_id": "user-a",
+    "client_id": "client-1",
+    "agent_id": "agent-1",
+}
+
+
+def _actor(bus: InMemoryTextSessionBus, seen: List[Dict[str, Any]], **kwargs: Any) -> TextSessionActor:
+    async def handle(turn: Dict[str, Any], publish) -> None:
+        seen.append(turn)
+        await publish({"streaming": True, "text_response": None}, 1)
+        await publish({"text_response_partial": "Hel", "streaming": True}, 1)
+        await publish({"text_response_partial": "Hello", "streaming": True}, 1)
+        await publish({"text_response": f"Hello: {turn['user_message']}", "streaming": False, "citations": [{"doc_id": 1}]}, 2)
+
+    kwargs.setdefault("idle_seconds", 5.0)
+    return TextSessionActor(bus, "conv-1", session_fingerprint(CONTEXT), handle, lease_seconds=0.3, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_follow_up_turns_stream_through_the_live_actor() -> None:
+    bus = InMemoryTextSessionBus()
+    client = TextSessionClient(bus, ack_timeout=1.0, turn_timeout=5.0)
+    assert await client.submit("conv-1", "hi") is None  # no actor yet -> caller dispatches
+
+    seen: List[Dict[str, Any]] = []
+    actor = _actor(bus, seen)
+    serving = asyncio.create_task(actor.serve())
+    await asyncio.sleep(0.05)
+
+    for message in ("first", "second"):
+        turn = await client.submit("conv-1", message, fingerprint=session_fingerprint(CONTEXT))
+        assert turn is not None
+        updates = [update async for update in turn.updates()]
+        assert updates[:2] == [{"delta": "Hel"}, {"delta": "lo"}]
+        assert updates[-1]["done"] and updates[-1]["full_text"] == f"Hello: {message}"
+        assert updates[-1]["citations"] == [{"doc_id": 1}]
+
+    assert [turn["user_message"] for turn in seen] == ["first", "second"]
+    actor.stop()
+    await asyncio.wait_for(serving, 2)
+    assert await bus.owner("conv-1") is None
+
+
+@pytest.mark.asyncio
+async def test_config_change_hands_the_turn_back_and_retires_the_actor() -> None:
+    bus = InMemoryTextSessionBus()
+    client = TextSessionClient(bus, ack_timeout=1.0)
+    seen: List[Dict[str, Any]] = []
+    serving = asyncio.create_task(_actor(bus, seen).serve())
+    await asyncio.sleep(0.05)
+
+    changed = session_fingerprint({**CONTEXT, "system_prompt": "Be verbose."})
+    assert await client.submit("conv-1", "hi", fingerprint=changed) is None
+
+    await asyncio.wait_for(serving, 2)
+    assert seen == []
+    assert await bus.owner("conv-1") is None
+
+
+@pytest.mark.asyncio
+async def test_actor_only_serves_the_caller_it_was_started_for() -> None:
+    bus = InMemoryTextSessionBus()
+    client = TextSessionClient(bus, ack_timeout=1.0)
+    seen: List[Dict[str, Any]] = []
+    serving = asyncio.create_task(_actor(bus, seen).serve())
+    await asyncio.sleep(0.05)
+
+    other_user = session_fingerprint({**CONTEXT, "user_id": "user-b"})
+    assert await client.submit("conv-1", "hi", fingerprint=other_user) is None
+
+    await asyncio.wait_for(serving, 2)
+    assert seen == []
+
+
+@pytest.mark.asyncio
+async def test_turn_without_fingerprint_is_not_served() -> None:
+    bus = InMemoryTextSessionBus()
+    client = TextSessionClient(bus, ack_timeout=1.0)
+    seen: List[Dict[str, Any]] = []
+    serving = asyncio.create_task(_actor(bus, seen).serve())
+    await asyncio.sleep(0.05)
+
+    assert await client.submit("conv-1", "hi") is None
+    await asyncio.wait_for(serving, 2)
+    assert seen == []
+
+
+@pytest.mark.asyncio
+async def test_idle_actor_releases_the_conversation() -> None:
+    bus = InMemoryTextSessionBus()
+    actor = _actor(bus, [], idle_seconds=0.1)
+    await asyncio.wait_for(actor.serve(), 2)
+
+    assert await bus.owner("conv-1") is None
+    # Only one actor may own a conversation at a time
+    assert await bus.claim("conv-1", "worker-a", 1.0)
+    assert not await bus.claim("conv-1", "worker-b", 1.0)
+
+
+def test_fingerprint_ignores_volatile_tool_fields() -> None:
+    with_timestamps = {**CONTEXT, "tools": [{"id": "t1", "slug": "search", "updated_at": "2026-01-01"}]}
+    assert session_fingerprint(with_timestamps) == session_fingerprint(CONTEXT)
+    assert session_fingerprint({**CONTEXT, "dataset_ids": [1]}) != session_fingerprint(CONTEXT)
+
+
+class _LateAckBus(InMemoryTextSessionBus):
+    """Live owner whose ack lands on the reply stream just as the client's wait runs out."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.turns: List[Dict[str, Any]] = []
+
+    async def owner(self, conversation_id: str) -> str:
+        return "worker-1"
+
+    async def push(self, stream: str, message: Dict[str, Any]) -> None:
+        if stream.endswith(":inbox"):
+            self.turns.append(message)
+            return
+        await super().push(stream, message)
+
+    async def pop(self, stream: str, timeout: float) -> List[Dict[str, Any]]:
+        if timeout > 0:
+            await asyncio.sleep(timeout)
+            await super().push(stream, {"type": "accepted", "worker_id": "worker-1"})
+            return []
+        return await super().pop(stream, 0)
+
+
+@pytest.mark.asyncio
+async def test_ack_at_the_deadline_is_not_also_dispatched() -> None:
+    bus = _LateAckBus()
+    client = TextSessionClient(bus, ack_timeout=0.2)
+
+    started = time.time()
+    assert await client.submit("conv-1", "hi", fingerprint="f") is not None
+    # Actors stop accepting before the client stops listening
+    assert bus.turns[0]["ack_deadline"] <= started + 0.2 - min(ACK_MARGIN_SECONDS, 0.05) + 0.01
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import uuid
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from app.agent_modules import transcript_store
+
+
+class _Result:
+    def __init__(self, data: List[Dict[str, Any]]) -> None:
+        self.data = data
+
+
+class _Query:
+    def __init__(self, client: "_FakeSupabase", table: str) -> None:
+        self.client = client
+        self.table = table
+        self.op: Tuple[str, Any] = ("select", None)
+        self.kwargs: Dict[str, Any] = {}
+
+    def select(self, *_args: Any) -> "_Query":
+        return self
+
+    def eq(self, *_args: Any) -> "_Query":
+        return self
+
+    def limit(self, *_args: Any) -> "_Query":
+        return self
+
+    def insert(self, row: Dict[str, Any]) -> "_Query":
+        self.op = ("insert", row)
+        return self
+
+    def update(self, row: Dict[str, Any]) -> "_Query":
+        self.op = ("update", row)
+        return self
+
+    def upsert(self, row: Dict[str, Any], **kwargs: Any) -> "_Query":
+        self.op = ("upsert", row)
+        self.kwargs = kwargs
+        return self
+
+    def execute(self) -> _Result:
+        kind, row = self.op
+        self.client.calls.append((self.table, kind, row, self.kwargs))
+        if kind == "insert":
+            return _Result([{"id": str(uuid.uuid4()), **row}])
+        if kind == "select" and self.table == "conversations":
+            return _Result([{"id": "existing"}])
+        return _Result([])
+
+
+class _FakeSupabase:
+    def __init__(self) -> None:
+        self.calls: List[Tuple[str, str, Any, Dict[str, Any]]] = []
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+
+class _Embedder:
+    def __init__(self) -> None:
+        self.texts: List[str] = []
+
+    async def create_embedding(self, text: str) -> List[float]:
+        self.texts.append(text)
+        return [0.1, 0.2, 0.3]
+
+
+@pytest.mark.asyncio
+async def test_store_turn_upserts_one_paired_turn_embedding() -> None:
+    supabase = _FakeSupabase()
+    embedder = _Embedder()
+    user_id = str(uuid.uuid4())
+    agent_id = str(uuid.uuid4())
+    conversation_id = str(uuid.uuid4())
+
+    result = await transcript_store.store_turn(
+        {
+            "conversation_id": conversation_id,
+            "agent_id": agent_id,
+            "user_id": user_id,
+            "user_text": "What did we decide about the launch date?",
+            "assistant_text": "We moved the launch to the first week of March.",
+            "embedder": embedder,
+        },
+        supabase,
+    )
+
+    assert result["success"] is True
+    upserts = [call for call in supabase.calls if call[0] == "conversation_turn_embeddings"]
+    assert len(upserts) == 1
+    _, kind, row, kwargs = upserts[0]
+    assert kind == "upsert"
+    assert kwargs == {"on_conflict": "turn_id"}
+    assert row["turn_id"] == result["turn_id"]
+    assert row["user_id"] == user_id
+    assert row["agent_id"] == agent_id
+    assert row["user_message"] == "What did we decide about the launch date?"
+    assert row["agent_response"] == "We moved the launch to the first week of March."
+    assert row["embeddings"] == [0.1, 0.2, 0.3]
+
+
+@pytest.mark.asyncio
+async def test_trivial_user_message_skips_turn_embedding() -> None:
+    supabase = _FakeSupabase()
+
+    await transcript_store.generate_embeddings_best_effort(
+        _Embedder(),
+        supabase,
+        "thanks",
+        "You're welcome!",
+        "user-row",
+        None,
+        turn_row={"turn_id": str(uuid.uuid4())},
+    )
+
+    assert not [call for call in supabase.calls if call[0] == "conversation_turn_embeddings"]
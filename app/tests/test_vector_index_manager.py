@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Tuple
+
+from app.services.document_processor import DocumentProcessor
+from app.services.schema_sync import RAG_PATCH_SQL
+from app.services.vector_index_manager import RPC_VECTOR_COLUMNS, ExistingIndex, VectorIndexManager, plan_index
+
+
+def test_plan_drops_ann_index_on_small_tables() -> None:
+    plan = plan_index("documents", "embeddings", 120, [ExistingIndex("documents_embeddings_ivfflat", "ivfflat", options={"lists": "16"})])
+    assert plan.method == "none"
+    assert plan.action == "drop"
+
+
+def test_plan_switches_fixed_ivfflat_to_hnsw_and_resizes_large_tables() -> None:
+    legacy = [ExistingIndex("document_chunks_embeddings_ivfflat", "ivfflat", options={"lists": "16"})]
+    mid = plan_index("document_chunks", "embeddings", 50_000, legacy)
+    assert (mid.method, mid.action) == ("hnsw", "rebuild")
+    assert mid.search_settings == {"hnsw.ef_search": 80}
+
+    large = plan_index("document_chunks", "embeddings", 4_000_000, legacy)
+    assert large.method == "ivfflat"
+    assert large.params == {"lists": 2000}
+    assert large.search_settings == {"ivfflat.probes": 44}
+    assert large.action == "rebuild"
+
+    settled = plan_index(
+        "document_chunks",
+        "embeddings",
+        4_000_000,
+        [ExistingIndex("document_chunks_embeddings_ivfflat_l1800", "ivfflat", options={"lists": "1800"})],
+    )
+    assert settled.action == "keep"
+
+
+def test_manager_builds_new_index_before_dropping_old() -> None:
+    executed: List[str] = []
+
+    def execute(sql: str) -> Tuple[bool, str]:
+        executed.append(sql)
+        return True, ""
+
+    def query(sql: str) -> List[Dict[str, Any]]:
+        if "information_schema.columns" in sql:
+            return [
+                {
+                    "table_name": "document_chunks",
+                    "column_name": "embeddings_vec",
+                    "estimated_rows": 20_000,
+                    "null_frac": 0.0,
+                    "indexes": [
+                        {"name": "document_chunks_embeddings_vec_ivfflat", "method": "ivfflat", "valid": True, "options": ["lists=16"]}
+                    ],
+                }
+            ]
+        return [{"table_name": "document_chunks", "column_name": "embeddings_vec", "rows": 20_000}]
+
+    results = VectorIndexManager(execute=execute, query=query, targets=[("document_chunks", "embeddings_vec")]).sync()
+
+    assert executed[0].startswith("create index concurrently if not exists document_chunks_embeddings_vec_hnsw_m16")
+    assert executed[1] == "drop index concurrently if exists public.document_chunks_embeddings_vec_ivfflat"
+    assert "hnsw.ef_search = 80" in executed[2]
+    assert results[0][0] == "vector_index:document_chunks.embeddings_vec"
+    assert all(ok for _, ok, _ in results)
+
+
+def test_hybrid_rpc_and_its_index_use_the_column_ingestion_writes() -> None:
+    processor = DocumentProcessor.__new__(DocumentProcessor)
+    row = processor._build_chunk_row("1", "some text", 0, embeddings=[0.1, 0.2], content_hash="h")
+    [vector_column] = [column for column, value in row.items() if value == [0.1, 0.2]]
+
+    hybrid_sql = RAG_PATCH_SQL[RAG_PATCH_SQL.index("function public.match_documents_hybrid("):]
+    hybrid_sql = hybrid_sql[: hybrid_sql.index("$$;")]
+    used = set(re.findall(r"dc\.(embeddings\w*)", hybrid_sql))
+    assert used == {vector_column}
+    assert f"dc.{vector_column} is not null" in hybrid_sql
+
+    [hybrid_rpc] = [rpc for rpc in RPC_VECTOR_COLUMNS if "match_documents_hybrid" in rpc]
+    assert RPC_VECTOR_COLUMNS[hybrid_rpc] == ("document_chunks", vector_column)
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Dict
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from app.services.web_scraper import ScrapeError, WebScraper, parse_html
+
+PAGE = """
+<html>
+  <head>
+    <title>Example Page</title>
+    <meta name="description" content="An example">
+  </head>
+  <body>
+    <nav>Skip me</nav>
+    <article><h1>Hello</h1><p>Body text <a href="https://example.com/a">link</a></p></article>
+    <script>var x = 1;</script>
+  </body>
+</html>
+"""
+
+
+def test_parse_html_extracts_main_content_and_links() -> None:
+    parsed = parse_html(PAGE, "https://example.com/")
+    assert parsed["title"] == "Example Page"
+    assert parsed["description"] == "An example"
+    assert "Body text" in parsed["markdown"]
+    assert "Skip me" not in parsed["markdown"]
+    assert "var x" not in parsed["markdown"]
+    assert parsed["links"] == ["https://example.com/a"]
+
+
+@pytest_asyncio.fixture
+async def page_server():
+    hits: Dict[str, int] = {"page": 0, "not_modified": 0}
+
+    async def page(request: web.Request) -> web.Response:
+        if request.headers.get("If-None-Match") == '"v1"':
+            hits["not_modified"] += 1
+            return web.Response(status=304)
+        hits["page"] += 1
+        return web.Response(text=PAGE, content_type="text/html", headers={"ETag": '"v1"'})
+
+    async def big(request: web.Request) -> web.Response:
+        return web.Response(text="<html><body>" + "x" * 10_000 + "</body></html>", content_type="text/html")
+
+    async def pdf(request: web.Request) -> web.Response:
+        return web.Response(body=b"%PDF", content_type="application/pdf")
+
+    async def slow(request: web.Request) -> web.Response:
+        await asyncio.sleep(1)
+        return web.Response(text=PAGE, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/page", page)
+    app.router.add_get("/big", big)
+    app.router.add_get("/pdf", pdf)
+    app.router.add_get("/slow", slow)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+    yield f"http://127.0.0.1:{port}", hits
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_scrape_caches_and_revalidates(page_server) -> None:
+    base_url, hits = page_server
+    scraper = WebScraper(cache_ttl=60)
+    try:
+        first = await scraper.scrape(f"{base_url}/page")
+        second = await scraper.scrape(f"{base_url}/page", include_links=True)
+        assert first.title == "Example Page"
+        assert first.from_cache is False and first.links == []
+        assert second.from_cache is True and second.links == ["https://example.com/a"]
+        assert hits["page"] == 1
+
+        # Expired entries are revalidated with the stored ETag
+        scraper._cache[f"{base_url}/page"].expires_at = 0
+        third = await scraper.scrape(f"{base_url}/page")
+        assert third.from_cache is True
+        assert hits == {"page": 1, "not_modified": 1}
+    finally:
+        await scraper.close()
+
+
+@pytest.mark.asyncio
+async def test_scrape_caps_download_and_rejects_non_html(page_server) -> None:
+    base_url, _ = page_server
+    scraper = WebScraper(max_bytes=1024)
+    try:
+        page = await scraper.scrape(f"{base_url}/big")
+        assert page.truncated is True
+        assert len(page.markdown) <= 1024
+
+        with pytest.raises(ScrapeError):
+            await scraper.scrape(f"{base_url}/pdf")
+    finally:
+        await scraper.close()
+
+
+@pytest.mark.asyncio
+async def test_network_failures_surface_as_scrape_errors(page_server) -> None:
+    base_url, _ = page_server
+    scraper = WebScraper()
+    try:
+        with pytest.raises(ScrapeError, match="Timed out"):
+            await scraper.scrape(f"{base_url}/slow", timeout=0.1)
+        # Nothing listens on port 1
+        with pytest.raises(ScrapeError, match="Failed to fetch"):
+            await scraper.scrape("http://127.0.0.1:1/page")
+    finally:
+        await scraper.close()
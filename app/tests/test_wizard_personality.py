@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+
+from app.tests.utils.agent_loader import load_agent_module
+
+
+@pytest.fixture(scope="module")
+def wizard_tasks():
+    try:
+        return load_agent_module("wizard_tasks.py", "agent_wizard_tasks_for_tests")
+    except ImportError as e:
+        pytest.skip(f"wizard_tasks needs the agent's livekit-agents version: {e}")
+
+
+ANSWERS = {
+    "openness": "Creative!",
+    "conscientiousness": "organized",
+    "extraversion": "outgoing",
+    "agreeableness": "warm",
+    "emotional_stability": "calm",
+}
+
+
+class _FakeGroq:
+    """Stands in for AsyncGroq; every assessment blocks until ``release`` is set."""
+
+    SCORES = '{"openness": 91, "conscientiousness": 72, "extraversion": 64, "agreeableness": 88, "neuroticism": 12}'
+
+    def __init__(self) -> None:
+        self.calls: List[Dict[str, Any]] = []
+        self.release = asyncio.Event()
+        self.chat = SimpleNamespace(completions=self)
+
+    def __call__(self, api_key: str) -> "_FakeGroq":
+        return self
+
+    async def create(self, **kwargs: Any) -> Any:
+        self.calls.append(kwargs)
+        await self.release.wait()
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.SCORES))])
+
+
+@pytest.fixture
+def groq(wizard_tasks, monkeypatch: pytest.MonkeyPatch) -> _FakeGroq:
+    fake = _FakeGroq()
+    monkeypatch.setattr(wizard_tasks, "GROQ_AVAILABLE", True)
+    monkeypatch.setattr(wizard_tasks, "AsyncGroq", fake)
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setattr(wizard_tasks, "_ASSESSMENT_CACHE", wizard_tasks.OrderedDict())
+    return fake
+
+
+@pytest.mark.asyncio
+async def test_traits_score_incrementally_and_refine_in_background(wizard_tasks, groq) -> None:
+    published: List[Dict[str, int]] = []
+
+    async def on_refined(traits: Dict[str, int]) -> None:
+        published.append(traits)
+
+    assessor = wizard_tasks.PersonalityAssessor("Nova", on_refined=on_refined)
+    collected: Dict[str, str] = {}
+    for field, value in ANSWERS.items():
+        assert assessor.record(field, value)
+        collected[field] = value
+        assessor.refine(collected)
+
+    # Keyword scores are there immediately; the LLM call is in flight, not awaited
+    assert assessor.traits == {"openness": 80, "conscientiousness": 80, "extraversion": 80, "agreeableness": 80, "neuroticism": 20}
+    await asyncio.sleep(0)
+    assert len(groq.calls) == 1 and published == []
+
+    live = assessor.traits
+    groq.release.set()
+    await asyncio.sleep(0.01)
+    assert live["openness"] == 91 and live["neuroticism"] == 12
+    assert published == [live]
+
+    # A later session with the same answers (modulo case and punctuation) reuses the assessment
+    again = wizard_tasks.PersonalityAssessor("Other")
+    again.refine({**ANSWERS, "openness": "creative"})
+    assert again.traits["openness"] == 91
+    await asyncio.sleep(0.01)
+    assert len(groq.calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_changed_answers_supersede_an_in_flight_refinement(wizard_tasks, groq) -> None:
+    assessor = wizard_tasks.PersonalityAssessor("Nova")
+    assessor.refine(ANSWERS)
+    await asyncio.sleep(0)
+    assessor.record("openness", "practical")
+    assessor.refine({**ANSWERS, "openness": "practical"})
+    await asyncio.sleep(0)
+
+    assert len(groq.calls) == 2
+    groq.release.set()
+    await asyncio.sleep(0.01)
+    # Only the refinement for the current answers was applied (the first was cancelled)
+    assert assessor.traits["openness"] == 91 and len(wizard_tasks._ASSESSMENT_CACHE) == 1
+
+
+def test_assessment_key_keeps_non_latin_answers_distinct(wizard_tasks) -> None:
+    key = wizard_tasks._assessment_key
+    assert key({**ANSWERS, "openness": "好奇心が強い"}) != key({**ANSWERS, "openness": "Творческий"})
+    assert key({**ANSWERS, "openness": "Créatif !"}) == key({**ANSWERS, "openness": "créatif"})
+    assert key({**ANSWERS, "openness": "Créatif"}) != key({**ANSWERS, "openness": "cr atif"})
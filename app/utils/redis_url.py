@@ -0,0 +1,32 @@
+"""
+Redis URL resolution for the optional shared stores (credential cache,
+conversation state, dispatch config, text sessions, media runs, embed config).
+
+Each store can point at its own Redis with an override variable such as
+``CREDENTIAL_CACHE_REDIS_URL``; otherwise it shares ``REDIS_URL`` or the
+platform's ``settings.redis_url``. Stores fall back to process memory when
+this returns None, so ``settings.redis_url`` (which always has a localhost
+default) is only used when ``REDIS_HOST`` is actually configured.
+"""
+import logging
+import os
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def redis_url_from_env(override_var: Optional[str] = None) -> Optional[str]:
+    """``override_var``, then ``REDIS_URL``, then ``settings.redis_url`` when Redis is configured."""
+    for var in (override_var, "REDIS_URL"):
+        url = os.getenv(var) if var else None
+        if url:
+            return url
+    if not os.getenv("REDIS_HOST"):
+        return None
+    try:
+        from app.config import settings
+    except Exception as e:
+        # The agent container has no platform settings; it configures REDIS_URL instead
+        logger.debug(f"Platform settings unavailable for Redis URL: {e}")
+        return None
+    return settings.redis_url
@@ -0,0 +1,68 @@
+"""
+Per-request stage timings for hot paths.
+
+A ``StageTimer`` records how long each named stage of one request took
+(config resolution, tool manifest, dispatch, first token, persist, ...).
+``finish()`` emits a single ``PERF:`` log line in the same shape as the
+agent's ``log_perf`` and hands the timings to any registered sinks, which is
+how the benchmark harness collects percentiles without parsing logs.
+"""
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+StageSink = Callable[[str, Dict[str, float], Dict[str, Any]], None]
+
+_sinks: List[StageSink] = []
+
+
+def add_stage_sink(sink: StageSink) -> None:
+    """Receive ``(event, {stage: ms}, details)`` for every finished timer."""
+    _sinks.append(sink)
+
+
+def remove_stage_sink(sink: StageSink) -> None:
+    if sink in _sinks:
+        _sinks.remove(sink)
+
+
+class StageTimer:
+    """Accumulates stage durations (ms) for one request."""
+
+    def __init__(self, event: str):
+        self.event = event
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.stages: Dict[str, float] = {}
+        self._finished = False
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def lap(self, name: str) -> None:
+        """Close a sequential stage: time since the previous lap (or the start)."""
+        now = time.perf_counter()
+        self.stages[name] = self.stages.get(name, 0.0) + (now - self._last) * 1000
+        self._last = now
+
+    def mark(self, name: str) -> None:
+        """Record time since the request started (first occurrence wins), e.g. first token."""
+        self.stages.setdefault(name, self.elapsed_ms())
+
+    def finish(self, **details) -> Dict[str, float]:
+        """Close the timer once: log it and notify sinks."""
+        if self._finished:
+            return self.stages
+        self._finished = True
+        self.stages.setdefault("total", self.elapsed_ms())
+        stages = {name: round(ms, 2) for name, ms in self.stages.items()}
+        logger.info(f"PERF: {json.dumps({'event': self.event, 'stages_ms': stages, 'details': details}, default=str)}")
+        for sink in list(_sinks):
+            try:
+                sink(self.event, dict(self.stages), details)
+            except Exception as e:
+                logger.debug(f"Stage sink failed: {e}")
+        return self.stages
@@ -8,8 +8,36 @@ import logging
 import json
 from typing import Dict, Optional, Any
 
+try:
+    from app.services.credential_cache import PLATFORM_SCOPE, get_credential_cache
+except Exception as exc:  # pragma: no cover - app package not mounted
+    logging.getLogger(__name__).warning("Failed to import credential cache: %s", exc)
+    PLATFORM_SCOPE = "platform"
+    get_credential_cache = None
+
 logger = logging.getLogger(__name__)
 
+_platform_clients: Dict[tuple, Any] = {}
+
+
+def _platform_client(supabase_url: str, supabase_key: str):
+    """Reuse one platform Supabase client per process instead of one per load."""
+    client = _platform_clients.get((supabase_url, supabase_key))
+    if client is None:
+        from supabase import create_client
+
+        client = create_client(supabase_url, supabase_key)
+        _platform_clients[(supabase_url, supabase_key)] = client
+    return client
+
+
+def _cached(scope: Optional[str], name: str, loader):
+    """Serve from the process-wide credential cache (TTL, single-flight)."""
+    if not scope or get_credential_cache is None:
+        return loader()
+    return get_credential_cache().get(scope, name, loader)
+
+
 class APIKeyLoader:
     """Handles loading API keys from various sources"""
     
@@ -96,34 +124,40 @@ class APIKeyLoader:
         if not client_id:
             return True  # Default to platform keys
 
-        try:
-            from supabase import create_client, Client
+        key_mode = _cached(client_id, "key_mode", lambda: APIKeyLoader._fetch_key_mode(client_id))
+        if key_mode is None:
+            return True  # Default to platform keys
+        return key_mode["uses_platform_keys"]
 
+    @staticmethod
+    def _fetch_key_mode(client_id: str) -> Optional[Dict[str, bool]]:
+        """Read the client's key mode; None when it can't be determined."""
+        try:
             supabase_url = os.getenv('SUPABASE_URL')
             supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
 
             if not supabase_url or not supabase_key:
-                return True  # Default to platform keys
+                return None
 
-            supabase: Client = create_client(supabase_url, supabase_key)
+            supabase = _platform_client(supabase_url, supabase_key)
             result = supabase.table('clients').select('uses_platform_keys').eq('id', client_id).single().execute()
 
-            if result.data:
-                # Only use BYOK (return False) if explicitly set to False
-                # None or True = use platform keys
-                if result.data.get('uses_platform_keys') is False:
-                    return False
-            return True  # Default to platform keys
+            # Only use BYOK if explicitly set to False; None or True = use platform keys
+            uses_platform = not (result.data and result.data.get('uses_platform_keys') is False)
+            return {"uses_platform_keys": uses_platform}
         except Exception as e:
             logger.warning(f"Failed to check uses_platform_keys: {e}")
-            return True  # Default to platform keys
+            return None
 
     @staticmethod
     def _load_platform_keys() -> Dict[str, str]:
-        """Load API keys from the platform_api_keys table"""
-        try:
-            from supabase import create_client, Client
+        """Load API keys from the platform_api_keys table (via the credential cache)"""
+        return _cached(PLATFORM_SCOPE, "platform_keys", APIKeyLoader._fetch_platform_keys)
 
+    @staticmethod
+    def _fetch_platform_keys() -> Dict[str, str]:
+        """Read active keys from platform_api_keys"""
+        try:
             supabase_url = os.getenv('SUPABASE_URL')
             supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
 
@@ -131,7 +165,7 @@ class APIKeyLoader:
                 logger.error("Supabase credentials not available - cannot load platform keys")
                 return {}
 
-            supabase: Client = create_client(supabase_url, supabase_key)
+            supabase = _platform_client(supabase_url, supabase_key)
             result = supabase.table('platform_api_keys').select('key_name, key_value').eq('is_active', True).execute()
 
             if result.data:
@@ -152,11 +186,13 @@ class APIKeyLoader:
 
     @staticmethod
     def _load_from_supabase(client_id: str) -> Dict[str, str]:
+        """Client API keys via the credential cache (refreshes at most once per TTL)."""
+        return _cached(client_id, "byok_keys", lambda: APIKeyLoader._fetch_from_supabase(client_id))
+
+    @staticmethod
+    def _fetch_from_supabase(client_id: str) -> Dict[str, str]:
         """Load API keys from Supabase for a specific client (BYOK mode)"""
         try:
-            # Import here to avoid circular dependencies
-            from supabase import create_client, Client
-            
             supabase_url = os.getenv('SUPABASE_URL')
             supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
             
@@ -164,8 +200,8 @@ class APIKeyLoader:
                 logger.error("Supabase credentials not available - cannot load API keys")
                 return {}
                 
-            # Create Supabase client
-            supabase: Client = create_client(supabase_url, supabase_key)
+            # Shared platform Supabase client
+            supabase = _platform_client(supabase_url, supabase_key)
             
             # Get client API keys from the 'clients' table
             # Platform database stores API keys as individual columns
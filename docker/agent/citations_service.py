@@ -6,6 +6,7 @@ Provides document retrieval with structured citation metadata.
 """
 import logging
 import asyncio
+import os
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 from datetime import datetime
@@ -14,6 +15,21 @@ import httpx
 
 logger = logging.getLogger(__name__)
 
+# Retrieval modes: pure cosine search (match_documents) or vector + full-text with
+# reciprocal-rank fusion (match_documents_hybrid, see app/services/schema_sync.py)
+RETRIEVAL_MODE_VECTOR = "vector"
+RETRIEVAL_MODE_HYBRID = "hybrid"
+DEFAULT_RETRIEVAL_MODE = (os.getenv("RAG_RETRIEVAL_MODE") or RETRIEVAL_MODE_VECTOR).strip().lower()
+
+
+def _candidate_score(candidate: Dict[str, Any]) -> float:
+    """Fused RRF score for hybrid candidates, cosine similarity otherwise."""
+    score = candidate.get("rrf_score")
+    if score is None:
+        score = candidate.get("similarity", 0.0)
+    return score or 0.0
+
+
 @dataclass
 class CitationChunk:
     """Single citation chunk with full metadata"""
@@ -42,10 +58,13 @@ class RAGRetrievalResult:
 class RAGCitationsService:
     """Service for RAG document retrieval with citation tracking"""
     
-    def __init__(self, supabase_client: Client, embedder=None, agent_slug: str = None):
+    def __init__(self, supabase_client: Client, embedder=None, agent_slug: str = None, retrieval_mode: Optional[str] = None):
         self.supabase = supabase_client
         self.embedder = embedder
         self.agent_slug = agent_slug
+        self.retrieval_mode = (retrieval_mode or DEFAULT_RETRIEVAL_MODE).lower()
+        # Set once the tenant turns out not to have match_documents_hybrid yet
+        self._hybrid_unavailable = False
         self.max_context_tokens = 32000  # Increased to allow multiple chunks
         self.chars_per_token = 4
         self.max_context_chars = self.max_context_tokens * self.chars_per_token
@@ -73,7 +92,8 @@ class RAGCitationsService:
         rerank_top_k: Optional[int] = None,
         rerank_provider: Optional[str] = None,
         rerank_model: Optional[str] = None,
-        api_keys: Optional[Dict[str, Any]] = None
+        api_keys: Optional[Dict[str, Any]] = None,
+        retrieval_mode: Optional[str] = None,
     ) -> RAGRetrievalResult:
         """
         Retrieve documents with full citation metadata.
@@ -87,6 +107,7 @@ class RAGCitationsService:
             similarity_threshold: Minimum similarity score
             max_documents: Maximum unique documents to include
             max_chunks: Maximum chunks to include in context
+            retrieval_mode: "vector" or "hybrid" (defaults to the service's mode)
             
         Returns:
             RAGRetrievalResult with context and citations
@@ -118,15 +139,13 @@ class RAGCitationsService:
             # Generate query embedding
             query_embedding = await self.embedder.create_embedding(query)
             
-            # Call the match_documents RPC function with correct signature
-            rpc_params = {
-                "p_query_embedding": query_embedding,
-                "p_agent_slug": effective_agent_slug,
-                "p_match_threshold": similarity_threshold,
-                "p_match_count": top_k,
-            }
-            result = await asyncio.to_thread(
-                lambda: self.supabase.rpc("match_documents", rpc_params).execute()
+            result, mode_used = await self._search(
+                query=query,
+                query_embedding=query_embedding,
+                agent_slug=effective_agent_slug,
+                similarity_threshold=similarity_threshold,
+                top_k=top_k,
+                retrieval_mode=(retrieval_mode or self.retrieval_mode).lower(),
             )
             
             if not result.data:
@@ -159,6 +178,7 @@ class RAGCitationsService:
                 "enabled": bool(rerank_enabled and rerank_provider and rerank_model),
                 "provider": rerank_provider,
                 "model": rerank_model,
+                "retrieval_mode": mode_used,
                 "candidates_evaluated": len(result.data),
                 "returned": 0,
                 "top_doc_ids": [],
@@ -183,11 +203,11 @@ class RAGCitationsService:
                     logger.warning(f"Model rerank failed ({type(rerank_err).__name__}): {rerank_err}. Falling back to similarity sort.")
                     # Filter out None items before sorting
                     valid_data = [x for x in result.data if x and isinstance(x, dict)]
-                    reranked = sorted(valid_data, key=lambda x: x.get("similarity", 0.0), reverse=True)[:candidates_limit]
+                    reranked = sorted(valid_data, key=_candidate_score, reverse=True)[:candidates_limit]
             else:
                 # Filter out None items before sorting
                 valid_data = [x for x in result.data if x and isinstance(x, dict)]
-                reranked = sorted(valid_data, key=lambda x: x.get("similarity", 0.0), reverse=True)[:candidates_limit]
+                reranked = sorted(valid_data, key=_candidate_score, reverse=True)[:candidates_limit]
             rerank_debug["returned"] = len(reranked)
             if reranked:
                 rerank_debug["post_titles"] = [r.get("title") for r in reranked[:10] if r and isinstance(r, dict)]
@@ -284,6 +304,57 @@ class RAGCitationsService:
             # No silent failures - raise the exception for proper error handling
             raise RuntimeError(error_msg) from e
 
+    async def _search(
+        self,
+        query: str,
+        query_embedding: List[float],
+        agent_slug: str,
+        similarity_threshold: float,
+        top_k: int,
+        retrieval_mode: str,
+    ) -> Tuple[Any, str]:
+        """Run the candidate search RPC; returns (response, mode actually used)."""
+        if retrieval_mode == RETRIEVAL_MODE_HYBRID and not self._hybrid_unavailable:
+            hybrid_params = {
+                "p_query_embedding": query_embedding,
+                "p_query_text": query,
+                "p_agent_slug": agent_slug,
+                "p_match_threshold": similarity_threshold,
+                "p_match_count": top_k,
+                "p_candidate_count": max(top_k * 4, 40),
+            }
+            try:
+                result = await asyncio.to_thread(
+                    lambda: self.supabase.rpc("match_documents_hybrid", hybrid_params).execute()
+                )
+                return result, RETRIEVAL_MODE_HYBRID
+            except Exception as e:
+                if not self._is_missing_function_error(e):
+                    raise
+                self._hybrid_unavailable = True
+                logger.warning(
+                    "match_documents_hybrid is not installed for this tenant (run schema sync); "
+                    "using vector-only match_documents"
+                )
+
+        # Call the match_documents RPC function with correct signature
+        rpc_params = {
+            "p_query_embedding": query_embedding,
+            "p_agent_slug": agent_slug,
+            "p_match_threshold": similarity_threshold,
+            "p_match_count": top_k,
+        }
+        result = await asyncio.to_thread(
+            lambda: self.supabase.rpc("match_documents", rpc_params).execute()
+        )
+        return result, RETRIEVAL_MODE_VECTOR
+
+    @staticmethod
+    def _is_missing_function_error(error: Exception) -> bool:
+        text = str(error)
+        code = getattr(error, "code", None)
+        return code in ("PGRST202", "42883") or "Could not find the function" in text or "does not exist" in text
+
     async def _model_rerank(
         self,
         query: str,
@@ -304,12 +375,12 @@ class RAGCitationsService:
 
         if provider != "siliconflow":
             logger.info(f"Rerank provider {provider} not supported in agent container; using similarity fallback.")
-            return sorted(candidates, key=lambda x: x.get("similarity", 0.0), reverse=True)[:top_n]
+            return sorted(candidates, key=_candidate_score, reverse=True)[:top_n]
 
         api_key = (api_keys or {}).get("siliconflow_api_key")
         if not api_key:
             logger.warning("SiliconFlow rerank requested but siliconflow_api_key is missing; using similarity fallback.")
-            return sorted(candidates, key=lambda x: x.get("similarity", 0.0), reverse=True)[:top_n]
+            return sorted(candidates, key=_candidate_score, reverse=True)[:top_n]
 
         documents = []
         for c in candidates[:max(top_n, len(candidates))]:
@@ -361,17 +432,17 @@ class RAGCitationsService:
             if reranked_chunks:
                 return reranked_chunks
             # Fallback if parsing failed
-            return sorted(candidates, key=lambda x: x.get("similarity", 0.0), reverse=True)[:top_n]
+            return sorted(candidates, key=_candidate_score, reverse=True)[:top_n]
         except Exception as e:
             logger.warning(f"SiliconFlow rerank call failed: {e}")
-            return sorted(candidates, key=lambda x: x.get("similarity", 0.0), reverse=True)[:top_n]
+            return sorted(candidates, key=_candidate_score, reverse=True)[:top_n]
 
 
 # Singleton instance (will be initialized with supabase client)
 rag_citations_service: Optional[RAGCitationsService] = None
 
-def initialize_citations_service(supabase_client: Client, embedder=None, agent_slug: str = None):
+def initialize_citations_service(supabase_client: Client, embedder=None, agent_slug: str = None, retrieval_mode: Optional[str] = None):
     """Initialize the citations service with a Supabase client, embedder, and agent slug"""
     global rag_citations_service
-    rag_citations_service = RAGCitationsService(supabase_client, embedder, agent_slug)
+    rag_citations_service = RAGCitationsService(supabase_client, embedder, agent_slug, retrieval_mode=retrieval_mode)
     return rag_citations_service
@@ -8,6 +8,7 @@ import asyncio
 import logging
 import json
 import os
+from dataclasses import dataclass
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 
@@ -21,12 +22,86 @@ MAX_PROFILE_FIELD_CHARS = int(os.getenv("CONTEXT_MAX_PROFILE_FIELD_CHARS", "500"
 MAX_KNOWLEDGE_EXCERPT_CHARS = int(os.getenv("CONTEXT_MAX_KNOWLEDGE_EXCERPT_CHARS", "600"))
 MAX_CONVERSATION_SNIPPET_CHARS = int(os.getenv("CONTEXT_MAX_CONVERSATION_SNIPPET_CHARS", "450"))
 CONTEXT_MARKDOWN_CHAR_BUDGET = int(os.getenv("CONTEXT_MARKDOWN_CHAR_BUDGET", "20000"))
+
+# Opt-in turn latency budget for build_complete_context. 0 (default) waits for every
+# source (strict mode); a budget lets slow sources be served stale or dropped.
+CONTEXT_LATENCY_BUDGET_MS = int(os.getenv("CONTEXT_LATENCY_BUDGET_MS", "0"))
+
+# Response formatting guidelines that apply to all prompts
+RESPONSE_FORMATTING_GUIDELINES = """
+## Response Formatting Guidelines
+
+When speaking, structure your responses for clarity:
+- Use paragraph breaks between distinct ideas or topics
+- Bold key terms, important concepts, and names using **double asterisks**
+- Use transition phrases to guide the listener through your explanation
+- Keep individual sentences clear and conversational"""
+
+# User Overview tool guidance
+USER_OVERVIEW_TOOL_GUIDANCE = """
+## User Overview Tool
+
+You have access to an `update_user_overview` tool to maintain persistent notes about users.
+These notes are shared across all sidekicks for this client - they're your collective memory.
+
+**Use this tool when the user shares ENDURING information about:**
+- **Biography:** Life story, background, personal journey, ventures, projects, origin story
+- **Identity:** Their name (ALWAYS store under identity.name when shared), career/role changes, who they are
+- **Goals:** Priority shifts ("My priority is now X instead of Y"), aspirations, missions
+- **Working Style:** Communication preferences, decision-making patterns, neurodivergence
+- **Important Context:** Personal factors affecting interactions, constraints, circumstances
+- **Relationship History:** Key wins, milestones, ongoing threads worth remembering
+
+**Do NOT use for:** Routine tasks, today-only info, already-captured details, or speculation.
+
+**Be concise and update (don't just append).** If a goal changes, replace it. If they share biographical details, add them to the biography section."""
 import httpx
 import time
 
+from prompt_layout import (
+    PROMPT_LAYOUT_LEGACY,
+    PromptSegment,
+    assemble_prompt,
+    get_prompt_layout,
+    prefix_fingerprint,
+    stable_prefix,
+)
+
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class ContextSourcePolicy:
+    """
+    Deadline policy for one context source in budgeted mode.
+
+    deadline: Seconds after the turn starts that the source may hold the LLM
+    priority: 0 = essential (awaited until the overall budget), higher = more expendable
+    serve_stale: On a miss, serve the last good value from this session instead of dropping
+    """
+    deadline: float
+    priority: int
+    serve_stale: bool = False
+
+
+# Profile/overview change rarely, so a stale value beats none; RAG results are
+# query-specific and are dropped instead.
+DEFAULT_CONTEXT_SOURCE_POLICIES: Dict[str, ContextSourcePolicy] = {
+    "knowledge_rag": ContextSourcePolicy(deadline=1.2, priority=0),
+    "conversation_rag": ContextSourcePolicy(deadline=0.9, priority=1),
+    "user_overview": ContextSourcePolicy(deadline=0.6, priority=2, serve_stale=True),
+    "user_profile": ContextSourcePolicy(deadline=0.4, priority=2, serve_stale=True),
+}
+
+# Value used when a source is dropped
+_CONTEXT_SOURCE_EMPTY = {
+    "knowledge_rag": list,
+    "conversation_rag": list,
+    "user_overview": dict,
+    "user_profile": dict,
+}
+
+
 class LocalBGEEmbedder:
     """Client for local BGE-M3 embedding service (on-premise)"""
 
@@ -205,6 +280,14 @@ class AgentContextManager:
         self.user_id = user_id
         self.client_id = client_id
         self.api_keys = api_keys or {}
+
+        # Prompt assembly order (prefix_stable keeps per-turn RAG at the end for prompt caching)
+        self.prompt_layout = get_prompt_layout()
+        self._last_prefix_hash: Optional[str] = None
+
+        # Deadline-driven context assembly (see _gather_with_deadlines)
+        self.context_budget, self.source_policies = self._load_context_policies()
+        self._last_good_context: Dict[str, Any] = {}
         
         # Initialize remote embedder - FAIL FAST if not configured
         self.embedder = self._initialize_embedder()
@@ -265,6 +348,110 @@ class AgentContextManager:
         logger.info(f"Initializing {provider} embedder with model: {model or 'default'}, dimension: {dimension or 'default'}")
         return RemoteEmbedder(provider, api_key, model, dimension)
     
+    def _load_context_policies(self) -> Tuple[float, Dict[str, ContextSourcePolicy]]:
+        """Turn budget (seconds) and per-source policies, with agent-level overrides.
+
+        agent_config may set ``context_latency_budget_ms`` and
+        ``context_deadlines_ms`` ({source: ms}).
+        """
+        budget_ms = self.agent_config.get("context_latency_budget_ms")
+        try:
+            budget = float(budget_ms if budget_ms is not None else CONTEXT_LATENCY_BUDGET_MS) / 1000.0
+        except (TypeError, ValueError):
+            budget = CONTEXT_LATENCY_BUDGET_MS / 1000.0
+
+        policies = dict(DEFAULT_CONTEXT_SOURCE_POLICIES)
+        overrides = self.agent_config.get("context_deadlines_ms") or {}
+        if isinstance(overrides, dict):
+            for name, deadline_ms in overrides.items():
+                if name in policies:
+                    try:
+                        current = policies[name]
+                        policies[name] = ContextSourcePolicy(
+                            deadline=float(deadline_ms) / 1000.0,
+                            priority=current.priority,
+                            serve_stale=current.serve_stale,
+                        )
+                    except (TypeError, ValueError):
+                        logger.warning(f"Ignoring invalid context deadline for {name}: {deadline_ms}")
+        return max(budget, 0.0), policies
+
+    async def _gather_with_deadlines(
+        self, tasks: Dict[str, "asyncio.Task"]
+    ) -> Tuple[Dict[str, Tuple[Any, float]], Dict[str, Dict[str, Any]]]:
+        """
+        Await context sources under the turn's latency budget.
+
+        Each source may hold the LLM until its own deadline (essential sources
+        until the overall budget), but nothing is cut while the turn is still
+        waiting on another source anyway. Sources that fail or miss their
+        deadline are served from the last good value (``serve_stale``) or dropped.
+
+        Returns ({source: (value, duration)}, {source: degradation info}).
+        """
+        start = time.perf_counter()
+        effective: Dict[str, float] = {}
+        for name in tasks:
+            policy = self.source_policies.get(name) or ContextSourcePolicy(deadline=self.context_budget, priority=1)
+            effective[name] = self.context_budget if policy.priority == 0 else min(policy.deadline, self.context_budget)
+
+        results: Dict[str, Tuple[Any, float]] = {}
+        degraded: Dict[str, Dict[str, Any]] = {}
+        failures: Dict[str, str] = {}
+        pending = dict(tasks)
+
+        while pending:
+            elapsed = time.perf_counter() - start
+            horizon = max(effective[name] for name in pending)
+            if elapsed >= horizon:
+                break
+            done, _ = await asyncio.wait(
+                pending.values(), timeout=horizon - elapsed, return_when=asyncio.FIRST_COMPLETED
+            )
+            for name, task in list(pending.items()):
+                if task not in done:
+                    continue
+                pending.pop(name)
+                try:
+                    value, duration = task.result()
+                    results[name] = (value, duration)
+                    self._last_good_context[name] = value
+                except Exception as e:
+                    failures[name] = f"{type(e).__name__}: {e}"
+
+        for name, task in pending.items():
+            task.cancel()
+            failures[name] = "deadline"
+
+        for name, reason in failures.items():
+            policy = self.source_policies.get(name)
+            elapsed = time.perf_counter() - start
+            if policy and policy.serve_stale and name in self._last_good_context:
+                results[name] = (self._last_good_context[name], elapsed)
+                served = "stale"
+            else:
+                results[name] = (_CONTEXT_SOURCE_EMPTY.get(name, dict)(), elapsed)
+                served = "dropped"
+            degraded[name] = {
+                "reason": "deadline" if reason == "deadline" else "error",
+                "served": served,
+                "deadline_ms": round(effective[name] * 1000),
+            }
+            if reason != "deadline":
+                degraded[name]["error"] = reason[:200]
+            if served == "dropped":
+                logger.warning(
+                    f"⏱️ Context source {name} dropped from this turn ({degraded[name]['reason']}) "
+                    f"after {elapsed * 1000:.0f}ms; the reply is generated without it"
+                )
+            else:
+                logger.warning(
+                    f"⏱️ Context source {name} degraded ({degraded[name]['reason']}, served stale) "
+                    f"after {elapsed * 1000:.0f}ms"
+                )
+
+        return results, degraded
+
     def _detect_schema(self):
         """
         NO FALLBACKS: Assume required RPC functions exist.
@@ -321,17 +508,18 @@ class AgentContextManager:
             perf_details['gather_user_profile'] = profile_duration
             perf_details['gather_user_overview'] = overview_duration
 
-            # Format user profile and overview as markdown (without RAG results)
-            context_markdown = self._format_context_as_markdown(
+            # Format user profile and overview (without RAG results) and merge with the
+            # original system prompt
+            original_prompt = self.agent_config.get("system_prompt", "You are a helpful AI assistant.")
+            composed = self._compose_prompt(
+                original_prompt,
                 user_profile,
+                user_overview,
                 [],  # No knowledge results
                 [],  # No conversation results
-                user_overview
             )
-
-            # Merge with original system prompt
-            original_prompt = self.agent_config.get("system_prompt", "You are a helpful AI assistant.")
-            enhanced_prompt = self._merge_system_prompts(original_prompt, context_markdown)
+            context_markdown = composed["context_markdown"]
+            enhanced_prompt = composed["enhanced_prompt"]
 
             # Calculate timing
             duration = time.perf_counter() - start_time
@@ -351,7 +539,8 @@ class AgentContextManager:
                     "context_length": len(context_markdown),
                     "total_prompt_length": len(enhanced_prompt),
                     "performance": perf_details,
-                    "context_type": "initial"
+                    "context_type": "initial",
+                    **self._prompt_layout_metadata(composed),
                 },
                 "raw_context_data": {
                     "user_profile": user_profile,
@@ -390,6 +579,8 @@ class AgentContextManager:
         Returns:
             Dictionary containing:
             - enhanced_system_prompt: Original prompt + dynamic context
+            - turn_context_prompt: Per-turn context only (prefix_stable layout)
+            - stable_prefix: Cacheable leading part of enhanced_system_prompt
             - context_metadata: Metadata for logging/debugging
             - raw_context_data: All gathered context data
         """
@@ -416,8 +607,24 @@ class AgentContextManager:
             else:
                 knowledge_task = asyncio.create_task(self._gather_knowledge_rag(user_message))
 
-            # Wait for all tasks to complete - NO FALLBACKS, fail fast
-            if knowledge_task:
+            if self.context_budget > 0:
+                # Budgeted mode: the LLM starts on time, late/failed sources are degraded
+                source_tasks = {
+                    "user_profile": user_profile_task,
+                    "user_overview": user_overview_task,
+                    "conversation_rag": conversation_task,
+                }
+                if knowledge_task:
+                    source_tasks["knowledge_rag"] = knowledge_task
+                gathered, degraded = await self._gather_with_deadlines(source_tasks)
+                user_profile, profile_duration = gathered["user_profile"]
+                user_overview, overview_duration = gathered["user_overview"]
+                conversation_results, conversation_duration = gathered["conversation_rag"]
+                knowledge_results, knowledge_duration = gathered.get("knowledge_rag", ([], 0.0))
+                perf_details['context_budget_ms'] = round(self.context_budget * 1000)
+                perf_details['degraded_sources'] = degraded
+            # Strict mode: wait for all tasks to complete - NO FALLBACKS, fail fast
+            elif knowledge_task:
                 results = await asyncio.gather(
                     user_profile_task,
                     user_overview_task,
@@ -449,19 +656,19 @@ class AgentContextManager:
             perf_details['gather_conversation_rag'] = conversation_duration
             perf_details['has_top_document_intelligence'] = top_document_intelligence is not None
 
-            # Format all context as markdown
+            # Format all context as markdown and merge with the original system prompt
             # top_document_intelligence comes from RAG result (only the #1 ranked document)
-            context_markdown = self._format_context_as_markdown(
+            original_prompt = self.agent_config.get("system_prompt", "You are a helpful AI assistant.")
+            composed = self._compose_prompt(
+                original_prompt,
                 user_profile,
+                user_overview,
                 knowledge_results,
                 conversation_results,
-                user_overview,
                 top_document_intelligence  # Single document, not a list
             )
-
-            # Merge with original system prompt
-            original_prompt = self.agent_config.get("system_prompt", "You are a helpful AI assistant.")
-            enhanced_prompt = self._merge_system_prompts(original_prompt, context_markdown)
+            context_markdown = composed["context_markdown"]
+            enhanced_prompt = composed["enhanced_prompt"]
 
             # Calculate timing
             duration = time.perf_counter() - start_time
@@ -469,6 +676,10 @@ class AgentContextManager:
             # Prepare result
             result = {
                 "enhanced_system_prompt": enhanced_prompt,
+                # Volatile tail only; callers whose instructions already carry the
+                # stable prefix inject this instead of the full prompt
+                "turn_context_prompt": composed["turn_context_prompt"],
+                "stable_prefix": composed["stable_prefix"],
                 "context_metadata": {
                     "user_id": user_id,  # Use the passed user_id, not self.user_id
                     "client_id": self.client_id,
@@ -482,7 +693,8 @@ class AgentContextManager:
                     "context_length": len(context_markdown),
                     "total_prompt_length": len(enhanced_prompt),
                     "performance": perf_details,
-                    "context_type": "complete"
+                    "context_type": "complete",
+                    **self._prompt_layout_metadata(composed),
                 },
                 "raw_context_data": {
                     "user_profile": user_profile,
@@ -533,7 +745,9 @@ class AgentContextManager:
                 return {}, time.perf_counter() - start_time
 
             # Query the profiles table in client's Supabase without .single(), handle 0/1 gracefully
-            result = self.supabase.table("profiles").select("*").eq("user_id", user_id).execute()
+            result = await asyncio.to_thread(
+                lambda: self.supabase.table("profiles").select("*").eq("user_id", user_id).execute()
+            )
             
             if result.data and len(result.data) > 0:
                 profile = result.data[0]
@@ -582,11 +796,13 @@ class AgentContextManager:
             # This returns both shared overview and sidekick-specific insights
             try:
                 if agent_id:
-                    result = self.supabase.rpc("get_user_overview_for_agent", {
-                        "p_user_id": user_id,
-                        "p_client_id": self.client_id,
-                        "p_agent_id": agent_id
-                    }).execute()
+                    result = await asyncio.to_thread(
+                        lambda: self.supabase.rpc("get_user_overview_for_agent", {
+                            "p_user_id": user_id,
+                            "p_client_id": self.client_id,
+                            "p_agent_id": agent_id
+                        }).execute()
+                    )
 
                     if result.data and isinstance(result.data, dict):
                         # RPC returns 'shared_understanding' (not 'overview') and 'my_insights' (not 'sidekick_insights')
@@ -626,10 +842,12 @@ class AgentContextManager:
                 logger.debug(f"get_user_overview_for_agent not available, falling back: {e}")
 
             # Fallback to basic get_user_overview
-            result = self.supabase.rpc("get_user_overview", {
-                "p_user_id": user_id,
-                "p_client_id": self.client_id
-            }).execute()
+            result = await asyncio.to_thread(
+                lambda: self.supabase.rpc("get_user_overview", {
+                    "p_user_id": user_id,
+                    "p_client_id": self.client_id
+                }).execute()
+            )
 
             if result.data:
                 data = result.data
@@ -683,7 +901,7 @@ class AgentContextManager:
             hosting_type = self.agent_config.get("hosting_type", "dedicated")
             if hosting_type == "shared" and self.client_id:
                 rpc_params["p_client_id"] = str(self.client_id)
-            result = self.supabase.rpc("match_documents", rpc_params).execute()
+            result = await asyncio.to_thread(lambda: self.supabase.rpc("match_documents", rpc_params).execute())
 
             if result.data:
                 logger.info(f"✅ match_documents returned {len(result.data)} results.")
@@ -766,7 +984,9 @@ class AgentContextManager:
                     "user_id_param": user_id,
                     "match_count": MAX_CONVERSATION_RESULTS
                 }
-            result = self.supabase.rpc("match_conversation_transcripts_secure", conv_rpc_params).execute()
+            result = await asyncio.to_thread(
+                lambda: self.supabase.rpc("match_conversation_transcripts_secure", conv_rpc_params).execute()
+            )
             rpc_duration = (time.perf_counter() - rpc_start) * 1000
             logger.info(f"[PERF] Conversation RAG RPC took {rpc_duration:.0f}ms (returned {len(result.data) if result.data else 0} results)")
 
@@ -819,6 +1039,52 @@ class AgentContextManager:
         # Header
         sections.append("# Agent Context\n")
 
+        # User Overview first - most important for relationship context
+        sections.extend(self._user_overview_sections(user_overview))
+        sections.extend(self._document_intelligence_sections(document_intelligence))
+        sections.extend(self._user_profile_sections(profile, user_overview))
+        sections.extend(self._knowledge_sections(knowledge))
+        sections.extend(self._conversation_sections(conversations))
+
+        # Footer
+        sections.append("---")
+        sections.append(f"*Context generated at: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC*")
+
+        return self._finalize_markdown(sections)
+
+    def _format_user_context_markdown(
+        self,
+        profile: Dict[str, Any],
+        user_overview: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Slow-changing per-user context (overview + profile); part of the cacheable prefix."""
+        if not profile and not (user_overview and any(user_overview.values())):
+            return ""
+        sections = ["# Agent Context\n"]
+        sections.extend(self._user_overview_sections(user_overview))
+        sections.extend(self._user_profile_sections(profile, user_overview))
+        return self._finalize_markdown(sections)
+
+    def _format_turn_context_markdown(
+        self,
+        knowledge: List[Dict[str, Any]],
+        conversations: List[Dict[str, Any]],
+        document_intelligence: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Per-turn retrieval context; always placed last so the prefix stays cacheable."""
+        if not knowledge and not conversations and not document_intelligence:
+            return ""
+        sections = ["# Context For This Turn\n"]
+        sections.extend(self._document_intelligence_sections(document_intelligence))
+        sections.extend(self._knowledge_sections(knowledge))
+        sections.extend(self._conversation_sections(conversations))
+        sections.append("---")
+        sections.append(f"*Context generated at: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC*")
+        return self._finalize_markdown(sections)
+
+    def _user_overview_sections(self, user_overview: Optional[Dict[str, Any]]) -> List[str]:
+        """User Overview markdown (agent-maintained notes shared across sidekicks)."""
+        sections: List[str] = []
         # User Overview Section (comes first - most important for relationship context)
         if user_overview and any(user_overview.values()):
             sections.append("## User Overview")
@@ -955,6 +1221,11 @@ class AgentContextManager:
 
             sections.append("")  # Extra spacing after overview
 
+        return sections
+
+    def _document_intelligence_sections(self, document_intelligence: Optional[Dict[str, Any]]) -> List[str]:
+        """DocumentSense summary for the #1 ranked RAG document."""
+        sections: List[str] = []
         # Document Intelligence Section (DocumentSense - only for the #1 ranked document from RAG)
         if document_intelligence and isinstance(document_intelligence, dict):
             sections.append("## Top Document Intelligence")
@@ -1003,6 +1274,11 @@ class AgentContextManager:
 
             sections.append("")  # Extra spacing after document intelligence
 
+        return sections
+
+    def _user_profile_sections(self, profile: Dict[str, Any], user_overview: Optional[Dict[str, Any]]) -> List[str]:
+        """User profile markdown."""
+        sections: List[str] = []
         # User Profile Section
         if profile:
             sections.append("## User Profile")
@@ -1043,7 +1319,12 @@ class AgentContextManager:
                 sections.append(f"**Preferences:** {self._truncate_text(profile['preferences'], MAX_PROFILE_FIELD_CHARS)}  ")
             
             sections.append("")  # Empty line
-        
+
+        return sections
+
+    def _knowledge_sections(self, knowledge: List[Dict[str, Any]]) -> List[str]:
+        """Knowledge base search results markdown."""
+        sections: List[str] = []
         # Knowledge Base Section
         if knowledge:
             sections.append("## Relevant Knowledge Base")
@@ -1061,7 +1342,12 @@ class AgentContextManager:
                     sections.append(formatted_excerpt)
                 
                 sections.append("")  # Empty line between documents
-        
+
+        return sections
+
+    def _conversation_sections(self, conversations: List[Dict[str, Any]]) -> List[str]:
+        """Conversation history search results markdown."""
+        sections: List[str] = []
         # Conversation History Section
         if conversations:
             sections.append("## Recent Conversation Context")
@@ -1093,11 +1379,11 @@ class AgentContextManager:
                     sections.append(f"*(High relevance: {conv['relevance']})*  ")
                 
                 sections.append("")  # Empty line between conversations
-        
-        # Footer
-        sections.append("---")
-        sections.append(f"*Context generated at: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC*")
-        
+
+        return sections
+
+    def _finalize_markdown(self, sections: List[str]) -> str:
+        """Join sections, collapse blank lines and enforce the markdown budget."""
         # Join all sections
         markdown = "\n".join(sections)
         
@@ -1148,7 +1434,7 @@ class AgentContextManager:
     
     def _merge_system_prompts(self, original_prompt: str, context_markdown: str) -> str:
         """
-        Combine user-defined system prompt with dynamic context
+        Combine user-defined system prompt with dynamic context (legacy layout)
         
         Args:
             original_prompt: The agent's configured system prompt
@@ -1157,38 +1443,9 @@ class AgentContextManager:
         Returns:
             Enhanced system prompt
         """
-        # Response formatting guidelines that apply to all prompts
-        formatting_guidelines = """
-## Response Formatting Guidelines
-
-When speaking, structure your responses for clarity:
-- Use paragraph breaks between distinct ideas or topics
-- Bold key terms, important concepts, and names using **double asterisks**
-- Use transition phrases to guide the listener through your explanation
-- Keep individual sentences clear and conversational"""
-
-        # User Overview tool guidance
-        overview_tool_guidance = """
-## User Overview Tool
-
-You have access to an `update_user_overview` tool to maintain persistent notes about users.
-These notes are shared across all sidekicks for this client - they're your collective memory.
-
-**Use this tool when the user shares ENDURING information about:**
-- **Biography:** Life story, background, personal journey, ventures, projects, origin story
-- **Identity:** Their name (ALWAYS store under identity.name when shared), career/role changes, who they are
-- **Goals:** Priority shifts ("My priority is now X instead of Y"), aspirations, missions
-- **Working Style:** Communication preferences, decision-making patterns, neurodivergence
-- **Important Context:** Personal factors affecting interactions, constraints, circumstances
-- **Relationship History:** Key wins, milestones, ongoing threads worth remembering
-
-**Do NOT use for:** Routine tasks, today-only info, already-captured details, or speculation.
-
-**Be concise and update (don't just append).** If a goal changes, replace it. If they share biographical details, add them to the biography section."""
-
         if not context_markdown or context_markdown.strip() == "# Agent Context":
             # No meaningful context to add, but still include formatting and tool guidelines
-            return f"{original_prompt}\n\n---\n{formatting_guidelines}\n{overview_tool_guidance}"
+            return f"{original_prompt}\n\n---\n{RESPONSE_FORMATTING_GUIDELINES}\n{USER_OVERVIEW_TOOL_GUIDANCE}"
 
         # Build the enhanced prompt with formatting guidance
         enhanced_prompt = f"""{original_prompt}
@@ -1198,13 +1455,97 @@ These notes are shared across all sidekicks for this client - they're your colle
 {context_markdown}
 
 ---
-{formatting_guidelines}
-{overview_tool_guidance}
+{RESPONSE_FORMATTING_GUIDELINES}
+{USER_OVERVIEW_TOOL_GUIDANCE}
 
 Remember to use this context appropriately in your responses while maintaining your core personality and instructions."""
 
         return enhanced_prompt
-    
+
+    def _build_prompt_segments(
+        self,
+        original_prompt: str,
+        profile: Dict[str, Any],
+        user_overview: Optional[Dict[str, Any]],
+        knowledge: List[Dict[str, Any]],
+        conversations: List[Dict[str, Any]],
+        document_intelligence: Optional[Dict[str, Any]] = None,
+    ) -> List[PromptSegment]:
+        """
+        Prompt segments ordered from most static to most volatile.
+
+        agent prompt -> guidance -> user context -> per-turn RAG. Everything but
+        the final turn segment is identical across turns, so providers can serve
+        it from their prompt cache.
+        """
+        return [
+            PromptSegment("agent_prompt", original_prompt),
+            PromptSegment(
+                "guidance",
+                f"{RESPONSE_FORMATTING_GUIDELINES.strip()}\n\n{USER_OVERVIEW_TOOL_GUIDANCE.strip()}",
+            ),
+            PromptSegment("user_context", self._format_user_context_markdown(profile, user_overview)),
+            PromptSegment(
+                "turn_context",
+                self._format_turn_context_markdown(knowledge, conversations, document_intelligence),
+                cacheable=False,
+            ),
+        ]
+
+    def _compose_prompt(
+        self,
+        original_prompt: str,
+        profile: Dict[str, Any],
+        user_overview: Optional[Dict[str, Any]],
+        knowledge: List[Dict[str, Any]],
+        conversations: List[Dict[str, Any]],
+        document_intelligence: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Assemble the enhanced prompt for the configured layout."""
+        if self.prompt_layout == PROMPT_LAYOUT_LEGACY:
+            context_markdown = self._format_context_as_markdown(
+                profile, knowledge, conversations, user_overview, document_intelligence
+            )
+            enhanced_prompt = self._merge_system_prompts(original_prompt, context_markdown)
+            return {
+                "enhanced_prompt": enhanced_prompt,
+                "context_markdown": context_markdown,
+                "turn_context_prompt": enhanced_prompt,
+                "segments": [],
+                "stable_prefix": "",
+            }
+
+        segments = self._build_prompt_segments(
+            original_prompt, profile, user_overview, knowledge, conversations, document_intelligence
+        )
+        by_name = {seg.name: seg.content for seg in segments}
+        turn_context = by_name["turn_context"]
+        return {
+            "enhanced_prompt": assemble_prompt(segments),
+            "context_markdown": "\n\n".join(part for part in (by_name["user_context"], turn_context) if part),
+            "turn_context_prompt": (
+                f"{turn_context}\n\nUse this context appropriately in your response while maintaining "
+                f"your core personality and instructions."
+            ) if turn_context else "",
+            "segments": segments,
+            "stable_prefix": stable_prefix(segments),
+        }
+
+    def _prompt_layout_metadata(self, composed: Dict[str, Any]) -> Dict[str, Any]:
+        """Layout details for context_metadata; flags turns whose cacheable prefix changed."""
+        stable = composed.get("stable_prefix") or ""
+        prefix_hash = prefix_fingerprint(stable) if stable else None
+        changed = prefix_hash is not None and prefix_hash != self._last_prefix_hash
+        if prefix_hash is not None:
+            self._last_prefix_hash = prefix_hash
+        return {
+            "prompt_layout": self.prompt_layout,
+            "stable_prefix_length": len(stable),
+            "stable_prefix_hash": prefix_hash,
+            "stable_prefix_changed": changed,
+            "prompt_segments": [seg.to_dict() for seg in composed.get("segments") or []],
+        }
+
     async def close(self):
         """Clean up resources"""
         if hasattr(self, 'embedder') and self.embedder:
@@ -15,7 +15,7 @@ import types
 import re
 import unicodedata
 import aiohttp
-from typing import Optional, Dict, Any, List
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from datetime import datetime, timezone
 
 # Build version - updated automatically or manually when deploying
@@ -47,6 +47,7 @@ from io import BytesIO
 from api_key_loader import APIKeyLoader
 from config_validator import ConfigValidator, ConfigurationError
 from context import AgentContextManager
+from prompt_layout import PROMPT_LAYOUT_LEGACY, PromptCacheStats, get_prompt_layout, prompt_cache_key
 from sidekick_agent import SidekickAgent
 from tool_registry import ToolRegistry
 from supabase import create_client
@@ -54,6 +55,22 @@ try:
     from wizard_tasks import WizardGuideAgent
 except ImportError:
     WizardGuideAgent = None
+try:
+    from app.services.conversation_state import get_conversation_state_store, invalidate_conversation_state
+except Exception as exc:  # pragma: no cover - app package not mounted
+    logging.getLogger(__name__).warning("Failed to import conversation state store: %s", exc)
+    get_conversation_state_store = invalidate_conversation_state = None
+try:
+    from app.services.dispatch_config import get_dispatch_config_store
+except Exception as exc:  # pragma: no cover - app package not mounted
+    logging.getLogger(__name__).warning("Failed to import dispatch config store: %s", exc)
+    get_dispatch_config_store = None
+try:
+    from app.services.text_sessions import TextSessionActor, get_text_session_bus
+except Exception as exc:  # pragma: no cover - app package not mounted
+    logging.getLogger(__name__).warning("Failed to import text sessions: %s", exc)
+    TextSessionActor = None
+    get_text_session_bus = None
 
 # Enable SDK debug logging for better diagnostics
 os.environ["LIVEKIT_LOG_LEVEL"] = "debug"
@@ -586,6 +603,54 @@ def _extract_text_from_chat_items(items: List[Any]) -> str:
     return ""
 
 
+# Shared LiveKit API client for this job process (one aiohttp session per event loop)
+_livekit_api_client: Optional[Any] = None
+_livekit_api_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_livekit_api() -> Optional[Any]:
+    """Return the process-wide LiveKit API client, or None without credentials."""
+    global _livekit_api_client, _livekit_api_loop
+    loop = asyncio.get_running_loop()
+    if _livekit_api_client is not None and _livekit_api_loop is loop:
+        return _livekit_api_client
+    livekit_url = os.getenv("LIVEKIT_URL")
+    livekit_key = os.getenv("LIVEKIT_API_KEY")
+    livekit_secret = os.getenv("LIVEKIT_API_SECRET")
+    if not all([livekit_url, livekit_key, livekit_secret]):
+        return None
+    _livekit_api_client = livekit_api.LiveKitAPI(
+        url=livekit_url,
+        api_key=livekit_key,
+        api_secret=livekit_secret,
+    )
+    _livekit_api_loop = loop
+    return _livekit_api_client
+
+
+async def _reset_livekit_api() -> None:
+    global _livekit_api_client, _livekit_api_loop
+    client, _livekit_api_client, _livekit_api_loop = _livekit_api_client, None, None
+    if client is not None:
+        try:
+            await client.aclose()
+        except Exception:
+            pass
+
+
+async def _resolve_dispatch_config(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Expand a job's signed ``config_ref`` into the agent config it references."""
+    store = get_dispatch_config_store() if get_dispatch_config_store is not None else None
+    if store is None:
+        raise ConfigurationError("Job metadata carries a config_ref but no dispatch config store is configured")
+    try:
+        config = await store.resolve(metadata["config_ref"])
+    except Exception as e:
+        raise ConfigurationError(f"Failed to resolve dispatch config: {e}") from e
+    resolved = {k: v for k, v in metadata.items() if k != "config_ref"}
+    return {**config, **resolved}
+
+
 async def _merge_and_update_room_metadata(
     *,
     room_name: str,
@@ -594,23 +659,14 @@ async def _merge_and_update_room_metadata(
     retries: int = 2,
 ) -> None:
     """Persist payload into LiveKit room metadata, merging with existing metadata."""
-    livekit_url = os.getenv("LIVEKIT_URL")
-    livekit_key = os.getenv("LIVEKIT_API_KEY")
-    livekit_secret = os.getenv("LIVEKIT_API_SECRET")
-    if not all([livekit_url, livekit_key, livekit_secret]):
-        logger.warning("⚠️ LiveKit credentials missing; skipping metadata update")
-        return
-
     attempt = 0
     while attempt <= retries:
         attempt += 1
-        lk_client = None
         try:
-            lk_client = livekit_api.LiveKitAPI(
-                url=livekit_url,
-                api_key=livekit_key,
-                api_secret=livekit_secret,
-            )
+            lk_client = _get_livekit_api()
+            if lk_client is None:
+                logger.warning("⚠️ LiveKit credentials missing; skipping metadata update")
+                return
             existing = {}
             try:
                 rooms = await lk_client.room.list_rooms(
@@ -672,14 +728,10 @@ async def _merge_and_update_room_metadata(
                 meta_err,
                 exc_info=True,
             )
+            # Drop the shared client in case its session is what failed
+            await _reset_livekit_api()
             if attempt > retries:
                 return
-        finally:
-            try:
-                if lk_client:
-                    await lk_client.aclose()
-            except Exception:
-                pass
 
 
 async def _load_conversation_history(
@@ -687,20 +739,23 @@ async def _load_conversation_history(
     conversation_id: str,
     limit: int = 50,
 ) -> List[Dict[str, str]]:
-    """Load previous messages from conversation history for context."""
+    """Load the most recent messages of a conversation from the database."""
     if not supabase_client or not conversation_id:
         return []
 
     try:
-        result = supabase_client.table("conversation_transcripts").select(
-            "role", "content", "created_at"
-        ).eq("conversation_id", conversation_id).order(
-            "created_at", desc=False
-        ).limit(limit).execute()
+        # Newest `limit` rows, returned in chronological order
+        result = await asyncio.to_thread(
+            lambda: supabase_client.table("conversation_transcripts").select(
+                "role", "content", "created_at"
+            ).eq("conversation_id", conversation_id).order(
+                "created_at", desc=True
+            ).limit(limit).execute()
+        )
 
         messages = []
         if result.data:
-            for msg in result.data:
+            for msg in reversed(result.data):
                 role = msg.get("role")
                 content = msg.get("content", "")
                 if role in ("user", "assistant") and content:
@@ -713,6 +768,32 @@ async def _load_conversation_history(
         return []
 
 
+async def _get_conversation_history(
+    supabase_client,
+    conversation_id: str,
+    limit: int = 50,
+    fresh: bool = False,
+) -> List[Dict[str, str]]:
+    """Rolling conversation window; hits the database only on a state-store miss.
+
+    ``fresh`` re-hydrates the window first, for voice sessions whose earlier
+    transcripts were written straight to the database.
+    """
+    if not conversation_id:
+        return []
+    if get_conversation_state_store is None:
+        return await _load_conversation_history(supabase_client, conversation_id, limit=limit)
+
+    store = get_conversation_state_store()
+    if fresh:
+        await store.invalidate(conversation_id)
+    history = await store.get_history(
+        conversation_id,
+        loader=lambda: _load_conversation_history(supabase_client, conversation_id, limit=limit),
+    )
+    return history[-limit:] if limit else history
+
+
 async def _run_text_mode_interaction(
     *,
     session: voice.AgentSession,
@@ -722,12 +803,29 @@ async def _run_text_mode_interaction(
     collector: Optional[TextResponseCollector],
     conversation_id: str,
     timeout: float = 30.0,
+    publish: Optional[Callable[[Dict[str, Any], int], Awaitable[None]]] = None,
+    history: Optional[List[Dict[str, str]]] = None,
 ) -> Dict[str, Any]:
+    """Answer one text message.
+
+    Response payloads go to the room metadata by default; a text session actor
+    passes ``publish`` to send them on its reply stream instead, and its warm
+    ``history`` (extended with this exchange) in place of a history lookup.
+    """
     if not user_message or not user_message.strip():
         raise ConfigurationError("Text mode requests require 'user_message' in metadata")
 
     logger.info("📝 Text-only mode: direct LLM path (bypass TTS pipeline)")
 
+    if publish is None:
+        async def publish(payload: Dict[str, Any], retries: int) -> None:
+            await _merge_and_update_room_metadata(
+                room_name=room.name,
+                payload=payload,
+                logger=logger,
+                retries=retries,
+            )
+
     # ===========================================================================
     # ABILITY CLICK DETECTION: Detect [Ability Clicked: X] patterns and directly
     # trigger widgets without LLM involvement. This is more reliable than relying
@@ -801,22 +899,16 @@ async def _run_text_mode_interaction(
                 "tool_results": [],
             }
 
-            # Store in room metadata
-            await _merge_and_update_room_metadata(
-                room_name=room.name,
-                payload=payload,
-                logger=logger,
-                retries=2,
-            )
+            # Store in room metadata (or the text session reply stream)
+            await publish(payload, 2)
             logger.info(f"✅ Direct ability widget trigger completed: {widget_trigger['type']}")
             return payload
 
     # CRITICAL: Clear stale response fields from previous turns to prevent race conditions
     # This ensures the polling API doesn't see old text_response before the new one is ready
     try:
-        await _merge_and_update_room_metadata(
-            room_name=room.name,
-            payload={
+        await publish(
+            {
                 "mode": "text",
                 "conversation_id": conversation_id,
                 "streaming": True,  # Indicate new response in progress
@@ -828,8 +920,7 @@ async def _run_text_mode_interaction(
                 "widget": None,
                 "generated_at": None,
             },
-            logger=logger,
-            retries=1,
+            1,
         )
         logger.info("🔄 Cleared stale response metadata for new turn")
     except Exception as clear_err:
@@ -867,7 +958,10 @@ async def _run_text_mode_interaction(
             agent._agent_config.get("system_prompt") if hasattr(agent, "_agent_config") else None
         )
 
-        # Inject RAG context into the system prompt if available
+        # Inject RAG context if available. With the prefix-stable layout it goes in its
+        # own system message after the history so the system prompt + history prefix
+        # stays identical across turns (provider prompt caching).
+        rag_injection = ""
         if rag_context:
             rag_injection = f"""
 
@@ -880,19 +974,24 @@ IMPORTANT: Base your answer ONLY on the information provided below. If the conte
 
 ---
 """
-            system_prompt = (system_prompt or "") + rag_injection
-            logger.info(f"📚 Injected RAG context into system prompt")
+            if get_prompt_layout() == PROMPT_LAYOUT_LEGACY:
+                system_prompt = (system_prompt or "") + rag_injection
+                rag_injection = ""
+                logger.info(f"📚 Injected RAG context into system prompt")
 
         if system_prompt:
             chat_ctx.add_message(role="system", content=system_prompt)
             logger.info(f"📝 Added system prompt to chat context ({len(system_prompt)} chars)")
 
         # Load and add conversation history for resumed conversations
-        history_messages = await _load_conversation_history(
-            getattr(agent, "_supabase_client", None),
-            conversation_id,
-            limit=50  # Limit history to avoid token overflow
-        )
+        if history is not None:
+            history_messages = history[-50:]
+        else:
+            history_messages = await _get_conversation_history(
+                getattr(agent, "_supabase_client", None),
+                conversation_id,
+                limit=50  # Limit history to avoid token overflow
+            )
 
         for msg in history_messages:
             chat_ctx.add_message(role=msg["role"], content=msg["content"])
@@ -900,6 +999,10 @@ IMPORTANT: Base your answer ONLY on the information provided below. If the conte
         if history_messages:
             logger.info(f"📜 Added {len(history_messages)} history messages to chat context")
 
+        if rag_injection:
+            chat_ctx.add_message(role="system", content=rag_injection.strip())
+            logger.info(f"📚 Injected RAG context after history (prefix-stable layout)")
+
         # Add current user message
         chat_ctx.add_message(role="user", content=user_message)
 
@@ -981,9 +1084,8 @@ IMPORTANT: Base your answer ONLY on the information provided below. If the conte
                 if chunk_index - last_update_index >= stream_batch_size:
                     last_update_index = chunk_index
                     try:
-                        await _merge_and_update_room_metadata(
-                            room_name=room.name,
-                            payload={
+                        await publish(
+                            {
                                 "mode": "text",
                                 "conversation_id": conversation_id,
                                 "text_response_partial": assembled,
@@ -994,8 +1096,7 @@ IMPORTANT: Base your answer ONLY on the information provided below. If the conte
                                     "current": chunk_index,
                                 },
                             },
-                            logger=logger,
-                            retries=1,
+                            1,
                         )
                     except Exception as partial_err:
                         logger.debug(f"Streaming metadata update skipped: {partial_err}")
@@ -1376,21 +1477,79 @@ IMPORTANT: Base your answer ONLY on the information provided below. If the conte
     if widget_trigger:
         payload["widget"] = widget_trigger
         logger.info(f"🎨 TEXT-MODE: Adding widget trigger to payload: {widget_trigger}")
-    # Persist response via LiveKit server metadata so the API can poll it
-    await _merge_and_update_room_metadata(
-        room_name=room.name,
-        payload=payload,
-        logger=logger,
-        retries=2,
-    )
+    # Persist response via LiveKit server metadata (or the text session reply stream) so the API can poll it
+    await publish(payload, 2)
 
     # NOTE: Transcript storage for text mode is handled by FastAPI layer (embed.py)
     # after the streaming response completes. Do NOT store here to avoid duplicates.
     # The FastAPI layer's store_turn() handles both user and assistant messages.
+    # With a shared (Redis) state store the FastAPI store_turn() also appends the
+    # turn to the rolling window; an in-memory window lives only in this worker.
+    if get_conversation_state_store is not None and conversation_id and response_text:
+        store = get_conversation_state_store()
+        if not store.is_shared:
+            await store.append_turn(conversation_id, user_message, response_text)
+    if history is not None and response_text:
+        history.append({"role": "user", "content": user_message})
+        history.append({"role": "assistant", "content": response_text})
 
     return payload
 
 
+async def _serve_text_session(
+    *,
+    session: voice.AgentSession,
+    agent: SidekickAgent,
+    room: rtc.Room,
+    fingerprint: Optional[str],
+) -> None:
+    """Keep a finished text job alive as its conversation's actor for follow-up messages.
+
+    Follow-ups arrive on the text session inbox instead of a new room/dispatch, and
+    reuse this job's agent, tool registry and chat history. Returns once the actor
+    retires (idle timeout, config change or room disconnect).
+    """
+    conversation_id = getattr(agent, "_conversation_id", None)
+    # Without a fingerprint the actor could not tell whose turns it is serving
+    if get_text_session_bus is None or not conversation_id or not fingerprint:
+        return
+    bus = get_text_session_bus()
+    if bus is None:
+        return
+
+    history: Optional[List[Dict[str, str]]] = None
+
+    async def handle_turn(turn: Dict[str, Any], publish) -> None:
+        nonlocal history
+        if history is None:
+            # Seeded on the first follow-up, after the API persisted the first turn
+            history = list(
+                await _get_conversation_history(
+                    getattr(agent, "_supabase_client", None),
+                    conversation_id,
+                    limit=50,
+                )
+            )
+        await _run_text_mode_interaction(
+            session=session,
+            agent=agent,
+            room=room,
+            user_message=turn.get("user_message") or "",
+            collector=None,
+            conversation_id=conversation_id,
+            publish=publish,
+            history=history,
+        )
+        del history[:-50]
+
+    actor = TextSessionActor(bus, conversation_id, fingerprint, handle_turn)
+    try:
+        room.on("disconnected", lambda *_: actor.stop())
+    except Exception:
+        pass
+    await actor.serve()
+
+
 def collect_tool_results_from_event(event: Any, *, log: logging.Logger) -> tuple[List[Optional[str]], List[Dict[str, Any]]]:
     function_calls = list(getattr(event, "function_calls", []) or [])
     function_call_outputs = list(getattr(event, "function_call_outputs", []) or [])
@@ -1564,6 +1723,8 @@ async def _store_voice_turn(
         }
         await supabase_client.table("conversation_transcripts").insert(user_row).execute()
         await supabase_client.table("conversation_transcripts").insert(assistant_row).execute()
+        if invalidate_conversation_state is not None:
+            await invalidate_conversation_state(conversation_id)
         logger.info(
             f"✅ Stored voice turn as two rows for conversation_id={conversation_id}"
         )
@@ -1712,19 +1873,13 @@ async def agent_job_handler(ctx: JobContext):
             logger.info(f"LiveKit API credentials available: URL={bool(livekit_url)}, Key={bool(livekit_api_key)}, Secret={bool(livekit_api_secret)}")
             
             if all([livekit_url, livekit_api_key, livekit_api_secret]):
-                # Create LiveKit API client
-                livekit_api = None
+                # Shared LiveKit API client (kept open across jobs and metadata updates)
+                lk_client = _get_livekit_api()
                 try:
-                    livekit_api = api.LiveKitAPI(
-                        url=livekit_url,
-                        api_key=livekit_api_key,
-                        api_secret=livekit_api_secret
-                    )
-
                     logger.info(f"Fetching room details from LiveKit API for room: {ctx.room.name}")
 
                     # Fetch room details
-                    rooms = await livekit_api.room.list_rooms(
+                    rooms = await lk_client.room.list_rooms(
                         api.ListRoomsRequest(names=[ctx.room.name])
                     )
 
@@ -1766,12 +1921,9 @@ async def agent_job_handler(ctx: JobContext):
                             logger.warning("Room has no metadata in API response")
                     else:
                         logger.warning(f"Room {ctx.room.name} not found in API response")
-                finally:
-                    if livekit_api:
-                        try:
-                            await livekit_api.aclose()
-                        except Exception as close_error:
-                            logger.warning(f"Failed to close LiveKitAPI session: {close_error}")
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    await _reset_livekit_api()
+                    raise
             else:
                 missing = []
                 if not livekit_url: missing.append("LIVEKIT_URL")
@@ -1814,6 +1966,13 @@ async def agent_job_handler(ctx: JobContext):
                     merged = {**base, **job_metadata}
                     metadata = merged
                     logger.info("Merged room metadata with job metadata (job has priority)")
+                    if isinstance(metadata.get("config_ref"), dict):
+                        ref_start = time.perf_counter()
+                        metadata = await _resolve_dispatch_config(metadata)
+                        logger.info(
+                            f"Resolved dispatch config {job_metadata['config_ref'].get('version')} "
+                            f"({len(metadata)} keys) in {(time.perf_counter() - ref_start) * 1000:.1f}ms"
+                        )
             except json.JSONDecodeError as e:
                 logger.error(f"Failed to parse job metadata as JSON: {e}")
                 logger.error(f"Raw job metadata (first 500 chars): {ctx.job.metadata[:500]}")
@@ -1942,6 +2101,13 @@ async def agent_job_handler(ctx: JobContext):
             # Configure LLM based on provider - NO FALLBACK to environment variables
             if not llm_provider:
                 raise ConfigurationError("LLM provider required but not found (llm_provider)")
+            # Prefix-cache routing hint so turns for this client/agent share a warm prompt cache
+            cache_key = prompt_cache_key(
+                llm_provider,
+                metadata.get("client_id"),
+                metadata.get("agent_slug") or metadata.get("agent_id"),
+            )
+            cache_kwargs = {"prompt_cache_key": cache_key} if cache_key else {}
             if llm_provider == "groq":
                 groq_key = api_keys.get("groq_api_key")
                 if not groq_key:
@@ -1958,7 +2124,8 @@ async def agent_job_handler(ctx: JobContext):
                 llm_plugin = groq.LLM(
                     model=model,
                     api_key=groq_key,
-                    temperature=voice_settings.get("temperature", 0.8)
+                    temperature=voice_settings.get("temperature", 0.8),
+                    **cache_kwargs,
                 )
                 logger.info(f"✅ Groq LLM initialized: {model}")
             elif llm_provider == "cerebras":
@@ -1972,7 +2139,8 @@ async def agent_job_handler(ctx: JobContext):
                 # https://inference-docs.cerebras.ai/api-reference/chat-completions
                 model = voice_settings.get("llm_model", metadata.get("model", "zai-glm-4.7"))
                 llm_plugin = openai.LLM.with_cerebras(
-                    model=model
+                    model=model,
+                    **cache_kwargs,
                 )
                 # Check if this is a GLM model that supports reasoning toggle
                 # GLM-4.7 supports disable_reasoning parameter for fast voice responses
@@ -1998,12 +2166,17 @@ async def agent_job_handler(ctx: JobContext):
                     raise ConfigurationError("OpenAI API key required but not found")
                 llm_plugin = openai.LLM(
                     model=metadata.get("model", "gpt-4"),
-                    api_key=openai_key
+                    api_key=openai_key,
+                    **cache_kwargs,
                 )
             
             # Validate LLM initialization
             ConfigValidator.validate_provider_initialization(f"{llm_provider} LLM", llm_plugin)
 
+            # Report provider-side cached-token hit rates per turn
+            prompt_cache_stats = PromptCacheStats(label=llm_provider)
+            prompt_cache_stats.attach(llm_plugin)
+
             stt_plugin = None
             tts_plugin = None
             vad = None
@@ -2410,6 +2583,7 @@ async def agent_job_handler(ctx: JobContext):
                         "style_preset": _voice_settings_for_kb.get("kenburns_style", "cinematic"),
                         "animation_duration": _voice_settings_for_kb.get("kenburns_duration", 20),
                         "auto_interval": _voice_settings_for_kb.get("kenburns_auto_interval", 15),
+                        "prefetch_depth": _voice_settings_for_kb.get("kenburns_prefetch_depth", 1),
                     }
 
                     # Build Ken Burns tools (needs room for data channel)
@@ -2457,10 +2631,11 @@ async def agent_job_handler(ctx: JobContext):
             if conv_id_for_history and not is_text_mode:
                 try:
                     supabase_for_history = client_supabase if 'client_supabase' in locals() else None
-                    history_messages = await _load_conversation_history(
+                    history_messages = await _get_conversation_history(
                         supabase_for_history,
                         conv_id_for_history,
-                        limit=30  # Limit to avoid token overflow
+                        limit=30,  # Limit to avoid token overflow
+                        fresh=True,
                     )
                     if history_messages:
                         initial_chat_ctx = llm.ChatContext()
@@ -2548,6 +2723,7 @@ async def agent_job_handler(ctx: JobContext):
                         'show_citations': show_citations,
                         'dataset_ids': dataset_ids,
                         'rag_results_limit': metadata.get("rag_results_limit"),
+                        'rag_retrieval_mode': metadata.get("rag_retrieval_mode"),
                         'rerank': metadata.get("rerank"),
                         'api_keys': metadata.get("api_keys"),
                         'is_wizard_mode': False,
@@ -3284,6 +3460,9 @@ async def agent_job_handler(ctx: JobContext):
                         agent._current_turn_text = merged
                         session.latest_user_text = merged
                         agent.latest_user_text = merged
+                        # Overlap retrieval with the rest of the utterance
+                        if hasattr(agent, "on_interim_transcript"):
+                            agent.on_interim_transcript(merged)
                         if is_final:
                             # Only interrupt if this is NOT a duplicate transcript for the same turn
                             should_skip_duplicate = _should_skip_user_commit(agent, merged)
@@ -3869,6 +4048,12 @@ async def agent_job_handler(ctx: JobContext):
                         conversation_id=agent._conversation_id,
                     )
                     logger.info(f"✅ Text-only interaction completed with response length {len(payload.get('text_response', ''))}")
+                    await _serve_text_session(
+                        session=session,
+                        agent=agent,
+                        room=ctx.room,
+                        fingerprint=metadata.get("text_session_fingerprint"),
+                    )
                 finally:
                     try:
                         session.shutdown(drain=False)
@@ -0,0 +1,132 @@
+"""
+Prompt Layout
+Prefix-stable system prompt assembly and prompt-cache reporting.
+
+Providers cache (and route) on the longest identical prompt prefix, so segments
+are ordered from most static to most volatile:
+
+    agent prompt -> formatting/tool guidance -> user overview/profile -> per-turn RAG
+
+Only the trailing turn segment changes between turns, which keeps the cached
+prefix warm for long system prompts. ``PromptCacheStats`` reports how many
+prompt tokens the provider actually served from cache.
+"""
+import hashlib
+import logging
+import os
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROMPT_LAYOUT_PREFIX_STABLE = "prefix_stable"
+PROMPT_LAYOUT_LEGACY = "legacy"
+
+SEGMENT_SEPARATOR = "\n\n---\n\n"
+
+# Providers whose chat completions accept ``prompt_cache_key`` (prefix-cache routing hint)
+PROMPT_CACHE_KEY_PROVIDERS = {"openai", "groq", "cerebras"}
+
+
+def get_prompt_layout() -> str:
+    """Prompt layout mode from AGENT_PROMPT_LAYOUT (defaults to prefix_stable)."""
+    layout = (os.getenv("AGENT_PROMPT_LAYOUT") or PROMPT_LAYOUT_PREFIX_STABLE).strip().lower()
+    if layout not in (PROMPT_LAYOUT_PREFIX_STABLE, PROMPT_LAYOUT_LEGACY):
+        logger.warning(f"Unknown AGENT_PROMPT_LAYOUT '{layout}', using {PROMPT_LAYOUT_PREFIX_STABLE}")
+        return PROMPT_LAYOUT_PREFIX_STABLE
+    return layout
+
+
+@dataclass
+class PromptSegment:
+    """One block of the system prompt."""
+    name: str
+    content: str
+    cacheable: bool = True
+
+    def to_dict(self, include_content: bool = False) -> Dict[str, Any]:
+        data = asdict(self)
+        if not include_content:
+            data.pop("content")
+        data["length"] = len(self.content)
+        return data
+
+
+def assemble_prompt(segments: List[PromptSegment]) -> str:
+    """Join non-empty segments in order."""
+    return SEGMENT_SEPARATOR.join(seg.content.strip() for seg in segments if seg.content and seg.content.strip())
+
+
+def stable_prefix(segments: List[PromptSegment]) -> str:
+    """The cacheable prefix: every segment before the first volatile one."""
+    prefix: List[PromptSegment] = []
+    for seg in segments:
+        if not seg.cacheable:
+            break
+        prefix.append(seg)
+    return assemble_prompt(prefix)
+
+
+def prefix_fingerprint(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()[:16]
+
+
+def prompt_cache_key(provider: Optional[str], *parts: Optional[str]) -> Optional[str]:
+    """
+    Stable routing key for providers with automatic prefix caching.
+
+    Requests sharing a key are routed to the same cache shard, so one key per
+    client/agent keeps their shared system prompt warm across users and sessions.
+    """
+    if (provider or "").lower() not in PROMPT_CACHE_KEY_PROVIDERS:
+        return None
+    material = ":".join(str(p) for p in parts if p)
+    if not material:
+        return None
+    return f"sk-{prefix_fingerprint(material)}"
+
+
+class PromptCacheStats:
+    """Per-turn and cumulative cached-token hit rates from LLM metrics."""
+
+    def __init__(self, label: str = "llm"):
+        self.label = label
+        self.turns = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.last: Optional[Dict[str, Any]] = None
+
+    @property
+    def hit_rate(self) -> float:
+        return (self.cached_tokens / self.prompt_tokens) if self.prompt_tokens else 0.0
+
+    def record(self, metrics: Any) -> Optional[Dict[str, Any]]:
+        """Record an ``LLMMetrics`` (or metrics_collected event); ignores other metric types."""
+        metrics = getattr(metrics, "metrics", metrics)
+        prompt_tokens = getattr(metrics, "prompt_tokens", None)
+        if not prompt_tokens:
+            return None
+        cached = int(getattr(metrics, "prompt_cached_tokens", 0) or 0)
+
+        self.turns += 1
+        self.prompt_tokens += int(prompt_tokens)
+        self.cached_tokens += cached
+        self.last = {
+            "prompt_tokens": int(prompt_tokens),
+            "cached_tokens": cached,
+            "hit_rate": round(cached / prompt_tokens, 3),
+            "ttft": getattr(metrics, "ttft", None),
+            "session_hit_rate": round(self.hit_rate, 3),
+        }
+        logger.info(
+            f"🧊 Prompt cache ({self.label}): {cached}/{prompt_tokens} tokens cached "
+            f"({self.last['hit_rate']:.0%}) | session {self.hit_rate:.0%} over {self.turns} turns"
+        )
+        return self.last
+
+    def attach(self, llm_plugin: Any) -> None:
+        """Subscribe to an LLM plugin's metrics_collected events."""
+        try:
+            llm_plugin.on("metrics_collected", self.record)
+        except Exception as e:
+            logger.debug(f"Prompt cache stats not attached: {e}")
@@ -18,6 +18,13 @@ try:
 except ImportError:  # pragma: no cover - fallback for older SDKs
     from livekit.agents.voice.agent import TimedString
 
+from speculative_rag import SpeculativeRetriever, speculative_rag_enabled
+try:
+    from app.services.conversation_state import invalidate_conversation_state
+except Exception as exc:  # pragma: no cover - app package not mounted
+    logging.getLogger(__name__).warning("Failed to import conversation state store: %s", exc)
+    invalidate_conversation_state = None
+
 
 logger = logging.getLogger(__name__)
 
@@ -141,6 +148,12 @@ class SidekickAgent(voice.Agent):
         self._text_mode_enabled: bool = False
         self._text_response_collector: Optional[Any] = None
 
+        # Speculative retrieval on interim STT transcripts (fed by the session's
+        # user_input_transcribed handler; text mode never produces interims)
+        self._speculative_rag: Optional[SpeculativeRetriever] = None
+        if speculative_rag_enabled(self._agent_config) and not self._is_wizard_mode:
+            self._speculative_rag = SpeculativeRetriever(self._fetch_turn_context)
+
     def attach_text_response_collector(self, collector: Any) -> None:
         """Enable text-only mode response capture."""
         self._text_mode_enabled = True
@@ -370,20 +383,27 @@ class SidekickAgent(voice.Agent):
                 logger.info("on_user_turn_completed: context manager not available; skipping RAG injection")
                 return
 
-            # Perform RAG retrieval with citations if enabled
-            if self._citations_enabled and self._client_id:
+            # Reuse a speculative retrieval started on interim transcripts when the
+            # final text is close enough; otherwise retrieve on the final text now
+            bundle = None
+            speculation = self._speculative_rag.take(user_text) if self._speculative_rag else None
+            if speculation is not None:
                 try:
-                    await self._retrieve_with_citations(user_text)
+                    bundle = await speculation
                 except Exception as e:
-                    logger.error(f"Citation retrieval failed: {e}")
-                    # Continue with regular RAG if citations fail (graceful degradation)
-
-            logger.info("on_user_turn_completed: building RAG context for current turn")
-            ctx = await self._context_manager.build_complete_context(
-                user_message=user_text, user_id=self._user_id or "unknown"
-            )
+                    logger.warning(f"Speculative RAG failed, retrying on final transcript: {type(e).__name__}: {e}")
+            if bundle is None:
+                logger.info("on_user_turn_completed: building RAG context for current turn")
+                bundle = await self._fetch_turn_context(user_text)
+            citations, ctx = bundle
+            if citations is not None:
+                self._apply_citations(citations)
 
             enhanced = ctx.get("enhanced_system_prompt") if isinstance(ctx, dict) else None
+            stable = ctx.get("stable_prefix") if isinstance(ctx, dict) else None
+            if stable and stable in (getattr(self, "instructions", None) or ""):
+                # Instructions already carry the cacheable prefix; only inject this turn's context
+                enhanced = ctx.get("turn_context_prompt")
             if enhanced:
                 # Inject context as a system message so LLM treats it as instructions/context
                 turn_ctx.add_message(
@@ -396,11 +416,60 @@ class SidekickAgent(voice.Agent):
         except Exception as e:
             logger.error(f"on_user_turn_completed: RAG injection failed: {type(e).__name__}: {e}")
 
+    def on_interim_transcript(self, transcript: str) -> None:
+        """Feed an interim user transcript to the speculative retriever."""
+        if self._speculative_rag and self._context_manager:
+            self._speculative_rag.observe(transcript)
+
+    async def _fetch_turn_context(self, user_text: str):
+        """
+        Run citation retrieval and context building for ``user_text`` concurrently.
+
+        Returns ``(citations, ctx)`` where ``citations`` is a
+        ``(citations, rerank_info)`` pair or None when citations were skipped.
+        Has no side effects on the current turn, so it is safe to run speculatively.
+        """
+        citations_task = None
+        if self._citations_enabled and self._client_id:
+            citations_task = asyncio.create_task(self._compute_citations(user_text))
+        try:
+            ctx = await self._context_manager.build_complete_context(
+                user_message=user_text, user_id=self._user_id or "unknown"
+            )
+        except BaseException:
+            if citations_task:
+                citations_task.cancel()
+            raise
+
+        citations = None
+        if citations_task:
+            try:
+                citations = await citations_task
+            except Exception as e:
+                logger.error(f"Citation retrieval failed: {e}")
+                # Continue with regular RAG if citations fail (graceful degradation)
+        return citations, ctx
+
     async def _retrieve_with_citations(self, user_text: str) -> None:
         """
         Perform RAG retrieval with citation tracking.
         This method populates self._current_citations for use in the response.
         """
+        computed = await self._compute_citations(user_text)
+        if computed is not None:
+            self._apply_citations(computed)
+
+    def _apply_citations(self, computed) -> None:
+        self._current_citations, self._current_rerank_info = computed
+        logger.info(f"Retrieved {len(self._current_citations)} citations for message {self._current_message_id}")
+
+    async def _compute_citations(self, user_text: str):
+        """
+        Citation retrieval without touching per-turn state.
+
+        Returns ``(citations, rerank_info)``, or None when citations are not
+        configured for this agent.
+        """
         try:
             # Debug: Log agent_config state
             logger.info(f"_retrieve_with_citations: agent_config type={type(self._agent_config)}, is_none={self._agent_config is None}")
@@ -408,8 +477,7 @@ class SidekickAgent(voice.Agent):
             # Ensure agent_config is a dict
             if not isinstance(self._agent_config, dict):
                 logger.warning(f"_retrieve_with_citations: agent_config is not a dict, skipping citations")
-                self._current_citations = []
-                return
+                return [], {}
 
             # Use local citations service
             from citations_service import initialize_citations_service
@@ -429,12 +497,13 @@ class SidekickAgent(voice.Agent):
                     initialize_citations_service(
                         self._context_manager.supabase,
                         embedder=embedder,
-                        agent_slug=agent_slug
+                        agent_slug=agent_slug,
+                        retrieval_mode=self._agent_config.get('rag_retrieval_mode'),
                     )
                     self._citations_service_initialized = True
                 else:
                     logger.warning("No Supabase client available for citations service")
-                    return
+                    return None
             
             from citations_service import rag_citations_service
             
@@ -442,7 +511,7 @@ class SidekickAgent(voice.Agent):
             agent_slug = self._agent_config.get('agent_slug') or self._agent_config.get('agent_id')
             if not agent_slug:
                 logger.info("No agent_slug configured for citations")
-                return
+                return None
             
             # Collect dataset constraints if provided for this agent
             dataset_ids = []
@@ -525,8 +594,8 @@ class SidekickAgent(voice.Agent):
                 api_keys=api_keys,
             )
             
-            # Store citations for inclusion in the final response
-            self._current_citations = [
+            # Citations for inclusion in the final response
+            citations = [
                 {
                     "chunk_id": citation.chunk_id,
                     "doc_id": citation.doc_id,
@@ -542,14 +611,14 @@ class SidekickAgent(voice.Agent):
                 for citation in result.citations
             ]
 
-            # Store rerank info for downstream metadata
+            # Rerank info for downstream metadata
             try:
-                self._current_rerank_info = result.rerank_info or rerank_fallback_info
+                rerank_info = result.rerank_info or rerank_fallback_info
             except Exception:
-                self._current_rerank_info = rerank_fallback_info
-            
-            logger.info(f"Retrieved {len(self._current_citations)} citations for message {self._current_message_id}")
-            
+                rerank_info = rerank_fallback_info
+
+            return citations, rerank_info
+
         except Exception as e:
             import traceback
             logger.error(f"Citations retrieval failed: {e}")
@@ -560,7 +629,7 @@ class SidekickAgent(voice.Agent):
                 logger.error("Critical configuration error in citations service - cannot proceed")
                 raise
             # For other errors, continue without citations
-            self._current_citations = []
+            return [], self._current_rerank_info
 
     def get_current_citations(self) -> List[Dict[str, Any]]:
         """Get citations for the current message"""
@@ -876,6 +945,10 @@ class SidekickAgent(voice.Agent):
         final_content = self._enhance_text_for_display(accumulated_text)
         logger.info(f"📝 transcription_node FINISHED, accumulated: {len(accumulated_text)} chars, enhanced: {len(final_content)} chars")
 
+        # The streamed row bypassed store_turn; drop the rolling history window so it re-hydrates
+        if self._streaming_transcript_row_id:
+            await self._invalidate_conversation_window()
+
         # Store final streamed text for deduplication, then clear streaming row ID
         # Keep _streaming_transcript_text for deduplication check, clear row_id
         self._streaming_transcript_text = final_content
@@ -1155,6 +1228,7 @@ class SidekickAgent(voice.Agent):
                     return self._supabase_client.table("conversation_transcripts").insert(row).execute()
 
                 result = await asyncio.to_thread(_insert)
+            await self._invalidate_conversation_window()
             # Return inserted row id if available
             try:
                 if result and getattr(result, 'data', None):
@@ -1169,6 +1243,11 @@ class SidekickAgent(voice.Agent):
             logger.error(f"Failed to store {role} transcript: {e}")
             return None
     
+    async def _invalidate_conversation_window(self) -> None:
+        """Voice transcripts are written here directly, so the shared history window must re-hydrate."""
+        if invalidate_conversation_state is not None:
+            await invalidate_conversation_state(self._conversation_id)
+
     async def store_transcript(self, role: str, content: str) -> None:
         """Public wrapper used by session event handlers."""
         try:
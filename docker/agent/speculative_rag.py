@@ -0,0 +1,192 @@
+"""
+Speculative RAG
+Starts retrieval on stable interim STT transcripts so embedding + vector search
+overlap with the end of the user's speech instead of following it.
+
+Interim transcripts are debounced (a transcript must stop changing for
+``stable_after`` seconds) before a speculative retrieval is launched. Results
+are keyed by normalized text; when the turn completes, the closest speculation
+is reused if its divergence from the final transcript is within
+``max_divergence``, otherwise retrieval re-runs on the final text.
+"""
+import asyncio
+import difflib
+import logging
+import os
+import re
+import time
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Retriever = Callable[[str], Awaitable[Any]]
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, drop apostrophes, strip punctuation and collapse whitespace."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text).lower()
+    # STT toggles contractions ("what's" / "whats") between interim and final results
+    text = re.sub(r"['’]", "", text)
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def text_divergence(a: str, b: str) -> float:
+    """
+    Word-level divergence between two normalized transcripts (0 = identical, 1 = disjoint).
+
+    Based on difflib's matching-blocks ratio over word sequences, so appended
+    trailing words and single-word STT corrections both count proportionally.
+    """
+    a_words, b_words = a.split(), b.split()
+    if not a_words and not b_words:
+        return 0.0
+    return 1.0 - difflib.SequenceMatcher(None, a_words, b_words, autojunk=False).ratio()
+
+
+def speculative_rag_enabled(agent_config: Optional[Dict[str, Any]] = None) -> bool:
+    """Per-agent ``speculative_rag`` setting, falling back to SPECULATIVE_RAG_ENABLED (default on)."""
+    if isinstance(agent_config, dict) and agent_config.get("speculative_rag") is not None:
+        return bool(agent_config.get("speculative_rag"))
+    return (os.getenv("SPECULATIVE_RAG_ENABLED", "true").strip().lower() not in ("0", "false", "no", "off"))
+
+
+@dataclass
+class _Speculation:
+    text: str
+    task: "asyncio.Task[Any]"
+    started_at: float = field(default_factory=time.monotonic)
+
+
+class SpeculativeRetriever:
+    """
+    Debounced speculative retrieval keyed by normalized transcript text.
+
+    Args:
+        retrieve: ``await retrieve(text)`` producing the retrieval bundle
+        min_words: Ignore interim transcripts shorter than this
+        stable_after: Seconds an interim transcript must stay unchanged
+        max_divergence: Reuse a speculation when divergence <= this value
+        max_entries: In-flight/complete speculations kept per turn
+        max_age: Speculations older than this (seconds) are never reused
+    """
+
+    def __init__(
+        self,
+        retrieve: Retriever,
+        *,
+        min_words: int = 3,
+        stable_after: float = 0.25,
+        max_divergence: float = 0.2,
+        max_entries: int = 4,
+        max_age: float = 20.0,
+    ):
+        self._retrieve = retrieve
+        self.min_words = min_words
+        self.stable_after = stable_after
+        self.max_divergence = max_divergence
+        self.max_entries = max_entries
+        self.max_age = max_age
+
+        self._entries: Dict[str, _Speculation] = {}
+        self._debounce: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.launched = 0
+
+    # ------------------------------------------------------------------
+    # Interim side
+    # ------------------------------------------------------------------
+
+    def observe(self, transcript: str) -> None:
+        """Feed an interim (or partial final) transcript; must be called on the event loop."""
+        norm = normalize_query(transcript)
+        if len(norm.split()) < self.min_words:
+            return
+        if self._closest(norm)[0] is not None:
+            return  # an existing speculation already covers this text
+        if self._debounce and not self._debounce.done():
+            self._debounce.cancel()
+        self._debounce = asyncio.get_running_loop().create_task(self._launch_when_stable(norm, transcript))
+
+    async def _launch_when_stable(self, norm: str, transcript: str) -> None:
+        await asyncio.sleep(self.stable_after)
+        if norm in self._entries:
+            return
+        self.launched += 1
+        logger.info(f"🔮 Speculative RAG started for interim: '{transcript[:80]}'")
+        self._entries[norm] = _Speculation(text=norm, task=asyncio.create_task(self._retrieve(transcript)))
+        while len(self._entries) > self.max_entries:
+            oldest = min(self._entries, key=lambda key: self._entries[key].started_at)
+            self._drop(oldest)
+
+    # ------------------------------------------------------------------
+    # Final side
+    # ------------------------------------------------------------------
+
+    def _closest(self, norm: str) -> Tuple[Optional[_Speculation], float]:
+        now = time.monotonic()
+        best: Optional[_Speculation] = None
+        best_divergence = 1.0
+        for entry in self._entries.values():
+            if now - entry.started_at > self.max_age or entry.task.cancelled():
+                continue
+            divergence = text_divergence(entry.text, norm)
+            if divergence < best_divergence:
+                best, best_divergence = entry, divergence
+        if best is not None and best_divergence <= self.max_divergence:
+            return best, best_divergence
+        return None, best_divergence
+
+    def take(self, final_transcript: str) -> Optional["asyncio.Task[Any]"]:
+        """
+        Claim the speculation matching ``final_transcript`` (or None) and reset for the next turn.
+
+        The returned task may still be running; other speculations are cancelled.
+        """
+        if self._debounce and not self._debounce.done():
+            self._debounce.cancel()
+        self._debounce = None
+
+        match, divergence = self._closest(normalize_query(final_transcript))
+        if match is not None:
+            self.hits += 1
+            state = "ready" if match.task.done() else "in flight"
+            logger.info(
+                f"🔮 Speculative RAG hit ({state}, divergence={divergence:.2f}) "
+                f"| hits={self.hits} misses={self.misses}"
+            )
+            self._entries.pop(match.text, None)
+        elif self._entries:
+            self.misses += 1
+            logger.info(
+                f"🔮 Speculative RAG miss (closest divergence={divergence:.2f}); re-running on final transcript"
+            )
+        self.reset()
+        return match.task if match is not None else None
+
+    def reset(self) -> None:
+        """Cancel every outstanding speculation."""
+        for key in list(self._entries):
+            self._drop(key)
+        if self._debounce and not self._debounce.done():
+            self._debounce.cancel()
+        self._debounce = None
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        if not entry.task.done():
+            entry.task.cancel()
+        elif not entry.task.cancelled():
+            # Consume exceptions so discarded speculations don't log "never retrieved"
+            entry.task.exception()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {"launched": self.launched, "hits": self.hits, "misses": self.misses}
@@ -79,6 +79,17 @@ except Exception as exc:  # pragma: no cover - agent runtime runs standalone
     PredictionMarketConfigError = None  # type: ignore
 
 
+# Shared web scraping engine (pooled session + URL cache) for the scrape_url fallback
+try:
+    from app.services.web_scraper import ScrapeError, web_scraper  # type: ignore
+except Exception as exc:  # pragma: no cover - agent runtime runs standalone
+    logging.getLogger(__name__).warning(
+        "Failed to import web scraper engine: %s", exc,
+    )
+    web_scraper = None
+    ScrapeError = Exception  # type: ignore
+
+
 def _is_glm_reasoning_model(model_name: str) -> bool:
     """
     Check if the model is a GLM model that supports the reasoning toggle.
@@ -2194,99 +2205,19 @@ Do NOT use this for general knowledge questions - only for document-specific que
 
         async def _scrape_with_fallback(url: str, include_links: bool = False) -> dict:
             """
-            Built-in scraping fallback using BeautifulSoup + html2text.
+            Built-in scraping fallback backed by the shared WebScraper engine
+            (pooled session, capped download, off-loop parsing, URL cache).
             Returns dict with: title, description, markdown, links, source_url
             """
-            try:
-                from bs4 import BeautifulSoup
-                import html2text
-            except ImportError:
+            if web_scraper is None:
                 raise ToolError("Web scraping libraries not available. Please contact support.")
-
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.5",
-            }
-
-            timeout = aiohttp.ClientTimeout(total=timeout_seconds)
-            async with aiohttp.ClientSession(timeout=timeout, headers=headers) as session:
-                async with session.get(url, allow_redirects=True) as resp:
-                    if resp.status >= 400:
-                        raise ToolError(f"HTTP {resp.status} error fetching URL")
-
-                    content_type = resp.headers.get("Content-Type", "")
-                    if "text/html" not in content_type.lower() and "application/xhtml" not in content_type.lower():
-                        raise ToolError(f"URL returned non-HTML content type: {content_type}")
-
-                    html_content = await resp.text()
-                    final_url = str(resp.url)
-
-            # Parse HTML
-            soup = BeautifulSoup(html_content, "lxml")
-
-            # Extract title
-            title = "Untitled"
-            if soup.title and soup.title.string:
-                title = soup.title.string.strip()
-            elif soup.find("h1"):
-                title = soup.find("h1").get_text(strip=True)
-
-            # Extract description from meta tags
-            description = ""
-            meta_desc = soup.find("meta", attrs={"name": "description"})
-            if meta_desc and meta_desc.get("content"):
-                description = meta_desc["content"].strip()
-            elif soup.find("meta", attrs={"property": "og:description"}):
-                og_desc = soup.find("meta", attrs={"property": "og:description"})
-                if og_desc and og_desc.get("content"):
-                    description = og_desc["content"].strip()
-
-            # Remove unwanted elements before conversion
-            for tag in soup.find_all(["script", "style", "nav", "header", "footer", "aside", "noscript", "iframe"]):
-                tag.decompose()
-
-            # Try to find main content area
-            main_content = None
-            for selector in ["main", "article", "[role='main']", ".content", "#content", ".post", ".article"]:
-                main_content = soup.select_one(selector)
-                if main_content:
-                    break
-
-            if not main_content:
-                main_content = soup.find("body") or soup
-
-            # Convert to markdown using html2text
-            h2t = html2text.HTML2Text()
-            h2t.ignore_links = False
-            h2t.ignore_images = True
-            h2t.ignore_emphasis = False
-            h2t.body_width = 0  # No wrapping
-            h2t.skip_internal_links = True
-
-            markdown_content = h2t.handle(str(main_content))
-
-            # Clean up excessive whitespace
-            import re
-            markdown_content = re.sub(r'\n{3,}', '\n\n', markdown_content)
-            markdown_content = markdown_content.strip()
-
-            # Extract links if requested
-            links = []
-            if include_links:
-                for a_tag in soup.find_all("a", href=True):
-                    href = a_tag["href"]
-                    if href.startswith(("http://", "https://")):
-                        links.append(href)
-                links = list(dict.fromkeys(links))  # Remove duplicates while preserving order
-
-            return {
-                "title": title,
-                "description": description,
-                "markdown": markdown_content,
-                "links": links,
-                "source_url": final_url,
-            }
+            try:
+                page = await web_scraper.scrape(url, include_links=include_links, timeout=timeout_seconds)
+            except ScrapeError as e:
+                raise ToolError(str(e))
+            if page.from_cache:
+                self._logger.info(f"♻️ Scrape cache hit for {url}")
+            return page.to_dict()
 
         async def _invoke_scrape(**kwargs: Any) -> str:
             """Scrape a URL and return markdown content."""
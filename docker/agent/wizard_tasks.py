@@ -17,8 +17,10 @@ import logging
 import os
 import re
 import time
+import unicodedata
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
 
 from livekit import rtc
 from livekit.agents import AgentTask, function_tool, RunContext
@@ -39,6 +41,36 @@ logger = logging.getLogger(__name__)
 # LLM-Based Personality Assessment
 # =============================================================================
 
+# Answers that feed the LLM assessment (and so its memo key)
+ASSESSMENT_FIELDS = (
+    "openness",
+    "conscientiousness",
+    "extraversion",
+    "agreeableness",
+    "emotional_stability",
+    "communication_style",
+    "expertise_focus",
+    "humor_style",
+)
+# The Big Five answers needed before a background LLM refinement is worth starting
+REFINEMENT_FIELDS = ASSESSMENT_FIELDS[:5]
+ASSESSMENT_CACHE_SIZE = 256
+
+# Normalized answers -> LLM scores, shared across wizard sessions in this worker
+_ASSESSMENT_CACHE: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+
+
+def _assessment_key(collected_traits: Dict[str, str]) -> str:
+    """Memo key for a set of answers: case, punctuation and spacing don't matter (in any script)."""
+    normalized = {
+        field: " ".join(
+            re.findall(r"\w+", unicodedata.normalize("NFKC", collected_traits.get(field) or "").casefold())
+        )
+        for field in ASSESSMENT_FIELDS
+    }
+    return json.dumps(normalized, sort_keys=True)
+
+
 async def assess_personality_with_llm(
     collected_traits: Dict[str, str],
     sidekick_name: str
@@ -68,6 +100,13 @@ async def assess_personality_with_llm(
         "neuroticism": 50,
     }
 
+    cache_key = _assessment_key(collected_traits)
+    cached = _ASSESSMENT_CACHE.get(cache_key)
+    if cached is not None:
+        _ASSESSMENT_CACHE.move_to_end(cache_key)
+        logger.info(f"Wizard: Reusing personality assessment for identical answers: {cached}")
+        return dict(cached)
+
     if not GROQ_AVAILABLE:
         logger.warning("Groq SDK not available, using keyword-based scoring")
         return _keyword_based_scoring(collected_traits)
@@ -150,6 +189,10 @@ Return the JSON scores:"""
                 validated_scores[trait] = 50
 
         logger.info(f"Wizard: LLM assessed personality scores for {sidekick_name}: {validated_scores}")
+        # Only LLM results are memoized, so a failed call is retried on the next assessment
+        _ASSESSMENT_CACHE[cache_key] = dict(validated_scores)
+        while len(_ASSESSMENT_CACHE) > ASSESSMENT_CACHE_SIZE:
+            _ASSESSMENT_CACHE.popitem(last=False)
         return validated_scores
 
     except json.JSONDecodeError as e:
@@ -271,6 +314,78 @@ def _score_single_trait(field: str, value: str) -> Optional[Dict[str, int]]:
     return {field: score}
 
 
+# Refinements outlive the PersonalityTask that started them; keep them referenced
+_REFINEMENT_TASKS: Set[asyncio.Task] = set()
+
+
+class PersonalityAssessor:
+    """
+    Incremental Big Five scoring for one wizard session.
+
+    Each recorded answer updates ``traits`` immediately with the keyword score.
+    Once all Big Five answers are in, the LLM assessment runs in the background
+    and, if the answers haven't changed meanwhile, overwrites ``traits`` in place
+    and is passed to ``on_refined``. Callers can hand ``traits`` on without
+    waiting; it picks up the refinement whenever it lands.
+    """
+
+    def __init__(
+        self,
+        sidekick_name: str,
+        on_refined: Optional[Callable[[Dict[str, int]], Awaitable[None]]] = None,
+    ):
+        self.sidekick_name = sidekick_name
+        self.traits: Dict[str, int] = {
+            "openness": 50,
+            "conscientiousness": 50,
+            "extraversion": 50,
+            "agreeableness": 50,
+            "neuroticism": 50,
+        }
+        self._on_refined = on_refined
+        self._key: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, field: str, value: str) -> Optional[Dict[str, int]]:
+        """Apply the keyword score for one answer; returns the slider update, if any."""
+        update = _score_single_trait(field, value)
+        if update:
+            self.traits.update(update)
+        return update
+
+    def refine(self, collected: Dict[str, str]) -> None:
+        """Start (or restart) the background LLM assessment for the current answers."""
+        if not all(collected.get(f) for f in REFINEMENT_FIELDS):
+            return
+        key = _assessment_key(collected)
+        if key == self._key:
+            return
+        self._key = key
+        if self._task and not self._task.done():
+            self._task.cancel()  # Superseded by newer answers
+
+        cached = _ASSESSMENT_CACHE.get(key)
+        if cached is not None:
+            self.traits.update(cached)  # Available right away; the task below just publishes it
+
+        self._task = asyncio.create_task(self._refine(key, dict(collected)))
+        _REFINEMENT_TASKS.add(self._task)
+        self._task.add_done_callback(_REFINEMENT_TASKS.discard)
+
+    async def _refine(self, key: str, collected: Dict[str, str]) -> None:
+        try:
+            scores = await assess_personality_with_llm(collected, self.sidekick_name)
+            if key != self._key:
+                return
+            self.traits.update(scores)
+            if self._on_refined:
+                await self._on_refined(dict(self.traits))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Wizard: Background personality refinement failed: {e}")
+
+
 # =============================================================================
 # UI Event Manager - Handles bidirectional sync with frontend
 # =============================================================================
@@ -801,6 +916,11 @@ class PersonalityTask(AgentTask[PersonalityResult]):
         self._user_confirmed = False
         self._ui_event_manager = ui_event_manager
         self._ui_watcher_task: Optional[asyncio.Task] = None
+        self._assessor = PersonalityAssessor(sidekick_name, on_refined=self._publish_refined_traits)
+
+    async def _publish_refined_traits(self, traits: Dict[str, int]) -> None:
+        logger.info(f"Wizard: Refined personality traits (0-100) for {self.sidekick_name}: {traits}")
+        await self.publisher.field_update("personality_traits", traits, step=2)
 
     async def on_enter(self) -> None:
         await wait_for_speech_completion(self.session, timeout=3.0)
@@ -899,9 +1019,10 @@ class PersonalityTask(AgentTask[PersonalityResult]):
         await self.publisher.field_update(f"personality_{field}", value, step=2)
 
         # Publish numeric slider score so the personality engine sliders update in real time
-        trait_score = _score_single_trait(field, value)
+        trait_score = self._assessor.record(field, value)
         if trait_score:
             await self.publisher.field_update("personality_traits", trait_score, step=2)
+        self._assessor.refine(self._collected)
 
         # Build response with progress info
         collected_count = len([k for k in self._collected if k in self.REQUIRED_FIELDS])
@@ -949,11 +1070,12 @@ class PersonalityTask(AgentTask[PersonalityResult]):
                 self._collected[trait] = value.strip()
                 await self.publisher.field_update(f"personality_{trait}", value.strip(), step=2)
                 # Update slider with numeric score
-                trait_score = _score_single_trait(trait, value.strip())
+                trait_score = self._assessor.record(trait, value.strip())
                 if trait_score:
                     await self.publisher.field_update("personality_traits", trait_score, step=2)
                 extracted.append(trait)
                 logger.info(f"Wizard: Pre-collected {trait}='{value.strip()}' from initial description")
+        self._assessor.refine(self._collected)
 
         collected_count = len([k for k in self._collected if k in self.REQUIRED_FIELDS])
         total_required = len(self.REQUIRED_FIELDS)
@@ -1091,6 +1213,8 @@ class PersonalityTask(AgentTask[PersonalityResult]):
             await self.publisher.field_update("personality_additional_notes", notes, step=2)
             logger.info(f"Wizard: Recorded additional_notes='{notes}' for {self.sidekick_name}")
 
+        self._assessor.refine(self._collected)
+
         extras_recorded = sum(1 for x in [expertise, humor, notes] if x)
         if extras_recorded > 0:
             return f"Recorded {extras_recorded} extra preference(s)! Now summarize ALL collected traits to the user and ask 'Does that sound right?' Wait for their confirmation."
@@ -1150,15 +1274,17 @@ class PersonalityTask(AgentTask[PersonalityResult]):
 
         description = f"{self.sidekick_name} " + ", ".join(parts) + "."
 
-        # Use LLM to assess Big Five trait scores (0-100 scale) from collected descriptions
-        traits = await assess_personality_with_llm(self._collected, self.sidekick_name)
+        # Scores so far (LLM-refined if the background assessment already landed); the
+        # live dict picks up a later refinement before the wizard's results are built
+        self._assessor.refine(self._collected)
+        traits = self._assessor.traits
 
         logger.info(f"Wizard: Personality confirmed: {description}")
-        logger.info(f"Wizard: Assessed personality traits (0-100): {traits}")
+        logger.info(f"Wizard: Personality traits so far (0-100): {traits}")
 
         # Publish description and trait scores to frontend
         await self.publisher.field_update("personality_description", description, step=2)
-        await self.publisher.field_update("personality_traits", traits, step=2)
+        await self.publisher.field_update("personality_traits", dict(traits), step=2)
 
         self.complete(PersonalityResult(
             description=description,
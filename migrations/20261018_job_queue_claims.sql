@@ -0,0 +1,76 @@
+-- Notification-driven job claiming for client_provisioning_jobs.
+-- Used by app/services/job_queue.py (ProvisioningWorker).
+--
+-- * claim_* RPCs lock candidate rows with FOR UPDATE SKIP LOCKED so concurrent
+--   workers never block on, or double-claim, the same job.
+-- * Claims older than the visibility timeout are reclaimable (crashed workers).
+-- * A trigger pg_notifies the worker channel when new work becomes available, so
+--   enqueuers never publish to Postgres themselves.
+
+-- ---------------------------------------------------------------------------
+-- Provisioning jobs
+-- ---------------------------------------------------------------------------
+
+ALTER TABLE public.client_provisioning_jobs
+  ADD COLUMN IF NOT EXISTS claimed_by text;
+
+CREATE INDEX IF NOT EXISTS client_provisioning_jobs_unclaimed_idx
+  ON public.client_provisioning_jobs (job_type, created_at)
+  WHERE claimed_at IS NULL;
+
+CREATE OR REPLACE FUNCTION public.claim_provisioning_jobs(
+  p_job_type text,
+  p_limit integer DEFAULT 1,
+  p_visibility_timeout_seconds integer DEFAULT 900,
+  p_worker_id text DEFAULT NULL
+)
+RETURNS SETOF public.client_provisioning_jobs
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  UPDATE public.client_provisioning_jobs j
+     SET claimed_at = now(),
+         claimed_by = p_worker_id
+   WHERE j.id IN (
+     SELECT c.id
+       FROM public.client_provisioning_jobs c
+      WHERE (p_job_type = '*' OR c.job_type = p_job_type)
+        AND (
+          c.claimed_at IS NULL
+          -- Reclaim jobs held by crashed workers; failed jobs keep their claim
+          -- (and last_error) until an operator retries them.
+          OR (
+            c.last_error IS NULL
+            AND c.claimed_at < now() - make_interval(secs => p_visibility_timeout_seconds)
+          )
+        )
+      ORDER BY c.created_at
+      LIMIT greatest(p_limit, 0)
+      FOR UPDATE SKIP LOCKED
+   )
+  RETURNING j.*;
+$$;
+
+REVOKE ALL ON FUNCTION public.claim_provisioning_jobs(text, integer, integer, text) FROM public, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.claim_provisioning_jobs(text, integer, integer, text) TO service_role;
+
+CREATE OR REPLACE FUNCTION public.notify_client_provisioning_job()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF NEW.claimed_at IS NULL THEN
+    PERFORM pg_notify(
+      'client_provisioning_jobs',
+      json_build_object('client_id', NEW.client_id, 'job_type', NEW.job_type)::text
+    );
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS client_provisioning_jobs_notify ON public.client_provisioning_jobs;
+CREATE TRIGGER client_provisioning_jobs_notify
+  AFTER INSERT OR UPDATE OF claimed_at ON public.client_provisioning_jobs
+  FOR EACH ROW EXECUTE FUNCTION public.notify_client_provisioning_job();
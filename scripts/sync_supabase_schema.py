@@ -26,7 +26,7 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--skip-indexes",
         action="store_true",
-        help="Skip IVFFLAT index rebuild (apply only column patch).",
+        help="Skip vector index sizing/rebuild (apply only column patch).",
     )
     parser.add_argument(
         "--include-platform",
@@ -53,12 +53,14 @@ def run_patches(project_ref: str, name: str, token: str, run_indexes: bool) -> N
         "base_schema": "base tenant tables ensured",
         "vector_dimensions": "vector dimensions normalized",
         "conversation_patch": "conversation_transcripts columns aligned",
-        "ivfflat_indexes": "IVFFLAT indexes ensured (lists=16)",
+        "rag_patch": "RAG functions and columns ensured",
+        "vector_search_settings": "RPC probes/ef_search tuned",
     }
     for step, ok, detail in results:
         message = messages.get(step, step)
         if ok:
-            print(f"{format_status(True)} {name}: {message}")
+            suffix = f" -> {detail}" if step.startswith("vector_") and detail else ""
+            print(f"{format_status(True)} {name}: {message}{suffix}")
         else:
             print(f"{format_status(False)} {name}: {message} failed -> {detail}")
 